@@ -0,0 +1 @@
+"""Performance benchmarks of the quadcopter hot path (run from the repository root with "python -m benchmarks" or "python -m benchmarks.<name>")."""
@@ -0,0 +1,104 @@
+"""Runs the benchmark suite and compares it with the stored baseline (python -m benchmarks --help)."""
+
+import argparse
+import json
+import os
+import platform
+import sys
+
+from benchmarks import import_from_root
+from benchmarks.suite import Suite
+
+
+CONST_BASELINE_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+"""Default baseline file"""
+
+CONST_SOURCE_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+"""Directory the quadcopter reads its data files from"""
+
+
+def compare(results: dict, baseline: dict, threshold: float, tail_threshold: float) -> list:
+    """
+    This function finds the benchmarks that got slower or allocate more than the baseline.
+
+    :param results: dict | Benchmark name -> measurements
+    :param baseline: dict | Benchmark name -> measurements of the baseline
+    :param threshold: float | Allowed relative growth of the time per call
+    :param tail_threshold: float | Allowed relative growth of the 99th percentile
+    :return: list | Descriptions of the regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if result['ns'] > base['ns'] * (1 + threshold):
+            regressions.append(name + ': ' + format(result['ns'], '.0f') + ' ns/call (baseline ' + format(base['ns'], '.0f') + ')')
+        if result['p99'] > base['p99'] * (1 + tail_threshold):
+            regressions.append(name + ': p99 ' + format(result['p99'], '.0f') + ' ns (baseline ' + format(base['p99'], '.0f') + ')')
+        # tracemalloc rounds to whole blocks, so a few bytes per call are noise
+        if result['bytes'] > base['bytes'] * (1 + threshold) + 16:
+            regressions.append(name + ': ' + format(result['bytes'], '.0f') + ' bytes/call (baseline ' + format(base['bytes'], '.0f') + ')')
+    return regressions
+
+
+def main() -> int:
+    """
+    This function runs the suite, prints the results and checks them against the baseline.
+
+    :return: int | Exit code (1 - regression)
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks of the control hot path.')
+    parser.add_argument('--baseline', default=CONST_BASELINE_PATH, help='baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed growth of ns/call and bytes/call (0.25 = 25%%)')
+    parser.add_argument('--tail-threshold', type=float, default=1.0, help='allowed growth of the 99th percentile')
+    parser.add_argument('--filter', default='', help='run only the benchmarks containing this text')
+    parser.add_argument('--repeat', type=int, default=3, help='timing runs per benchmark (the best one counts)')
+    parser.add_argument('--scale', type=float, default=1, help='multiplier of the number of calls')
+    arguments = parser.parse_args()
+    baseline_path = os.path.abspath(arguments.baseline)
+
+    os.chdir(CONST_SOURCE_PATH)
+    suite = Suite()
+    results = {}
+    try:
+        print('{:<42}{:>10}{:>12}{:>10}{:>10}{:>10}'.format('benchmark', 'ns/call', 'bytes/call', 'p50', 'p99', 'max'))
+        for benchmark in suite.benchmarks:
+            if arguments.filter not in benchmark.name:
+                continue
+            result = benchmark.run(arguments.repeat, arguments.scale)
+            results[benchmark.name] = result
+            print('{:<42}{:>10.0f}{:>12.0f}{:>10}{:>10}{:>10}'.format(
+                benchmark.name, result['ns'], result['bytes'], result['p50'], result['p99'], result['max']
+            ))
+    finally:
+        suite.close()
+
+    if arguments.save:
+        with open(baseline_path, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results
+            }, file, indent=2)
+        print('Baseline saved: ' + baseline_path)
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print('No baseline (' + baseline_path + '), run with --save to create it.')
+        return 0
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    if baseline.get('python') != platform.python_version() or baseline.get('machine') != platform.machine():
+        print('Warning: the baseline comes from Python ' + str(baseline.get('python')) + ' on ' + str(baseline.get('machine')) + '.')
+    regressions = compare(results, baseline['results'], arguments.threshold, arguments.tail_threshold)
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    if not regressions:
+        print('No regressions against ' + baseline_path)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Compares one tick of the dict-of-dicts motor state with the array-backed motor bank (python -m benchmarks.bench_banks)."""
+
+from benchmarks import import_from_root
+from benchmarks.measure import time_call, allocated_bytes
+from banks import MotorBank
+from motor_output import GPIOMotorOutput
+from mixer import Mixer
+from fake_hardware import FakeGPIO
+
+
+class CountingDict(dict):
+    """
+    This class counts the key lookups of a dictionary.
+    """
+
+    lookups: int = 0
+
+    def __getitem__(self, key):
+        CountingDict.lookups += 1
+        return super().__getitem__(key)
+
+
+class LegacyMotors:
+    """
+    This class repeats the motor handling of Quadcopter before the motor bank (distribute_power, set_powers, get_powers).
+    """
+
+    def __init__(self, gpio: FakeGPIO, dict_type: type = dict) -> None:
+        pins = {'frontLeft': 6, 'frontRight': 26, 'backLeft': 19, 'backRight': 13}
+        self.motor_dict = dict_type()
+        for name, pin in pins.items():
+            self.motor_dict[name] = dict_type(pin=pin, gpio=gpio.PWM(pin, 50), extra_power=0)
+        self.main_power = 7
+        self.x_delta_power = 0.3
+        self.y_delta_power = -0.2
+        self.rotation_delta = 0.1
+
+    def get_calculated_power(self, motor_name: str) -> float:
+        return self.main_power + self.motor_dict[motor_name]['extra_power']
+
+    def tick(self) -> dict:
+        power_per_engine_left = self.x_delta_power / 2
+        power_per_engine_right = -power_per_engine_left
+        self.motor_dict['frontLeft']['extra_power'] = power_per_engine_left - self.rotation_delta
+        self.motor_dict['backLeft']['extra_power'] = power_per_engine_left + self.rotation_delta
+        self.motor_dict['frontRight']['extra_power'] = power_per_engine_right + self.rotation_delta
+        self.motor_dict['backRight']['extra_power'] = power_per_engine_right - self.rotation_delta
+        power_per_engine_front = self.y_delta_power / 2
+        power_per_engine_back = -power_per_engine_front
+        self.motor_dict['frontRight']['extra_power'] += power_per_engine_front
+        self.motor_dict['frontLeft']['extra_power'] += power_per_engine_front
+        self.motor_dict['backRight']['extra_power'] += power_per_engine_back
+        self.motor_dict['backLeft']['extra_power'] += power_per_engine_back
+        powers = [
+            self.get_calculated_power('frontRight'),
+            self.get_calculated_power('frontLeft'),
+            self.get_calculated_power('backRight'),
+            self.get_calculated_power('backLeft')
+        ]
+        max_power = max(powers)
+        min_power = min(powers)
+        if max_power > 10:
+            power_reduction = max_power - 10
+            for motor in self.motor_dict.values():
+                motor['extra_power'] -= power_reduction
+        elif min_power < 5:
+            extra_power = 5 - min_power
+            for motor in self.motor_dict.values():
+                motor['extra_power'] += extra_power
+        for x in self.motor_dict.values():
+            x['gpio'].ChangeDutyCycle(self.main_power + x['extra_power'])
+        powers = {}
+        for loop_index, x in enumerate(self.motor_dict.values()):
+            powers.update({loop_index: self.main_power + x['extra_power']})
+        return powers
+
+
+class BankMotors:
+    """
+    This class repeats the motor handling of Quadcopter with the motor bank and the mixer.
+    """
+
+    def __init__(self, gpio: FakeGPIO) -> None:
+        self.mixer = Mixer.from_file('data/airframes.json', 'quad_x')
+        pins = [6, 26, 19, 13]
+        self.motors = MotorBank(self.mixer.names, pins, GPIOMotorOutput(gpio, pins))
+        self.mixer.set_output(self.motors.extra_powers)
+        self.main_power = 7
+
+    def tick(self) -> dict:
+        self.mixer.mix(self.main_power, 0.3, -0.2, 0.1)
+        self.motors.set_duty_cycles(self.main_power)
+        return self.motors.get_powers(self.main_power)
+
+
+def main() -> None:
+    """
+    This function prints the time, the allocations and the key lookups of one tick.
+
+    :return: None
+    """
+    legacy = LegacyMotors(FakeGPIO())
+    bank = BankMotors(FakeGPIO())
+
+    CountingDict.lookups = 0
+    LegacyMotors(FakeGPIO(), CountingDict).tick()
+    legacy_lookups = CountingDict.lookups
+
+    print('{:<8}{:>12}{:>16}{:>16}'.format('', 'ns/tick', 'bytes/tick', 'lookups/tick'))
+    print('{:<8}{:>12.0f}{:>16.0f}{:>16}'.format('dict', time_call(legacy.tick), allocated_bytes(legacy.tick), legacy_lookups))
+    print('{:<8}{:>12.0f}{:>16.0f}{:>16}'.format('bank', time_call(bank.tick), allocated_bytes(bank.tick), 0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compares the per-sample cost of the old 3-sample MeasurementsFixer with the filters (python -m benchmarks.bench_filters)."""
+
+import numpy as np
+
+from benchmarks import import_from_root
+from benchmarks.measure import time_call, allocated_bytes
+from filters import MovingAverage, MovingMedian, ExponentialMovingAverage, BiquadLowPass
+
+
+class LegacyMeasurementsFixer:
+    """
+    This class repeats MeasurementsFixer before the filters (list.pop(0) and append, the whole window summed for every output).
+    """
+
+    def __init__(self, round_position: int = 0) -> None:
+        self.measurements_array = [[0, 0], [0, 0], [0, 0]]
+        self.round_position = round_position
+
+    def add_measurement(self, measurement: list):
+        self.measurements_array.pop(0)
+        self.measurements_array.append(measurement)
+        return self
+
+    def get_fixed_measurement(self) -> list:
+        return [
+            round((self.measurements_array[0][0] + self.measurements_array[1][0] + self.measurements_array[2][0]) / 3, self.round_position),
+            round((self.measurements_array[0][1] + self.measurements_array[1][1] + self.measurements_array[2][1]) / 3, self.round_position)
+        ]
+
+    def tick(self, measurement: list) -> list:
+        return self.add_measurement(measurement).get_fixed_measurement()
+
+
+CONST_BATCH: int = 1000
+"""Number of samples of an add_many call"""
+
+
+def main() -> None:
+    """
+    This function prints the time and the allocations per sample of every filter, one sample at a time and in batches.
+
+    :return: None
+    """
+    sample = [1.234, -5.678]
+    batch = np.random.default_rng(1).normal(0, 10, (CONST_BATCH, 2))
+    legacy = LegacyMeasurementsFixer()
+    filters = [
+        ('average(3)', MovingAverage(3)),
+        ('average(50)', MovingAverage(50)),
+        ('median(5)', MovingMedian(5)),
+        ('median(51)', MovingMedian(51)),
+        ('ema', ExponentialMovingAverage(0.1)),
+        ('biquad', BiquadLowPass(30, 1000))
+    ]
+
+    print('{:<14}{:>14}{:>16}{:>18}'.format('', 'ns/sample', 'bytes/sample', 'batch ns/sample'))
+    print('{:<14}{:>14.0f}{:>16.0f}{:>18}'.format('legacy(3)', time_call(lambda: legacy.tick(sample)), allocated_bytes(lambda: legacy.tick(sample)), '-'))
+    for name, item in filters:
+        add = item.add
+        add_many = item.add_many
+        print('{:<14}{:>14.0f}{:>16.0f}{:>18.0f}'.format(
+            name, time_call(lambda: add(sample)), allocated_bytes(lambda: add(sample)), time_call(lambda: add_many(batch), 200) / CONST_BATCH
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Drives many simulated WebSocket and HTTP clients against a local ground station (python -m benchmarks.load_ground_station --help)."""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import struct
+from multiprocessing import Process, Queue, Event
+from time import monotonic, sleep
+
+from benchmarks import import_from_root
+from benchmarks.measure import percentile
+from ground_station import GroundStation
+from telemetry import TelemetryRing
+from telemetry_stream import TelemetryStream
+
+
+def fly(ring: TelemetryRing, duration: float, idle: float, frequency: float, telemetry_frequency: float, results: Queue) -> None:
+    """
+    This function imitates the flight process: a fixed-rate loop that writes the telemetry and measures how late every tick starts.
+
+    :param ring: TelemetryRing | Telemetry ring
+    :param duration: float | Time (seconds) of the whole run
+    :param idle: float | Time (seconds) at the start without clients
+    :param frequency: float | Frequency (Hz) of the loop
+    :param telemetry_frequency: float | Frequency (Hz) of the telemetry writes
+    :param results: Queue | Receives the lateness (seconds) of the ticks without and with clients
+    :return: None
+    """
+    period = 1 / frequency
+    every = max(1, round(frequency / telemetry_frequency))
+    lateness = ([], [])
+    start = monotonic()
+    tick = 0
+    while True:
+        deadline = start + tick * period
+        now = monotonic()
+        if now < deadline:
+            sleep(deadline - now)
+            now = monotonic()
+        if now - start >= duration:
+            break
+        lateness[now - start >= idle].append(now - deadline)
+        if tick % every == 0:
+            ring.write(now, [5 + tick % 100 / 20, 6, 7, 8], [0.5, -0.5], 0.0001, now - deadline)
+        tick += 1
+    results.put(lateness)
+
+
+def run_station(ring: TelemetryRing, ports: Queue, stop: Event) -> None:
+    """
+    This function runs a ground station on a free port until the stop event is set.
+
+    :param ring: TelemetryRing | Telemetry ring
+    :param ports: Queue | Receives the port
+    :param stop: Event | Ends the station
+    :return: None
+    """
+    async def serve() -> None:
+        station = GroundStation(ring)
+        await station.start('127.0.0.1', 0)
+        ports.put(station.get_port())
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        station.stop()
+
+    if hasattr(os, 'nice'):
+        os.nice(10)
+    asyncio.run(serve())
+
+
+async def websocket_client(port: int, end: float, slow: bool, stats: dict) -> None:
+    """
+    This function reads telemetry frames over a WebSocket until the end time.
+
+    :param port: int | Port of the station
+    :param end: float | Time (monotonic) to leave
+    :param slow: bool | Reads only twice a second (so the station has to drop frames)
+    :param stats: dict | Counters and latencies (seconds from the sample to its arrival, fast clients only) to add to
+    :return: None
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((
+        'GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+        'Sec-WebSocket-Key: ' + key + '\r\nSec-WebSocket-Version: 13\r\n\r\n'
+    ).encode())
+    if not (await reader.readuntil(b'\r\n\r\n')).startswith(b'HTTP/1.1 101'):
+        stats['errors'] += 1
+        writer.close()
+        return
+    header_size = TelemetryStream.CONST_HEADER_FORMAT.size
+    try:
+        while monotonic() < end:
+            first, second = await asyncio.wait_for(reader.readexactly(2), end - monotonic())
+            length = second & 0x7f
+            if length == 126:
+                length = struct.unpack('>H', await reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack('>Q', await reader.readexactly(8))[0]
+            payload = await reader.readexactly(length)
+            version, motors, count, number = TelemetryStream.CONST_HEADER_FORMAT.unpack_from(payload)
+            timestamp = struct.unpack_from('<d', payload, header_size + (count - 1) * (16 + 4 * motors))[0]
+            stats['frames'] += 1
+            stats['samples'] += count
+            if slow:
+                await asyncio.sleep(0.5)
+            else:
+                stats['latencies'].append(monotonic() - timestamp)
+        # masked close frame with an empty mask
+        writer.write(b'\x88\x80\x00\x00\x00\x00')
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    writer.close()
+
+
+async def http_client(port: int, end: float, interval: float, stats: dict) -> None:
+    """
+    This function polls the latest sample over a keep-alive HTTP connection until the end time.
+
+    :param port: int | Port of the station
+    :param end: float | Time (monotonic) to leave
+    :param interval: float | Time (seconds) between requests
+    :param stats: dict | Counters and latencies (seconds of a request) to add to
+    :return: None
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while monotonic() < end:
+            start = monotonic()
+            writer.write(b'GET /telemetry HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            await reader.readexactly(length)
+            stats['requests'] += 1
+            stats['request_latencies'].append(monotonic() - start)
+            await asyncio.sleep(interval)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        stats['errors'] += 1
+    writer.close()
+
+
+async def get_status(port: int) -> dict:
+    """
+    This function reads the counters of the station.
+
+    :param port: int | Port of the station
+    :return: dict | Counters
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'GET /status HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def load(port: int, websockets: int, slow: int, https: int, interval: float, duration: float) -> tuple:
+    """
+    This function runs all the clients at once.
+
+    :param port: int | Port of the station
+    :param websockets: int | Number of WebSocket clients
+    :param slow: int | How many of them read slowly
+    :param https: int | Number of HTTP clients
+    :param interval: float | Time (seconds) between the requests of an HTTP client
+    :param duration: float | Time (seconds) of the load
+    :return: tuple | Client statistics, station counters
+    """
+    stats = {'frames': 0, 'samples': 0, 'latencies': [], 'requests': 0, 'request_latencies': [], 'errors': 0}
+    end = monotonic() + duration
+    clients = [websocket_client(port, end, x < slow, stats) for x in range(websockets)]
+    clients += [http_client(port, end, interval, stats) for x in range(https)]
+    for result in await asyncio.gather(*clients, return_exceptions=True):
+        if isinstance(result, Exception):
+            stats['errors'] += 1
+    return stats, await get_status(port)
+
+
+def main() -> None:
+    """
+    This function starts the flight imitation and the station in their own processes, loads the station and prints the results.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load_ground_station', description='Load test of the ground station.')
+    parser.add_argument('--websockets', type=int, default=200, help='number of WebSocket clients')
+    parser.add_argument('--slow', type=int, default=20, help='how many WebSocket clients read only twice a second')
+    parser.add_argument('--http', type=int, default=100, help='number of HTTP polling clients')
+    parser.add_argument('--interval', type=float, default=0.1, help='time (seconds) between the requests of an HTTP client')
+    parser.add_argument('--duration', type=float, default=5, help='time (seconds) of the load')
+    parser.add_argument('--idle', type=float, default=2, help='time (seconds) the flight loop runs before the clients connect')
+    parser.add_argument('--frequency', type=float, default=1000, help='frequency (Hz) of the imitated flight loop')
+    arguments = parser.parse_args()
+
+    ring = TelemetryRing()
+    results = Queue()
+    ports = Queue()
+    stop = Event()
+    flight = Process(target=fly, args=(ring, arguments.idle + arguments.duration, arguments.idle, arguments.frequency, 100, results))
+    station = Process(target=run_station, args=(ring, ports, stop))
+    try:
+        flight.start()
+        station.start()
+        port = ports.get(timeout=10)
+        # real clients run on other machines, here they must not take the CPU from the flight loop either
+        if hasattr(os, 'nice'):
+            os.nice(10)
+        sleep(arguments.idle)
+        stats, status = asyncio.run(load(port, arguments.websockets, arguments.slow, arguments.http, arguments.interval, arguments.duration))
+        idle, loaded = results.get(timeout=arguments.duration + 10)
+    finally:
+        stop.set()
+        flight.join()
+        station.join()
+        ring.close()
+
+    latencies = sorted(stats['latencies'])
+    request_latencies = sorted(stats['request_latencies'])
+    print('clients: ' + str(arguments.websockets) + ' WebSocket (' + str(arguments.slow) + ' slow), ' + str(arguments.http) + ' HTTP')
+    print('frames received: ' + str(stats['frames']) + ' (' + format(stats['frames'] / arguments.duration, '.0f') + '/s), samples: ' + str(stats['samples']))
+    if latencies:
+        print('sample to client (ms): p50 ' + format(percentile(latencies, 0.5) * 1e3, '.2f') + ', p99 ' + format(percentile(latencies, 0.99) * 1e3, '.2f'))
+    print('HTTP requests: ' + str(stats['requests']) + ' (' + format(stats['requests'] / arguments.duration, '.0f') + '/s)')
+    if request_latencies:
+        print('HTTP request (ms): p50 ' + format(percentile(request_latencies, 0.5) * 1e3, '.2f') + ', p99 ' + format(percentile(request_latencies, 0.99) * 1e3, '.2f'))
+    print('client errors: ' + str(stats['errors']))
+    print('station: ' + json.dumps(status))
+    for name, samples in (('idle', sorted(idle)), ('loaded', sorted(loaded))):
+        if samples:
+            print('flight loop lateness ' + name + ' (us): p50 ' + format(percentile(samples, 0.5) * 1e6, '.0f') + ', p99 '
+                  + format(percentile(samples, 0.99) * 1e6, '.0f') + ', max ' + format(samples[-1] * 1e6, '.0f'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""This module measures the time and the memory allocations of a function call."""
+
+import tracemalloc
+from time import perf_counter_ns
+from typing import Callable
+
+
+def time_call(function: Callable, calls: int = 100000) -> float:
+    """
+    This function measures the average time of a call.
+
+    :param function: Callable | Function without arguments
+    :param calls: int | Number of calls
+    :return: float | Nanoseconds per call
+    """
+    start = perf_counter_ns()
+    for x in range(calls):
+        function()
+    return (perf_counter_ns() - start) / calls
+
+
+def allocated_bytes(function: Callable, calls: int = 1000) -> float:
+    """
+    This function measures the average number of bytes allocated (and possibly freed again) by a call.
+
+    :param function: Callable | Function without arguments
+    :param calls: int | Number of calls
+    :return: float | Bytes allocated per call
+    """
+    function()
+    total = 0
+    tracemalloc.start()
+    try:
+        for x in range(calls):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function()
+            total += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return total / calls
+
+
+def latencies(function: Callable, calls: int = 10000) -> list:
+    """
+    This function measures every call separately (including about one timer read of overhead).
+
+    :param function: Callable | Function without arguments
+    :param calls: int | Number of calls
+    :return: list | Sorted nanoseconds of every call
+    """
+    samples = [0] * calls
+    for x in range(calls):
+        start = perf_counter_ns()
+        function()
+        samples[x] = perf_counter_ns() - start
+    samples.sort()
+    return samples
+
+
+def percentile(samples: list, part: float) -> float:
+    """
+    This function returns the value below which the given part of the sorted samples falls.
+
+    :param samples: list | Sorted samples
+    :param part: float | Part of the samples (0 - 1)
+    :return: float | Value
+    """
+    return samples[min(len(samples) - 1, int(part * len(samples)))]
@@ -0,0 +1,196 @@
+"""This module defines the benchmarks of the control hot path against the fake GPIO and SMBus (run it with "python -m benchmarks")."""
+
+import shutil
+import tempfile
+from time import monotonic
+from typing import Callable
+
+import numpy as np
+
+from benchmarks import import_from_root
+from benchmarks.measure import time_call, allocated_bytes, latencies, percentile
+from accelerometer import Accelerometer, MeasurementsFixer
+from fake_hardware import FakeSMBus
+from filters import MovingAverage, MovingMedian, ExponentialMovingAverage, BiquadLowPass
+from flight_recorder import FlightRecorder
+from hardware import FakeHardware
+from imu_reader import ImuReader
+from metrics import FlightMetrics
+from quadcopter import Quadcopter
+from setpoint import SetpointChannel
+from telemetry import TelemetryRing
+from timers import Clock, LoopRate, PreciseClock
+
+
+class BenchmarkHardware(FakeHardware):
+    """
+    This class uses the fake GPIO and SMBus with the real clock. Sleeping takes no time, so arming the quadcopter is instant.
+    """
+
+    def time(self) -> float:
+        """
+        This method returns the monotonic time moved forward by the time slept.
+
+        :return: float | Time in seconds
+        """
+        return monotonic() + self.now
+
+
+class Benchmark:
+    """
+    This class holds a function measured by the suite.
+    """
+
+    name: str = None
+    """Benchmark name"""
+
+    function: Callable = None
+    """Function without arguments"""
+
+    calls: int = None
+    """Number of calls of a timing run"""
+
+    def __init__(self, name: str, function: Callable, calls: int = 100000) -> None:
+        """
+        This constructor sets the benchmark.
+
+        :param name: str | Benchmark name
+        :param function: Callable | Function without arguments
+        :param calls: int | Number of calls of a timing run
+        :return: None
+        """
+        self.name = name
+        self.function = function
+        self.calls = calls
+
+    def run(self, repeat: int = 3, scale: float = 1) -> dict:
+        """
+        This method measures the function. The time per call is the best of the repeated runs, which is the least noisy estimate.
+
+        :param repeat: int | Number of timing runs
+        :param scale: float | Multiplier of the number of calls
+        :return: dict | ns per call, allocated bytes per call, median, 99th percentile and maximum call time (ns)
+        """
+        calls = max(1, int(self.calls * scale))
+        samples = latencies(self.function, max(100, calls // 10))
+        return {
+            'ns': min(time_call(self.function, calls) for x in range(repeat)),
+            'bytes': allocated_bytes(self.function, max(10, min(calls // 10, 1000))),
+            'p50': percentile(samples, 0.5),
+            'p99': percentile(samples, 0.99),
+            'max': samples[-1]
+        }
+
+
+class Suite:
+    """
+    This class builds a quadcopter on the fake hardware and the benchmarks of its hot functions.
+    """
+
+    setpoints: SetpointChannel = None
+    """Command channel of the quadcopter"""
+
+    telemetry: TelemetryRing = None
+    """Telemetry ring of the quadcopter"""
+
+    quadcopter: Quadcopter = None
+    """Quadcopter on the fake hardware"""
+
+    recorder: FlightRecorder = None
+    """Flight recorder writing to a temporary directory"""
+
+    metrics: FlightMetrics = None
+    """Hot path metrics of the quadcopter (on, like in production)"""
+
+    reader: ImuReader = None
+    """IMU reader filled inline (without its reading process)"""
+
+    benchmarks: list = None
+    """Benchmarks"""
+
+    def __init__(self) -> None:
+        """
+        This constructor creates the quadcopter and the benchmarks (the working directory has to be src).
+
+        :return: None
+        """
+        hardware = BenchmarkHardware()
+        hardware.bus.set_mpu6050_sample([1200, -800, 16000], 0, [65, -131, 20])
+        self.setpoints = SetpointChannel()
+        self.telemetry = TelemetryRing()
+        self.metrics = FlightMetrics()
+        quadcopter = Quadcopter(self.setpoints, self.telemetry, hardware=hardware, metrics=self.metrics)
+        quadcopter.set_main_power(7)
+        quadcopter.update_attitude()
+        quadcopter.main_method()
+        self.quadcopter = quadcopter
+
+        bus = FakeSMBus()
+        bus.set_mpu6050_sample([1200, -800, 16000], 0, [65, -131, 20])
+        accelerometer = Accelerometer(bus=bus)
+        fixer = MeasurementsFixer(2)
+        for x in range(3):
+            fixer.add_measurement([1.234, -5.678])
+        average = MovingAverage(50)
+        median = MovingMedian(5)
+        exponential = ExponentialMovingAverage(0.1)
+        low_pass = BiquadLowPass(30, Quadcopter.CONST_IMU_FREQUENCY)
+        batch = np.random.default_rng(1).normal(0, 10, (100, 2))
+        self.reader = reader = ImuReader(accelerometer)
+
+        def pick_up() -> None:
+            reader.read_once()
+            reader.read_new()
+
+        clock = Clock()
+        precise_clock = PreciseClock()
+        loop_rate = LoopRate(10 ** 9)
+        self.recorder = FlightRecorder(tempfile.mkdtemp(), len(quadcopter.motors))
+
+        def tick() -> None:
+            quadcopter.update_attitude()
+            quadcopter.main_method()
+            quadcopter.read_commands(self.setpoints)
+
+        self.benchmarks = [
+            Benchmark('quadcopter.tick', tick, 20000),
+            Benchmark('quadcopter.main_method', quadcopter.main_method, 50000),
+            Benchmark('quadcopter.distribute_power', quadcopter.distribute_power),
+            Benchmark('quadcopter.set_powers', quadcopter.set_powers),
+            Benchmark('quadcopter.get_powers', quadcopter.get_powers),
+            Benchmark('accelerometer.run', accelerometer.run, 20000),
+            Benchmark('accelerometer.read_attitude', accelerometer.read_attitude, 20000),
+            Benchmark('imu_reader.read_once_read_new', pick_up, 20000),
+            Benchmark('imu_reader.latest', reader.latest),
+            Benchmark('measurements_fixer.add_measurement', lambda: fixer.add_measurement([1.234, -5.678])),
+            Benchmark('measurements_fixer.get_fixed_measurement', fixer.get_fixed_measurement),
+            Benchmark('moving_average.add', lambda: average.add([1.234, -5.678])),
+            Benchmark('moving_median.add', lambda: median.add([1.234, -5.678])),
+            Benchmark('exponential_moving_average.add', lambda: exponential.add([1.234, -5.678])),
+            Benchmark('biquad_low_pass.add', lambda: low_pass.add([1.234, -5.678])),
+            Benchmark('moving_average.add_many_100', lambda: average.add_many(batch), 10000),
+            Benchmark('biquad_low_pass.add_many_100', lambda: low_pass.add_many(batch), 2000),
+            Benchmark('clock.get_elapsed_time', clock.get_elapsed_time),
+            Benchmark('clock.get_elapsed_seconds', clock.get_elapsed_seconds),
+            Benchmark('precise_clock.get_elapsed_ns', precise_clock.get_elapsed_ns),
+            Benchmark('loop_rate.slow_loop', loop_rate.slow_loop),
+            Benchmark('metrics.observe', lambda: self.metrics.observe(2, 0.0000123)),
+            Benchmark('flight_recorder.write', lambda: self.recorder.write(
+                1.0, (1200, -800, 16000, 0, 65, -131, 20), [1.5, -2.5], (0.1, -0.2, 0.05), 7.0, [7.1, 6.9, 7.05, 6.95], quadcopter.stage_times
+            ))
+        ]
+
+    def close(self) -> None:
+        """
+        This method closes the channels of the quadcopter.
+
+        :return: None
+        """
+        self.quadcopter = None
+        self.benchmarks = None
+        self.setpoints.close()
+        self.telemetry.close()
+        self.metrics.close()
+        self.reader.close()
+        self.recorder.close()
+        shutil.rmtree(self.recorder.directory)
@@ -1,55 +1,100 @@
 """This module manages the web visualizer."""
 
+from time import perf_counter
+
+# measured before the web modules are imported, for the start-up report
+CONST_START_TIME: float = perf_counter()
+
 import os
-from flask import Flask, send_from_directory, render_template
+from flask import Flask, Response, jsonify, send_from_directory, render_template, request
 from flask_socketio import SocketIO
 from flask_cors import CORS
-import multiprocessing
-
-
-try:
-    import import_from_root
-    from src.quadcopter import Quadcopter
-
-    powers = multiprocessing.Manager().list()
-    powers.append(0)
-
-    drone = Quadcopter(multiprocessing.Manager().Queue(), powers)
-    drone.start(test=True)
-except Exception as error:
-    print(error)
-
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'secret'
-CORS(app)
-socketio = SocketIO(app)
-
-
-@app.route('/favicon.ico')
-def favicon():
-    return send_from_directory(os.path.join(app.root_path, 'static'), 'favicon.ico', mimetype='image/vnd.microsoft.icon')
-
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-
-@app.route('/get-data')
-def get_data():
-    return drone.data_list[0]
-
 
-@socketio.on('message')
-def handleMessage(power):
-    print('Main power: ' + str(power))
-    drone.queue.put(float(power))
+import import_from_root
+from src.flight_service import IPCHub, FlightSupervisor
+from src.telemetry_stream import TelemetryStream
+
+CONST_IMPORT_TIME: float = perf_counter() - CONST_START_TIME
+
+
+def create_app(supervisor: FlightSupervisor) -> tuple:
+    """
+    This function creates the visualizer server and its telemetry stream. Nothing is started: the flight process starts
+    on supervisor.start() or on the first power command, the stream on TelemetryStream.run.
+
+    :param supervisor: FlightSupervisor | Starts and reports the flight process
+    :return: tuple | Flask application, SocketIO server, telemetry stream
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'secret'
+    CORS(app)
+    socketio = SocketIO(app)
+    hub = supervisor.hub
+    stream = TelemetryStream(hub.telemetry, lambda sid, data, callback: socketio.emit('telemetry', data, to=sid, callback=callback))
+
+    @app.route('/favicon.ico')
+    def favicon():
+        return send_from_directory(os.path.join(app.root_path, 'static'), 'favicon.ico', mimetype='image/vnd.microsoft.icon')
+
+    @app.route('/')
+    def index():
+        return render_template('index.html')
+
+    @app.route('/metrics')
+    def get_metrics():
+        return Response(hub.metrics.render(hub.setpoints.get_counters()), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/arming')
+    def get_arming():
+        return jsonify(hub.arming_status.read())
+
+    @app.route('/status')
+    def get_status():
+        status = supervisor.get_status()
+        status['server']['import_seconds'] = CONST_IMPORT_TIME
+        status['stream'] = stream.get_counters()
+        return jsonify(status)
+
+    @app.route('/get-data')
+    def get_data():
+        return hub.telemetry.get_powers()
+
+    @socketio.on('subscribe')
+    def subscribe(options):
+        options = options if isinstance(options, dict) else {}
+        stream.subscribe(request.sid, options.get('rate', 50), options.get('batch', 8))
+
+    @socketio.on('disconnect')
+    def disconnect(*arguments):
+        stream.unsubscribe(request.sid)
+
+    @socketio.on('message')
+    def handleMessage(power):
+        value = hub.setpoints.parse_power(power)
+        if value is None:
+            print('Wrong main power: ' + str(power))
+            return
+        print('Main power: ' + str(value))
+        supervisor.start()
+        hub.setpoints.send_power(value)
+
+    return app, socketio, stream
 
 
 if __name__ == '__main__':
+    hub = IPCHub.from_airframe()
+    supervisor = FlightSupervisor(hub)
+    app, socketio, stream = create_app(supervisor)
+    if not supervisor.start():
+        print('The flight process did not start: ' + supervisor.error)
+    socketio.start_background_task(stream.run, socketio.sleep)
+    print('Telemetry ring: ' + hub.telemetry.get_name() + ' (python3 ground_station.py ' + hub.telemetry.get_name() + ')')
+    print('Ready in ' + format(perf_counter() - CONST_START_TIME, '.2f') + ' s (the motors are armed in the background, see /arming)')
     try:
-        socketio.run(app, host='0.0.0.0', debug=True, use_reloader=False)
+        socketio.run(app, host='0.0.0.0', use_reloader=False, allow_unsafe_werkzeug=True)
     except KeyboardInterrupt:
-        drone.terminate()
-        drone.join()
+        pass
+    finally:
+        stream.stop()
+        supervisor.stop()
+        hub.close()
@@ -1,36 +1,51 @@
 const socket = io.connect('http://192.168.1.185:5000');
-let interval;
+const CONST_RATE = 50;
+const CONST_BATCH = 8;
 
 $(document).ready(function () {
-    interval = setInterval(initPower, 500);
+    socket.on('connect', function () {
+        $('.error').html('');
+        socket.emit('subscribe', {rate: CONST_RATE, batch: CONST_BATCH});
+    });
+    socket.on('disconnect', function () {
+        $('.error').html('Connection lost, reconnecting...');
+    });
+    socket.on('telemetry', function (data, ack) {
+        const samples = decodeFrame(data);
+        ack();
+        if (samples.length > 0) {
+            putData(samples[samples.length - 1].powers);
+        }
+    });
 }).on('change', '.slider', function () {
 	let val = $(this).val();
 	$('.power').html(val + ' %');
     socket.send((5 + (5 * val / 100)).toFixed(2));
 });
 
-function initPower() {
-    fetch('http://192.168.1.185:5000/get-data')
-    .then(async response => {
-
-        if (!response.ok) {
-            let status = response.status;
-            return Promise.reject(status);
+// Frame: version (u8), motors (u8), count (u16), first sample number (u32), then count x [timestamp (f64), motors x power (f32), 2 x angle (f32)]
+function decodeFrame(buffer) {
+    const view = new DataView(buffer);
+    const motors = view.getUint8(1);
+    const count = view.getUint16(2, true);
+    const size = 8 + 4 * motors + 8;
+    const samples = [];
+    for (let index = 0, offset = 8; index < count; index++, offset += size) {
+        const powers = [];
+        for (let motor = 0; motor < motors; motor++) {
+            powers.push(view.getFloat32(offset + 8 + 4 * motor, true));
         }
-        
-        const responseData = await response.json();
-
-        putData(responseData);
-    })
-    .catch(error => {
-        $('.error').html('Error while downloading data!');
-        clearInterval(interval);
-    });
+        samples.push({
+            timestamp: view.getFloat64(offset, true),
+            powers: powers,
+            angles: [view.getFloat32(offset + 8 + 4 * motors, true), view.getFloat32(offset + 12 + 4 * motors, true)]
+        });
+    }
+    return samples;
 }
 
-function putData(data) {
-    $('.engine:nth-child(1)').html(parseFloat(data['0']).toFixed(2));
-    $('.engine:nth-child(2)').html(parseFloat(data['1']).toFixed(2));
-    $('.engine:nth-child(3)').html(parseFloat(data['2']).toFixed(2));
-    $('.engine:nth-child(4)').html(parseFloat(data['3']).toFixed(2));
+function putData(powers) {
+    powers.forEach(function (power, index) {
+        $('.engine:nth-child(' + (index + 1) + ')').html(power.toFixed(2));
+    });
 }
@@ -1,9 +1,12 @@
 """This module handles the communication over I2C between a Raspberry Pi and a MPU-6050 Accelerometer."""
 
-import smbus
 import math
+import struct
+import numpy as np
 from typing import TypeVar
 
+from filters import MovingAverage
+
 
 class Accelerometer:
     """
@@ -13,24 +16,121 @@ class Accelerometer:
     power_management_1: hex = None
     """Wake up the device"""
 
-    bus: smbus.SMBus = None
-    """SMBus module"""
+    bus = None
+    """SMBus module (smbus.SMBus interface)"""
 
     address: hex = None
     """Device address"""
 
-    def __init__(self, address: hex = 0x68) -> None:
+    burst: bool = True
+    """Read all data registers in a single I2C block transaction"""
+
+    CONST_ACCELEROMETER_REGISTER: hex = 0x3b
+    """The first register of the accelerometer/temperature/gyro data block"""
+
+    CONST_TEMPERATURE_REGISTER: hex = 0x41
+    """The first temperature register"""
+
+    CONST_GYRO_REGISTER: hex = 0x43
+    """The first gyro register"""
+
+    CONST_BLOCK_LENGTH: int = 14
+    """Length of the data block (0x3B - 0x48)"""
+
+    CONST_BLOCK_FORMAT: struct.Struct = struct.Struct('>7h')
+    """Data block layout: 3 accelerometer, 1 temperature and 3 gyro big endian words"""
+
+    CONST_VECTOR_FORMAT: struct.Struct = struct.Struct('>3h')
+    """Layout of 3 big endian words (accelerometer or gyro vector)"""
+
+    CONST_WORD_FORMAT: struct.Struct = struct.Struct('>h')
+    """Layout of a single big endian word"""
+
+    CONST_ACCELEROMETER_SCALE: float = 16384.0
+    """LSB per g for the +-2 g range"""
+
+    CONST_GYRO_SCALE: float = 131.0
+    """LSB per deg/s for the +-250 deg/s range"""
+
+    CONST_SAMPLE_RATE_DIVIDER_REGISTER: hex = 0x19
+    """Sample rate divider register (sample rate = gyro output rate / (1 + divider))"""
+
+    CONST_CONFIG_REGISTER: hex = 0x1a
+    """Configuration register (digital low pass filter)"""
+
+    CONST_FIFO_ENABLE_REGISTER: hex = 0x23
+    """FIFO enable register (which data is written to the FIFO)"""
+
+    CONST_INTERRUPT_STATUS_REGISTER: hex = 0x3a
+    """Interrupt status register (bit 4 - FIFO overflow)"""
+
+    CONST_USER_CONTROL_REGISTER: hex = 0x6a
+    """User control register (bit 6 - FIFO enable, bit 2 - FIFO reset)"""
+
+    CONST_FIFO_COUNT_REGISTER: hex = 0x72
+    """The first FIFO count register"""
+
+    CONST_FIFO_REGISTER: hex = 0x74
+    """FIFO read/write register"""
+
+    CONST_FIFO_ACCELEROMETER_GYRO: hex = 0x78
+    """FIFO enable value for accelerometer and X, Y, Z gyro data"""
+
+    CONST_FIFO_FRAME_LENGTH: int = 12
+    """Length of a single FIFO sample (3 accelerometer and 3 gyro words)"""
+
+    CONST_FIFO_CHUNK_LENGTH: int = 24
+    """Number of FIFO bytes read in one transaction (whole samples, SMBus limit is 32)"""
+
+    CONST_FIFO_DTYPE: np.dtype = np.dtype('>i2')
+    """Type of a single FIFO word"""
+
+    streaming: bool = False
+    """Keeps information whether the FIFO streaming mode is active"""
+
+    overflows: int = 0
+    """Number of FIFO overflows detected while streaming"""
+
+    raw: tuple = (0, 0, 0, 0, 0, 0, 0)
+    """Raw words of the last sample read by read_sample (accelerometer X, Y, Z, temperature, gyro X, Y, Z)"""
+
+    calibration = None
+    """Bias and scale correction (calibration.SensorCalibration, None - data sheet values)"""
+
+    corrections: tuple = (0.0, 0.0, 0.0, CONST_ACCELEROMETER_SCALE, CONST_ACCELEROMETER_SCALE, CONST_ACCELEROMETER_SCALE, 0.0, 0.0, 0.0)
+    """Accelerometer X, Y, Z bias (LSB), accelerometer X, Y, Z scale (LSB per g) and gyro X, Y, Z bias (LSB) applied on every read"""
+
+    def __init__(self, address: hex = 0x68, burst: bool = True, bus=None) -> None:
         """
         This constructor wakes up "MPU6050" when it boots up in sleep mode.
 
         :param address: hex | Device address
+        :param burst: bool | Read all data registers in a single I2C block transaction
+        :param bus: smbus.SMBus | Bus to use instead of the I2C bus 1 (e.g. fake_hardware.FakeSMBus)
         :return None
         """
         self.power_management_1 = 0x6b
-        self.bus = smbus.SMBus(1)
+        if bus is None:
+            import smbus
+            bus = smbus.SMBus(1)
+        self.bus = bus
         self.address = address
+        self.burst = burst
         self.bus.write_byte_data(self.address, self.power_management_1, 0)
 
+    def set_calibration(self, calibration) -> None:
+        """
+        This method sets the correction applied on every read. The values are unpacked once here, so a read only subtracts and divides.
+
+        :param calibration: calibration.SensorCalibration | Bias and scale correction (None - data sheet values)
+        :return: None
+        """
+        self.calibration = calibration
+        if calibration is None:
+            self.corrections = Accelerometer.corrections
+        else:
+            self.corrections = tuple(float(x) for x in (*calibration.accelerometer_bias, *calibration.accelerometer_scale, *calibration.gyro_bias))
+
     def read_word_2c(self, register: hex) -> float:
         """
         This method read two i2c registers.
@@ -45,6 +145,216 @@ class Accelerometer:
             return value - 65536
         return value
 
+    def read_block(self, register: hex, block_format: struct.Struct) -> tuple:
+        """
+        This method reads consecutive registers in one transaction and decodes them.
+
+        :param register: hex | The first register to read from
+        :param block_format: struct.Struct | Layout of the registers
+        :return: tuple | Decoded values
+        """
+        return block_format.unpack(bytes(self.bus.read_i2c_block_data(self.address, register, block_format.size)))
+
+    def read_raw(self) -> tuple:
+        """
+        This method reads raw accelerometer, temperature and gyro values.
+
+        :return: tuple | Accelerometer X, Y, Z, temperature, gyro X, Y, Z
+        """
+        if self.burst:
+            return self.read_block(self.CONST_ACCELEROMETER_REGISTER, self.CONST_BLOCK_FORMAT)
+        return tuple(self.read_word_2c(self.CONST_ACCELEROMETER_REGISTER + 2 * x) for x in range(7))
+
+    def read_vector(self, register: hex) -> tuple:
+        """
+        This method reads three raw values (X, Y, Z) starting at a given register.
+
+        :param register: hex | The first register to read from
+        :return: tuple | X, Y, Z values
+        """
+        if self.burst:
+            return self.read_block(register, self.CONST_VECTOR_FORMAT)
+        return self.read_word_2c(register), self.read_word_2c(register + 2), self.read_word_2c(register + 4)
+
+    def get_accelerometer(self) -> list:
+        """
+        This method returns the acceleration.
+
+        :return: list | X, Y, Z acceleration in g
+        """
+        x, y, z = self.read_vector(self.CONST_ACCELEROMETER_REGISTER)
+        bias_x, bias_y, bias_z, scale_x, scale_y, scale_z = self.corrections[:6]
+        return [(x - bias_x) / scale_x, (y - bias_y) / scale_y, (z - bias_z) / scale_z]
+
+    def get_gyro(self) -> list:
+        """
+        This method returns the angular velocity.
+
+        :return: list | X, Y, Z angular velocity in deg/s
+        """
+        x, y, z = self.read_vector(self.CONST_GYRO_REGISTER)
+        bias_x, bias_y, bias_z = self.corrections[6:]
+        scale = self.CONST_GYRO_SCALE
+        return [(x - bias_x) / scale, (y - bias_y) / scale, (z - bias_z) / scale]
+
+    def get_temperature(self) -> float:
+        """
+        This method returns the temperature of the sensor.
+
+        :return: float | Temperature in degrees Celsius
+        """
+        if self.burst:
+            raw = self.read_block(self.CONST_TEMPERATURE_REGISTER, self.CONST_WORD_FORMAT)[0]
+        else:
+            raw = self.read_word_2c(self.CONST_TEMPERATURE_REGISTER)
+        return Accelerometer.convert_temperature(raw)
+
+    def read_sample(self) -> list:
+        """
+        This method reads the accelerometer, temperature and gyro at once (one transaction in burst mode).
+
+        :return: list | [X, Y, Z acceleration in g], temperature in degrees Celsius, [X, Y, Z angular velocity in deg/s]
+        """
+        self.raw = raw = self.read_raw()
+        return self.convert_sample(raw)
+
+    def convert_sample(self, raw: tuple) -> list:
+        """
+        This method corrects and scales raw words (e.g. read by imu_reader.ImuReader).
+
+        :param raw: tuple | Raw accelerometer X, Y, Z, temperature, gyro X, Y, Z words
+        :return: list | [X, Y, Z acceleration in g], temperature in degrees Celsius, [X, Y, Z angular velocity in deg/s]
+        """
+        accelerometer_x, accelerometer_y, accelerometer_z, temperature, gyro_x, gyro_y, gyro_z = raw
+        bias_x, bias_y, bias_z, scale_x, scale_y, scale_z, gyro_bias_x, gyro_bias_y, gyro_bias_z = self.corrections
+        gyro_scale = self.CONST_GYRO_SCALE
+        return [
+            [(accelerometer_x - bias_x) / scale_x, (accelerometer_y - bias_y) / scale_y, (accelerometer_z - bias_z) / scale_z],
+            Accelerometer.convert_temperature(temperature),
+            [(gyro_x - gyro_bias_x) / gyro_scale, (gyro_y - gyro_bias_y) / gyro_scale, (gyro_z - gyro_bias_z) / gyro_scale]
+        ]
+
+    @staticmethod
+    def convert_temperature(raw: int) -> float:
+        """
+        This method converts the raw temperature value into degrees Celsius.
+
+        :param raw: int | Raw temperature value
+        :return: float | Temperature in degrees Celsius
+        """
+        return raw / 340 + 36.53
+
+    def start_stream(self, sample_rate_divider: int = 0, dlpf: int = 1) -> None:
+        """
+        This method configures the sample rate and the digital low pass filter and starts writing samples to the FIFO.
+
+        :param sample_rate_divider: int | Sample rate divider (0 - 255)
+        :param dlpf: int | Digital low pass filter setting (0 - 6), 0 sets the gyro output rate to 8 kHz, other values to 1 kHz
+        :return: None
+        """
+        if not 0 <= sample_rate_divider <= 255:
+            raise ValueError('Wrong sample_rate_divider. ' + str(sample_rate_divider) + ' should be between 0 and 255.')
+        if not 0 <= dlpf <= 6:
+            raise ValueError('Wrong dlpf. ' + str(dlpf) + ' should be between 0 and 6.')
+        self.bus.write_byte_data(self.address, self.CONST_SAMPLE_RATE_DIVIDER_REGISTER, sample_rate_divider)
+        self.bus.write_byte_data(self.address, self.CONST_CONFIG_REGISTER, dlpf)
+        self.bus.write_byte_data(self.address, self.CONST_FIFO_ENABLE_REGISTER, self.CONST_FIFO_ACCELEROMETER_GYRO)
+        self.reset_stream()
+        self.streaming = True
+        self.overflows = 0
+
+    def stop_stream(self) -> None:
+        """
+        This method stops writing samples to the FIFO.
+
+        :return: None
+        """
+        self.bus.write_byte_data(self.address, self.CONST_FIFO_ENABLE_REGISTER, 0)
+        self.bus.write_byte_data(self.address, self.CONST_USER_CONTROL_REGISTER, 0)
+        self.streaming = False
+
+    def reset_stream(self) -> None:
+        """
+        This method clears the FIFO and keeps it enabled.
+
+        :return: None
+        """
+        self.bus.write_byte_data(self.address, self.CONST_USER_CONTROL_REGISTER, 0x44)
+
+    @staticmethod
+    def get_sample_rate(sample_rate_divider: int, dlpf: int) -> float:
+        """
+        This method calculates the FIFO sample rate.
+
+        :param sample_rate_divider: int | Sample rate divider
+        :param dlpf: int | Digital low pass filter setting
+        :return: float | Sample rate in Hz
+        """
+        return (8000 if dlpf == 0 else 1000) / (1 + sample_rate_divider)
+
+    def get_fifo_count(self) -> int:
+        """
+        This method returns the number of bytes in the FIFO.
+
+        :return: int | Number of bytes
+        """
+        high, low = self.bus.read_i2c_block_data(self.address, self.CONST_FIFO_COUNT_REGISTER, 2)
+        return (high << 8) + low
+
+    def read_stream(self, max_samples: int = None) -> list:
+        """
+        This method drains whole samples from the FIFO. The FIFO is reset when it has overflowed because its content is no longer aligned.
+
+        :param max_samples: int | Maximum number of samples to read (None - all)
+        :return: list | First index - (N, 3) acceleration array in g, Second index - (N, 3) angular velocity array in deg/s
+        """
+        if self.bus.read_byte_data(self.address, self.CONST_INTERRUPT_STATUS_REGISTER) & 0x10:
+            self.overflows += 1
+            self.reset_stream()
+            return [np.empty((0, 3)), np.empty((0, 3))]
+
+        samples = self.get_fifo_count() // self.CONST_FIFO_FRAME_LENGTH
+        if max_samples is not None:
+            samples = min(samples, max_samples)
+        length = samples * self.CONST_FIFO_FRAME_LENGTH
+
+        data = bytearray(length)
+        for start in range(0, length, self.CONST_FIFO_CHUNK_LENGTH):
+            chunk = min(self.CONST_FIFO_CHUNK_LENGTH, length - start)
+            data[start:start + chunk] = bytes(self.bus.read_i2c_block_data(self.address, self.CONST_FIFO_REGISTER, chunk))
+
+        words = np.frombuffer(data, dtype=self.CONST_FIFO_DTYPE).reshape(samples, 6)
+        corrections = np.array(self.corrections)
+        return [
+            (words[:, :3] - corrections[:3]) / corrections[3:6],
+            (words[:, 3:] - corrections[6:]) / self.CONST_GYRO_SCALE
+        ]
+
+    def run_stream(self, max_samples: int = None) -> np.ndarray:
+        """
+        This method calculates the device angles of every sample waiting in the FIFO.
+
+        :param max_samples: int | Maximum number of samples to read (None - all)
+        :return: np.ndarray | (N, 2) array, First column - X axis angles, Second column - Y axis angles
+        """
+        return Accelerometer.get_rotations(self.read_stream(max_samples)[0])
+
+    @staticmethod
+    def get_rotations(accelerometer: np.ndarray) -> np.ndarray:
+        """
+        This method converts a batch of accelerometer data into angles (vectorized get_x_rotation and get_y_rotation).
+
+        :param accelerometer: np.ndarray | (N, 3) array of X, Y, Z axis parameters
+        :return: np.ndarray | (N, 2) array, First column - X axis angles, Second column - Y axis angles
+        """
+        x = accelerometer[:, 0]
+        y = accelerometer[:, 1]
+        z = accelerometer[:, 2]
+        return np.degrees(np.column_stack((
+            np.arctan2(y, np.hypot(x, z)),
+            np.arctan2(x, np.hypot(y, z))
+        )))
+
     @staticmethod
     def dist(a: float, b: float) -> float:
         """
@@ -86,54 +396,72 @@ class Accelerometer:
 
         :return: list | First index - X axis angle, Second index - Y axis angle
         """
-        # Read accelerometer data
-        accelerometer_x = self.read_word_2c(0x3b)
-        accelerometer_y = self.read_word_2c(0x3d)
-        accelerometer_z = self.read_word_2c(0x3f)
-
-        # Scale accelerometer data
-        accelerometer_x_scaled = accelerometer_x / 16384.0
-        accelerometer_y_scaled = accelerometer_y / 16384.0
-        accelerometer_z_scaled = accelerometer_z / 16384.0
+        accelerometer_x_scaled, accelerometer_y_scaled, accelerometer_z_scaled = self.get_accelerometer()
 
         return [
             Accelerometer.get_x_rotation(accelerometer_x_scaled, accelerometer_y_scaled, accelerometer_z_scaled),
             Accelerometer.get_y_rotation(accelerometer_x_scaled, accelerometer_y_scaled, accelerometer_z_scaled)
         ]
 
+    def read_attitude(self) -> list:
+        """
+        This method reads the device angles and the angular velocity at once.
+
+        :return: list | [X axis angle, Y axis angle], [X axis rate, Y axis rate, Z axis rate] in deg/s
+        """
+        self.raw = raw = self.read_raw()
+        return self.convert_attitude(raw)
+
+    def convert_attitude(self, raw: tuple) -> list:
+        """
+        This method converts raw words into the device angles and the angular velocity.
+        The Y angle of get_y_rotation grows in the opposite direction to the gyro Y axis, so the Y rate is negated.
+
+        :param raw: tuple | Raw accelerometer X, Y, Z, temperature, gyro X, Y, Z words
+        :return: list | [X axis angle, Y axis angle], [X axis rate, Y axis rate, Z axis rate] in deg/s
+        """
+        accelerometer, temperature, gyro = self.convert_sample(raw)
+        return [
+            [Accelerometer.get_x_rotation(*accelerometer), Accelerometer.get_y_rotation(*accelerometer)],
+            [gyro[0], -gyro[1], gyro[2]]
+        ]
+
 
 MeasurementsFixerObject = TypeVar('MeasurementsFixerObject', bound='MeasurementsFixer')
 
 
 class MeasurementsFixer:
     """
-    This class stores 3 measurements from the accelerometer and calculates the average and rounds it.
+    This class stores the last measurements from the accelerometer and calculates the average (and rounds it).
+    A calibrated sensor (calibration.SensorCalibration) has no bias to hide, so the average is not rounded by default.
+    The history starts filled with zeros; filters.MovingAverage keeps the running sum, so the window size does not change the cost.
     """
 
-    measurements_array: list = None
-    """Stores the history of measurements"""
+    average: MovingAverage = None
+    """Stores the history of measurements and their running sum"""
 
     round_position: int = None
-    """Holds the position to which the class will round numbers"""
+    """Holds the position to which the class will round numbers (None - no rounding)"""
 
-    def __init__(self, round_position: int = 0) -> None:
+    def __init__(self, round_position: int = None, window: int = 3) -> None:
         """
         This constructor sets the measurement history and round_position.
         
-        :param round_position: int | Position to which the class will round numbers
+        :param round_position: int | Position to which the class will round numbers (None - no rounding)
+        :param window: int | Number of measurements in the average
         :return: None
         """
-        self.measurements_array = [[0, 0], [0, 0], [0, 0]]
+        self.average = MovingAverage(window).fill([0, 0])
         self.set_round(round_position)
 
     def set_round(self, round_position: int) -> MeasurementsFixerObject:
         """
         Sets position to which the class will round numbers.
 
-        :param round_position: int | Position to which the class will round numbers
+        :param round_position: int | Position to which the class will round numbers (None - no rounding)
         :return: self
         """
-        if round_position < -1:
+        if round_position is not None and round_position < -1:
             raise ValueError('Wrong round_position. ' + str(round_position) + ' should be greater than -1.')
         self.round_position = round_position
         return self
@@ -145,8 +473,7 @@ class MeasurementsFixer:
         :param measurement: list | Data from accelerometer
         :return: self
         """
-        self.measurements_array.pop(0)
-        self.measurements_array.append(measurement)
+        self.average.add(measurement)
         return self
 
     def get_all_measurements(self) -> list:
@@ -155,7 +482,7 @@ class MeasurementsFixer:
 
         :return: list | Copy of the measurement history
         """
-        return self.measurements_array.copy()
+        return self.average.get_window()
 
     def get_fixed_measurement(self) -> list:
         """
@@ -163,17 +490,7 @@ class MeasurementsFixer:
 
         :return: list | Fixed measurement history data
         """
-        return [
-            round((
-                    (
-                            self.measurements_array[0][0] +
-                            self.measurements_array[1][0] +
-                            self.measurements_array[2][0]
-                    ) / 3), self.round_position),
-            round((
-                    (
-                            self.measurements_array[0][1] +
-                            self.measurements_array[1][1] +
-                            self.measurements_array[2][1]
-                    ) / 3), self.round_position)
-        ]
+        averages = self.average.get_value()
+        if self.round_position is None:
+            return averages
+        return [round(x, self.round_position) for x in averages]
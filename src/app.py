@@ -1,57 +1,90 @@
 """This module manages the web server."""
 
+from time import perf_counter
+
+# measured before the web modules are imported, for the start-up report
+CONST_START_TIME: float = perf_counter()
+
 import os
-from flask import Flask, send_from_directory, render_template
+from flask import Flask, Response, jsonify, send_from_directory, render_template
 from flask_socketio import SocketIO
 from flask_cors import CORS
-import multiprocessing
-
-
-try:
-    from quadcopter import Quadcopter
-
-    powers = multiprocessing.Manager().list()
-    powers.append(0)
-
-    drone = Quadcopter(multiprocessing.Manager().Queue(), powers)
-    drone.start(test=True)
-except Exception as error:
-    print(error)
-
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'secret'
-CORS(app)
-socketio = SocketIO(app)
-
-
-@app.route('/favicon.ico')
-def favicon():
-    return send_from_directory(os.path.join(app.root_path, 'static'), 'favicon.ico', mimetype='image/vnd.microsoft.icon')
-
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-
-@app.route('/direction/<action>')
-def direction(action):
-    ### TODO ###
-    print(action)
-    return '', 200
-
 
-@app.route('/power/<strength>')
-def power(strength):
-    ### TODO ###
-    print(strength)
-    return '', 200
+from flight_service import IPCHub, FlightSupervisor
+
+CONST_IMPORT_TIME: float = perf_counter() - CONST_START_TIME
+
+
+def create_app(supervisor: FlightSupervisor) -> tuple:
+    """
+    This function creates the web server. Nothing is started: the flight process starts on supervisor.start()
+    or on the first request that needs it.
+
+    :param supervisor: FlightSupervisor | Starts and reports the flight process
+    :return: tuple | Flask application, SocketIO server
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'secret'
+    CORS(app)
+    socketio = SocketIO(app)
+    hub = supervisor.hub
+
+    @app.route('/favicon.ico')
+    def favicon():
+        return send_from_directory(os.path.join(app.root_path, 'static'), 'favicon.ico', mimetype='image/vnd.microsoft.icon')
+
+    @app.route('/')
+    def index():
+        return render_template('index.html')
+
+    @app.route('/metrics')
+    def get_metrics():
+        return Response(hub.metrics.render(hub.setpoints.get_counters()), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/arming')
+    def get_arming():
+        return jsonify(hub.arming_status.read())
+
+    @app.route('/status')
+    def get_status():
+        status = supervisor.get_status()
+        status['server']['import_seconds'] = CONST_IMPORT_TIME
+        return jsonify(status)
+
+    @app.route('/direction/<action>')
+    def direction(action):
+        # the flight process imports the quadcopter module anyway
+        from quadcopter import Quadcopter
+        if action.upper() not in Quadcopter.Action.__members__:
+            return 'Unknown action "' + action + '".', 400
+        supervisor.start()
+        hub.setpoints.send_action(Quadcopter.Action[action.upper()].value)
+        return '', 200
+
+    @app.route('/power/<strength>')
+    def power(strength):
+        value = hub.setpoints.parse_power(strength)
+        if value is None:
+            return 'Wrong power "' + strength + '".', 400
+        supervisor.start()
+        hub.setpoints.send_power(value)
+        return '', 200
+
+    return app, socketio
 
 
 if __name__ == '__main__':
+    hub = IPCHub.from_airframe()
+    supervisor = FlightSupervisor(hub)
+    app, socketio = create_app(supervisor)
+    if not supervisor.start():
+        print('The flight process did not start: ' + supervisor.error)
+    print('Telemetry ring: ' + hub.telemetry.get_name() + ' (python3 ground_station.py ' + hub.telemetry.get_name() + ')')
+    print('Ready in ' + format(perf_counter() - CONST_START_TIME, '.2f') + ' s (the motors are armed in the background, see /arming)')
     try:
-        socketio.run(app, host='0.0.0.0', debug=True, use_reloader=False)
+        socketio.run(app, host='0.0.0.0', use_reloader=False, allow_unsafe_werkzeug=True)
     except KeyboardInterrupt:
-        drone.terminate()
-        drone.join()
+        pass
+    finally:
+        supervisor.stop()
+        hub.close()
@@ -0,0 +1,387 @@
+"""This module arms the motors as a sequence of timed steps that never blocks the caller."""
+
+import json
+import os
+import struct
+from enum import Enum
+from time import time as wall_time
+from typing import Callable
+
+from banks import MotorBank, LedBank
+from shared_block import SharedBlock
+
+
+class ArmingState(Enum):
+    DISARMED = 0
+    CALIBRATING = 1
+    ARMING = 2
+    READY = 3
+
+
+class SensorState(Enum):
+    UNCALIBRATED = 0
+    CACHED = 1
+    CALIBRATED = 2
+    FAILED = 3
+
+
+class EscCalibrationCache:
+    """
+    This class remembers when the ESCs were last initialised with the current motor output settings.
+    The ESCs stay initialised as long as they are powered, so a restart of the flight process soon after the last one can skip the wait.
+    """
+
+    path: str = None
+    """Path to the cache file"""
+
+    validity: float = None
+    """Time (seconds) a calibration stays valid"""
+
+    def __init__(self, path: str, validity: float) -> None:
+        """
+        This constructor sets the cache file.
+
+        :param path: str | Path to the cache file
+        :param validity: float | Time (seconds) a calibration stays valid
+        :return: None
+        """
+        self.path = path
+        self.validity = validity
+
+    def is_valid(self, key: dict, now: float = None) -> bool:
+        """
+        This method checks whether the ESCs were calibrated with the same settings recently enough.
+
+        :param key: dict | Motor output settings
+        :param now: float | Wall clock time (None - current time)
+        :return: bool | The calibration can be skipped
+        """
+        now = wall_time() if now is None else now
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+            return data['key'] == key and 0 <= now - data['time'] < self.validity
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def save(self, key: dict, now: float = None) -> None:
+        """
+        This method stores a finished calibration (a failed write only costs the next start the full calibration).
+
+        :param key: dict | Motor output settings
+        :param now: float | Wall clock time (None - current time)
+        :return: None
+        """
+        try:
+            with open(self.path + '.tmp', 'w') as file:
+                json.dump({'key': key, 'time': wall_time() if now is None else now}, file)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError:
+            pass
+
+
+class ArmingStatus:
+    """
+    This class publishes the progress of the arming in shared memory, so other processes (e.g. the web server) can show it.
+    The flight process is the only writer; a reader may see the fields of two neighbouring steps, which is harmless for a progress report.
+    """
+
+    CONST_FORMAT: struct.Struct = struct.Struct('<qqqd')
+    """Layout: state, finished steps, number of steps, remaining time (seconds)"""
+
+    CONST_SENSOR_FORMAT: struct.Struct = struct.Struct('<qq')
+    """Layout after the progress: sensor calibration state, failed sensor calibration attempts"""
+
+    block: SharedBlock = None
+    """Shared memory block"""
+
+    def __init__(self, name: str = None) -> None:
+        """
+        This constructor creates the status in a new shared memory block (DISARMED).
+
+        :param name: str | Name of the shared memory block (None - random)
+        :return: None
+        """
+        self.block = SharedBlock(self.CONST_FORMAT.size + self.CONST_SENSOR_FORMAT.size, name)
+
+    @staticmethod
+    def attach(name: str):
+        """
+        This method opens a status created by another process.
+
+        :param name: str | Name of the shared memory block
+        :return: ArmingStatus | Status
+        """
+        status = ArmingStatus.__new__(ArmingStatus)
+        status.block = SharedBlock.attach(name)
+        return status
+
+    def __getstate__(self) -> dict:
+        """
+        This method pickles the status as the name of its shared memory block.
+
+        :return: dict | State
+        """
+        return {'name': self.block.get_name()}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method attaches to the shared memory block after unpickling.
+
+        :param state: dict | State
+        :return: None
+        """
+        self.block = SharedBlock.attach(state['name'])
+
+    def get_name(self) -> str:
+        """
+        This method returns the name of the shared memory block.
+
+        :return: str | Name
+        """
+        return self.block.get_name()
+
+    def write(self, state: ArmingState, step: int, steps: int, remaining: float) -> None:
+        """
+        This method publishes the progress.
+
+        :param state: ArmingState | State
+        :param step: int | Finished steps
+        :param steps: int | Number of steps
+        :param remaining: float | Remaining time (seconds)
+        :return: None
+        """
+        self.CONST_FORMAT.pack_into(self.block.get_buffer(), 0, state.value, step, steps, remaining)
+
+    def write_sensor(self, state: SensorState, failures: int) -> None:
+        """
+        This method publishes the result of the sensor calibration.
+
+        :param state: SensorState | State (FAILED - the sensor uses the data sheet values)
+        :param failures: int | Failed calibration attempts
+        :return: None
+        """
+        self.CONST_SENSOR_FORMAT.pack_into(self.block.get_buffer(), self.CONST_FORMAT.size, state.value, failures)
+
+    def read(self) -> dict:
+        """
+        This method reads the progress.
+
+        :return: dict | state (name), step, steps, remaining (seconds), sensor (name), sensor_failures
+        """
+        buffer = self.block.get_buffer()
+        state, step, steps, remaining = self.CONST_FORMAT.unpack_from(buffer, 0)
+        sensor, failures = self.CONST_SENSOR_FORMAT.unpack_from(buffer, self.CONST_FORMAT.size)
+        return {
+            'state': ArmingState(state).name, 'step': step, 'steps': steps, 'remaining': remaining,
+            'sensor': SensorState(sensor).name, 'sensor_failures': failures
+        }
+
+    def close(self) -> None:
+        """
+        This method closes the shared memory (and removes it if this object created it).
+
+        :return: None
+        """
+        self.block.close()
+
+
+class ArmingSequence:
+    """
+    This class arms the motors: DISARMED -> CALIBRATING (ESC initialisation) -> ARMING (every motor spins in turn, then the leds blink) -> READY.
+    Every step runs an action and lasts a fixed time; update() runs the steps that are due and returns at once,
+    so the caller keeps running other tasks (e.g. the IMU) while arming. A step lasts at least its time from the update that ran it,
+    so a late update never runs a motor test or a blink shorter than its time (it only delays the rest of the sequence).
+    When the cache holds a valid calibration for the same motor output, the 5 second initialisation becomes a short arming signal.
+    """
+
+    CONST_CALIBRATION_TIME: float = 5
+    """Time (seconds) of the low signal initialising the ESCs"""
+
+    CONST_ARM_SIGNAL_TIME: float = 1
+    """Time (seconds) of the low signal when the calibration is cached"""
+
+    CONST_SPIN_TIME: float = 2
+    """Time (seconds) every motor spins during the test"""
+
+    CONST_BLINK_TIME: float = 0.3
+    """Time (seconds) the leds are on in every ready blink"""
+
+    CONST_BLINKS: int = 3
+    """Number of ready blinks"""
+
+    CONST_START_POWER: float = 4
+    """Duty cycle (%) initialising the ESCs"""
+
+    CONST_SPIN_POWER: float = 5.7
+    """Duty cycle (%) of the motor test"""
+
+    CONST_IDLE_POWER: float = 5
+    """Duty cycle (%) of a stopped motor"""
+
+    motors: MotorBank = None
+    """Motors"""
+
+    leds: LedBank = None
+    """Leds"""
+
+    cache: EscCalibrationCache = None
+    """Last calibration (None - always calibrate)"""
+
+    key: dict = None
+    """Motor output settings the calibration is valid for"""
+
+    status: ArmingStatus = None
+    """Progress for other processes (None - not published)"""
+
+    ready: Callable = None
+    """Function called when the motors are armed (None - nothing)"""
+
+    state: ArmingState = ArmingState.DISARMED
+    """Current state"""
+
+    steps: list = None
+    """(state, duration, action) of every step"""
+
+    step: int = 0
+    """Index of the next step"""
+
+    deadline: float = None
+    """Time (seconds) the next step starts"""
+
+    def __init__(self, motors: MotorBank, leds: LedBank, cache: EscCalibrationCache = None, key: dict = None,
+                 status: ArmingStatus = None, ready: Callable = None) -> None:
+        """
+        This constructor sets what to arm (nothing starts before start()).
+
+        :param motors: MotorBank | Motors
+        :param leds: LedBank | Leds
+        :param cache: EscCalibrationCache | Last calibration (None - always calibrate)
+        :param key: dict | Motor output settings the calibration is valid for
+        :param status: ArmingStatus | Progress for other processes (None - not published)
+        :param ready: Callable | Function called when the motors are armed
+        :return: None
+        """
+        self.motors = motors
+        self.leds = leds
+        self.cache = cache
+        self.key = key
+        self.status = status
+        self.ready = ready
+        self.state = ArmingState.DISARMED
+        self.steps = []
+        self.step = 0
+        self.deadline = None
+
+    def create_steps(self, calibrate: bool) -> list:
+        """
+        This method lists the steps of the sequence.
+
+        :param calibrate: bool | Initialise the ESCs fully (False - the calibration is cached)
+        :return: list | (state, duration, action) of every step
+        """
+        output = self.motors.output
+        leds = self.leds
+        steps = []
+        if calibrate:
+            steps.append((ArmingState.CALIBRATING, self.CONST_CALIBRATION_TIME, lambda: output.start(self.CONST_START_POWER)))
+            if self.cache is not None:
+                steps.append((ArmingState.CALIBRATING, 0, lambda: self.cache.save(self.key)))
+        else:
+            steps.append((ArmingState.ARMING, self.CONST_ARM_SIGNAL_TIME, lambda: output.start(self.CONST_START_POWER)))
+
+        for index, name in enumerate(self.motors.names):
+            led = leds.index(name)
+            steps.append((ArmingState.ARMING, self.CONST_SPIN_TIME, lambda index=index, led=led: self.spin(index, led, True)))
+            steps.append((ArmingState.ARMING, 0, lambda index=index, led=led: self.spin(index, led, False)))
+        for x in range(self.CONST_BLINKS):
+            steps.append((ArmingState.ARMING, self.CONST_BLINK_TIME, lambda: leds.set_all(True)))
+            steps.append((ArmingState.ARMING, 0, lambda: leds.set_all(False)))
+        steps.append((ArmingState.READY, 0, self.finish))
+        return steps
+
+    def spin(self, index: int, led: int, active: bool) -> None:
+        """
+        This method starts or stops the test of a motor.
+
+        :param index: int | Motor index
+        :param led: int | Index of the led of the motor (-1 - no led)
+        :param active: bool | Start (True) or stop (False) the motor
+        :return: None
+        """
+        self.motors.output.set_duty_cycle(index, self.CONST_SPIN_POWER if active else self.CONST_IDLE_POWER)
+        if led >= 0:
+            self.leds.set(led, active)
+
+    def finish(self) -> None:
+        """
+        This method shows that the quadcopter is ready (the front left and the back right led are on).
+
+        :return: None
+        """
+        leds = self.leds
+        for name in ('frontLeft', 'backRight'):
+            led = leds.index(name)
+            if led >= 0:
+                leds.set(led, True)
+        if self.ready is not None:
+            self.ready()
+
+    def start(self, now: float) -> ArmingState:
+        """
+        This method starts the sequence.
+
+        :param now: float | Current time (seconds)
+        :return: ArmingState | State
+        """
+        if self.state != ArmingState.DISARMED:
+            raise Exception('The arming has already started.')
+        self.steps = self.create_steps(self.cache is None or not self.cache.is_valid(self.key))
+        self.step = 0
+        self.deadline = now
+        return self.update(now)
+
+    def update(self, now: float) -> ArmingState:
+        """
+        This method runs the steps that are due.
+
+        :param now: float | Current time (seconds)
+        :return: ArmingState | State
+        """
+        steps = self.steps
+        if self.step >= len(steps):
+            return self.state
+        while self.step < len(steps) and self.deadline <= now:
+            state, duration, action = steps[self.step]
+            self.state = state
+            action()
+            # a hold starts when its action runs, so a late update cannot end it in the same call
+            self.deadline = now + duration if duration else self.deadline
+            self.step += 1
+        if self.status is not None:
+            self.status.write(self.state, self.step, len(steps), self.get_remaining_time(now))
+        return self.state
+
+    def get_remaining_time(self, now: float) -> float:
+        """
+        This method returns the time until the motors are armed.
+
+        :param now: float | Current time (seconds)
+        :return: float | Remaining time (seconds)
+        """
+        if self.step >= len(self.steps):
+            return 0.0
+        return max(self.deadline - now, 0.0) + sum(duration for state, duration, action in self.steps[self.step:])
+
+    def run(self, time_source: Callable, sleep_function: Callable) -> None:
+        """
+        This method runs the whole sequence and returns when the motors are armed.
+
+        :param time_source: Callable | Monotonic time function (seconds)
+        :param sleep_function: Callable | Function waiting the given number of seconds
+        :return: None
+        """
+        state = self.start(time_source())
+        while state != ArmingState.READY:
+            sleep_function(max(self.deadline - time_source(), 0))
+            state = self.update(time_source())
@@ -0,0 +1,190 @@
+"""This module estimates the attitude of the quadcopter by fusing the gyro rates with the accelerometer angles."""
+
+from typing import TypeVar
+
+
+AttitudeEstimatorObject = TypeVar('AttitudeEstimatorObject', bound='AttitudeEstimator')
+
+
+class AttitudeEstimator:
+    """
+    This class is the base of all attitude estimators. The first update takes the accelerometer angles as they are.
+    """
+
+    attitude: list = None
+    """Current estimate, First index - X axis angle, Second index - Y axis angle"""
+
+    initialized: bool = False
+    """Keeps information whether the estimator has received the first measurement"""
+
+    def __init__(self) -> None:
+        """
+        This constructor clears the estimate.
+
+        :return: None
+        """
+        self.reset()
+
+    def reset(self, attitude: list = None) -> AttitudeEstimatorObject:
+        """
+        This method clears the estimate or sets it to the given angles.
+
+        :param attitude: list | X and Y axis angles (None - wait for the next measurement)
+        :return: self
+        """
+        self.attitude = [0.0, 0.0] if attitude is None else list(attitude)
+        self.initialized = attitude is not None
+        return self
+
+    def update(self, angles: list, rates: list, dt: float) -> list:
+        """
+        This method fuses a new measurement into the estimate.
+
+        :param angles: list | X and Y axis angles from the accelerometer (degrees)
+        :param rates: list | X and Y axis angular velocity from the gyro (deg/s)
+        :param dt: float | Time since the previous update (seconds)
+        :return: list | First index - X axis angle, Second index - Y axis angle
+        """
+        if not self.initialized or dt <= 0:
+            if not self.initialized:
+                self.reset(angles[:2])
+            return self.get_attitude()
+        for axis in range(2):
+            self.attitude[axis] = self.fuse(axis, angles[axis], rates[axis], dt)
+        return self.get_attitude()
+
+    def fuse(self, axis: int, angle: float, rate: float, dt: float) -> float:
+        """
+        This method fuses a measurement of one axis.
+
+        :param axis: int | Axis index (0 - X, 1 - Y)
+        :param angle: float | Accelerometer angle (degrees)
+        :param rate: float | Gyro angular velocity (deg/s)
+        :param dt: float | Time since the previous update (seconds)
+        :return: float | New angle
+        """
+        raise NotImplementedError
+
+    def get_attitude(self) -> list:
+        """
+        This method returns a copy of the current estimate.
+
+        :return: list | First index - X axis angle, Second index - Y axis angle
+        """
+        return self.attitude.copy()
+
+
+class ComplementaryFilter(AttitudeEstimator):
+    """
+    This class integrates the gyro (high pass) and pulls the result towards the accelerometer angle (low pass).
+    """
+
+    alpha: float = None
+    """Weight of the integrated gyro angle"""
+
+    def __init__(self, alpha: float = 0.98) -> None:
+        """
+        This constructor sets the gyro weight.
+
+        :param alpha: float | Weight of the integrated gyro angle (0 - 1)
+        :return: None
+        """
+        if not 0 <= alpha <= 1:
+            raise ValueError('Wrong alpha. ' + str(alpha) + ' should be between 0 and 1.')
+        self.alpha = alpha
+        super().__init__()
+
+    def fuse(self, axis: int, angle: float, rate: float, dt: float) -> float:
+        """
+        This method fuses a measurement of one axis.
+
+        :param axis: int | Axis index (0 - X, 1 - Y)
+        :param angle: float | Accelerometer angle (degrees)
+        :param rate: float | Gyro angular velocity (deg/s)
+        :param dt: float | Time since the previous update (seconds)
+        :return: float | New angle
+        """
+        return self.alpha * (self.attitude[axis] + rate * dt) + (1 - self.alpha) * angle
+
+
+class KalmanFilter(AttitudeEstimator):
+    """
+    This class runs a two state (angle, gyro bias) Kalman filter on each axis.
+    """
+
+    q_angle: float = None
+    """Process noise of the angle"""
+
+    q_bias: float = None
+    """Process noise of the gyro bias"""
+
+    r_measure: float = None
+    """Measurement noise of the accelerometer angle"""
+
+    bias: list = None
+    """Estimated gyro bias of each axis (deg/s)"""
+
+    covariance: list = None
+    """Error covariance matrix [[P00, P01], [P10, P11]] of each axis"""
+
+    def __init__(self, q_angle: float = 0.001, q_bias: float = 0.003, r_measure: float = 0.03) -> None:
+        """
+        This constructor sets the noise parameters.
+
+        :param q_angle: float | Process noise of the angle
+        :param q_bias: float | Process noise of the gyro bias
+        :param r_measure: float | Measurement noise of the accelerometer angle
+        :return: None
+        """
+        if q_angle <= 0 or q_bias <= 0 or r_measure <= 0:
+            raise ValueError('The noise parameters must be greater than 0.')
+        self.q_angle = q_angle
+        self.q_bias = q_bias
+        self.r_measure = r_measure
+        super().__init__()
+
+    def reset(self, attitude: list = None) -> AttitudeEstimatorObject:
+        """
+        This method clears the estimate, the gyro bias and the error covariance.
+
+        :param attitude: list | X and Y axis angles (None - wait for the next measurement)
+        :return: self
+        """
+        self.bias = [0.0, 0.0]
+        self.covariance = [[[0.0, 0.0], [0.0, 0.0]], [[0.0, 0.0], [0.0, 0.0]]]
+        return super().reset(attitude)
+
+    def fuse(self, axis: int, angle: float, rate: float, dt: float) -> float:
+        """
+        This method fuses a measurement of one axis.
+
+        :param axis: int | Axis index (0 - X, 1 - Y)
+        :param angle: float | Accelerometer angle (degrees)
+        :param rate: float | Gyro angular velocity (deg/s)
+        :param dt: float | Time since the previous update (seconds)
+        :return: float | New angle
+        """
+        p = self.covariance[axis]
+
+        # Predict
+        estimate = self.attitude[axis] + (rate - self.bias[axis]) * dt
+        p[0][0] += dt * (dt * p[1][1] - p[0][1] - p[1][0] + self.q_angle)
+        p[0][1] -= dt * p[1][1]
+        p[1][0] -= dt * p[1][1]
+        p[1][1] += self.q_bias * dt
+
+        # Correct
+        s = p[0][0] + self.r_measure
+        k0 = p[0][0] / s
+        k1 = p[1][0] / s
+        innovation = angle - estimate
+        estimate += k0 * innovation
+        self.bias[axis] += k1 * innovation
+
+        p00 = p[0][0]
+        p01 = p[0][1]
+        p[0][0] -= k0 * p00
+        p[0][1] -= k0 * p01
+        p[1][0] -= k1 * p00
+        p[1][1] -= k1 * p01
+        return estimate
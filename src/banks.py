@@ -0,0 +1,180 @@
+"""This module stores the state of the motors and the leds in compact arrays with index-based access."""
+
+from array import array
+
+from motor_output import MotorOutput
+
+
+class MotorBank:
+    """
+    This class holds the motors in a stable order. Index i refers to the same motor in every array.
+    """
+
+    __slots__ = ('names', 'pins', 'output', 'extra_powers')
+
+    names: tuple
+    """Motor names"""
+
+    pins: array
+    """GPIO pin of every motor"""
+
+    output: MotorOutput
+    """Output backend driving the ESCs (channel i is motor i)"""
+
+    extra_powers: array
+    """Difference between the power of every motor and the main power"""
+
+    def __init__(self, names: list, pins: list, output: MotorOutput) -> None:
+        """
+        This constructor sets the motors.
+
+        :param names: list | Motor names
+        :param pins: list | GPIO pin of every motor
+        :param output: MotorOutput | Output backend with a channel for every motor
+        :return: None
+        """
+        if not len(names) == len(pins) == len(output):
+            raise ValueError('Every motor must have a name, a pin and an output channel.')
+        self.names = tuple(names)
+        self.pins = array('i', pins)
+        self.output = output
+        self.extra_powers = array('d', [0.0] * len(names))
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of motors.
+
+        :return: int | Number of motors
+        """
+        return len(self.names)
+
+    def index(self, name: str) -> int:
+        """
+        This method returns the index of a motor.
+
+        :param name: str | Motor name
+        :return: int | Motor index
+        """
+        return self.names.index(name)
+
+    def get_power(self, index: int, main_power: float) -> float:
+        """
+        This method calculates the power of a motor.
+
+        :param index: int | Motor index
+        :param main_power: float | Main power of motors
+        :return: float | Motor power
+        """
+        return main_power + self.extra_powers[index]
+
+    def get_powers(self, main_power: float) -> dict:
+        """
+        This method returns the power of every motor keyed by the motor index.
+
+        :param main_power: float | Main power of motors
+        :return: dict | Dictionary of motors power
+        """
+        return {index: main_power + extra_power for index, extra_power in enumerate(self.extra_powers)}
+
+    def set_duty_cycles(self, main_power: float) -> None:
+        """
+        This method sets the power on every output channel (unchanged channels are not written).
+
+        :param main_power: float | Main power of motors
+        :return: None
+        """
+        self.output.set_duty_cycles(main_power, self.extra_powers)
+
+
+class LedBank:
+    """
+    This class holds the leds in a stable order. Index i refers to the same led in every array.
+    """
+
+    __slots__ = ('names', 'pins', 'active', 'gpio')
+
+    names: tuple
+    """Led names"""
+
+    pins: array
+    """GPIO pin of every led"""
+
+    active: array
+    """State of every led"""
+
+    gpio: object
+    """GPIO module"""
+
+    def __init__(self, names: list, pins: list, gpio) -> None:
+        """
+        This constructor sets the leds (all turned off).
+
+        :param names: list | Led names
+        :param pins: list | GPIO pin of every led
+        :param gpio: RPi.GPIO | GPIO module
+        :return: None
+        """
+        if len(names) != len(pins):
+            raise ValueError('Every led must have a name and a pin.')
+        self.names = tuple(names)
+        self.pins = array('i', pins)
+        self.active = array('b', [0] * len(names))
+        self.gpio = gpio
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of leds.
+
+        :return: int | Number of leds
+        """
+        return len(self.names)
+
+    def index(self, name: str) -> int:
+        """
+        This method returns the index of a led or -1 when there is no such led.
+
+        :param name: str | Led name
+        :return: int | Led index
+        """
+        return self.names.index(name) if name in self.names else -1
+
+    def set(self, index: int, active: bool) -> None:
+        """
+        This method sets the state of a led.
+
+        :param index: int | Led index
+        :param active: bool | Led state
+        :return: None
+        """
+        self.active[index] = active
+        self.gpio.output(self.pins[index], active)
+
+    def switch(self, index: int) -> bool:
+        """
+        This method changes the state of a led.
+
+        :param index: int | Led index
+        :return: bool | Led state
+        """
+        active = not self.active[index]
+        self.set(index, active)
+        return active
+
+    def set_all(self, active: bool) -> None:
+        """
+        This method sets the state of every led.
+
+        :param active: bool | Led state
+        :return: None
+        """
+        for index in range(len(self.names)):
+            self.set(index, active)
+
+    def switch_all(self) -> None:
+        """
+        This method changes the state of every led.
+
+        :return: None
+        """
+        for index in range(len(self.names)):
+            self.switch(index)
@@ -0,0 +1,273 @@
+"""This module calibrates the bias and the scale of the MPU-6050 at rest and caches the result per sensor address (run it from the src directory)."""
+
+import argparse
+import json
+import os
+from time import time as wall_time, sleep
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from accelerometer import Accelerometer
+
+
+class SensorCalibration(NamedTuple):
+    """
+    This class holds the corrections of one sensor in raw units (LSB), so they do not depend on the measurement range.
+    A corrected value is (raw - bias) / scale.
+    """
+
+    accelerometer_bias: tuple
+    """X, Y, Z accelerometer bias (LSB)"""
+
+    accelerometer_scale: tuple
+    """X, Y, Z accelerometer scale (LSB per g)"""
+
+    gyro_bias: tuple
+    """X, Y, Z gyro bias (LSB)"""
+
+    temperature: float
+    """Temperature of the sensor during the calibration (Celsius)"""
+
+    @staticmethod
+    def get_default():
+        """
+        This method returns the calibration of an ideal sensor (no correction).
+
+        :return: SensorCalibration | Zero bias, data sheet scale
+        """
+        scale = Accelerometer.CONST_ACCELEROMETER_SCALE
+        return SensorCalibration((0.0, 0.0, 0.0), (scale, scale, scale), (0.0, 0.0, 0.0), 25.0)
+
+    @staticmethod
+    def compute(poses: list):
+        """
+        This method calculates the calibration from samples at rest. Every pose is a batch of samples taken without moving the sensor.
+        An axis that points straight up in one pose and straight down in another gets its bias and scale from the two means (six-position method);
+        the other axes keep the data sheet scale and take the bias that leaves exactly the gravity of their poses.
+        A single level pose (Z up) is enough for the bias of every axis.
+
+        :param poses: list | (N, 7) np.ndarray of raw words (accelerometer X, Y, Z, temperature, gyro X, Y, Z) of every pose
+        :return: SensorCalibration | Calibration
+        """
+        means = np.array([np.asarray(pose, dtype=float).mean(axis=0) for pose in poses])
+        accelerometer = means[:, :3]
+        nominal = Accelerometer.CONST_ACCELEROMETER_SCALE
+
+        # the axis with the largest reading carries the gravity in each pose
+        rows = np.arange(len(accelerometer))
+        gravity_axes = np.abs(accelerometer).argmax(axis=1)
+        gravity_signs = np.sign(accelerometer[rows, gravity_axes])
+        highest = accelerometer.max(axis=0)
+        lowest = accelerometer.min(axis=0)
+        flipped = (highest > nominal / 2) & (lowest < -nominal / 2)
+
+        scale = np.where(flipped, (highest - lowest) / 2, nominal)
+        expected = np.zeros_like(accelerometer)
+        expected[rows, gravity_axes] = gravity_signs * scale[gravity_axes]
+        bias = np.where(flipped, (highest + lowest) / 2, (accelerometer - expected).mean(axis=0))
+
+        return SensorCalibration(
+            tuple(bias.tolist()),
+            tuple(scale.tolist()),
+            tuple(means[:, 4:].mean(axis=0).tolist()),
+            Accelerometer.convert_temperature(float(means[:, 3].mean()))
+        )
+
+    @staticmethod
+    def from_data(data: dict):
+        """
+        This method reads a calibration from the cache file format.
+
+        :param data: dict | Calibration data
+        :return: SensorCalibration | Calibration
+        """
+        return SensorCalibration(
+            tuple(float(x) for x in data['accelerometer_bias']),
+            tuple(float(x) for x in data['accelerometer_scale']),
+            tuple(float(x) for x in data['gyro_bias']),
+            float(data['temperature'])
+        )
+
+    def to_data(self) -> dict:
+        """
+        This method returns the calibration in the cache file format.
+
+        :return: dict | Calibration data
+        """
+        return {
+            'accelerometer_bias': list(self.accelerometer_bias),
+            'accelerometer_scale': list(self.accelerometer_scale),
+            'gyro_bias': list(self.gyro_bias),
+            'temperature': self.temperature
+        }
+
+
+class SensorCalibrator:
+    """
+    This class collects raw samples of a sensor at rest and turns them into a calibration.
+    """
+
+    CONST_SAMPLES: int = 2000
+    """Number of samples of a pose"""
+
+    CONST_PERIOD: float = 0.001
+    """Time (seconds) between two samples (the sample rate of the sensor)"""
+
+    CONST_MAX_ACCELEROMETER_DEVIATION: float = 0.05
+    """Largest standard deviation (g) of the accelerometer of a sensor at rest"""
+
+    CONST_MAX_GYRO_DEVIATION: float = 1.0
+    """Largest standard deviation (deg/s) of the gyro of a sensor at rest"""
+
+    accelerometer: Accelerometer = None
+    """Sensor to calibrate"""
+
+    sleep_function: Callable = None
+    """Waits between two samples"""
+
+    def __init__(self, accelerometer: Accelerometer, sleep_function: Callable = sleep) -> None:
+        """
+        This constructor sets the sensor.
+
+        :param accelerometer: Accelerometer | Sensor to calibrate
+        :param sleep_function: Callable | Waits between two samples (e.g. Hardware.sleep)
+        :return: None
+        """
+        self.accelerometer = accelerometer
+        self.sleep_function = sleep_function
+
+    def collect(self, samples: int = None) -> np.ndarray:
+        """
+        This method reads raw samples of one pose and checks that the sensor did not move.
+
+        :param samples: int | Number of samples (None - CONST_SAMPLES)
+        :return: np.ndarray | (N, 7) array of raw words (accelerometer X, Y, Z, temperature, gyro X, Y, Z)
+        """
+        samples = self.CONST_SAMPLES if samples is None else samples
+        if samples < 2:
+            raise ValueError('Wrong samples. ' + str(samples) + ' should be at least 2.')
+        read_raw = self.accelerometer.read_raw
+        sleep_function = self.sleep_function
+        period = self.CONST_PERIOD
+        data = np.empty((samples, 7))
+        for x in range(samples):
+            data[x] = read_raw()
+            sleep_function(period)
+
+        deviation = data.std(axis=0)
+        if (deviation[:3] > self.CONST_MAX_ACCELEROMETER_DEVIATION * Accelerometer.CONST_ACCELEROMETER_SCALE).any() or \
+                (deviation[4:] > self.CONST_MAX_GYRO_DEVIATION * Accelerometer.CONST_GYRO_SCALE).any():
+            raise ValueError('The sensor moved during the calibration. Keep it still and try again.')
+        return data
+
+    def calibrate(self, samples: int = None) -> SensorCalibration:
+        """
+        This method calibrates a sensor lying level (Z axis up).
+
+        :param samples: int | Number of samples (None - CONST_SAMPLES)
+        :return: SensorCalibration | Calibration
+        """
+        return SensorCalibration.compute([self.collect(samples)])
+
+
+class SensorCalibrationCache:
+    """
+    This class stores the calibrations of the sensors keyed by their I2C address, so a restart does not have to keep the quadcopter still again.
+    The gyro bias drifts with the temperature, so a calibration is only valid near the temperature it was made at.
+    """
+
+    path: str = None
+    """Path to the cache file"""
+
+    validity: float = None
+    """Time (seconds) a calibration stays valid"""
+
+    temperature_tolerance: float = None
+    """Largest temperature difference (Celsius) of a valid calibration"""
+
+    def __init__(self, path: str, validity: float, temperature_tolerance: float = 5) -> None:
+        """
+        This constructor sets the cache file.
+
+        :param path: str | Path to the cache file
+        :param validity: float | Time (seconds) a calibration stays valid
+        :param temperature_tolerance: float | Largest temperature difference (Celsius) of a valid calibration
+        :return: None
+        """
+        self.path = path
+        self.validity = validity
+        self.temperature_tolerance = temperature_tolerance
+
+    @staticmethod
+    def get_key(address: hex) -> str:
+        """
+        This method returns the key of a sensor in the cache file.
+
+        :param address: hex | I2C address of the sensor
+        :return: str | Key
+        """
+        return format(address, '#04x')
+
+    def read(self) -> dict:
+        """
+        This method reads the whole cache file.
+
+        :return: dict | Key -> calibration data with its time (empty when there is no readable file)
+        """
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def load(self, address: hex, temperature: float, now: float = None) -> SensorCalibration:
+        """
+        This method returns the cached calibration of a sensor if it is still valid.
+
+        :param address: hex | I2C address of the sensor
+        :param temperature: float | Current temperature of the sensor (Celsius)
+        :param now: float | Wall clock time (None - current time)
+        :return: SensorCalibration | Calibration (None - no valid calibration)
+        """
+        now = wall_time() if now is None else now
+        try:
+            data = self.read()[self.get_key(address)]
+            calibration = SensorCalibration.from_data(data)
+            if 0 <= now - data['time'] < self.validity and abs(calibration.temperature - temperature) <= self.temperature_tolerance:
+                return calibration
+        except (KeyError, TypeError, ValueError):
+            pass
+        return None
+
+    def save(self, address: hex, calibration: SensorCalibration, now: float = None) -> None:
+        """
+        This method stores the calibration of a sensor next to the other sensors (a failed write only costs the next start a calibration).
+
+        :param address: hex | I2C address of the sensor
+        :param calibration: SensorCalibration | Calibration
+        :param now: float | Wall clock time (None - current time)
+        :return: None
+        """
+        data = self.read()
+        data[self.get_key(address)] = dict(calibration.to_data(), time=wall_time() if now is None else now)
+        try:
+            with open(self.path + '.tmp', 'w') as file:
+                json.dump(data, file, indent=4)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calibrate the MPU-6050 lying level and still, and store the result in the cache.')
+    parser.add_argument('--address', type=lambda x: int(x, 0), default=0x68, help='I2C address of the sensor')
+    parser.add_argument('--samples', type=int, default=SensorCalibrator.CONST_SAMPLES, help='number of samples')
+    parser.add_argument('--file', default='../data/sensor_calibration.json', help='calibration cache')
+    arguments = parser.parse_args()
+
+    sensor = Accelerometer(arguments.address)
+    result = SensorCalibrator(sensor).calibrate(arguments.samples)
+    SensorCalibrationCache(arguments.file, 0).save(arguments.address, result)
+    print(json.dumps(result.to_data(), indent=4))
@@ -0,0 +1,176 @@
+"""This module loads the tuning of the flight controller from a file and reloads it when the file changes."""
+
+import os
+from typing import NamedTuple
+
+from file_reader import FileReader
+
+
+class TuningConfig(NamedTuple):
+    """
+    This class is an immutable snapshot of the tuning values. A new snapshot replaces the old one as a whole,
+    so a reader never sees some values from one version of the file and some from another.
+    """
+
+    x_pid_gains: tuple
+    """X axis angle controller gains (kp, ki, kd)"""
+
+    y_pid_gains: tuple
+    """Y axis angle controller gains (kp, ki, kd)"""
+
+    yaw_pid_gains: tuple
+    """Yaw rate controller gains (kp, ki, kd)"""
+
+    max_delta: float
+    """Maximum delta of power difference"""
+
+    tilt_angle: float
+    """Angle (degrees) of the tilt when moving"""
+
+    yaw_rate: float
+    """Yaw rate (deg/s) when rotating"""
+
+    @staticmethod
+    def from_data(data: dict):
+        """
+        This method checks the values read from a file and creates a snapshot.
+
+        :param data: dict | Values read from a file (keys - field names)
+        :return: TuningConfig | Snapshot
+        """
+        if not isinstance(data, dict):
+            raise ValueError('The tuning must be an object.')
+        missing = [x for x in TuningConfig._fields if x not in data]
+        unknown = [x for x in data if x not in TuningConfig._fields]
+        if missing or unknown:
+            raise ValueError('Missing tuning values: ' + str(missing) + ', unknown tuning values: ' + str(unknown) + '.')
+        values = {}
+        for name in TuningConfig._fields:
+            if name.endswith('_gains'):
+                gains = data[name]
+                if not isinstance(gains, list) or len(gains) != 3:
+                    raise ValueError('"' + name + '" must be a list of 3 gains (kp, ki, kd).')
+                values[name] = tuple(TuningConfig.get_number(name, x, 0) for x in gains)
+            else:
+                values[name] = TuningConfig.get_number(name, data[name], 0, False)
+        if values['tilt_angle'] >= 90:
+            raise ValueError('"tilt_angle" must be lower than 90.')
+        return TuningConfig(**values)
+
+    @staticmethod
+    def get_number(name: str, value, minimum: float, inclusive: bool = True) -> float:
+        """
+        This method checks a single number.
+
+        :param name: str | Value name (for the error message)
+        :param value: Any | Value
+        :param minimum: float | Lowest allowed value
+        :param inclusive: bool | The lowest value itself is allowed
+        :return: float | Value
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+            raise ValueError('"' + name + '" must be a number.')
+        if value < minimum or (value == minimum and not inclusive):
+            raise ValueError('"' + name + '" must be ' + ('at least ' if inclusive else 'greater than ') + str(minimum) + '.')
+        return float(value)
+
+    def to_data(self) -> dict:
+        """
+        This method returns the values in the file layout.
+
+        :return: dict | Values (keys - field names)
+        """
+        return {name: list(value) if isinstance(value, tuple) else value for name, value in zip(self._fields, self)}
+
+
+class ConfigService:
+    """
+    This class parses and checks the tuning file once and keeps the snapshot. check() looks at the modification time and the size
+    of the file (a single stat) and reads it again only when they change. A file that cannot be read or checked keeps the previous
+    snapshot and is read again on the next check, so a half-written file is picked up once the editor finishes writing it.
+    """
+
+    CONST_NAME: str = 'tuning'
+    """Alias of the file in the file reader"""
+
+    reader: FileReader = None
+    """Reads the file"""
+
+    current: TuningConfig = None
+    """Latest valid snapshot"""
+
+    version: int = 0
+    """Number of snapshots loaded"""
+
+    stamp: tuple = None
+    """Modification time (ns) and size of the file the snapshot comes from"""
+
+    errors: int = 0
+    """Number of failed loads"""
+
+    error: str = None
+    """Reason of the last failed load (None - the last load succeeded)"""
+
+    def __init__(self, path: str) -> None:
+        """
+        This constructor loads the file (an invalid file raises an exception here).
+
+        :param path: str | Path to the tuning file
+        :return: None
+        """
+        self.reader = FileReader(self.CONST_NAME, path)
+        self.version = 0
+        self.errors = 0
+        self.error = None
+        self.stamp = self.get_stamp()
+        self.current = TuningConfig.from_data(self.reader.get_data(self.CONST_NAME))
+        self.version = 1
+
+    def get_path(self) -> str:
+        """
+        This method returns the path to the tuning file.
+
+        :return: str | Path
+        """
+        return self.reader.get_files_dictionary()[self.CONST_NAME]
+
+    def get_stamp(self) -> tuple:
+        """
+        This method reads the modification time and the size of the file.
+
+        :return: tuple | Modification time (ns), size
+        """
+        status = os.stat(self.get_path())
+        return status.st_mtime_ns, status.st_size
+
+    def check(self) -> TuningConfig:
+        """
+        This method loads the file again if it changed.
+
+        :return: TuningConfig | New snapshot (None - the file did not change or is invalid)
+        """
+        try:
+            stamp = self.get_stamp()
+            if stamp == self.stamp:
+                return None
+            config = TuningConfig.from_data(self.reader.get_data(self.CONST_NAME))
+        except (OSError, ValueError) as error:
+            # ValueError covers json.JSONDecodeError
+            self.errors += 1
+            self.error = str(error)
+            return None
+        self.stamp = stamp
+        self.error = None
+        if config == self.current:
+            return None
+        self.current = config
+        self.version += 1
+        return config
+
+    def get_status(self) -> dict:
+        """
+        This method returns the state of the service.
+
+        :return: dict | path, version, errors, error, tuning
+        """
+        return {'path': self.get_path(), 'version': self.version, 'errors': self.errors, 'error': self.error, 'tuning': self.current.to_data()}
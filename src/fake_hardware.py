@@ -0,0 +1,351 @@
+"""This module contains stand-ins for the Raspberry Pi hardware so the code can be tested and benchmarked on a dev box."""
+
+import struct
+from time import perf_counter
+from typing import TypeVar
+
+
+FakeSMBusObject = TypeVar('FakeSMBusObject', bound='FakeSMBus')
+
+
+class FakeSMBus:
+    """
+    This class imitates "smbus.SMBus" with a register map of a single I2C device.
+    """
+
+    registers: bytearray = None
+    """Device register map"""
+
+    transactions: int = 0
+    """Number of bus transactions made"""
+
+    transaction_delay: float = 0
+    """Time (in seconds) that every transaction takes"""
+
+    fifo: bytearray = None
+    """Content of the MPU-6050 FIFO buffer"""
+
+    CONST_FIFO_COUNT_REGISTER: hex = 0x72
+    """The first MPU-6050 FIFO count register"""
+
+    CONST_FIFO_REGISTER: hex = 0x74
+    """MPU-6050 FIFO read/write register"""
+
+    CONST_FIFO_SIZE: int = 1024
+    """MPU-6050 FIFO size in bytes"""
+
+    CONST_USER_CONTROL_REGISTER: hex = 0x6a
+    """MPU-6050 user control register (bit 2 resets the FIFO)"""
+
+    def __init__(self, bus: int = 1, transaction_delay: float = 0) -> None:
+        """
+        This constructor clears the register map.
+
+        :param bus: int | Bus number (ignored)
+        :param transaction_delay: float | Time (in seconds) that every transaction takes
+        :return: None
+        """
+        self.registers = bytearray(256)
+        self.fifo = bytearray()
+        self.transactions = 0
+        self.transaction_delay = transaction_delay
+
+    def wait(self) -> None:
+        """
+        This method counts the transaction and busy-waits the transaction delay like a real bus does.
+
+        :return: None
+        """
+        self.transactions += 1
+        if self.transaction_delay > 0:
+            end = perf_counter() + self.transaction_delay
+            while perf_counter() < end:
+                pass
+
+    def read_byte_data(self, address: hex, register: hex) -> int:
+        """
+        This method reads one register.
+
+        :param address: hex | Device address
+        :param register: hex | Register to read from
+        :return: int | Register value
+        """
+        self.wait()
+        return self.read_register(register)
+
+    def read_i2c_block_data(self, address: hex, register: hex, length: int = 32) -> list:
+        """
+        This method reads consecutive registers in one transaction.
+
+        :param address: hex | Device address
+        :param register: hex | The first register to read from
+        :param length: int | Number of registers
+        :return: list | Register values
+        """
+        self.wait()
+        if register == self.CONST_FIFO_REGISTER:
+            data = list(self.fifo[:length])
+            del self.fifo[:length]
+            return data + [0] * (length - len(data))
+        return [self.read_register(register + x) for x in range(length)]
+
+    def read_register(self, register: hex) -> int:
+        """
+        This method returns the register value without a bus transaction.
+
+        :param register: hex | Register to read from
+        :return: int | Register value
+        """
+        if register == self.CONST_FIFO_COUNT_REGISTER:
+            return len(self.fifo) >> 8
+        if register == self.CONST_FIFO_COUNT_REGISTER + 1:
+            return len(self.fifo) & 0xff
+        if register == self.CONST_FIFO_REGISTER:
+            if not self.fifo:
+                return 0
+            value = self.fifo[0]
+            del self.fifo[0]
+            return value
+        return self.registers[register]
+
+    def write_byte_data(self, address: hex, register: hex, value: int) -> None:
+        """
+        This method writes one register.
+
+        :param address: hex | Device address
+        :param register: hex | Register to write to
+        :param value: int | Register value
+        :return: None
+        """
+        self.wait()
+        if register == self.CONST_USER_CONTROL_REGISTER and value & 0x04:
+            self.fifo.clear()
+            value &= ~0x04
+        self.registers[register] = value & 0xff
+
+    def write_i2c_block_data(self, address: hex, register: hex, data: list) -> None:
+        """
+        This method writes consecutive registers in one transaction.
+
+        :param address: hex | Device address
+        :param register: hex | The first register to write to
+        :param data: list | Register values
+        :return: None
+        """
+        self.wait()
+        self.registers[register:register + len(data)] = bytes(data)
+
+    def set_word(self, register: hex, value: int) -> FakeSMBusObject:
+        """
+        This method stores a signed 16-bit value in two registers (big endian).
+
+        :param register: hex | The first register
+        :param value: int | Signed value
+        :return: self
+        """
+        value &= 0xffff
+        self.registers[register] = value >> 8
+        self.registers[register + 1] = value & 0xff
+        return self
+
+    def set_mpu6050_sample(self, accelerometer: list, temperature: int = 0, gyro: list = (0, 0, 0)) -> FakeSMBusObject:
+        """
+        This method fills the MPU-6050 data registers (0x3B - 0x48) with raw values.
+
+        :param accelerometer: list | Raw X, Y and Z accelerometer values
+        :param temperature: int | Raw temperature value
+        :param gyro: list | Raw X, Y and Z gyro values
+        :return: self
+        """
+        struct.pack_into('>7h', self.registers, 0x3b, *(int(value) for value in accelerometer), int(temperature), *(int(value) for value in gyro))
+        return self
+
+    def push_mpu6050_fifo(self, accelerometer: list, gyro: list) -> FakeSMBusObject:
+        """
+        This method appends raw samples to the MPU-6050 FIFO (accelerometer and gyro enabled). Excess bytes are dropped like on the device.
+
+        :param accelerometer: list | Raw X, Y and Z accelerometer values of each sample
+        :param gyro: list | Raw X, Y and Z gyro values of each sample
+        :return: self
+        """
+        for accelerometer_sample, gyro_sample in zip(accelerometer, gyro):
+            self.fifo += struct.pack('>6h', *(list(accelerometer_sample) + list(gyro_sample)))
+        del self.fifo[self.CONST_FIFO_SIZE:]
+        return self
+
+    def close(self) -> None:
+        """
+        This method closes the bus.
+
+        :return: None
+        """
+
+
+class FakePWM:
+    """
+    This class imitates "RPi.GPIO.PWM" and remembers the last duty cycle.
+    """
+
+    pin: int = None
+    """GPIO pin"""
+
+    frequency: float = None
+    """PWM frequency in Hz"""
+
+    duty_cycle: float = 0
+    """Current duty cycle in percent"""
+
+    running: bool = False
+    """Keeps information whether the PWM is running"""
+
+    changes: int = 0
+    """Number of duty cycle changes"""
+
+    def __init__(self, pin: int, frequency: float) -> None:
+        """
+        This constructor sets the pin and the frequency.
+
+        :param pin: int | GPIO pin
+        :param frequency: float | PWM frequency in Hz
+        :return: None
+        """
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.running = False
+        self.changes = 0
+
+    def start(self, duty_cycle: float) -> None:
+        """
+        This method starts the PWM.
+
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        self.running = True
+        self.duty_cycle = duty_cycle
+
+    def ChangeDutyCycle(self, duty_cycle: float) -> None:
+        """
+        This method changes the duty cycle.
+
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        self.changes += 1
+        self.duty_cycle = duty_cycle
+
+    def ChangeFrequency(self, frequency: float) -> None:
+        """
+        This method changes the frequency.
+
+        :param frequency: float | PWM frequency in Hz
+        :return: None
+        """
+        self.frequency = frequency
+
+    def stop(self) -> None:
+        """
+        This method stops the PWM.
+
+        :return: None
+        """
+        self.running = False
+
+
+class FakeGPIO:
+    """
+    This class imitates the "RPi.GPIO" module and remembers the state of every pin.
+    """
+
+    BCM: int = 11
+    BOARD: int = 10
+    OUT: int = 0
+    IN: int = 1
+    LOW: int = 0
+    HIGH: int = 1
+
+    mode: int = None
+    """Pin numbering mode"""
+
+    pins: dict = None
+    """Pin -> output value"""
+
+    pwms: list = None
+    """Created PWM channels"""
+
+    def __init__(self) -> None:
+        """
+        This constructor clears the pins.
+
+        :return: None
+        """
+        self.pins = {}
+        self.pwms = []
+
+    def setwarnings(self, enabled: bool) -> None:
+        """
+        This method enables or disables warnings (ignored).
+
+        :param enabled: bool | Warnings state
+        :return: None
+        """
+
+    def setmode(self, mode: int) -> None:
+        """
+        This method sets the pin numbering mode.
+
+        :param mode: int | BCM or BOARD
+        :return: None
+        """
+        self.mode = mode
+
+    def setup(self, pin: int, direction: int, initial: int = LOW) -> None:
+        """
+        This method sets up a pin.
+
+        :param pin: int | GPIO pin
+        :param direction: int | OUT or IN
+        :param initial: int | Initial output value
+        :return: None
+        """
+        self.pins[pin] = initial
+
+    def output(self, pin: int, value: int) -> None:
+        """
+        This method sets the output value of a pin.
+
+        :param pin: int | GPIO pin
+        :param value: int | Output value
+        :return: None
+        """
+        self.pins[pin] = int(value)
+
+    def input(self, pin: int) -> int:
+        """
+        This method returns the value of a pin.
+
+        :param pin: int | GPIO pin
+        :return: int | Pin value
+        """
+        return self.pins.get(pin, self.LOW)
+
+    def PWM(self, pin: int, frequency: float) -> FakePWM:
+        """
+        This method creates a PWM channel.
+
+        :param pin: int | GPIO pin
+        :param frequency: float | PWM frequency in Hz
+        :return: FakePWM | PWM channel
+        """
+        pwm = FakePWM(pin, frequency)
+        self.pwms.append(pwm)
+        return pwm
+
+    def cleanup(self) -> None:
+        """
+        This method resets every pin.
+
+        :return: None
+        """
+        self.pins.clear()
@@ -0,0 +1,535 @@
+"""This module smooths measurements of several channels (e.g. the X and Y angles) sample by sample or in batches."""
+
+import math
+from bisect import bisect_left, insort
+from typing import TypeVar
+
+import numpy as np
+
+
+FilterObject = TypeVar('FilterObject', bound='Filter')
+
+
+class Filter:
+    """
+    This class is the base of all filters. A sample holds one value of every channel; add is O(1) (O(log N) for the median)
+    and allocates only the returned list, add_many takes a whole batch at once and returns the output after every sample.
+    """
+
+    channels: int = None
+    """Number of values in a sample"""
+
+    count: int = 0
+    """Number of samples added since the reset (at most the window of a window filter)"""
+
+    def __init__(self, channels: int = 2) -> None:
+        """
+        This constructor clears the filter.
+
+        :param channels: int | Number of values in a sample
+        :return: None
+        """
+        if channels < 1:
+            raise ValueError('Wrong channels. ' + str(channels) + ' should be at least 1.')
+        self.channels = channels
+        self.reset()
+
+    def reset(self) -> FilterObject:
+        """
+        This method forgets every sample.
+
+        :return: self
+        """
+        self.count = 0
+        return self
+
+    def add(self, sample: list) -> list:
+        """
+        This method adds a sample.
+
+        :param sample: list | Value of every channel
+        :return: list | Output of every channel
+        """
+        raise NotImplementedError
+
+    def add_many(self, samples: np.ndarray) -> np.ndarray:
+        """
+        This method adds a batch of samples (the same outputs as add, sample by sample).
+
+        :param samples: np.ndarray | (N, channels) array of samples
+        :return: np.ndarray | (N, channels) array of the output after every sample
+        """
+        samples = np.asarray(samples, dtype=float).reshape(-1, self.channels)
+        add = self.add
+        return np.array([add(x) for x in samples.tolist()], dtype=float).reshape(-1, self.channels)
+
+    def get_value(self) -> list:
+        """
+        This method returns the current output.
+
+        :return: list | Output of every channel (zeros before the first sample)
+        """
+        raise NotImplementedError
+
+
+class WindowFilter(Filter):
+    """
+    This class keeps the last N samples in a ring buffer allocated once. The rows of the buffer are reused, so adding a sample allocates nothing.
+    """
+
+    window: int = None
+    """Number of samples the output is calculated from"""
+
+    buffer: list = None
+    """Ring buffer of the samples, a row per sample"""
+
+    index: int = 0
+    """Row the next sample is written to (the oldest sample once the window is full)"""
+
+    def __init__(self, window: int, channels: int = 2) -> None:
+        """
+        This constructor allocates the ring buffer.
+
+        :param window: int | Number of samples the output is calculated from
+        :param channels: int | Number of values in a sample
+        :return: None
+        """
+        if window < 1:
+            raise ValueError('Wrong window. ' + str(window) + ' should be at least 1.')
+        self.window = window
+        super().__init__(channels)
+
+    def reset(self) -> FilterObject:
+        """
+        This method forgets every sample.
+
+        :return: self
+        """
+        self.buffer = [[0.0] * self.channels for x in range(self.window)]
+        self.index = 0
+        return super().reset()
+
+    def fill(self, sample: list) -> FilterObject:
+        """
+        This method fills the whole window with one sample (e.g. a known starting value instead of a warm-up).
+
+        :param sample: list | Value of every channel
+        :return: self
+        """
+        return self.set_window([list(sample)] * self.window)
+
+    def set_window(self, rows: list) -> FilterObject:
+        """
+        This method replaces the content of the window.
+
+        :param rows: list | Samples, the oldest first (only the last N are kept)
+        :return: self
+        """
+        rows = rows[len(rows) - self.window:] if len(rows) > self.window else rows
+        self.reset()
+        for row, sample in zip(self.buffer, rows):
+            row[:] = sample
+        self.count = len(rows)
+        self.index = self.count % self.window
+        return self
+
+    def get_window(self) -> list:
+        """
+        This method returns a copy of the samples in the window.
+
+        :return: list | Samples, the oldest first
+        """
+        if self.count < self.window:
+            rows = self.buffer[:self.count]
+        else:
+            rows = self.buffer[self.index:] + self.buffer[:self.index]
+        return [row.copy() for row in rows]
+
+    def get_batch_data(self, samples: np.ndarray) -> tuple:
+        """
+        This method joins the window and a batch and keeps the last N samples of both in the window.
+
+        :param samples: np.ndarray | (N, channels) array of samples
+        :return: tuple | (M, channels) array of the window and the batch, number of rows of the window
+        """
+        history = self.get_window()
+        data = np.concatenate((np.array(history, dtype=float).reshape(-1, self.channels), np.asarray(samples, dtype=float).reshape(-1, self.channels)))
+        self.set_window(data[-self.window:].tolist())
+        return data, len(history)
+
+
+class MovingAverage(WindowFilter):
+    """
+    This class averages the last N samples with running sums, so adding a sample costs the same for any N.
+    Until the window is full the output is the average of the samples so far.
+    """
+
+    CONST_RESUM_SAMPLES: int = 4096
+    """Number of samples after which the window is summed again (rounded up to whole laps of the ring buffer)"""
+
+    sums: list = None
+    """Running sum of every channel"""
+
+    laps: int = 0
+    """Number of laps of the ring buffer since the window was summed"""
+
+    def reset(self) -> FilterObject:
+        """
+        This method forgets every sample.
+
+        :return: self
+        """
+        self.sums = [0.0] * self.channels
+        self.laps = 0
+        return super().reset()
+
+    def set_window(self, rows: list) -> FilterObject:
+        """
+        This method replaces the content of the window.
+
+        :param rows: list | Samples, the oldest first (only the last N are kept)
+        :return: self
+        """
+        super().set_window(rows)
+        self.sums = [math.fsum(column) for column in zip(*self.buffer)]
+        self.laps = 0
+        return self
+
+    def add(self, sample: list) -> list:
+        """
+        This method adds a sample.
+
+        :param sample: list | Value of every channel
+        :return: list | Average of every channel
+        """
+        row = self.buffer[self.index]
+        sums = self.sums
+        for channel, value in enumerate(sample):
+            sums[channel] += value - row[channel]
+            row[channel] = value
+        self.index += 1
+        if self.index == self.window:
+            self.index = 0
+            self.laps += 1
+            # the running sums collect rounding errors, summing the window again now and then keeps them bounded (amortised O(1))
+            if self.laps * self.window >= self.CONST_RESUM_SAMPLES:
+                self.sums = [math.fsum(column) for column in zip(*self.buffer)]
+                self.laps = 0
+        if self.count < self.window:
+            self.count += 1
+        count = self.count
+        return [x / count for x in self.sums]
+
+    def add_many(self, samples: np.ndarray) -> np.ndarray:
+        """
+        This method adds a batch of samples with cumulative sums (vectorized).
+
+        :param samples: np.ndarray | (N, channels) array of samples
+        :return: np.ndarray | (N, channels) array of the average after every sample
+        """
+        data, history = self.get_batch_data(samples)
+        sums = np.concatenate((np.zeros((1, self.channels)), np.cumsum(data, axis=0)))
+        ends = np.arange(history + 1, len(data) + 1)
+        starts = np.maximum(ends - self.window, 0)
+        return (sums[ends] - sums[starts]) / (ends - starts)[:, None]
+
+    def get_value(self) -> list:
+        """
+        This method returns the current average.
+
+        :return: list | Average of every channel (zeros before the first sample)
+        """
+        count = self.count if self.count else 1
+        return [x / count for x in self.sums]
+
+
+class MovingMedian(WindowFilter):
+    """
+    This class returns the median of the last N samples, which ignores single outliers (e.g. a corrupted I2C read) the average would follow.
+    Every channel keeps its window sorted, so adding a sample is a binary search (the list shift is negligible for small N).
+    """
+
+    ordered: list = None
+    """Sorted window of every channel"""
+
+    def reset(self) -> FilterObject:
+        """
+        This method forgets every sample.
+
+        :return: self
+        """
+        self.ordered = [[] for x in range(self.channels)]
+        return super().reset()
+
+    def set_window(self, rows: list) -> FilterObject:
+        """
+        This method replaces the content of the window.
+
+        :param rows: list | Samples, the oldest first (only the last N are kept)
+        :return: self
+        """
+        super().set_window(rows)
+        self.ordered = [sorted(column) for column in zip(*self.buffer[:self.count])] if self.count else [[] for x in range(self.channels)]
+        return self
+
+    def add(self, sample: list) -> list:
+        """
+        This method adds a sample.
+
+        :param sample: list | Value of every channel
+        :return: list | Median of every channel
+        """
+        row = self.buffer[self.index]
+        full = self.count == self.window
+        for channel, value in enumerate(sample):
+            ordered = self.ordered[channel]
+            if full:
+                del ordered[bisect_left(ordered, row[channel])]
+            insort(ordered, value)
+            row[channel] = value
+        self.index += 1
+        if self.index == self.window:
+            self.index = 0
+        if not full:
+            self.count += 1
+        return self.get_value()
+
+    def add_many(self, samples: np.ndarray) -> np.ndarray:
+        """
+        This method adds a batch of samples with sliding windows (vectorized once the window is full).
+
+        :param samples: np.ndarray | (N, channels) array of samples
+        :return: np.ndarray | (N, channels) array of the median after every sample
+        """
+        data, history = self.get_batch_data(samples)
+        output = np.empty((len(data) - history, self.channels))
+        # windows that are not full yet (at most N - 1 of them)
+        partial = min(max(self.window - 1 - history, 0), len(output))
+        for x in range(partial):
+            output[x] = np.median(data[:history + x + 1], axis=0)
+        if partial < len(output):
+            windows = np.lib.stride_tricks.sliding_window_view(data, self.window, axis=0)
+            output[partial:] = np.median(windows[history + partial + 1 - self.window:], axis=-1)
+        return output
+
+    def get_value(self) -> list:
+        """
+        This method returns the current median.
+
+        :return: list | Median of every channel (zeros before the first sample)
+        """
+        count = self.count
+        if not count:
+            return [0.0] * self.channels
+        middle = count // 2
+        if count % 2:
+            return [ordered[middle] for ordered in self.ordered]
+        return [(ordered[middle - 1] + ordered[middle]) / 2 for ordered in self.ordered]
+
+
+class ExponentialMovingAverage(Filter):
+    """
+    This class is a first order low pass filter: every sample moves the output by alpha of its difference to the output.
+    The first sample is taken as it is, so there is no warm-up from zero.
+    """
+
+    alpha: float = None
+    """Weight of a new sample (0 - 1]"""
+
+    value: list = None
+    """Output of every channel"""
+
+    def __init__(self, alpha: float, channels: int = 2) -> None:
+        """
+        This constructor sets the weight of a new sample.
+
+        :param alpha: float | Weight of a new sample (0 - 1], see get_alpha
+        :param channels: int | Number of values in a sample
+        :return: None
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError('Wrong alpha. ' + str(alpha) + ' should be greater than 0 and at most 1.')
+        self.alpha = alpha
+        super().__init__(channels)
+
+    @staticmethod
+    def get_alpha(cutoff: float, sample_rate: float) -> float:
+        """
+        This method calculates the weight of a new sample for a cutoff frequency (like an RC low pass filter).
+
+        :param cutoff: float | Cutoff frequency (Hz)
+        :param sample_rate: float | Sample rate (Hz)
+        :return: float | Weight of a new sample
+        """
+        dt = 1 / sample_rate
+        return dt / (1 / (2 * math.pi * cutoff) + dt)
+
+    def reset(self) -> FilterObject:
+        """
+        This method forgets every sample.
+
+        :return: self
+        """
+        self.value = [0.0] * self.channels
+        return super().reset()
+
+    def add(self, sample: list) -> list:
+        """
+        This method adds a sample.
+
+        :param sample: list | Value of every channel
+        :return: list | Output of every channel
+        """
+        value = self.value
+        if self.count:
+            alpha = self.alpha
+            for channel, x in enumerate(sample):
+                value[channel] += alpha * (x - value[channel])
+        else:
+            value[:] = sample
+        self.count += 1
+        return value.copy()
+
+    def add_many(self, samples: np.ndarray) -> np.ndarray:
+        """
+        This method adds a batch of samples, a channel at a time with the state in local variables.
+
+        :param samples: np.ndarray | (N, channels) array of samples
+        :return: np.ndarray | (N, channels) array of the output after every sample
+        """
+        samples = np.asarray(samples, dtype=float).reshape(-1, self.channels)
+        output = np.empty_like(samples)
+        if not len(samples):
+            return output
+        alpha = self.alpha
+        for channel in range(self.channels):
+            column = samples[:, channel].tolist()
+            value = self.value[channel] if self.count else column[0]
+            outputs = []
+            append = outputs.append
+            for x in column:
+                value += alpha * (x - value)
+                append(value)
+            output[:, channel] = outputs
+            self.value[channel] = value
+        self.count += len(samples)
+        return output
+
+    def get_value(self) -> list:
+        """
+        This method returns the current output.
+
+        :return: list | Output of every channel (zeros before the first sample)
+        """
+        return self.value.copy()
+
+
+class BiquadLowPass(Filter):
+    """
+    This class is a second order low pass filter (Audio EQ Cookbook coefficients, transposed direct form II).
+    It damps the motor vibration much more than a first order filter with the same delay at low frequencies.
+    The state starts at the steady state of the first sample, so there is no warm-up from zero.
+    """
+
+    coefficients: tuple = None
+    """b0, b1, b2, a1, a2 (a0 normalised to 1)"""
+
+    value: list = None
+    """Output of every channel"""
+
+    state: list = None
+    """First and second delay of every channel"""
+
+    def __init__(self, cutoff: float, sample_rate: float, q: float = 1 / math.sqrt(2), channels: int = 2) -> None:
+        """
+        This constructor calculates the coefficients.
+
+        :param cutoff: float | Cutoff frequency (Hz), below half the sample rate
+        :param sample_rate: float | Sample rate (Hz)
+        :param q: float | Quality factor (1 / sqrt(2) - Butterworth, no overshoot in the frequency response)
+        :param channels: int | Number of values in a sample
+        :return: None
+        """
+        if not 0 < cutoff < sample_rate / 2:
+            raise ValueError('Wrong cutoff. ' + str(cutoff) + ' should be greater than 0 and below half of the sample rate.')
+        if q <= 0:
+            raise ValueError('Wrong q. ' + str(q) + ' should be greater than 0.')
+        omega = 2 * math.pi * cutoff / sample_rate
+        cosine = math.cos(omega)
+        alpha = math.sin(omega) / (2 * q)
+        a0 = 1 + alpha
+        self.coefficients = ((1 - cosine) / 2 / a0, (1 - cosine) / a0, (1 - cosine) / 2 / a0, -2 * cosine / a0, (1 - alpha) / a0)
+        super().__init__(channels)
+
+    def reset(self) -> FilterObject:
+        """
+        This method forgets every sample.
+
+        :return: self
+        """
+        self.value = [0.0] * self.channels
+        self.state = [[0.0, 0.0] for x in range(self.channels)]
+        return super().reset()
+
+    def add(self, sample: list) -> list:
+        """
+        This method adds a sample.
+
+        :param sample: list | Value of every channel
+        :return: list | Output of every channel
+        """
+        b0, b1, b2, a1, a2 = self.coefficients
+        value = self.value
+        if not self.count:
+            for channel, x in enumerate(sample):
+                delays = self.state[channel]
+                delays[1] = (b2 - a2) * x
+                delays[0] = (b1 - a1) * x + delays[1]
+        self.count += 1
+        for channel, x in enumerate(sample):
+            delays = self.state[channel]
+            y = b0 * x + delays[0]
+            delays[0] = b1 * x - a1 * y + delays[1]
+            delays[1] = b2 * x - a2 * y
+            value[channel] = y
+        return value.copy()
+
+    def add_many(self, samples: np.ndarray) -> np.ndarray:
+        """
+        This method adds a batch of samples, a channel at a time with the state in local variables.
+
+        :param samples: np.ndarray | (N, channels) array of samples
+        :return: np.ndarray | (N, channels) array of the output after every sample
+        """
+        samples = np.asarray(samples, dtype=float).reshape(-1, self.channels)
+        output = np.empty_like(samples)
+        if not len(samples):
+            return output
+        b0, b1, b2, a1, a2 = self.coefficients
+        for channel in range(self.channels):
+            column = samples[:, channel].tolist()
+            if self.count:
+                first, second = self.state[channel]
+            else:
+                second = (b2 - a2) * column[0]
+                first = (b1 - a1) * column[0] + second
+            outputs = []
+            append = outputs.append
+            for x in column:
+                y = b0 * x + first
+                first = b1 * x - a1 * y + second
+                second = b2 * x - a2 * y
+                append(y)
+            output[:, channel] = outputs
+            self.state[channel] = [first, second]
+            self.value[channel] = y
+        self.count += len(samples)
+        return output
+
+    def get_value(self) -> list:
+        """
+        This method returns the current output.
+
+        :return: list | Output of every channel (zeros before the first sample)
+        """
+        return self.value.copy()
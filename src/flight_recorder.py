@@ -0,0 +1,367 @@
+"""This module records every control tick into rotating memory-mapped files and reads the files back as NumPy arrays."""
+
+import mmap
+import os
+import struct
+from datetime import datetime
+from queue import Queue, Empty
+from threading import Thread
+from time import time
+
+import numpy as np
+
+
+class FlightRecorder:
+    """
+    This class appends fixed-size records to memory-mapped files. A write is a store into memory (no system call).
+    A background thread creates the next file before it is needed and flushes and closes the full ones,
+    so the control loop does not wait for the disk. Only the newest files are kept, the files of earlier runs included.
+    """
+
+    CONST_MAGIC: bytes = b'QFLR'
+    """File signature"""
+
+    CONST_VERSION: int = 2
+    """File format version"""
+
+    CONST_HEADER_FORMAT: struct.Struct = struct.Struct('<4sHHHHQd')
+    """Header layout: signature, version, number of motors, record size, header size, number of records, creation time"""
+
+    CONST_HEADER_SIZE: int = 64
+    """Bytes reserved for the header"""
+
+    CONST_COUNT_FORMAT: struct.Struct = struct.Struct('<Q')
+    """Layout of the number of records"""
+
+    CONST_COUNT_OFFSET: int = 12
+    """Offset of the number of records in the header"""
+
+    CONST_STAGES: tuple = ('read', 'estimate', 'control', 'mix', 'output')
+    """Measured stages of a control tick"""
+
+    CONST_EXTENSION: str = '.qfr'
+    """File extension"""
+
+    directory: str = None
+    """Directory of the files"""
+
+    prefix: str = None
+    """Beginning of the file names of this recorder (with its start time)"""
+
+    family: str = None
+    """Beginning of the file names of every recorder with the same prefix (earlier runs included)"""
+
+    records_per_file: int = None
+    """Number of records in a file"""
+
+    max_files: int = None
+    """Number of the newest files kept"""
+
+    motors: int = None
+    """Number of motors"""
+
+    record_format: struct.Struct = None
+    """Record layout"""
+
+    file_size: int = None
+    """Size of a file in bytes"""
+
+    map: mmap.mmap = None
+    """Memory of the current file"""
+
+    file = None
+    """Current file"""
+
+    index: int = 0
+    """Number of records in the current file"""
+
+    count: int = 0
+    """Number of records written"""
+
+    sequence: int = 0
+    """Number of the next file"""
+
+    paths: list = None
+    """Paths of the kept files, oldest first"""
+
+    stalls: int = 0
+    """Number of rotations that had to wait for the next file"""
+
+    jobs: Queue = None
+    """Work for the background thread"""
+
+    prepared: Queue = None
+    """The next file, created by the background thread"""
+
+    worker: Thread = None
+    """Background thread"""
+
+    def __init__(self, directory: str, motors: int = 4, records_per_file: int = 65536, max_files: int = 16, prefix: str = 'flight') -> None:
+        """
+        This constructor opens the first file and starts the background thread.
+
+        :param directory: str | Directory of the files (created if missing)
+        :param motors: int | Number of motors
+        :param records_per_file: int | Number of records in a file
+        :param max_files: int | Number of the newest files kept in the directory (earlier runs included)
+        :param prefix: str | Beginning of the file names
+        :return: None
+        """
+        if records_per_file <= 0 or max_files < 2 or motors <= 0:
+            raise ValueError('A file needs at least one record, at least 2 files must be kept and there must be a motor.')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.family = prefix + '-'
+        self.prefix = self.family + datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.records_per_file = records_per_file
+        self.max_files = max_files
+        self.motors = motors
+        self.record_format = struct.Struct(FlightRecorder.get_format(motors))
+        self.file_size = self.CONST_HEADER_SIZE + records_per_file * self.record_format.size
+        self.index = 0
+        self.count = 0
+        self.sequence = 0
+        self.paths = []
+        self.stalls = 0
+        self.jobs = Queue()
+        self.prepared = Queue(maxsize=1)
+
+        self.file, self.map = self.create()
+        self.worker = Thread(target=self.work, name='flight-recorder', daemon=True)
+        self.worker.start()
+        self.jobs.put(self.prepare)
+
+    @staticmethod
+    def get_format(motors: int) -> str:
+        """
+        This method returns the record layout.
+
+        :param motors: int | Number of motors
+        :return: str | struct format: timestamp, 7 raw IMU words, X and Y angles, X, Y and rotation deltas, main power,
+                       duty cycle of every motor, duration of every stage
+        """
+        return '<d7h2f3ff' + str(motors) + 'f' + str(len(FlightRecorder.CONST_STAGES)) + 'f'
+
+    @staticmethod
+    def get_dtype(motors: int) -> np.dtype:
+        """
+        This method returns the record layout seen by the readers (the same bytes as get_format).
+
+        :param motors: int | Number of motors
+        :return: np.dtype | Record type
+        """
+        return np.dtype([
+            ('timestamp', '<f8'),
+            ('accelerometer', '<i2', (3,)),
+            ('temperature', '<i2'),
+            ('gyro', '<i2', (3,)),
+            ('angles', '<f4', (2,)),
+            ('deltas', '<f4', (3,)),
+            ('main_power', '<f4'),
+            ('duties', '<f4', (motors,)),
+            ('stage_times', '<f4', (len(FlightRecorder.CONST_STAGES),))
+        ])
+
+    def create(self) -> tuple:
+        """
+        This method creates the next file and maps it.
+
+        :return: tuple | File, memory map
+        """
+        path = os.path.join(self.directory, self.prefix + '-' + format(self.sequence, '05d') + self.CONST_EXTENSION)
+        self.sequence += 1
+        file = open(path, 'w+b')
+        file.truncate(self.file_size)
+        memory = mmap.mmap(file.fileno(), self.file_size)
+        self.CONST_HEADER_FORMAT.pack_into(
+            memory, 0, self.CONST_MAGIC, self.CONST_VERSION, self.motors, self.record_format.size, self.CONST_HEADER_SIZE, 0, time()
+        )
+        self.paths.append(path)
+        return file, memory
+
+    def prepare(self) -> None:
+        """
+        This method creates the next file with its disk blocks allocated up front, then removes the oldest files (background thread).
+        The files of earlier runs count too, otherwise every start of the flight process would add files until the disk is full.
+        The system calls release the GIL, so the control loop keeps running meanwhile.
+
+        :return: None
+        """
+        file, memory = self.create()
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(file.fileno(), 0, self.file_size)
+        if hasattr(mmap, 'MADV_WILLNEED'):
+            memory.madvise(mmap.MADV_WILLNEED)
+        paths = FlightLog.list_files(self.directory, self.family)
+        # the current and the prepared file are never removed, even when an earlier run has later names (a clock without RTC)
+        keep = self.paths[-2:]
+        for path in [x for x in paths if x not in keep][:max(len(paths) - (self.max_files + 1), 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            if path in self.paths:
+                self.paths.remove(path)
+        self.prepared.put((file, memory))
+
+    def retire(self, file, memory: mmap.mmap) -> None:
+        """
+        This method writes a full file to the disk and closes it (background thread).
+
+        :param file: file | File
+        :param memory: mmap.mmap | Memory map of the file
+        :return: None
+        """
+        memory.flush()
+        memory.close()
+        file.close()
+
+    def work(self) -> None:
+        """
+        This method runs the jobs of the background thread until it gets None.
+
+        :return: None
+        """
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            job()
+
+    def rotate(self) -> None:
+        """
+        This method switches to the next file.
+
+        :return: None
+        """
+        file, memory = self.file, self.map
+        try:
+            self.file, self.map = self.prepared.get_nowait()
+        except Empty:
+            # the background thread is behind (a whole file was filled before the next one was ready)
+            self.stalls += 1
+            self.file, self.map = self.prepared.get()
+        self.index = 0
+        self.jobs.put(lambda: self.retire(file, memory))
+        self.jobs.put(self.prepare)
+
+    def write(self, timestamp: float, raw: tuple, angles: list, deltas: tuple, main_power: float, duties: list, stage_times: list) -> None:
+        """
+        This method appends a record (single writer only).
+
+        :param timestamp: float | Time of the tick (seconds)
+        :param raw: tuple | Raw accelerometer X, Y, Z, temperature, gyro X, Y, Z words
+        :param angles: list | X and Y axis angles
+        :param deltas: tuple | X, Y and rotation power deltas
+        :param main_power: float | Main power
+        :param duties: list | Duty cycle of every motor
+        :param stage_times: list | Duration of every stage (seconds)
+        :return: None
+        """
+        if self.index == self.records_per_file:
+            self.rotate()
+        memory = self.map
+        self.record_format.pack_into(
+            memory, self.CONST_HEADER_SIZE + self.index * self.record_format.size,
+            timestamp, *raw, angles[0], angles[1], deltas[0], deltas[1], deltas[2], main_power, *duties, *stage_times
+        )
+        self.index += 1
+        self.count += 1
+        self.CONST_COUNT_FORMAT.pack_into(memory, self.CONST_COUNT_OFFSET, self.index)
+
+    def get_paths(self) -> list:
+        """
+        This method returns the paths of the files with records, oldest first.
+
+        :return: list | Paths
+        """
+        return [path for path in FlightLog.list_files(self.directory, self.prefix) if FlightLog.read_header(path)['count'] > 0]
+
+    def close(self) -> None:
+        """
+        This method writes the current file to the disk, stops the background thread and removes the unused prepared file.
+
+        :return: None
+        """
+        if self.map is None:
+            return
+        file, memory = self.file, self.map
+        self.jobs.put(lambda: self.retire(file, memory))
+        self.jobs.put(None)
+        self.worker.join()
+        self.map = None
+        self.file = None
+        try:
+            file, memory = self.prepared.get_nowait()
+        except Empty:
+            return
+        memory.close()
+        file.close()
+        os.remove(file.name)
+        self.paths.remove(file.name)
+
+
+class FlightLog:
+    """
+    This class opens the files of the flight recorder as zero-copy NumPy structured arrays.
+    """
+
+    @staticmethod
+    def read_header(path: str) -> dict:
+        """
+        This method reads the header of a file.
+
+        :param path: str | Path to the file
+        :return: dict | Version, number of motors, record size, header size, number of records, creation time
+        """
+        with open(path, 'rb') as file:
+            magic, version, motors, record_size, header_size, count, created = FlightRecorder.CONST_HEADER_FORMAT.unpack(
+                file.read(FlightRecorder.CONST_HEADER_FORMAT.size)
+            )
+        if magic != FlightRecorder.CONST_MAGIC:
+            raise ValueError('The file ' + path + ' is not a flight log.')
+        return {
+            'version': version, 'motors': motors, 'record_size': record_size,
+            'header_size': header_size, 'count': count, 'created': created
+        }
+
+    @staticmethod
+    def open(path: str) -> np.ndarray:
+        """
+        This method maps the records of a file (read-only, nothing is read until it is used).
+
+        :param path: str | Path to the file
+        :return: np.ndarray | Records (FlightRecorder.get_dtype)
+        """
+        header = FlightLog.read_header(path)
+        dtype = FlightRecorder.get_dtype(header['motors'])
+        if header['record_size'] != dtype.itemsize:
+            raise ValueError('The file ' + path + ' has an unknown record layout.')
+        if header['count'] == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=header['header_size'], shape=(header['count'],))
+
+    @staticmethod
+    def list_files(directory: str, prefix: str = 'flight') -> list:
+        """
+        This method finds the files of the flight recorder.
+
+        :param directory: str | Directory of the files
+        :param prefix: str | Beginning of the file names
+        :return: list | Paths, oldest first
+        """
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(FlightRecorder.CONST_EXTENSION)
+        )
+
+    @staticmethod
+    def open_directory(directory: str, prefix: str = 'flight') -> list:
+        """
+        This method maps every file of the flight recorder.
+
+        :param directory: str | Directory of the files
+        :param prefix: str | Beginning of the file names
+        :return: list | Records of every file, oldest first
+        """
+        return [FlightLog.open(path) for path in FlightLog.list_files(directory, prefix)]
@@ -0,0 +1,217 @@
+"""This module owns the shared memory of the flight process and starts the flight process on demand for the web apps."""
+
+import os
+import resource
+from threading import Lock
+from time import monotonic, perf_counter
+
+
+class IPCHub:
+    """
+    This class creates every shared memory block the flight process exchanges with the other processes, in one place.
+    It is the only channel between the processes: no manager server process and no queue, only lock-free blocks.
+    The block modules (and NumPy with the telemetry ring) are imported when the hub is created, not with this module.
+    """
+
+    telemetry = None
+    """Ring buffer of the flight data (telemetry.TelemetryRing)"""
+
+    setpoints = None
+    """Latest command for the flight process (setpoint.SetpointChannel)"""
+
+    metrics = None
+    """Stage histograms and gauges of the flight process (metrics.FlightMetrics)"""
+
+    arming_status = None
+    """Arming progress of the flight process (arming.ArmingStatus)"""
+
+    def __init__(self, motors: int = 4) -> None:
+        """
+        This constructor creates the shared memory blocks.
+
+        :param motors: int | Number of motors in the telemetry
+        :return: None
+        """
+        from telemetry import TelemetryRing
+        from setpoint import SetpointChannel
+        from metrics import FlightMetrics
+        from arming import ArmingStatus
+        self.telemetry = TelemetryRing(motors=motors)
+        self.setpoints = SetpointChannel()
+        self.metrics = FlightMetrics()
+        self.arming_status = ArmingStatus()
+
+    @staticmethod
+    def from_airframe(airframe: str = None):
+        """
+        This method creates the hub with the telemetry sized for the motors of an airframe. Only the mixer is imported,
+        the flight modules still wait for FlightSupervisor.start().
+
+        :param airframe: str | Airframe from data/airframes.json (None - Mixer.CONST_AIRFRAME, the airframe of the quadcopter)
+        :return: IPCHub | Hub
+        """
+        from mixer import Mixer
+        airframe = Mixer.CONST_AIRFRAME if airframe is None else airframe
+        return IPCHub(Mixer.from_file(Mixer.CONST_AIRFRAMES_FILE, airframe).get_motor_count())
+
+    def get_names(self) -> dict:
+        """
+        This method returns the names of the shared memory blocks (e.g. for the ground station).
+
+        :return: dict | Channel -> name of its block
+        """
+        return {
+            'telemetry': self.telemetry.get_name(),
+            'setpoints': self.setpoints.get_name(),
+            'metrics': self.metrics.get_name(),
+            'arming': self.arming_status.get_name()
+        }
+
+    def close(self) -> None:
+        """
+        This method closes (and removes) the shared memory blocks.
+
+        :return: None
+        """
+        self.telemetry.close()
+        self.setpoints.close()
+        self.metrics.close()
+        self.arming_status.close()
+
+
+def get_resident_memory(pid: int = None) -> int:
+    """
+    This function returns the resident memory of a process.
+
+    :param pid: int | Process identifier (None - this process)
+    :return: int | Bytes (None - unknown)
+    """
+    try:
+        with open('/proc/' + ('self' if pid is None else str(pid)) + '/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if pid is None:
+            # peak instead of current, kilobytes on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return None
+
+
+class FlightSupervisor:
+    """
+    This class starts the flight process the first time it is needed (not at import), reports its state and stops it.
+    The flight modules (the quadcopter, its controllers and the hardware packages) are imported only then, so the web server starts quickly.
+    NumPy is already loaded by then: the telemetry ring of the IPCHub needs it.
+    A flight process that exits is not restarted on its own: motors must never start spinning again without a person deciding so.
+    """
+
+    hub: IPCHub = None
+    """Shared memory of the flight process"""
+
+    test: bool = True
+    """Run the flight process in the test mode (with telemetry)"""
+
+    hardware = None
+    """Hardware of the quadcopter (None - RaspberryPi)"""
+
+    drone = None
+    """Quadcopter (None - not started)"""
+
+    start_time: float = None
+    """Monotonic time the flight process was started"""
+
+    import_time: float = None
+    """Time (seconds) of importing the flight modules"""
+
+    create_time: float = None
+    """Time (seconds) of creating the quadcopter"""
+
+    error: str = None
+    """Reason the flight process could not be started (None - no error)"""
+
+    lock: Lock = None
+    """Lets only one request start the flight process"""
+
+    def __init__(self, hub: IPCHub, test: bool = True, hardware=None) -> None:
+        """
+        This constructor sets what to start.
+
+        :param hub: IPCHub | Shared memory of the flight process
+        :param test: bool | Run the flight process in the test mode (with telemetry)
+        :param hardware: Hardware | Hardware of the quadcopter (None - RaspberryPi)
+        :return: None
+        """
+        self.hub = hub
+        self.test = test
+        self.hardware = hardware
+        self.lock = Lock()
+
+    def start(self) -> bool:
+        """
+        This method creates the quadcopter and starts the flight process, unless that has been done already.
+
+        :return: bool | The flight process has been started (now or before)
+        """
+        with self.lock:
+            if self.drone is not None:
+                return True
+            if self.error is not None:
+                return False
+            try:
+                start = perf_counter()
+                from quadcopter import Quadcopter
+                self.import_time = perf_counter() - start
+                start = perf_counter()
+                hub = self.hub
+                drone = Quadcopter(hub.setpoints, hub.telemetry, hardware=self.hardware, metrics=hub.metrics, arm=False,
+                                   arming_status=hub.arming_status)
+                self.create_time = perf_counter() - start
+                drone.start(test=self.test)
+            except Exception as error:
+                self.error = type(error).__name__ + ': ' + str(error)
+                return False
+            self.drone = drone
+            self.start_time = monotonic()
+            return True
+
+    def is_running(self) -> bool:
+        """
+        This method checks whether the flight process is alive.
+
+        :return: bool | The flight process is alive
+        """
+        return self.drone is not None and self.drone.proccess is not None and self.drone.proccess.is_alive()
+
+    def get_status(self) -> dict:
+        """
+        This method returns the state of the flight process and the memory of both processes.
+
+        :return: dict | flight (started, running, pid, exit code, uptime, import and creation time, memory, error), arming, server memory
+        """
+        process = self.drone.proccess if self.drone is not None else None
+        running = self.is_running()
+        return {
+            'flight': {
+                'started': self.drone is not None,
+                'running': running,
+                'pid': process.pid if process is not None else None,
+                'exitcode': process.exitcode if process is not None else None,
+                'uptime': monotonic() - self.start_time if self.start_time is not None else None,
+                'import_seconds': self.import_time,
+                'create_seconds': self.create_time,
+                'resident_bytes': get_resident_memory(process.pid) if running else None,
+                'error': self.error
+            },
+            'arming': self.hub.arming_status.read(),
+            'server': {'pid': os.getpid(), 'resident_bytes': get_resident_memory()}
+        }
+
+    def stop(self) -> None:
+        """
+        This method stops the flight process (if it runs).
+
+        :return: None
+        """
+        with self.lock:
+            if self.drone is not None and self.drone.proccess is not None:
+                self.drone.terminate()
+                self.drone.join()
@@ -0,0 +1,236 @@
+"""This module writes and reads the traces of the flight process: its inputs and outputs in the order it handled them."""
+
+import struct
+from time import time
+
+
+class TraceWriter:
+    """
+    This class appends timestamped records to a trace file: raw IMU samples, commands and motor outputs, in the order the flight process handled them.
+    The file is written through a large buffer, so a record costs a pack into memory and the disk is written only when the buffer fills up.
+    """
+
+    CONST_MAGIC: bytes = b'QTRC'
+    """File signature"""
+
+    CONST_VERSION: int = 1
+    """File format version"""
+
+    CONST_EXTENSION: str = '.qtr'
+    """File extension"""
+
+    CONST_HEADER_FORMAT: struct.Struct = struct.Struct('<4sHHd')
+    """Header layout: signature, version, number of motors, creation time"""
+
+    CONST_STATE: bytes = b'I'
+    """Record kind: state of the quadcopter when the trace starts"""
+
+    CONST_SAMPLE: bytes = b'S'
+    """Record kind: raw IMU sample read by an attitude update"""
+
+    CONST_COMMAND: bytes = b'C'
+    """Record kind: command read from outside the process"""
+
+    CONST_OUTPUT: bytes = b'M'
+    """Record kind: duty cycles set by a control update"""
+
+    CONST_CORRECTIONS: bytes = b'K'
+    """Record kind: sensor calibration the raw IMU samples are corrected with"""
+
+    CONST_STATE_FORMAT: struct.Struct = struct.Struct('<cdddb')
+    """Layout: kind, attitude clock time, control clock time, main power, action value"""
+
+    CONST_SAMPLE_FORMAT: struct.Struct = struct.Struct('<cd7h')
+    """Layout: kind, attitude clock time, raw accelerometer X, Y, Z, temperature, gyro X, Y, Z words"""
+
+    CONST_COMMAND_FORMAT: struct.Struct = struct.Struct('<cddb')
+    """Layout: kind, time, power (NaN - unchanged), action value (SetpointChannel.CONST_NO_ACTION - unchanged)"""
+
+    CONST_CORRECTIONS_FORMAT: struct.Struct = struct.Struct('<cd9d')
+    """Layout: kind, attitude clock time, Accelerometer.corrections (accelerometer X, Y, Z bias and scale, gyro X, Y, Z bias)"""
+
+    CONST_BUFFER_SIZE: int = 1 << 20
+    """Size of the write buffer in bytes"""
+
+    path: str = None
+    """Path to the file"""
+
+    motors: int = None
+    """Number of motors"""
+
+    output_format: struct.Struct = None
+    """Layout: kind, control clock time, duty cycle of every motor"""
+
+    file = None
+    """Trace file"""
+
+    counts: dict = None
+    """Number of records of every kind"""
+
+    def __init__(self, path: str, motors: int = 4) -> None:
+        """
+        This constructor creates the file and writes its header.
+
+        :param path: str | Path to the file
+        :param motors: int | Number of motors
+        :return: None
+        """
+        self.path = path
+        self.motors = motors
+        self.output_format = TraceWriter.get_output_format(motors)
+        self.counts = {self.CONST_STATE: 0, self.CONST_SAMPLE: 0, self.CONST_COMMAND: 0, self.CONST_OUTPUT: 0, self.CONST_CORRECTIONS: 0}
+        self.file = open(path, 'wb', buffering=self.CONST_BUFFER_SIZE)
+        self.file.write(self.CONST_HEADER_FORMAT.pack(self.CONST_MAGIC, self.CONST_VERSION, motors, time()))
+
+    @staticmethod
+    def get_output_format(motors: int) -> struct.Struct:
+        """
+        This method returns the layout of a motor output record.
+
+        :param motors: int | Number of motors
+        :return: struct.Struct | Layout
+        """
+        return struct.Struct('<cd' + str(motors) + 'd')
+
+    def write_state(self, attitude_time: float, control_time: float, main_power: float, action: int) -> None:
+        """
+        This method records the state the replay starts from.
+
+        :param attitude_time: float | Time of the last attitude update
+        :param control_time: float | Time of the last control update
+        :param main_power: float | Main power
+        :param action: int | Quadcopter.Action value
+        :return: None
+        """
+        self.file.write(self.CONST_STATE_FORMAT.pack(self.CONST_STATE, attitude_time, control_time, main_power, action))
+        self.counts[self.CONST_STATE] += 1
+
+    def write_corrections(self, timestamp: float, corrections: tuple) -> None:
+        """
+        This method records the sensor calibration, the replay corrects the raw samples with it.
+
+        :param timestamp: float | Time of the last attitude update
+        :param corrections: tuple | Accelerometer.corrections
+        :return: None
+        """
+        self.file.write(self.CONST_CORRECTIONS_FORMAT.pack(self.CONST_CORRECTIONS, timestamp, *corrections))
+        self.counts[self.CONST_CORRECTIONS] += 1
+
+    def write_sample(self, timestamp: float, raw: tuple) -> None:
+        """
+        This method records a raw IMU sample.
+
+        :param timestamp: float | Time seen by the attitude clock
+        :param raw: tuple | Raw accelerometer X, Y, Z, temperature, gyro X, Y, Z words
+        :return: None
+        """
+        self.file.write(self.CONST_SAMPLE_FORMAT.pack(self.CONST_SAMPLE, timestamp, *raw))
+        self.counts[self.CONST_SAMPLE] += 1
+
+    def write_command(self, timestamp: float, power: float, action: int) -> None:
+        """
+        This method records a command.
+
+        :param timestamp: float | Time at which the command was read
+        :param power: float | Main power (NaN - unchanged)
+        :param action: int | Quadcopter.Action value (SetpointChannel.CONST_NO_ACTION - unchanged)
+        :return: None
+        """
+        self.file.write(self.CONST_COMMAND_FORMAT.pack(self.CONST_COMMAND, timestamp, power, action))
+        self.counts[self.CONST_COMMAND] += 1
+
+    def write_output(self, timestamp: float, duties: list) -> None:
+        """
+        This method records the duty cycles of the motors.
+
+        :param timestamp: float | Time seen by the control clock
+        :param duties: list | Duty cycle of every motor
+        :return: None
+        """
+        self.file.write(self.output_format.pack(self.CONST_OUTPUT, timestamp, *duties))
+        self.counts[self.CONST_OUTPUT] += 1
+
+    def close(self) -> None:
+        """
+        This method writes the buffer to the disk and closes the file.
+
+        :return: None
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class TraceReader:
+    """
+    This class streams the records of a trace file in chunks, so traces larger than the memory can be read.
+    """
+
+    CONST_CHUNK_SIZE: int = 1 << 20
+    """Number of bytes read from the disk at once"""
+
+    path: str = None
+    """Path to the file"""
+
+    motors: int = None
+    """Number of motors"""
+
+    created: float = None
+    """Creation time of the trace"""
+
+    chunk_size: int = None
+    """Number of bytes read from the disk at once"""
+
+    def __init__(self, path: str, chunk_size: int = None) -> None:
+        """
+        This constructor reads the header of the file.
+
+        :param path: str | Path to the file
+        :param chunk_size: int | Number of bytes read from the disk at once (None - CONST_CHUNK_SIZE)
+        :return: None
+        """
+        self.path = path
+        self.chunk_size = chunk_size if chunk_size is not None else self.CONST_CHUNK_SIZE
+        with open(path, 'rb') as file:
+            magic, version, self.motors, self.created = TraceWriter.CONST_HEADER_FORMAT.unpack(file.read(TraceWriter.CONST_HEADER_FORMAT.size))
+        if magic != TraceWriter.CONST_MAGIC:
+            raise ValueError('The file ' + path + ' is not a trace.')
+        if version != TraceWriter.CONST_VERSION:
+            raise ValueError('The trace ' + path + ' has an unknown version ' + str(version) + '.')
+
+    def __iter__(self):
+        """
+        This method yields the records in the order they were written.
+
+        :return: generator | (kind, time, values) tuples, values are the remaining fields of the record
+        """
+        formats = {
+            TraceWriter.CONST_STATE: TraceWriter.CONST_STATE_FORMAT,
+            TraceWriter.CONST_SAMPLE: TraceWriter.CONST_SAMPLE_FORMAT,
+            TraceWriter.CONST_COMMAND: TraceWriter.CONST_COMMAND_FORMAT,
+            TraceWriter.CONST_OUTPUT: TraceWriter.get_output_format(self.motors),
+            TraceWriter.CONST_CORRECTIONS: TraceWriter.CONST_CORRECTIONS_FORMAT
+        }
+        with open(self.path, 'rb') as file:
+            file.seek(TraceWriter.CONST_HEADER_FORMAT.size)
+            data = b''
+            offset = 0
+            while True:
+                chunk = file.read(self.chunk_size)
+                if not chunk:
+                    break
+                data = data[offset:] + chunk
+                offset = 0
+                end = len(data)
+                while offset < end:
+                    kind = data[offset:offset + 1]
+                    record_format = formats.get(kind)
+                    if record_format is None:
+                        raise ValueError('The trace ' + self.path + ' has an unknown record ' + repr(kind) + '.')
+                    if offset + record_format.size > end:
+                        break
+                    record = record_format.unpack_from(data, offset)
+                    offset += record_format.size
+                    yield kind, record[1], record[2:]
+            if offset < len(data):
+                raise ValueError('The trace ' + self.path + ' ends with an incomplete record.')
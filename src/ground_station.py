@@ -0,0 +1,410 @@
+"""This module serves the telemetry of a running flight process to many WebSocket and HTTP clients (run it from the src directory)."""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+from collections import deque
+from time import monotonic
+
+from telemetry import TelemetryRing
+from telemetry_stream import TelemetryStream
+
+
+class GroundStationClient:
+    """
+    This class keeps the frames waiting for a single WebSocket client. When the client falls behind, its oldest frames are dropped.
+    """
+
+    frames: deque = None
+    """WebSocket messages waiting to be sent, oldest first"""
+
+    ready: asyncio.Event = None
+    """Set when there are frames to send"""
+
+    sent: int = 0
+    """Number of frames sent"""
+
+    dropped: int = 0
+    """Number of frames dropped because the client was too slow"""
+
+    def __init__(self, queue_length: int) -> None:
+        """
+        This constructor creates the empty queue.
+
+        :param queue_length: int | Number of frames kept for the client
+        :return: None
+        """
+        self.frames = deque(maxlen=queue_length)
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def push(self, frame: bytes) -> None:
+        """
+        This method queues a frame (the oldest one is dropped when the queue is full).
+
+        :param frame: bytes | WebSocket message
+        :return: None
+        """
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(frame)
+        self.ready.set()
+
+
+class GroundStation:
+    """
+    This class attaches to the telemetry ring of the flight process and reads it once per update, whatever the number of clients.
+    Every update is encoded once (a binary TelemetryStream frame for the WebSocket clients, a JSON document for the HTTP clients)
+    and the same bytes go to everyone. Each WebSocket client has a short queue; a slow client loses its oldest frames and one
+    that stops reading is disconnected, so the memory stays bounded. The ring is a seqlock read without locks, so no amount of
+    web load can delay the flight process (run the station as a separate process, by default with a lower priority).
+
+    Routes: /ws (WebSocket, binary frames), /telemetry (latest sample as JSON), /status (counters as JSON).
+    """
+
+    CONST_WEBSOCKET_GUID: bytes = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    """Constant of the WebSocket handshake (RFC 6455)"""
+
+    CONST_POLL_FREQUENCY: float = 50
+    """Frequency (Hz) of reading the ring"""
+
+    CONST_MAX_BATCH: int = 64
+    """Highest number of samples in a frame"""
+
+    CONST_QUEUE_LENGTH: int = 8
+    """Number of frames kept for a slow WebSocket client"""
+
+    CONST_WRITE_TIMEOUT: float = 5
+    """Time (seconds) a client may keep a write blocked before it is disconnected"""
+
+    CONST_REQUEST_TIMEOUT: float = 30
+    """Time (seconds) a connection may stay idle between HTTP requests"""
+
+    CONST_MAX_CLIENTS: int = 2000
+    """Highest number of open connections"""
+
+    CONST_MAX_MESSAGE: int = 4096
+    """Largest message accepted from a WebSocket client (bytes)"""
+
+    CONST_WRITE_BUFFER: int = 65536
+    """Size of the socket write buffer above which writes wait for the client"""
+
+    ring: TelemetryRing = None
+    """Telemetry ring of the flight process"""
+
+    poll_period: float = None
+    """Time (seconds) between ring reads"""
+
+    clients: set = None
+    """Connected WebSocket clients"""
+
+    connections: int = 0
+    """Number of open connections"""
+
+    head: int = 0
+    """Number of ring records read"""
+
+    sample: bytes = b'{}'
+    """Latest sample as JSON"""
+
+    updates: int = 0
+    """Number of ring reads that found new records"""
+
+    requests: int = 0
+    """Number of HTTP requests served"""
+
+    disconnected: int = 0
+    """Number of WebSocket clients disconnected for not reading"""
+
+    sent: int = 0
+    """Number of frames sent to clients that have left"""
+
+    dropped: int = 0
+    """Number of frames dropped by clients that have left"""
+
+    server: asyncio.AbstractServer = None
+    """Listening server"""
+
+    poller: asyncio.Task = None
+    """Task reading the ring"""
+
+    def __init__(self, ring: TelemetryRing, poll_frequency: float = None) -> None:
+        """
+        This constructor sets the ring.
+
+        :param ring: TelemetryRing | Telemetry ring of the flight process
+        :param poll_frequency: float | Frequency (Hz) of reading the ring (None - CONST_POLL_FREQUENCY)
+        :return: None
+        """
+        self.ring = ring
+        self.poll_period = 1 / (poll_frequency if poll_frequency is not None else self.CONST_POLL_FREQUENCY)
+        self.clients = set()
+        self.connections = 0
+        self.head = ring.get_head()
+        self.sample = b'{}'
+        self.updates = 0
+        self.requests = 0
+        self.disconnected = 0
+        self.sent = 0
+        self.dropped = 0
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8765) -> asyncio.AbstractServer:
+        """
+        This method starts listening and reading the ring.
+
+        :param host: str | Address to listen on
+        :param port: int | Port to listen on (0 - any free port)
+        :return: asyncio.AbstractServer | Server
+        """
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        self.poller = asyncio.get_running_loop().create_task(self.poll())
+        return self.server
+
+    def stop(self) -> None:
+        """
+        This method stops listening and reading the ring (open connections end with the event loop).
+
+        :return: None
+        """
+        self.poller.cancel()
+        self.server.close()
+
+    def get_port(self) -> int:
+        """
+        This method returns the port the server listens on.
+
+        :return: int | Port
+        """
+        return self.server.sockets[0].getsockname()[1]
+
+    async def poll(self) -> None:
+        """
+        This method reads the new records of the ring at a fixed rate and hands them to every client.
+
+        :return: None
+        """
+        ring = self.ring
+        motors = ring.motors
+        sample_dtype = TelemetryStream.get_sample_dtype(motors)
+        next_time = monotonic()
+        while True:
+            head = ring.get_head()
+            if head != self.head:
+                records = ring.snapshot(min(head - self.head, self.CONST_MAX_BATCH), head)
+                self.head = head
+                if len(records):
+                    self.updates += 1
+                    message = GroundStation.encode_message(TelemetryStream.pack(records, motors, head - len(records), sample_dtype))
+                    latest = records[-1]
+                    self.sample = json.dumps({
+                        'sample': head - 1,
+                        'timestamp': float(latest['timestamp']),
+                        'powers': latest['powers'][:motors].tolist(),
+                        'angles': latest['angles'].tolist()
+                    }).encode()
+                    for client in self.clients:
+                        client.push(message)
+            next_time = max(next_time + self.poll_period, monotonic())
+            await asyncio.sleep(next_time - monotonic())
+
+    def get_status(self) -> dict:
+        """
+        This method returns the counters of the station.
+
+        :return: dict | Counters
+        """
+        return {
+            'connections': self.connections,
+            'websocket_clients': len(self.clients),
+            'updates': self.updates,
+            'requests': self.requests,
+            'frames_sent': self.sent + sum(x.sent for x in self.clients),
+            'frames_dropped': self.dropped + sum(x.dropped for x in self.clients),
+            'disconnected': self.disconnected,
+            'head': self.head
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        This method serves a connection: HTTP requests (keep-alive) until it upgrades to a WebSocket or closes.
+
+        :param reader: asyncio.StreamReader | Connection input
+        :param writer: asyncio.StreamWriter | Connection output
+        :return: None
+        """
+        if self.connections >= self.CONST_MAX_CLIENTS:
+            writer.close()
+            return
+        self.connections += 1
+        writer.transport.set_write_buffer_limits(high=self.CONST_WRITE_BUFFER)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.CONST_REQUEST_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                request = lines[0].split(' ')
+                if len(request) != 3:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, separator, value = line.partition(':')
+                    if separator:
+                        headers[name.strip().lower()] = value.strip()
+                method, path = request[0], request[1].split('?')[0]
+                self.requests += 1
+                if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self.serve_websocket(reader, writer, headers)
+                    return
+                if method != 'GET':
+                    status, body = '405 Method Not Allowed', b'{}'
+                elif path == '/telemetry':
+                    status, body = '200 OK', self.sample
+                elif path == '/status':
+                    status, body = '200 OK', json.dumps(self.get_status()).encode()
+                else:
+                    status, body = '404 Not Found', b'{}'
+                keep_alive = headers.get('connection', '').lower() != 'close' and request[2] == 'HTTP/1.1'
+                writer.write((
+                    'HTTP/1.1 ' + status + '\r\nContent-Type: application/json\r\nAccess-Control-Allow-Origin: *\r\n'
+                    'Cache-Control: no-store\r\nContent-Length: ' + str(len(body)) + '\r\n'
+                    'Connection: ' + ('keep-alive' if keep_alive else 'close') + '\r\n\r\n'
+                ).encode() + body)
+                await asyncio.wait_for(writer.drain(), self.CONST_WRITE_TIMEOUT)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.TimeoutError):
+            return
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict) -> None:
+        """
+        This method completes the WebSocket handshake and sends the frames until the client leaves or stops reading.
+
+        :param reader: asyncio.StreamReader | Connection input
+        :param writer: asyncio.StreamWriter | Connection output
+        :param headers: dict | Request headers (lower case names)
+        :return: None
+        """
+        key = headers.get('sec-websocket-key', '').encode()
+        accept = base64.b64encode(hashlib.sha1(key + self.CONST_WEBSOCKET_GUID).digest()).decode()
+        writer.write((
+            'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+            'Sec-WebSocket-Accept: ' + accept + '\r\n\r\n'
+        ).encode())
+        client = GroundStationClient(self.CONST_QUEUE_LENGTH)
+        self.clients.add(client)
+        receiver = asyncio.get_running_loop().create_task(self.receive(reader, writer, client))
+        try:
+            while not receiver.done():
+                await client.ready.wait()
+                client.ready.clear()
+                while client.frames:
+                    writer.write(client.frames.popleft())
+                    client.sent += 1
+                try:
+                    await asyncio.wait_for(writer.drain(), self.CONST_WRITE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    self.disconnected += 1
+                    return
+        finally:
+            self.clients.discard(client)
+            self.sent += client.sent
+            self.dropped += client.dropped
+            receiver.cancel()
+
+    async def receive(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, client: GroundStationClient) -> None:
+        """
+        This method reads the messages of a WebSocket client: answers pings and stops on close (other messages are ignored).
+
+        :param reader: asyncio.StreamReader | Connection input
+        :param writer: asyncio.StreamWriter | Connection output
+        :param client: GroundStationClient | Client
+        :return: None
+        """
+        try:
+            while True:
+                first, second = await reader.readexactly(2)
+                length = second & 0x7f
+                if length == 126:
+                    length = struct.unpack('>H', await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack('>Q', await reader.readexactly(8))[0]
+                if length > self.CONST_MAX_MESSAGE:
+                    return
+                mask = await reader.readexactly(4) if second & 0x80 else b'\x00\x00\x00\x00'
+                payload = bytes(x ^ mask[index % 4] for index, x in enumerate(await reader.readexactly(length)))
+                opcode = first & 0x0f
+                if opcode == 0x8:
+                    writer.write(GroundStation.encode_message(payload[:2], 0x8))
+                    return
+                if opcode == 0x9:
+                    writer.write(GroundStation.encode_message(payload, 0xa))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        finally:
+            # wakes the sender up, so it sees that the client has left
+            client.ready.set()
+
+    @staticmethod
+    def encode_message(payload: bytes, opcode: int = 0x2) -> bytes:
+        """
+        This method frames a WebSocket message sent by the server (not masked).
+
+        :param payload: bytes | Message
+        :param opcode: int | Message type (0x2 - binary)
+        :return: bytes | WebSocket frame
+        """
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('>BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, 127, length)
+        return header + payload
+
+
+async def serve(ring: TelemetryRing, host: str, port: int, poll_frequency: float = None) -> None:
+    """
+    This function runs a ground station until it is cancelled.
+
+    :param ring: TelemetryRing | Telemetry ring of the flight process
+    :param host: str | Address to listen on
+    :param port: int | Port to listen on
+    :param poll_frequency: float | Frequency (Hz) of reading the ring (None - GroundStation.CONST_POLL_FREQUENCY)
+    :return: None
+    """
+    station = GroundStation(ring, poll_frequency)
+    server = await station.start(host, port)
+    print('Ground station on port ' + str(station.get_port()))
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serves the telemetry of a running flight process to WebSocket and HTTP clients.')
+    parser.add_argument('telemetry', help='name of the shared memory block of the telemetry ring (TelemetryRing.get_name)')
+    parser.add_argument('--host', default='0.0.0.0', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    parser.add_argument('--rate', type=float, default=GroundStation.CONST_POLL_FREQUENCY, help='frequency (Hz) of reading the telemetry')
+    parser.add_argument('--nice', type=int, default=10, help='priority decrease of the station process (keeps it behind the flight process)')
+    arguments = parser.parse_args()
+
+    if arguments.nice and hasattr(os, 'nice'):
+        os.nice(arguments.nice)
+    telemetry = TelemetryRing.attach(arguments.telemetry)
+    try:
+        asyncio.run(serve(telemetry, arguments.host, arguments.port, arguments.rate))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        telemetry.close()
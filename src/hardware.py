@@ -0,0 +1,133 @@
+"""This module selects the hardware the quadcopter runs on."""
+
+from time import sleep, monotonic, monotonic_ns
+
+from timers import PreciseLoopRate
+
+
+class Hardware:
+    """
+    This class gives the quadcopter its GPIO module, its I2C bus and its time functions.
+    """
+
+    gpio = None
+    """GPIO module (RPi.GPIO interface)"""
+
+    bus = None
+    """I2C bus (smbus.SMBus interface)"""
+
+    spin_ns: int = 0
+    """Spin budget (ns) of sleep (0 - the system sleep only)"""
+
+    def __init__(self, gpio, bus, spin: float = 0) -> None:
+        """
+        This constructor sets the GPIO module and the I2C bus.
+
+        :param gpio: RPi.GPIO | GPIO module
+        :param bus: smbus.SMBus | I2C bus
+        :param spin: float | Time (seconds) at the end of every sleep spent spinning on the clock, so the wake-up is not late
+        :return: None
+        """
+        self.gpio = gpio
+        self.bus = bus
+        self.spin_ns = int(spin * 1e9)
+
+    def open_bus(self):
+        """
+        This method returns the bus for another process (e.g. the IMU reader), which must not share the open bus of this one.
+
+        :return: smbus.SMBus | I2C bus (the bus of this object unless the hardware opens a new one)
+        """
+        return self.bus
+
+    def time(self) -> float:
+        """
+        This method returns the monotonic time.
+
+        :return: float | Time in seconds
+        """
+        return monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        """
+        This method waits.
+
+        :param seconds: float | Time to wait in seconds
+        :return: None
+        """
+        if self.spin_ns > 0:
+            PreciseLoopRate.sleep_until(monotonic_ns() + int(seconds * 1e9), self.spin_ns)
+        else:
+            sleep(seconds)
+
+
+class RaspberryPi(Hardware):
+    """
+    This class uses the Raspberry Pi GPIO pins and the I2C bus 1. The hardware packages are imported only here.
+    Sleeps end with a short spin, because the 1 kHz flight loop cannot afford the late wake-ups of the system sleep.
+    """
+
+    bus_number: int = 1
+    """I2C bus number"""
+
+    def __init__(self, bus_number: int = 1, spin: float = PreciseLoopRate.CONST_SPIN) -> None:
+        """
+        This constructor imports RPi.GPIO and smbus and opens the I2C bus.
+
+        :param bus_number: int | I2C bus number
+        :param spin: float | Time (seconds) at the end of every sleep spent spinning on the clock
+        :return: None
+        """
+        import RPi.GPIO
+        import smbus
+        super().__init__(RPi.GPIO, smbus.SMBus(bus_number), spin)
+        self.bus_number = bus_number
+
+    def open_bus(self):
+        """
+        This method opens the I2C bus again for another process: a forked process shares the file of the bus,
+        and smbus caches the device address it last selected on that file, so two processes would talk to the wrong devices.
+
+        :return: smbus.SMBus | New I2C bus
+        """
+        import smbus
+        return smbus.SMBus(self.bus_number)
+
+
+class FakeHardware(Hardware):
+    """
+    This class uses the fake GPIO and I2C bus and a virtual clock, so sleeping takes no real time (e.g. for tests and benchmarks).
+    """
+
+    now: float = 0
+    """Virtual time in seconds"""
+
+    def __init__(self, gpio=None, bus=None) -> None:
+        """
+        This constructor creates the fake GPIO and I2C bus.
+
+        :param gpio: FakeGPIO | GPIO module (None - new FakeGPIO)
+        :param bus: FakeSMBus | I2C bus (None - new FakeSMBus)
+        :return: None
+        """
+        from fake_hardware import FakeGPIO, FakeSMBus
+        super().__init__(gpio if gpio is not None else FakeGPIO(), bus if bus is not None else FakeSMBus())
+        self.now = 0
+
+    def time(self) -> float:
+        """
+        This method returns the virtual time.
+
+        :return: float | Time in seconds
+        """
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """
+        This method moves the virtual time forward.
+
+        :param seconds: float | Time to wait in seconds
+        :return: None
+        """
+        if seconds > 0:
+            self.now += seconds
@@ -0,0 +1,275 @@
+"""This module reads the sensor in a separate process, so a slow or stalled I2C transfer never delays the control loop."""
+
+import struct
+from multiprocessing import Process
+from time import monotonic
+from typing import Callable
+
+import numpy as np
+
+from accelerometer import Accelerometer
+from shared_block import SharedBlock
+from timers import PreciseLoopRate
+
+
+class ImuReader:
+    """
+    This class reads raw samples at a fixed rate (paced by PreciseLoopRate) in a separate process into a ring in shared memory,
+    allocated once. The smbus binding keeps the GIL during a transfer, so a reading thread would stall the control loop together
+    with the bus; a process has its own interpreter. The control loop takes the newest sample or every sample since its last
+    pick-up and never waits for the bus. The reading process is the only writer: it stores a whole row before it moves the head,
+    and a reader checks the head again after copying, so a row overwritten meanwhile is dropped and counted instead of returned.
+    """
+
+    CONST_CAPACITY: int = 256
+    """Number of samples in the ring"""
+
+    CONST_PERIOD: float = 0.001
+    """Default time (seconds) between two samples"""
+
+    CONST_HEADER_FORMAT: struct.Struct = struct.Struct('<QQ')
+    """Header layout written by the reading process: number of written samples, number of failed transfers"""
+
+    CONST_STOP_FORMAT: struct.Struct = struct.Struct('<Q')
+    """Layout of the stop request written by the owner of the reader"""
+
+    CONST_STOP_OFFSET: int = 16
+    """Offset of the stop request"""
+
+    CONST_HEADER_SIZE: int = 64
+    """Bytes reserved for the header"""
+
+    CONST_STOP_TIMEOUT: float = 1
+    """Time (seconds) the reading process gets to finish its transfer before it is terminated"""
+
+    accelerometer: Accelerometer = None
+    """Sensor"""
+
+    time_function: Callable = None
+    """Time the samples are stamped with (seconds, the same clock in every process)"""
+
+    period: float = None
+    """Time (seconds) between two samples"""
+
+    spin: float = 0
+    """Spin budget (seconds) of the waits between two samples (0 - the system sleep only)"""
+
+    open_bus: Callable = None
+    """Opens the bus of the reading process (None - the bus of the accelerometer)"""
+
+    block: SharedBlock = None
+    """Shared memory block"""
+
+    ring: np.ndarray = None
+    """Samples: time, raw accelerometer X, Y, Z, temperature, gyro X, Y, Z words"""
+
+    tail: int = 0
+    """Number of samples written before the last pick-up of read_new"""
+
+    lost: int = 0
+    """Number of samples overwritten before read_new picked them up"""
+
+    stale: int = 0
+    """Number of pick-ups without a new sample"""
+
+    age: float = 0.0
+    """Age (seconds) of the newest sample at the last pick-up"""
+
+    max_age: float = 0.0
+    """Largest age (seconds) of the newest sample at a pick-up"""
+
+    worker: Process = None
+    """Reading process"""
+
+    def __init__(self, accelerometer: Accelerometer, time_function: Callable = monotonic, period: float = None, capacity: int = None,
+                 spin: float = 0, open_bus: Callable = None) -> None:
+        """
+        This constructor allocates the ring in a new shared memory block.
+
+        :param accelerometer: Accelerometer | Sensor
+        :param time_function: Callable | Time the samples are stamped with (seconds, e.g. Hardware.time)
+        :param period: float | Time (seconds) between two samples (None - CONST_PERIOD)
+        :param capacity: int | Number of samples in the ring (None - CONST_CAPACITY)
+        :param spin: float | Spin budget (seconds) of the waits between two samples (0 - the system sleep only)
+        :param open_bus: Callable | Opens the bus of the reading process (None - the bus of the accelerometer, e.g. Hardware.open_bus)
+        :return: None
+        """
+        capacity = self.CONST_CAPACITY if capacity is None else capacity
+        period = self.CONST_PERIOD if period is None else period
+        if capacity < 2:
+            raise ValueError('Wrong capacity. ' + str(capacity) + ' should be at least 2.')
+        if period <= 0:
+            raise ValueError('Wrong period. ' + str(period) + ' should be greater than 0.')
+        self.accelerometer = accelerometer
+        self.time_function = time_function
+        self.period = period
+        self.spin = spin
+        self.open_bus = open_bus
+        self.block = SharedBlock(self.CONST_HEADER_SIZE + capacity * 8 * 8)
+        self.ring = np.ndarray((capacity, 8), dtype=np.float64, buffer=self.block.get_buffer(), offset=self.CONST_HEADER_SIZE)
+
+    def get_head(self) -> int:
+        """
+        This method returns the number of samples written so far.
+
+        :return: int | Number of samples
+        """
+        return self.CONST_HEADER_FORMAT.unpack_from(self.block.get_buffer(), 0)[0]
+
+    def get_bus_errors(self) -> int:
+        """
+        This method returns the number of failed transfers.
+
+        :return: int | Number of failed transfers
+        """
+        return self.CONST_HEADER_FORMAT.unpack_from(self.block.get_buffer(), 0)[1]
+
+    def is_running(self) -> bool:
+        """
+        This method checks whether the reading process is alive.
+
+        :return: bool | The process is alive
+        """
+        return self.worker is not None and self.worker.is_alive()
+
+    def start(self) -> None:
+        """
+        This method starts the reading process.
+
+        :return: None
+        """
+        if self.is_running():
+            return
+        self.CONST_STOP_FORMAT.pack_into(self.block.get_buffer(), self.CONST_STOP_OFFSET, 0)
+        self.worker = Process(target=self.work, name='imu-reader', daemon=True)
+        self.worker.start()
+
+    def stop(self) -> None:
+        """
+        This method asks the reading process to stop after its current transfer and terminates it if the bus does not return in time.
+
+        :return: None
+        """
+        if self.worker is None:
+            return
+        self.CONST_STOP_FORMAT.pack_into(self.block.get_buffer(), self.CONST_STOP_OFFSET, 1)
+        self.worker.join(self.CONST_STOP_TIMEOUT)
+        if self.worker.is_alive():
+            self.worker.terminate()
+            self.worker.join()
+        self.worker = None
+
+    def work(self) -> None:
+        """
+        This method reads samples in the reading process until the reader is stopped. A late sample moves the schedule
+        instead of being caught up with a burst.
+
+        :return: None
+        """
+        if self.open_bus is not None:
+            self.accelerometer.bus = self.open_bus()
+        rate = PreciseLoopRate(1 / self.period, self.spin)
+        buffer = self.block.get_buffer()
+        unpack_stop = self.CONST_STOP_FORMAT.unpack_from
+        offset = self.CONST_STOP_OFFSET
+        try:
+            while not unpack_stop(buffer, offset)[0]:
+                self.read_once()
+                rate.wait()
+        except KeyboardInterrupt:
+            pass
+
+    def read_once(self) -> bool:
+        """
+        This method reads one sample into the ring (the reading process is the only writer).
+
+        :return: bool | The transfer succeeded
+        """
+        buffer = self.block.get_buffer()
+        head, bus_errors = self.CONST_HEADER_FORMAT.unpack_from(buffer, 0)
+        try:
+            raw = self.accelerometer.read_raw()
+        except OSError:
+            self.CONST_HEADER_FORMAT.pack_into(buffer, 0, head, bus_errors + 1)
+            return False
+        self.ring[head % len(self.ring)] = (self.time_function(), *raw)
+        self.CONST_HEADER_FORMAT.pack_into(buffer, 0, head + 1, bus_errors)
+        return True
+
+    def latest(self) -> tuple:
+        """
+        This method returns the newest sample without waiting (it does not move the pick-up of read_new).
+
+        :return: tuple | Time, raw words (None - no sample yet)
+        """
+        head = self.get_head()
+        if not head:
+            return None
+        row = self.ring[(head - 1) % len(self.ring)].tolist()
+        self.update_age(row[0])
+        return row[0], tuple(int(x) for x in row[1:])
+
+    def read_new(self) -> np.ndarray:
+        """
+        This method returns every sample written since the last call without waiting. Samples that were overwritten before
+        the call (the reader fell more than the ring behind) are counted as lost.
+
+        :return: np.ndarray | (N, 8) copy of the samples, the oldest first: time, raw accelerometer X, Y, Z, temperature, gyro X, Y, Z words
+        """
+        ring = self.ring
+        capacity = len(ring)
+        head = self.get_head()
+        # the row at the head is the next one written, it is never copied
+        tail = max(self.tail, head - capacity + 1)
+        if tail == head:
+            self.stale += 1
+            return ring[:0].copy()
+        start = tail % capacity
+        end = head % capacity
+        samples = ring[start:end].copy() if start < end else np.concatenate((ring[start:], ring[:end]))
+        # rows overwritten while copying are dropped
+        first = max(tail, self.get_head() - capacity + 1)
+        if first > tail:
+            samples = samples[first - tail:]
+        self.lost += first - self.tail
+        self.tail = head
+        if len(samples):
+            self.update_age(samples[-1, 0])
+        return samples
+
+    def update_age(self, timestamp: float) -> None:
+        """
+        This method measures the age of the newest sample at a pick-up.
+
+        :param timestamp: float | Time of the newest sample
+        :return: None
+        """
+        self.age = age = self.time_function() - timestamp
+        if age > self.max_age:
+            self.max_age = age
+
+    def get_counters(self) -> dict:
+        """
+        This method returns the counters of the reader.
+
+        :return: dict | samples, bus_errors, lost, stale, age, max_age, running
+        """
+        return {
+            'samples': self.get_head(),
+            'bus_errors': self.get_bus_errors(),
+            'lost': self.lost,
+            'stale': self.stale,
+            'age': self.age,
+            'max_age': self.max_age,
+            'running': self.is_running()
+        }
+
+    def close(self) -> None:
+        """
+        This method stops the reading process and removes the ring.
+
+        :return: None
+        """
+        self.stop()
+        self.ring = None
+        self.block.close()
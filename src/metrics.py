@@ -0,0 +1,224 @@
+"""This module keeps the hot path metrics of the flight process in shared memory and renders them in the Prometheus text format."""
+
+import struct
+from bisect import bisect_left
+
+from shared_block import SharedBlock
+from flight_recorder import FlightRecorder
+
+
+class FlightMetrics:
+    """
+    This class holds fixed-bucket histograms of the tick stage durations and a few gauges in a shared memory block.
+    The flight process is the only writer; an observation is a bisect and three stores into memory (no locks, no containers).
+    Other processes read the block at any time; a scrape may see a histogram halfway through an update, which Prometheus tolerates.
+    """
+
+    CONST_BUCKETS: tuple = (
+        0.000001, 0.000002, 0.000005, 0.00001, 0.00002, 0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01
+    )
+    """Upper bounds (seconds) of the histogram buckets (one more bucket counts the rest)"""
+
+    CONST_GAUGES: tuple = (
+        ('imu_rate_hz', 'gauge', 'Measured frequency of the attitude updates'),
+        ('control_rate_hz', 'gauge', 'Measured frequency of the control updates'),
+        ('control_jitter_seconds', 'gauge', 'Start delay of the last control update'),
+        ('imu_overruns_total', 'counter', 'Attitude updates that started a period late or ran longer than a period'),
+        ('control_overruns_total', 'counter', 'Control updates that started a period late or ran longer than a period'),
+        ('control_skipped_total', 'counter', 'Control periods skipped because the loop fell behind'),
+        ('last_command_number', 'gauge', 'Number of the last command read by the flight process (commands are numbered from 1)'),
+        ('imu_sample_age_seconds', 'gauge', 'Age of the newest sample of the IMU reader when the attitude update took it'),
+        ('imu_samples_lost_total', 'counter', 'Samples of the IMU reader overwritten before the attitude update took them'),
+        ('imu_bus_errors_total', 'counter', 'Failed I2C transfers of the IMU reader')
+    )
+    """Gauges: name, Prometheus type, description"""
+
+    CONST_HEADER_FORMAT: struct.Struct = struct.Struct('<QQQ')
+    """Header layout: number of stages, number of buckets, number of gauges"""
+
+    CONST_HEADER_SIZE: int = 64
+    """Bytes reserved for the header"""
+
+    CONST_PREFIX: str = 'quadcopter_'
+    """Beginning of the metric names"""
+
+    block: SharedBlock = None
+    """Shared memory block"""
+
+    stages: tuple = None
+    """Names of the measured stages"""
+
+    counts: memoryview = None
+    """Per stage: bucket counts, number of observations (unsigned 64-bit view of the block)"""
+
+    sums: memoryview = None
+    """Per stage: sum of the observations (double view of the block)"""
+
+    gauges: memoryview = None
+    """Gauge values (double view of the block)"""
+
+    stride: int = None
+    """Number of 8-byte slots of a stage"""
+
+    def __init__(self, stages: tuple = FlightRecorder.CONST_STAGES, name: str = None) -> None:
+        """
+        This constructor creates the metrics in a new shared memory block.
+
+        :param stages: tuple | Names of the measured stages
+        :param name: str | Name of the shared memory block (None - random)
+        :return: None
+        """
+        buckets = len(self.CONST_BUCKETS) + 1
+        self.block = SharedBlock(self.CONST_HEADER_SIZE + 8 * (len(stages) * (buckets + 2) + len(self.CONST_GAUGES)), name)
+        self.CONST_HEADER_FORMAT.pack_into(self.block.get_buffer(), 0, len(stages), buckets, len(self.CONST_GAUGES))
+        self.stages = tuple(stages)
+        self.map()
+
+    @staticmethod
+    def attach(name: str, stages: tuple = FlightRecorder.CONST_STAGES):
+        """
+        This method opens metrics created by another process.
+
+        :param name: str | Name of the shared memory block
+        :param stages: tuple | Names of the measured stages
+        :return: FlightMetrics | Metrics
+        """
+        metrics = FlightMetrics.__new__(FlightMetrics)
+        metrics.block = SharedBlock.attach(name)
+        metrics.stages = tuple(stages)
+        metrics.map()
+        return metrics
+
+    def map(self) -> None:
+        """
+        This method checks the header and creates the views of the block.
+
+        :return: None
+        """
+        buffer = self.block.get_buffer()
+        stages, buckets, gauges = self.CONST_HEADER_FORMAT.unpack_from(buffer, 0)
+        if (stages, buckets, gauges) != (len(self.stages), len(self.CONST_BUCKETS) + 1, len(self.CONST_GAUGES)):
+            raise ValueError('The metrics block has a different layout.')
+        self.stride = buckets + 2
+        end = self.CONST_HEADER_SIZE + 8 * stages * self.stride
+        self.counts = buffer[self.CONST_HEADER_SIZE:end].cast('Q')
+        self.sums = buffer[self.CONST_HEADER_SIZE:end].cast('d')
+        self.gauges = buffer[end:end + 8 * gauges].cast('d')
+
+    def __getstate__(self) -> dict:
+        """
+        This method pickles the metrics as the name of their shared memory block.
+
+        :return: dict | State
+        """
+        return {'name': self.block.get_name(), 'stages': self.stages}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method attaches to the shared memory block after unpickling.
+
+        :param state: dict | State
+        :return: None
+        """
+        self.__dict__.update(FlightMetrics.attach(state['name'], state['stages']).__dict__)
+
+    def get_name(self) -> str:
+        """
+        This method returns the name of the shared memory block.
+
+        :return: str | Name
+        """
+        return self.block.get_name()
+
+    def observe(self, stage: int, seconds: float) -> None:
+        """
+        This method adds a duration to the histogram of a stage (single writer only).
+
+        :param stage: int | Stage index
+        :param seconds: float | Duration
+        :return: None
+        """
+        base = stage * self.stride
+        counts = self.counts
+        counts[base + bisect_left(self.CONST_BUCKETS, seconds)] += 1
+        counts[base + self.stride - 2] += 1
+        self.sums[base + self.stride - 1] += seconds
+
+    def set_gauge(self, index: int, value: float) -> None:
+        """
+        This method sets a gauge (single writer only).
+
+        :param index: int | Index in CONST_GAUGES
+        :param value: float | Value
+        :return: None
+        """
+        self.gauges[index] = value
+
+    def get_histogram(self, stage: int) -> tuple:
+        """
+        This method reads the histogram of a stage.
+
+        :param stage: int | Stage index
+        :return: tuple | Bucket counts (not cumulative), number of observations, sum of the observations
+        """
+        base = stage * self.stride
+        return list(self.counts[base:base + self.stride - 2]), self.counts[base + self.stride - 2], self.sums[base + self.stride - 1]
+
+    def render(self, commands: dict = None) -> str:
+        """
+        This method renders the metrics in the Prometheus text format (version 0.0.4).
+
+        :param commands: dict | Counters of the command channel (SetpointChannel.get_counters) to add (None - not added)
+        :return: str | Metrics
+        """
+        prefix = self.CONST_PREFIX
+        name = prefix + 'stage_seconds'
+        lines = ['# HELP ' + name + ' Duration of a stage of the flight loop tick', '# TYPE ' + name + ' histogram']
+        bounds = [repr(x) for x in self.CONST_BUCKETS] + ['+Inf']
+        for stage, stage_name in enumerate(self.stages):
+            counts, count, total = self.get_histogram(stage)
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                lines.append(name + '_bucket{stage="' + stage_name + '",le="' + bound + '"} ' + str(cumulative))
+            lines.append(name + '_sum{stage="' + stage_name + '"} ' + repr(total))
+            lines.append(name + '_count{stage="' + stage_name + '"} ' + str(count))
+
+        for index, (gauge, kind, description) in enumerate(self.CONST_GAUGES):
+            lines += ['# HELP ' + prefix + gauge + ' ' + description, '# TYPE ' + prefix + gauge + ' ' + kind, prefix + gauge + ' ' + repr(self.gauges[index])]
+
+        if commands is not None:
+            read = int(self.gauges[self.get_gauge_index('last_command_number')])
+            for gauge, kind, description, value in (
+                ('commands_sent_total', 'counter', 'Commands sent to the flight process', commands['sent']),
+                ('commands_coalesced_total', 'counter', 'Commands overwritten before the flight process read them', commands['coalesced']),
+                ('commands_dropped_total', 'counter', 'Commands rejected by the flight process', commands['dropped']),
+                ('command_queue_depth', 'gauge', 'Commands sent but not read by the flight process yet', max(commands['sent'] - read, 0))
+            ):
+                lines += ['# HELP ' + prefix + gauge + ' ' + description, '# TYPE ' + prefix + gauge + ' ' + kind, prefix + gauge + ' ' + str(value)]
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def get_gauge_index(name: str) -> int:
+        """
+        This method finds a gauge.
+
+        :param name: str | Gauge name (without the prefix)
+        :return: int | Index in CONST_GAUGES
+        """
+        for index, gauge in enumerate(FlightMetrics.CONST_GAUGES):
+            if gauge[0] == name:
+                return index
+        raise ValueError('There is no gauge "' + name + '".')
+
+    def close(self) -> None:
+        """
+        This method closes the shared memory (and removes it if this object created it).
+
+        :return: None
+        """
+        self.counts.release()
+        self.sums.release()
+        self.gauges.release()
+        self.counts = self.sums = self.gauges = None
+        self.block.close()
@@ -0,0 +1,123 @@
+"""This module distributes the controller outputs between the motors with a mixing matrix."""
+
+import numpy as np
+from array import array
+
+from file_reader import FileReader
+
+
+class Mixer:
+    """
+    This class mixes the X axis, Y axis and yaw corrections into the power of every motor.
+    Each row of the mixing matrix holds the X, Y and yaw factors of one motor.
+    """
+
+    CONST_AIRFRAMES_FILE: str = '../data/airframes.json'
+    """Mixing matrices of the airframes"""
+
+    CONST_AIRFRAME: str = 'quad_x'
+    """Airframe of the quadcopter"""
+
+    names: list = None
+    """Motor names in the order of the matrix rows"""
+
+    matrix: np.ndarray = None
+    """(motors, 3) mixing matrix"""
+
+    command: np.ndarray = None
+    """Preallocated X axis, Y axis and yaw correction"""
+
+    output: array = None
+    """Preallocated difference between the power of each motor and the main power"""
+
+    extra_powers: np.ndarray = None
+    """NumPy view of the output (the builtin max/min are faster on the array than NumPy on a few items)"""
+
+    min_power: float = None
+    """Min motor power"""
+
+    max_power: float = None
+    """Max motor power"""
+
+    def __init__(self, names: list, matrix: list, min_power: float = 5.0, max_power: float = 10.0) -> None:
+        """
+        This constructor sets the mixing matrix and the motor power range.
+
+        :param names: list | Motor names in the order of the matrix rows
+        :param matrix: list | Mixing matrix, one [X, Y, yaw] row per motor
+        :param min_power: float | Min motor power
+        :param max_power: float | Max motor power
+        :return: None
+        """
+        matrix = np.array(matrix, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[1] != 3 or matrix.shape[0] != len(names):
+            raise ValueError('The mixing matrix must have one [X, Y, yaw] row per motor.')
+        if min_power >= max_power:
+            raise ValueError('The min power must be lower than the max power.')
+        self.names = list(names)
+        self.matrix = matrix
+        self.command = np.zeros(3)
+        self.set_output(array('d', [0.0] * len(names)))
+        self.min_power = min_power
+        self.max_power = max_power
+
+    @staticmethod
+    def from_file(path_to_file: str, airframe: str, min_power: float = 5.0, max_power: float = 10.0):
+        """
+        This method creates the mixer of an airframe described in a file.
+
+        :param path_to_file: str | Path to the airframe file
+        :param airframe: str | Airframe name (e.g. quad_x, quad_plus, hexa_x, octo_x)
+        :param min_power: float | Min motor power
+        :param max_power: float | Max motor power
+        :return: Mixer | Mixer of the airframe
+        """
+        airframes = FileReader('airframes', path_to_file).get_data('airframes')
+        if airframe not in airframes:
+            raise ValueError('Unknown airframe "' + airframe + '".')
+        motors = airframes[airframe]
+        return Mixer(list(motors.keys()), list(motors.values()), min_power, max_power)
+
+    def mix(self, main_power: float, x_delta: float, y_delta: float, yaw_delta: float) -> np.ndarray:
+        """
+        This method calculates the extra power of every motor and shifts all of them back into the power range.
+
+        :param main_power: float | Main power of motors
+        :param x_delta: float | The difference in engine power on the x axis
+        :param y_delta: float | The difference in engine power on the y axis
+        :param yaw_delta: float | The difference in the power of the motors spinning in opposite directions
+        :return: np.ndarray | Extra power of every motor (the array is reused by the next call)
+        """
+        command = self.command
+        command[0] = x_delta
+        command[1] = y_delta
+        command[2] = yaw_delta
+        extra_powers = np.dot(self.matrix, command, out=self.extra_powers)
+
+        max_power = main_power + max(self.output)
+        min_power = main_power + min(self.output)
+        if max_power > self.max_power:
+            extra_powers -= max_power - self.max_power
+        elif min_power < self.min_power:
+            extra_powers += self.min_power - min_power
+        return extra_powers
+
+    def set_output(self, buffer: array) -> None:
+        """
+        This method makes the mixer write the extra powers straight into a buffer (e.g. MotorBank.extra_powers).
+
+        :param buffer: array | array('d') with one item per motor
+        :return: None
+        """
+        if buffer.typecode != 'd' or len(buffer) != len(self.names):
+            raise ValueError('The buffer must be an array(\'d\') with one item per motor.')
+        self.output = buffer
+        self.extra_powers = np.frombuffer(buffer, dtype=np.float64)
+
+    def get_motor_count(self) -> int:
+        """
+        This method returns the number of motors.
+
+        :return: int | Number of motors
+        """
+        return len(self.names)
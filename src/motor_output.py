@@ -0,0 +1,404 @@
+"""This module sends the motor duty cycles to the ESCs through one of the output backends."""
+
+from array import array
+from time import sleep
+
+
+class MotorOutput:
+    """
+    This class is the base of the motor output backends. A duty cycle is given like for a 50 Hz PWM (5% - 1 ms pulse, 10% - 2 ms pulse)
+    whatever the backend and its frequency, so the pulse width the ESC sees does not depend on the update rate.
+    A channel is written only when its duty cycle changes; the backend may batch the writes of one update (flush).
+    """
+
+    CONST_REFERENCE_FREQUENCY: float = 50
+    """Frequency (Hz) the duty cycles are given for"""
+
+    CONST_ONESHOT_SCALE: float = 0.125
+    """Pulse width scale of OneShot125 (125 us - 250 us instead of 1 ms - 2 ms)"""
+
+    frequency: float = None
+    """Update rate (Hz) of the ESCs"""
+
+    pulse_scale: float = 1
+    """Pulse width scale of the ESC protocol"""
+
+    duty_cycles: array = None
+    """Last written duty cycle of every channel (NaN - not written yet)"""
+
+    writes: int = 0
+    """Number of channel writes"""
+
+    skipped: int = 0
+    """Number of channel writes skipped because the duty cycle did not change"""
+
+    def __init__(self, channels: int, frequency: float = 50, oneshot: bool = False) -> None:
+        """
+        This constructor sets the number of channels and the ESC protocol.
+
+        :param channels: int | Number of motors
+        :param frequency: float | Update rate (Hz) of the ESCs (e.g. 50 or 400)
+        :param oneshot: bool | OneShot125 pulses (True) or standard 1 ms - 2 ms pulses (False)
+        :return: None
+        """
+        self.pulse_scale = self.CONST_ONESHOT_SCALE if oneshot else 1
+        # 10% is the full throttle pulse
+        if self.get_pulse_width(10) >= 1 / frequency:
+            raise ValueError('The longest pulse does not fit in a period at ' + str(frequency) + ' Hz.')
+        self.frequency = frequency
+        self.duty_cycles = array('d', [float('nan')] * channels)
+        self.writes = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of channels.
+
+        :return: int | Number of channels
+        """
+        return len(self.duty_cycles)
+
+    def get_pulse_width(self, duty_cycle: float) -> float:
+        """
+        This method converts a duty cycle into the pulse width of the ESC protocol.
+
+        :param duty_cycle: float | Duty cycle in percent (like for a 50 Hz PWM)
+        :return: float | Pulse width in seconds
+        """
+        return duty_cycle / (100 * self.CONST_REFERENCE_FREQUENCY) * self.pulse_scale
+
+    def start(self, duty_cycle: float) -> None:
+        """
+        This method starts the output with the same duty cycle on every channel.
+
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        for index in range(len(self.duty_cycles)):
+            self.set_duty_cycle(index, duty_cycle)
+
+    def set_duty_cycle(self, index: int, duty_cycle: float) -> None:
+        """
+        This method sets the duty cycle of one channel.
+
+        :param index: int | Channel index
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        if duty_cycle != self.duty_cycles[index]:
+            self.duty_cycles[index] = duty_cycle
+            self.writes += 1
+            self.write_channel(index, duty_cycle)
+            self.flush()
+        else:
+            self.skipped += 1
+
+    def set_duty_cycles(self, main_power: float, extra_powers: array) -> None:
+        """
+        This method sets the duty cycle of every channel (main power + extra power of the channel).
+
+        :param main_power: float | Main power of motors
+        :param extra_powers: array | Difference between the power of every motor and the main power
+        :return: None
+        """
+        duty_cycles = self.duty_cycles
+        changed = 0
+        for index, extra_power in enumerate(extra_powers):
+            duty_cycle = main_power + extra_power
+            if duty_cycle != duty_cycles[index]:
+                duty_cycles[index] = duty_cycle
+                self.write_channel(index, duty_cycle)
+                changed += 1
+        self.writes += changed
+        self.skipped += len(duty_cycles) - changed
+        if changed:
+            self.flush()
+
+    def write_channel(self, index: int, duty_cycle: float) -> None:
+        """
+        This method sends the duty cycle of one channel (or keeps it for flush).
+
+        :param index: int | Channel index
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """
+        This method sends the channels kept by write_channel (nothing to send by default).
+
+        :return: None
+        """
+
+    def stop(self) -> None:
+        """
+        This method stops the output.
+
+        :return: None
+        """
+
+
+class GPIOMotorOutput(MotorOutput):
+    """
+    This class drives the ESCs with the RPi.GPIO software PWM, one call per changed channel.
+    """
+
+    pwms: list = None
+    """PWM channel of every motor"""
+
+    scale: float = 1
+    """Factor converting a duty cycle into the duty cycle of the PWM frequency"""
+
+    def __init__(self, gpio, pins: list, frequency: float = 50, oneshot: bool = False) -> None:
+        """
+        This constructor creates a PWM channel on every pin.
+
+        :param gpio: RPi.GPIO | GPIO module
+        :param pins: list | GPIO pin of every motor
+        :param frequency: float | PWM frequency (Hz)
+        :param oneshot: bool | OneShot125 pulses
+        :return: None
+        """
+        super().__init__(len(pins), frequency, oneshot)
+        self.pwms = [gpio.PWM(x, frequency) for x in pins]
+        self.scale = frequency / self.CONST_REFERENCE_FREQUENCY * self.pulse_scale
+
+    def start(self, duty_cycle: float) -> None:
+        """
+        This method starts every PWM channel.
+
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        for index, pwm in enumerate(self.pwms):
+            pwm.start(duty_cycle * self.scale)
+            self.duty_cycles[index] = duty_cycle
+
+    def write_channel(self, index: int, duty_cycle: float) -> None:
+        """
+        This method changes the duty cycle of a PWM channel.
+
+        :param index: int | Channel index
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        self.pwms[index].ChangeDutyCycle(duty_cycle * self.scale)
+
+    def stop(self) -> None:
+        """
+        This method stops every PWM channel.
+
+        :return: None
+        """
+        for pwm in self.pwms:
+            pwm.stop()
+
+
+class PCA9685MotorOutput(MotorOutput):
+    """
+    This class drives the ESCs with a PCA9685 PWM controller on the I2C bus. The pulses are generated in hardware,
+    so they do not jitter with the CPU load, and the motor channels are written in one auto-increment block transfer.
+    """
+
+    CONST_ADDRESS: hex = 0x40
+    """Default I2C address"""
+
+    CONST_MODE1_REGISTER: hex = 0x00
+    """Mode register 1"""
+
+    CONST_MODE2_REGISTER: hex = 0x01
+    """Mode register 2"""
+
+    CONST_LED0_REGISTER: hex = 0x06
+    """The first register of channel 0 (ON_L, ON_H, OFF_L, OFF_H)"""
+
+    CONST_ALL_LED_OFF_H_REGISTER: hex = 0xfd
+    """OFF_H register of all channels"""
+
+    CONST_PRESCALE_REGISTER: hex = 0xfe
+    """Prescaler of the PWM frequency"""
+
+    CONST_RESTART: int = 0x80
+    """MODE1 bit restarting the PWM channels"""
+
+    CONST_AUTO_INCREMENT: int = 0x20
+    """MODE1 bit enabling the register auto-increment"""
+
+    CONST_SLEEP: int = 0x10
+    """MODE1 bit stopping the oscillator"""
+
+    CONST_OUTPUT_DRIVE: int = 0x04
+    """MODE2 bit selecting the totem pole outputs"""
+
+    CONST_FULL_OFF: int = 0x10
+    """OFF_H bit turning a channel off"""
+
+    CONST_OSCILLATOR_FREQUENCY: float = 25000000
+    """Frequency (Hz) of the internal oscillator"""
+
+    CONST_STEPS: int = 4096
+    """Number of steps of a PWM period"""
+
+    CONST_MAX_BLOCK: int = 32
+    """Largest number of bytes of an SMBus block transfer"""
+
+    bus = None
+    """I2C bus (smbus.SMBus interface)"""
+
+    address: hex = None
+    """I2C address"""
+
+    first_channel: int = None
+    """The lowest PCA9685 channel of the motors"""
+
+    offsets: list = None
+    """Position of the channel of every motor in the block"""
+
+    block: list = None
+    """Register values of the motor channels"""
+
+    steps: float = None
+    """Number of steps of a second (steps of a period * frequency)"""
+
+    def __init__(self, bus, channels: list, frequency: float = 50, oneshot: bool = False, address: hex = CONST_ADDRESS,
+                 sleep_function=sleep) -> None:
+        """
+        This constructor sets the frequency of the controller and turns on the register auto-increment.
+
+        :param bus: smbus.SMBus | I2C bus
+        :param channels: list | PCA9685 channel of every motor (they have to be next to each other, in any order)
+        :param frequency: float | Update rate (Hz) of the ESCs (24 - 1526)
+        :param oneshot: bool | OneShot125 pulses
+        :param address: hex | I2C address
+        :param sleep_function: Callable | Function waiting the given number of seconds (for the oscillator start-up)
+        :return: None
+        """
+        first_channel = min(channels)
+        if sorted(channels) != list(range(first_channel, first_channel + len(channels))) or first_channel < 0 or first_channel + len(channels) > 16:
+            raise ValueError('The motors need neighbouring PCA9685 channels (0 - 15).')
+        if 4 * len(channels) > self.CONST_MAX_BLOCK:
+            raise ValueError('At most ' + str(self.CONST_MAX_BLOCK // 4) + ' motors fit in one block transfer.')
+        prescale = round(self.CONST_OSCILLATOR_FREQUENCY / (self.CONST_STEPS * frequency)) - 1
+        if not 3 <= prescale <= 255:
+            raise ValueError('The PCA9685 cannot run at ' + str(frequency) + ' Hz.')
+        super().__init__(len(channels), self.CONST_OSCILLATOR_FREQUENCY / (self.CONST_STEPS * (prescale + 1)), oneshot)
+        self.bus = bus
+        self.address = address
+        self.first_channel = first_channel
+        self.offsets = [4 * (x - first_channel) for x in channels]
+        self.block = [0] * (4 * len(channels))
+        self.steps = self.CONST_STEPS * self.frequency
+
+        # the prescaler can be written only while the oscillator sleeps
+        bus.write_byte_data(address, self.CONST_MODE1_REGISTER, self.CONST_SLEEP)
+        bus.write_byte_data(address, self.CONST_PRESCALE_REGISTER, prescale)
+        bus.write_byte_data(address, self.CONST_MODE2_REGISTER, self.CONST_OUTPUT_DRIVE)
+        bus.write_byte_data(address, self.CONST_MODE1_REGISTER, self.CONST_AUTO_INCREMENT)
+        sleep_function(0.0005)
+        bus.write_byte_data(address, self.CONST_MODE1_REGISTER, self.CONST_AUTO_INCREMENT | self.CONST_RESTART)
+
+    def get_steps(self, duty_cycle: float) -> int:
+        """
+        This method converts a duty cycle into the number of steps the channel output is high.
+
+        :param duty_cycle: float | Duty cycle in percent
+        :return: int | Steps (0 - 4095)
+        """
+        return min(max(round(self.get_pulse_width(duty_cycle) * self.steps), 0), self.CONST_STEPS - 1)
+
+    def write_channel(self, index: int, duty_cycle: float) -> None:
+        """
+        This method puts the duty cycle of a channel in the block (the pulse starts at step 0 and ends at OFF).
+
+        :param index: int | Channel index
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        steps = self.get_steps(duty_cycle)
+        offset = self.offsets[index]
+        block = self.block
+        block[offset + 2] = steps & 0xff
+        block[offset + 3] = steps >> 8
+
+    def flush(self) -> None:
+        """
+        This method writes every motor channel in one block transfer.
+
+        :return: None
+        """
+        self.bus.write_i2c_block_data(self.address, self.CONST_LED0_REGISTER + 4 * self.first_channel, self.block)
+
+    def stop(self) -> None:
+        """
+        This method turns off every channel and puts the controller to sleep.
+
+        :return: None
+        """
+        self.bus.write_byte_data(self.address, self.CONST_ALL_LED_OFF_H_REGISTER, self.CONST_FULL_OFF)
+        self.bus.write_byte_data(self.address, self.CONST_MODE1_REGISTER, self.CONST_SLEEP)
+
+
+class FakeMotorOutput(MotorOutput):
+    """
+    This class remembers the channel writes instead of driving ESCs (e.g. for tests).
+    """
+
+    history: list = None
+    """(channel index, duty cycle) of every channel write"""
+
+    flushes: int = 0
+    """Number of updates that wrote at least one channel"""
+
+    running: bool = False
+    """Keeps information whether the output is started"""
+
+    def __init__(self, channels: int, frequency: float = 50, oneshot: bool = False) -> None:
+        """
+        This constructor clears the history.
+
+        :param channels: int | Number of motors
+        :param frequency: float | Update rate (Hz) of the ESCs
+        :param oneshot: bool | OneShot125 pulses
+        :return: None
+        """
+        super().__init__(channels, frequency, oneshot)
+        self.history = []
+        self.flushes = 0
+        self.running = False
+
+    def start(self, duty_cycle: float) -> None:
+        """
+        This method starts the output.
+
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        self.running = True
+        super().start(duty_cycle)
+
+    def write_channel(self, index: int, duty_cycle: float) -> None:
+        """
+        This method remembers a channel write.
+
+        :param index: int | Channel index
+        :param duty_cycle: float | Duty cycle in percent
+        :return: None
+        """
+        self.history.append((index, duty_cycle))
+
+    def flush(self) -> None:
+        """
+        This method counts the update.
+
+        :return: None
+        """
+        self.flushes += 1
+
+    def stop(self) -> None:
+        """
+        This method stops the output.
+
+        :return: None
+        """
+        self.running = False
@@ -0,0 +1,141 @@
+"""This module contains a PID controller."""
+
+from typing import TypeVar
+
+
+PIDObject = TypeVar('PIDObject', bound='PID')
+
+
+class PID:
+    """
+    This class calculates a correction from the difference between the setpoint and the measurement.
+    The derivative is taken from the measurement, so setpoint changes do not kick the output,
+    and the integral stops growing while the output is clamped (anti-windup).
+    """
+
+    kp: float = None
+    """Proportional gain"""
+
+    ki: float = None
+    """Integral gain"""
+
+    kd: float = None
+    """Derivative gain"""
+
+    output_limit: float = None
+    """Maximum absolute value of the output"""
+
+    setpoint: float = 0
+    """Desired value of the measurement"""
+
+    integral: float = 0
+    """Integral term (already multiplied by ki)"""
+
+    previous_measurement: float = None
+    """Measurement from the previous update"""
+
+    output: float = 0
+    """Output from the previous update"""
+
+    def __init__(self, kp: float, ki: float, kd: float, output_limit: float, setpoint: float = 0) -> None:
+        """
+        This constructor sets the gains, the output limit and the setpoint.
+
+        :param kp: float | Proportional gain
+        :param ki: float | Integral gain
+        :param kd: float | Derivative gain
+        :param output_limit: float | Maximum absolute value of the output
+        :param setpoint: float | Desired value of the measurement
+        :return: None
+        """
+        self.set_gains(kp, ki, kd)
+        self.set_output_limit(output_limit)
+        self.setpoint = setpoint
+        self.reset()
+
+    def set_gains(self, kp: float, ki: float, kd: float) -> PIDObject:
+        """
+        This method sets the gains.
+
+        :param kp: float | Proportional gain
+        :param ki: float | Integral gain
+        :param kd: float | Derivative gain
+        :return: self
+        """
+        if kp < 0 or ki < 0 or kd < 0:
+            raise ValueError('The gains cannot be negative.')
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        return self
+
+    def set_output_limit(self, output_limit: float) -> PIDObject:
+        """
+        This method sets the maximum absolute value of the output.
+
+        :param output_limit: float | Maximum absolute value of the output
+        :return: self
+        """
+        if output_limit <= 0:
+            raise ValueError('The output limit must be greater than 0.')
+        self.output_limit = output_limit
+        return self
+
+    def set_setpoint(self, setpoint: float) -> PIDObject:
+        """
+        This method sets the desired value of the measurement.
+
+        :param setpoint: float | Desired value of the measurement
+        :return: self
+        """
+        self.setpoint = setpoint
+        return self
+
+    def reset(self) -> PIDObject:
+        """
+        This method clears the integral and the measurement history.
+
+        :return: self
+        """
+        self.integral = 0
+        self.previous_measurement = None
+        self.output = 0
+        return self
+
+    def update(self, measurement: float, dt: float) -> float:
+        """
+        This method calculates the output. The first update after reset only uses the proportional term.
+
+        :param measurement: float | Current value of the measurement
+        :param dt: float | Time since the previous update (seconds)
+        :return: float | Output clamped to the output limit
+        """
+        error = self.setpoint - measurement
+        proportional = self.kp * error
+
+        if self.previous_measurement is None or dt <= 0:
+            integral = self.integral
+            derivative = 0
+        else:
+            integral = self.integral + self.ki * error * dt
+            derivative = -self.kd * (measurement - self.previous_measurement) / dt
+        self.previous_measurement = measurement
+
+        limit = self.output_limit
+        output = proportional + integral + derivative
+        if output > limit:
+            output = limit
+            if integral > self.integral:
+                integral = self.integral
+        elif output < -limit:
+            output = -limit
+            if integral < self.integral:
+                integral = self.integral
+
+        if integral > limit:
+            integral = limit
+        elif integral < -limit:
+            integral = -limit
+        self.integral = integral
+        self.output = output
+        return output
@@ -1,13 +1,31 @@
 """Module to control quadcopter"""
 
-import RPi.GPIO as GPIO
-from time import sleep
+from array import array
+from datetime import datetime
 from enum import Enum
+import os
 from multiprocessing import Process
+from time import perf_counter
 
 from file_reader import FileReader
-from accelerometer import Accelerometer, MeasurementsFixer
+from config import TuningConfig, ConfigService
+from accelerometer import Accelerometer
+from calibration import SensorCalibration, SensorCalibrator, SensorCalibrationCache
+from imu_reader import ImuReader
+from attitude import AttitudeEstimator, ComplementaryFilter
 from timers import Clock
+from scheduler import Scheduler
+from pid import PID
+from mixer import Mixer
+from banks import MotorBank, LedBank
+from motor_output import MotorOutput, GPIOMotorOutput, PCA9685MotorOutput
+from arming import SensorState, ArmingState, ArmingSequence, ArmingStatus, EscCalibrationCache
+from telemetry import TelemetryRing
+from setpoint import SetpointChannel
+from hardware import Hardware, RaspberryPi
+from flight_recorder import FlightRecorder
+from flight_trace import TraceWriter
+from metrics import FlightMetrics
 
 #       ┌────┐y +┌────┐
 #       │ 01 │   │ 02 │
@@ -34,11 +52,14 @@ class Quadcopter:
         RIGHT = 5
         BACKWARD = 6
 
-    motor_dict: dict = {}
-    """Dictionary of motors"""
+    motors: MotorBank = None
+    """Motors in the order of the mixing matrix rows"""
 
-    led_dict: dict = {}
-    """Dictionary of leds"""
+    mixer: Mixer = None
+    """Distributes the corrections between the motors"""
+
+    leds: LedBank = None
+    """Leds"""
 
     main_power: float = None
     """Main power of motors"""
@@ -46,50 +67,176 @@ class Quadcopter:
     accelerometer: Accelerometer = None
     """Accelerometer"""
 
-    measure_fixer: MeasurementsFixer = None
-    """Measure fixer"""
+    attitude_estimator: AttitudeEstimator = None
+    """Fuses the gyro and the accelerometer into the attitude"""
+
+    attitude_clock: Clock = None
+    """Clock measuring the time between attitude updates"""
+
+    attitude: list = [0, 0]
+    """Latest attitude estimate, First index - X axis angle, Second index - Y axis angle"""
 
-    led_clock: Clock = None
-    """Led clock"""
+    scheduler: Scheduler = None
+    """Runs the flight tasks at their own rates"""
 
     action: Action = None
     """Quadcopter action"""
 
-    x_angle_range: list = []
-    """X axis range"""
+    x_pid: PID = None
+    """X axis angle controller"""
 
     x_delta_power: float = 0
     """The difference in engine power on the x axis"""
 
-    y_angle_range: list = []
-    """Y axis range"""
+    y_pid: PID = None
+    """Y axis angle controller"""
 
     y_delta_power: float = 0
     """The difference in engine power on the y axis"""
 
+    yaw_pid: PID = None
+    """Yaw rate controller"""
+
+    yaw_rate: float = 0
+    """Latest yaw rate (deg/s, positive - clockwise seen from above)"""
+
     rotation_delta: float = 0
     """The difference in the power of the motors located on different diagonals"""
 
-    CONST_POWER_JUMP: float = 0.08
-    """The value of the engine power jump if the flight is unstable"""
+    control_clock: Clock = None
+    """Clock measuring the time between control updates"""
+
+    CONST_TUNING_FILE: str = '../data/tuning.json'
+    """Tuning file, reloaded while flying when it changes (None - the CONST_ tuning values below)"""
+
+    CONST_CONFIG_FREQUENCY: float = 2
+    """Frequency (Hz) of checking the tuning file for changes"""
+
+    config: ConfigService = None
+    """Watches the tuning file (None - not watched)"""
+
+    tuning: TuningConfig = None
+    """Tuning values in use"""
+
+    CONST_X_PID_GAINS: list = [0.06, 0.04, 0.012]
+    """X axis angle controller gains (kp, ki, kd)"""
+
+    CONST_Y_PID_GAINS: list = [0.06, 0.04, 0.012]
+    """Y axis angle controller gains (kp, ki, kd)"""
+
+    CONST_YAW_PID_GAINS: list = [0.02, 0.01, 0]
+    """Yaw rate controller gains (kp, ki, kd)"""
+
+    CONST_TILT_ANGLE: float = 20
+    """Angle (degrees) of the tilt when moving"""
+
+    CONST_YAW_RATE: float = 90
+    """Yaw rate (deg/s) when rotating"""
 
     CONST_MAX_DELTA: float = 2
     """Maximum delta of power difference"""
 
+    CONST_AIRFRAME: str = Mixer.CONST_AIRFRAME
+    """Airframe from data/airframes.json"""
+
     CONST_MAX_POWER: float = 10.0
     """Max motor power"""
 
     CONST_MIN_POWER: float = 5.0
     """Min motor power"""
 
-    CONST_ROTATION_DELTA: float = 0.5
-    """Constant difference in engine power located on different diagonals"""
+    CONST_MOTOR_OUTPUT: str = 'gpio'
+    """Motor output backend: 'gpio' - RPi.GPIO software PWM, 'pca9685' - PCA9685 controller on the I2C bus"""
+
+    CONST_ESC_FREQUENCY: float = 50
+    """Update rate (Hz) of the ESCs (e.g. 400 for the PCA9685)"""
+
+    CONST_ESC_ONESHOT: bool = False
+    """OneShot125 pulses instead of the standard 1 ms - 2 ms pulses"""
+
+    CONST_CALIBRATION_FILE: str = '../data/esc_calibration.json'
+    """Cache of the last ESC calibration (None - always calibrate)"""
+
+    CONST_CALIBRATION_VALIDITY: float = 900
+    """Time (seconds) a cached ESC calibration stays valid (a new battery powers the ESCs up again)"""
+
+    CONST_SENSOR_CALIBRATION_FILE: str = '../data/sensor_calibration.json'
+    """Cache of the sensor calibrations (None - data sheet values, no calibration)"""
+
+    CONST_SENSOR_CALIBRATION_VALIDITY: float = 86400
+    """Time (seconds) a cached sensor calibration stays valid"""
+
+    CONST_SENSOR_CALIBRATION_ATTEMPTS: int = 3
+    """Number of sensor calibrations tried before the data sheet values are used"""
+
+    sensor_cache: SensorCalibrationCache = None
+    """Cache of the sensor calibrations (None - the sensor is not calibrated)"""
+
+    CONST_ARMING_FREQUENCY: float = 50
+    """Frequency (Hz) of the arming updates in the flight process"""
+
+    arming: ArmingSequence = None
+    """Arms the motors"""
+
+    CONST_IMU_FREQUENCY: float = 1000
+    """Frequency (Hz) of accelerometer reads and attitude updates"""
+
+    CONST_IMU_READER: bool = True
+    """Read the sensor in a separate process on the Raspberry Pi (fake and simulated hardware read inline, in lockstep with their clock)"""
+
+    CONST_IMU_READER_PERIOD: float = 1 / CONST_IMU_FREQUENCY
+    """Time (seconds) between two reads of the IMU reader"""
+
+    imu_reader: ImuReader = None
+    """Reads the sensor in the background (None - the attitude update reads it)"""
+
+    CONST_CONTROL_FREQUENCY: float = 250
+    """Frequency (Hz) of the control loop"""
+
+    CONST_COMMAND_FREQUENCY: float = 250
+    """Frequency (Hz) of reading commands from outside the process"""
+
+    CONST_TELEMETRY_FREQUENCY: float = 100
+    """Frequency (Hz) of sending data outside of the process"""
+
+    CONST_LED_FREQUENCY: float = 0.5
+    """Frequency (Hz) of switching the leds"""
+
+    CONST_RECORDER_DIRECTORY: str = '../flights'
+    """Directory of the flight recorder files (None - no recording)"""
+
+    recorder: FlightRecorder = None
+    """Records every control tick (None - no recording)"""
+
+    CONST_TRACE_DIRECTORY: str = None
+    """Directory of the replay traces (None - no trace)"""
+
+    trace: TraceWriter = None
+    """Records the IMU samples, commands and motor outputs for replay.Replay (None - no trace)"""
+
+    stage_times: array = None
+    """Duration (seconds) of the last read, estimate, control, mix and output stage"""
+
+    CONST_METRICS_FREQUENCY: float = 10
+    """Frequency (Hz) of updating the metric gauges"""
+
+    metrics: FlightMetrics = None
+    """Stage histograms and gauges in shared memory (None - not measured)"""
+
+    metrics_state: list = None
+    """Time and number of IMU and control runs at the last gauge update"""
+
+    hardware: Hardware = None
+    """GPIO, I2C bus and time functions"""
 
-    queue = None
-    """Variable for receiving data from outside the process"""
+    gpio = None
+    """GPIO module (RPi.GPIO interface)"""
 
-    data_list = None
-    """Variable for sending data outside of the process"""
+    setpoints: SetpointChannel = None
+    """Latest command from outside the process"""
+
+    telemetry: TelemetryRing = None
+    """Ring buffer in shared memory for sending data outside of the process"""
 
     proccess: Process = None
     """The variable responsible for handling multiprocessing"""
@@ -97,16 +244,27 @@ class Quadcopter:
     ############
     ### INIT ###
     ############
-    def __init__(self, queue, data_list) -> None:
-        """
-        This constructor reads the settings from the file and starts the quadcopter.
-
-        :param queue: multiprocessing.Manager().Queue() | Variable for receiving data from outside the process
-        :param data_list: multiprocessing.Manager().list() | Variable for sending data outside of the process
+    def __init__(self, setpoints: SetpointChannel, telemetry: TelemetryRing, attitude_estimator: AttitudeEstimator = None, hardware: Hardware = None,
+                 metrics: FlightMetrics = None, arm: bool = True, arming_status: ArmingStatus = None) -> None:
+        """
+        This constructor reads the settings from the file and prepares the quadcopter.
+
+        :param setpoints: SetpointChannel | Latest command from outside the process
+        :param telemetry: TelemetryRing | Ring buffer in shared memory for sending data outside of the process
+        :param attitude_estimator: AttitudeEstimator | Attitude estimator (None - ComplementaryFilter)
+        :param hardware: Hardware | Hardware to run on (None - RaspberryPi, e.g. simulator.SimulatedHardware)
+        :param metrics: FlightMetrics | Stage histograms and gauges in shared memory (None - not measured)
+        :param arm: bool | Arm the motors here with the full sequence (True, e.g. on fake hardware)
+                           or in the flight process while the IMU already runs (False, a cached ESC calibration shortens it)
+        :param arming_status: ArmingStatus | Arming progress for other processes (None - not published)
         :return: None
         """
-        self.queue = queue
-        self.data_list = data_list
+        self.hardware = hardware if hardware is not None else RaspberryPi()
+        self.gpio = self.hardware.gpio
+        self.stage_times = array('d', [0.0] * len(FlightRecorder.CONST_STAGES))
+        self.setpoints = setpoints
+        self.telemetry = telemetry
+        self.metrics = metrics
 
         reader = FileReader('motors', '../data/motor_pins.json')
         reader.add_file('leds', '../data/led_pins.json')
@@ -114,70 +272,88 @@ class Quadcopter:
         motors = reader.get_data('motors')
         leds = reader.get_data('leds')
 
+        GPIO = self.gpio
         GPIO.setwarnings(False)
         GPIO.setmode(GPIO.BCM)
 
-        for x in motors:
-            GPIO.setup(motors[x], GPIO.OUT, initial=GPIO.LOW)
-            self.motor_dict.update({
-                x: {
-                    'pin': motors[x],
-                    'gpio': GPIO.PWM(motors[x], 50),
-                    'extra_power': 0
-                }
-            })
-
-        for x in leds:
-            GPIO.setup(leds[x], GPIO.OUT, initial=GPIO.LOW)
-            self.led_dict.update({
-                x: {
-                    'pin': leds[x],
-                    'active': False
-                }
-            })
-
-        self.accelerometer = Accelerometer()
-        self.measure_fixer = MeasurementsFixer()
-        self.led_clock = Clock()
+        self.mixer = Mixer.from_file(Mixer.CONST_AIRFRAMES_FILE, self.CONST_AIRFRAME, self.CONST_MIN_POWER, self.CONST_MAX_POWER)
+        for x in self.mixer.names:
+            if x not in motors:
+                raise Exception('Motor "' + x + '" of the ' + self.CONST_AIRFRAME + ' airframe has no pin.')
+        pins = [motors[x] for x in self.mixer.names]
+        self.motors = MotorBank(self.mixer.names, pins, self.create_motor_output(pins))
+        self.mixer.set_output(self.motors.extra_powers)
+
+        for x in leds.values():
+            GPIO.setup(x, GPIO.OUT, initial=GPIO.LOW)
+        self.leds = LedBank(list(leds.keys()), list(leds.values()), GPIO)
+
+        self.accelerometer = Accelerometer(bus=self.hardware.bus)
+        self.attitude_estimator = attitude_estimator if attitude_estimator is not None else ComplementaryFilter()
+        self.attitude_clock = Clock(self.hardware.time)
+        self.control_clock = Clock(self.hardware.time)
+        if self.CONST_TUNING_FILE is not None:
+            self.config = ConfigService(self.CONST_TUNING_FILE)
+        self.tuning = self.config.current if self.config is not None else self.get_default_tuning()
+        self.x_pid = PID(*self.tuning.x_pid_gains, self.tuning.max_delta)
+        self.y_pid = PID(*self.tuning.y_pid_gains, self.tuning.max_delta)
+        self.yaw_pid = PID(*self.tuning.yaw_pid_gains, self.tuning.max_delta)
 
         self.set_action(self.Action(0))
 
-        self.start_pwm()
-        self.start_leds()
+        # only a real sensor has a bias worth the wait
+        if self.CONST_SENSOR_CALIBRATION_FILE is not None and isinstance(self.hardware, RaspberryPi):
+            self.sensor_cache = SensorCalibrationCache(self.CONST_SENSOR_CALIBRATION_FILE, self.CONST_SENSOR_CALIBRATION_VALIDITY)
 
-    def start_pwm(self) -> None:
+        cache = None
+        # only real ESCs stay initialised between runs
+        if not arm and self.CONST_CALIBRATION_FILE is not None and isinstance(self.hardware, RaspberryPi):
+            cache = EscCalibrationCache(self.CONST_CALIBRATION_FILE, self.CONST_CALIBRATION_VALIDITY)
+        key = {'output': self.CONST_MOTOR_OUTPUT, 'frequency': self.CONST_ESC_FREQUENCY, 'oneshot': self.CONST_ESC_ONESHOT, 'motors': list(self.motors.names)}
+        self.arming = ArmingSequence(self.motors, self.leds, cache, key, arming_status, self.finish_arming)
+        if arm:
+            self.arming.run(self.hardware.time, self.hardware.sleep)
+
+    @classmethod
+    def get_default_tuning(cls) -> TuningConfig:
         """
-        This method turns on and tests the motors and LEDs.
+        This method returns the tuning a new quadcopter starts with.
 
-        :return: None
+        :return: TuningConfig | Tuning values of CONST_TUNING_FILE (or of the CONST_ values when there is no file)
         """
-        for x in self.motor_dict.values():
-            x['gpio'].start(4)
+        if cls.CONST_TUNING_FILE is not None:
+            return ConfigService(cls.CONST_TUNING_FILE).current
+        return TuningConfig(
+            tuple(cls.CONST_X_PID_GAINS), tuple(cls.CONST_Y_PID_GAINS), tuple(cls.CONST_YAW_PID_GAINS),
+            cls.CONST_MAX_DELTA, cls.CONST_TILT_ANGLE, cls.CONST_YAW_RATE
+        )
 
-        sleep(5)
-        for x in self.motor_dict:
-            self.motor_dict[x]['gpio'].ChangeDutyCycle(5.7)
-            self.set_led(self.led_dict[x], True)
-            sleep(2)
-            self.motor_dict[x]['gpio'].ChangeDutyCycle(5)
-            self.set_led(self.led_dict[x], False)
-        self.main_power = 5
+    def create_motor_output(self, pins: list) -> MotorOutput:
+        """
+        This method creates the motor output backend chosen by CONST_MOTOR_OUTPUT.
 
-    def start_leds(self) -> None:
+        :param pins: list | GPIO pin of every motor (in the order of the mixing matrix rows)
+        :return: MotorOutput | Motor output
         """
-        This method informs you that the drone is ready by means of LEDs. It also sets the appropriate state of the LEDs and resets the clock.
+        if self.CONST_MOTOR_OUTPUT == 'pca9685':
+            channels = FileReader('channels', '../data/motor_channels.json').get_data('channels')
+            return PCA9685MotorOutput(self.hardware.bus, [channels[x] for x in self.mixer.names], self.CONST_ESC_FREQUENCY,
+                                      self.CONST_ESC_ONESHOT, sleep_function=self.hardware.sleep)
+        if self.CONST_MOTOR_OUTPUT == 'gpio':
+            for x in pins:
+                self.gpio.setup(x, self.gpio.OUT, initial=self.gpio.LOW)
+            return GPIOMotorOutput(self.gpio, pins, self.CONST_ESC_FREQUENCY, self.CONST_ESC_ONESHOT)
+        raise Exception('Unknown motor output "' + self.CONST_MOTOR_OUTPUT + '".')
 
-        :return: None
+    def finish_arming(self) -> None:
         """
-        for x in range(3):
-            for x in self.led_dict.values():
-                self.set_led(x, True)
-            sleep(0.3)
-            for x in self.led_dict.values():
-                self.set_led(x, False)
+        This method is called when the motors are armed. It sets the idle power and restarts the control clock, so the first control update
+        does not see the arming time.
 
-        self.set_led(self.led_dict['frontLeft'], True)
-        self.set_led(self.led_dict['backRight'], True)
+        :return: None
+        """
+        self.main_power = 5
+        self.control_clock.restart()
 
     #################
     ### PROCESSES ###
@@ -190,81 +366,434 @@ class Quadcopter:
         :return: None
         """
         if test:
-            self.proccess = Process(target=self.run_test, args=(self.queue, self.data_list))
+            self.proccess = Process(target=self.run_test, args=(self.setpoints, self.telemetry))
         else:
-            self.proccess = Process(target=self.run, args=(self.queue,))
+            self.proccess = Process(target=self.run, args=(self.setpoints,))
         self.proccess.start()
 
-    def run(self, queue) -> None:
+    def run(self, setpoints: SetpointChannel) -> None:
         """
-        This method TODO
+        This method is responsible for the new flight process.
 
-        :param queue: multiprocessing.Manager().Queue() | Variable for receiving data from outside the process
+        :param setpoints: SetpointChannel | Latest command from outside the process
         :return: None
         """
-        # TODO
         try:
-            while True:
-                if not queue.empty():
-                    self.set_main_power(queue.get())
-                self.main_method()
-                sleep(0.1)
+            self.wait_for_arming(setpoints)
         except KeyboardInterrupt:
             return
-    
-    def run_test(self, queue, data_list) -> None:
+        self.start_imu_reader()
+        self.scheduler = self.create_scheduler(setpoints)
+        self.start_recorder()
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            return
+        finally:
+            self.stop_recorder()
+            self.stop_imu_reader()
+
+    def run_test(self, setpoints: SetpointChannel, telemetry: TelemetryRing) -> None:
         """
         This method is responsible for the new test process.
 
-        :param queue: multiprocessing.Manager().Queue() | Variable for receiving data from outside the process
-        :param data_list: multiprocessing.Manager().list() | Variable for sending data outside of the process
+        :param setpoints: SetpointChannel | Latest command from outside the process
+        :param telemetry: TelemetryRing | Ring buffer in shared memory for sending data outside of the process
         :return: None
         """
         try:
-            while True:
-                if not queue.empty():
-                    self.set_main_power(queue.get())
-                self.main_method()
-                data_list[0] = self.get_powers()
-                sleep(0.1)
+            self.wait_for_arming(setpoints)
+        except KeyboardInterrupt:
+            return
+        self.start_imu_reader()
+        self.scheduler = self.create_scheduler(setpoints)
+        self.scheduler.add_task('telemetry', lambda: self.send_telemetry(telemetry), self.CONST_TELEMETRY_FREQUENCY)
+        self.start_recorder()
+        try:
+            self.scheduler.run()
         except KeyboardInterrupt:
             return
+        finally:
+            self.stop_recorder()
+            self.stop_imu_reader()
+
+    def start_imu_reader(self) -> None:
+        """
+        This method starts reading the sensor in a separate process on the Raspberry Pi (started by the flight process,
+        once the sensor is calibrated).
+
+        :return: None
+        """
+        if self.imu_reader is None and self.CONST_IMU_READER and isinstance(self.hardware, RaspberryPi):
+            hardware = self.hardware
+            self.imu_reader = ImuReader(self.accelerometer, hardware.time, self.CONST_IMU_READER_PERIOD, open_bus=hardware.open_bus)
+            self.imu_reader.start()
+
+    def stop_imu_reader(self) -> None:
+        """
+        This method stops the reading process of the sensor and removes its ring.
+
+        :return: None
+        """
+        if self.imu_reader is not None:
+            self.imu_reader.close()
+            self.imu_reader = None
+
+    def start_recorder(self) -> None:
+        """
+        This method starts the flight recorder and the replay trace in the flight process (the recorder thread does not survive a fork).
+
+        :return: None
+        """
+        if self.recorder is None and self.CONST_RECORDER_DIRECTORY is not None:
+            self.recorder = FlightRecorder(self.CONST_RECORDER_DIRECTORY, len(self.motors))
+        if self.trace is None and self.CONST_TRACE_DIRECTORY is not None:
+            os.makedirs(self.CONST_TRACE_DIRECTORY, exist_ok=True)
+            self.start_trace(os.path.join(
+                self.CONST_TRACE_DIRECTORY, 'trace-' + datetime.now().strftime('%Y%m%d-%H%M%S') + TraceWriter.CONST_EXTENSION
+            ))
+
+    def stop_recorder(self) -> None:
+        """
+        This method writes the flight recorder files and the replay trace to the disk.
+
+        :return: None
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        self.stop_trace()
+
+    def start_trace(self, path: str) -> None:
+        """
+        This method starts recording the IMU samples, commands and motor outputs for replay.Replay.
+        The replay is exact when the controllers and the attitude estimator are fresh (the start of a flight, or after a reset).
+
+        :param path: str | Path to the trace file
+        :return: None
+        """
+        self.stop_trace()
+        self.trace = TraceWriter(path, len(self.motors))
+        self.trace.write_corrections(self.attitude_clock.time_start_point, self.accelerometer.corrections)
+        self.trace.write_state(self.attitude_clock.time_start_point, self.control_clock.time_start_point, self.main_power, self.action.value)
+
+    def stop_trace(self) -> None:
+        """
+        This method writes the replay trace to the disk.
+
+        :return: None
+        """
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def wait_for_arming(self, setpoints: SetpointChannel) -> None:
+        """
+        This method arms the motors (if they are not armed yet). The attitude estimate runs meanwhile, so it has settled when the control starts.
+        A command sent while arming is dropped, it must not take effect the moment the motors are armed.
+
+        :param setpoints: SetpointChannel | Latest command from outside the process
+        :return: None
+        """
+        self.calibrate_sensor()
+        if self.arming.state == ArmingState.READY:
+            return
+        scheduler = Scheduler(self.hardware.time, self.hardware.sleep)
+        scheduler.add_task('imu', self.update_attitude, self.CONST_IMU_FREQUENCY)
+        scheduler.add_task('arming', lambda: self.update_arming(scheduler), self.CONST_ARMING_FREQUENCY)
+        self.arming.start(self.hardware.time())
+        scheduler.run()
+        if setpoints.poll() is not None:
+            setpoints.drop()
+
+    def calibrate_sensor(self) -> None:
+        """
+        This method corrects the sensor with its cached calibration, or calibrates it (the quadcopter must stand still and level)
+        when the cache has none for this temperature. A calibration disturbed by a movement is tried again; when every attempt fails,
+        the sensor keeps the data sheet values (not cached) and the failure is published in the arming status.
+        Nothing is done without a sensor cache or once the sensor is calibrated.
+
+        :return: None
+        """
+        accelerometer = self.accelerometer
+        if self.sensor_cache is None or accelerometer.calibration is not None:
+            return
+        status = self.arming.status
+        state = SensorState.CACHED
+        failures = 0
+        calibration = self.sensor_cache.load(accelerometer.address, accelerometer.get_temperature())
+        if calibration is None:
+            calibrator = SensorCalibrator(accelerometer, self.hardware.sleep)
+            for attempt in range(self.CONST_SENSOR_CALIBRATION_ATTEMPTS):
+                try:
+                    calibration = calibrator.calibrate()
+                    break
+                except ValueError:
+                    failures += 1
+                    if status is not None:
+                        status.write_sensor(SensorState.UNCALIBRATED, failures)
+            if calibration is None:
+                state = SensorState.FAILED
+                calibration = SensorCalibration.get_default()
+            else:
+                state = SensorState.CALIBRATED
+                self.sensor_cache.save(accelerometer.address, calibration)
+        accelerometer.set_calibration(calibration)
+        if status is not None:
+            status.write_sensor(state, failures)
+
+    def update_arming(self, scheduler: Scheduler) -> None:
+        """
+        This method runs the arming steps that are due and stops the scheduler when the motors are armed.
+
+        :param scheduler: Scheduler | Arming scheduler
+        :return: None
+        """
+        if self.arming.update(self.hardware.time()) == ArmingState.READY:
+            scheduler.stop()
+
+    def create_scheduler(self, setpoints: SetpointChannel) -> Scheduler:
+        """
+        This method registers the flight tasks (in priority order) with their rates.
+
+        :param setpoints: SetpointChannel | Latest command from outside the process
+        :return: Scheduler | Flight scheduler
+        """
+        scheduler = Scheduler(self.hardware.time, self.hardware.sleep)
+        scheduler.add_task('imu', self.update_attitude if self.imu_reader is None else self.take_samples, self.CONST_IMU_FREQUENCY)
+        scheduler.add_task('control', self.main_method, self.CONST_CONTROL_FREQUENCY)
+        scheduler.add_task('commands', lambda: self.read_commands(setpoints), self.CONST_COMMAND_FREQUENCY)
+        scheduler.add_task('leds', self.blink_leds, self.CONST_LED_FREQUENCY)
+        if self.metrics is not None:
+            self.metrics_state = [self.hardware.time(), 0, 0]
+            scheduler.add_task('metrics', lambda: self.update_metrics(scheduler, setpoints), self.CONST_METRICS_FREQUENCY)
+        if self.config is not None:
+            scheduler.add_task('config', self.reload_tuning, self.CONST_CONFIG_FREQUENCY)
+        return scheduler
+
+    def reload_tuning(self) -> None:
+        """
+        This method applies the tuning file if it changed. It runs as a scheduler task, so the new values take effect
+        between two control updates, never during one.
+
+        :return: None
+        """
+        tuning = self.config.check()
+        if tuning is not None:
+            self.apply_tuning(tuning)
+
+    def apply_tuning(self, tuning: TuningConfig) -> None:
+        """
+        This method sets new tuning values. The controllers keep their state, so the outputs do not jump.
+
+        :param tuning: TuningConfig | Tuning values
+        :return: None
+        """
+        self.tuning = tuning
+        self.x_pid.set_gains(*tuning.x_pid_gains).set_output_limit(tuning.max_delta)
+        self.y_pid.set_gains(*tuning.y_pid_gains).set_output_limit(tuning.max_delta)
+        self.yaw_pid.set_gains(*tuning.yaw_pid_gains).set_output_limit(tuning.max_delta)
+        self.set_action(self.action)
+
+    def read_commands(self, setpoints: SetpointChannel) -> None:
+        """
+        This method applies the latest command received from outside the process. Invalid commands are dropped.
+
+        :param setpoints: SetpointChannel | Latest command from outside the process
+        :return: None
+        """
+        command = setpoints.poll()
+        if command is None:
+            return
+        if self.trace is not None:
+            self.trace.write_command(self.hardware.time(), *command)
+        try:
+            self.apply_command(*command)
+        except Exception:
+            setpoints.drop()
+
+    def apply_command(self, power: float, action: int) -> None:
+        """
+        This method applies a command. A valid action is applied even when the power is rejected (the error is raised afterwards).
+
+        :param power: float | Main power (NaN - unchanged)
+        :param action: int | Quadcopter.Action value (SetpointChannel.CONST_NO_ACTION - unchanged)
+        :return: None
+        """
+        error = None
+        if power == power:
+            try:
+                self.set_main_power(power)
+            except Exception as exception:
+                error = exception
+        if action != SetpointChannel.CONST_NO_ACTION and action != self.action.value:
+            self.set_action(self.Action(action))
+        if error is not None:
+            raise error
+
+    def update_metrics(self, scheduler: Scheduler, setpoints: SetpointChannel) -> None:
+        """
+        This method publishes the loop rates, overruns and the number of commands read.
+
+        :param scheduler: Scheduler | Flight scheduler
+        :param setpoints: SetpointChannel | Latest command from outside the process
+        :return: None
+        """
+        metrics = self.metrics
+        imu = scheduler.get_task('imu')
+        control = scheduler.get_task('control')
+        now = self.hardware.time()
+        last_time, imu_runs, control_runs = self.metrics_state
+        elapsed = now - last_time
+        # indexes of FlightMetrics.CONST_GAUGES
+        if elapsed > 0:
+            metrics.set_gauge(0, (imu.runs - imu_runs) / elapsed)
+            metrics.set_gauge(1, (control.runs - control_runs) / elapsed)
+        metrics.set_gauge(2, control.jitter)
+        metrics.set_gauge(3, imu.overruns)
+        metrics.set_gauge(4, control.overruns)
+        metrics.set_gauge(5, control.skipped)
+        metrics.set_gauge(6, setpoints.last_number)
+        reader = self.imu_reader
+        if reader is not None:
+            metrics.set_gauge(7, reader.age)
+            metrics.set_gauge(8, reader.lost)
+            metrics.set_gauge(9, reader.get_bus_errors())
+        self.metrics_state = [now, imu.runs, control.runs]
+
+    def send_telemetry(self, telemetry: TelemetryRing) -> None:
+        """
+        This method sends the motor powers, the attitude and the control loop timing outside of the process.
+
+        :param telemetry: TelemetryRing | Ring buffer in shared memory for sending data outside of the process
+        :return: None
+        """
+        control = self.scheduler.get_task('control')
+        main_power = self.main_power
+        telemetry.write(
+            self.hardware.time(),
+            [main_power + x for x in self.motors.extra_powers],
+            self.attitude,
+            control.duration,
+            control.jitter
+        )
+
+    def blink_leds(self) -> None:
+        """
+        This method switches the state of every led.
+
+        :return: None
+        """
+        self.leds.switch_all()
 
     #############
     ### HEART ###
     #############
+    def update_attitude(self) -> None:
+        """
+        This method reads the accelerometer and updates the attitude estimate.
+
+        :return: None
+        """
+        start = perf_counter()
+        angles, rates = self.accelerometer.read_attitude()
+        read = perf_counter()
+        self.attitude = self.attitude_estimator.update(angles, rates, self.attitude_clock.restart_seconds())
+        self.yaw_rate = -rates[2]
+        stage_times = self.stage_times
+        stage_times[0] = read - start
+        stage_times[1] = perf_counter() - read
+
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.observe(0, stage_times[0])
+            metrics.observe(1, stage_times[1])
+
+        if self.trace is not None:
+            self.trace.write_sample(self.attitude_clock.time_start_point, self.accelerometer.raw)
+
+    def take_samples(self) -> None:
+        """
+        This method updates the attitude estimate with every sample the IMU reader has read since the last call (it never waits for the bus).
+        The time between two samples is taken from their time stamps.
+
+        :return: None
+        """
+        start = perf_counter()
+        samples = self.imu_reader.read_new()
+        read = perf_counter()
+        if len(samples):
+            accelerometer = self.accelerometer
+            attitude_estimator = self.attitude_estimator
+            attitude_clock = self.attitude_clock
+            trace = self.trace
+            for row in samples.tolist():
+                timestamp = row[0]
+                raw = tuple(int(x) for x in row[1:])
+                angles, rates = accelerometer.convert_attitude(raw)
+                self.attitude = attitude_estimator.update(angles, rates, timestamp - attitude_clock.time_start_point)
+                attitude_clock.time_start_point = timestamp
+                if trace is not None:
+                    trace.write_sample(timestamp, raw)
+            accelerometer.raw = raw
+            self.yaw_rate = -rates[2]
+        stage_times = self.stage_times
+        stage_times[0] = read - start
+        stage_times[1] = perf_counter() - read
+
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.observe(0, stage_times[0])
+            metrics.observe(1, stage_times[1])
+
     def main_method(self) -> None:
         """
-        This method manages the quadcopter using data from the accelerometer.
+        This method manages the quadcopter using the latest attitude estimate.
 
         :return: None
         """
-        if self.led_clock.get_elapsed_time().as_seconds() >= 2:
-            for x in self.led_dict.values():
-                self.switch_led(x)
-            self.led_clock.restart()
-        
-        for i in range(3):
-            self.measure_fixer.add_measurement(self.accelerometer.run())
-            sleep(0.06)
-        angle = self.measure_fixer.get_fixed_measurement()
-
-        if angle[0] < self.x_angle_range[0]:
-            if self.x_delta_power <= self.CONST_MAX_DELTA - self.CONST_POWER_JUMP:
-                self.x_delta_power += self.CONST_POWER_JUMP
-        elif angle[0] > self.x_angle_range[1]:
-            if self.x_delta_power >= -self.CONST_MAX_DELTA + self.CONST_POWER_JUMP:
-                self.x_delta_power -= 0.08
-
-        if angle[1] < self.y_angle_range[0]:
-            if self.y_delta_power <= self.CONST_MAX_DELTA - self.CONST_POWER_JUMP:
-                self.y_delta_power += self.CONST_POWER_JUMP
-        elif angle[1] > self.y_angle_range[1]:
-            if self.y_delta_power >= -self.CONST_MAX_DELTA + self.CONST_POWER_JUMP:
-                self.y_delta_power -= self.CONST_POWER_JUMP
-        
+        start = perf_counter()
+        dt = self.control_clock.restart_seconds()
+        self.x_delta_power = self.x_pid.update(self.attitude[0], dt)
+        self.y_delta_power = self.y_pid.update(self.attitude[1], dt)
+        self.rotation_delta = self.yaw_pid.update(self.yaw_rate, dt)
+        mix = perf_counter()
         self.distribute_power()
+        output = perf_counter()
         self.set_powers()
+        stage_times = self.stage_times
+        stage_times[2] = mix - start
+        stage_times[3] = output - mix
+        stage_times[4] = perf_counter() - output
+
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.observe(2, stage_times[2])
+            metrics.observe(3, stage_times[3])
+            metrics.observe(4, stage_times[4])
+
+        if self.recorder is not None:
+            self.record()
+        if self.trace is not None:
+            main_power = self.main_power
+            self.trace.write_output(self.control_clock.time_start_point, [main_power + x for x in self.motors.extra_powers])
+
+    def record(self) -> None:
+        """
+        This method writes the current tick to the flight recorder.
+
+        :return: None
+        """
+        main_power = self.main_power
+        self.recorder.write(
+            self.hardware.time(),
+            self.accelerometer.raw,
+            self.attitude,
+            (self.x_delta_power, self.y_delta_power, self.rotation_delta),
+            main_power,
+            [main_power + x for x in self.motors.extra_powers],
+            self.stage_times
+        )
 
     ###############
     ### CONTROL ###
@@ -276,79 +805,49 @@ class Quadcopter:
         :param main_power: float | Power
         :return: None
         """
-        if main_power < 0 or main_power > 10:
+        if main_power < SetpointChannel.CONST_MIN_POWER or main_power > SetpointChannel.CONST_MAX_POWER:
             raise Exception('Wrong power')
         self.main_power = main_power
 
     def set_action(self, action: Action) -> None:
         """
-        This method sets the activity of the quadcopter and changes the range of angles.
+        This method sets the activity of the quadcopter and changes the controller setpoints.
         
         :param action: Action | Drone action
         :return: None
         """
-        x_angle_range = [-1, 1]
-        y_angle_range = [-1, 1]
-        self.rotation_delta = 0
+        tuning = self.tuning
+        x_angle = 0
+        y_angle = 0
+        yaw_rate = 0
         if action == self.Action.FORWARD:
-            x_angle_range = [18, 22]
+            x_angle = tuning.tilt_angle
         elif action == self.Action.BACKWARD:
-            x_angle_range = [-22, -18]
+            x_angle = -tuning.tilt_angle
         elif action == self.Action.LEFT:
-            y_angle_range = [-22, -18]
+            y_angle = -tuning.tilt_angle
         elif action == self.Action.RIGHT:
-            y_angle_range = [18, 22]
+            y_angle = tuning.tilt_angle
         elif action == self.Action.ROTATE_RIGHT:
-            self.rotation_delta = self.CONST_MAX_DELTA
+            yaw_rate = tuning.yaw_rate
         elif action == self.Action.ROTATE_LEFT:
-            self.rotation_delta = -self.CONST_MAX_DELTA
+            yaw_rate = -tuning.yaw_rate
 
         self.action = action
-        self.x_angle_range = x_angle_range
-        self.y_angle_range = y_angle_range
+        self.x_pid.set_setpoint(x_angle)
+        self.y_pid.set_setpoint(y_angle)
+        self.yaw_pid.set_setpoint(yaw_rate)
 
     #############
     ### SETUP ###
     #############
     def distribute_power(self) -> None:
         """
-        This method distributes power between the motors based on a variable delta.
+        This method distributes power between the motors based on a variable delta (using the airframe mixing matrix).
 
         :return: None
         """
-        power_per_engine_left = self.x_delta_power / 2
-        power_per_engine_right = -power_per_engine_left
-
-        self.motor_dict['frontLeft']['extra_power'] = power_per_engine_left - self.rotation_delta
-        self.motor_dict['backLeft']['extra_power'] = power_per_engine_left + self.rotation_delta
-        self.motor_dict['frontRight']['extra_power'] = power_per_engine_right + self.rotation_delta
-        self.motor_dict['backRight']['extra_power'] = power_per_engine_right - self.rotation_delta
-
-        power_per_engine_front = self.y_delta_power / 2
-        power_per_engine_back = -power_per_engine_front
-
-        self.motor_dict['frontRight']['extra_power'] += power_per_engine_front
-        self.motor_dict['frontLeft']['extra_power'] += power_per_engine_front
-        self.motor_dict['backRight']['extra_power'] += power_per_engine_back
-        self.motor_dict['backLeft']['extra_power'] += power_per_engine_back
-
-        powers = [
-            self.get_calculated_power('frontRight'),
-            self.get_calculated_power('frontLeft'),
-            self.get_calculated_power('backRight'),
-            self.get_calculated_power('backLeft')
-        ]
-
-        max_power = max(powers)
-        min_power = min(powers)
-        if max_power > self.CONST_MAX_POWER:
-            power_reduction = max_power - 10
-            for motor in self.motor_dict.values():
-                motor['extra_power'] -= power_reduction
-        elif min_power < self.CONST_MIN_POWER:
-            extra_power = self.CONST_MIN_POWER - min_power
-            for motor in self.motor_dict.values():
-                motor['extra_power'] += extra_power
+        self.mixer.mix(self.main_power, self.x_delta_power, self.y_delta_power, self.rotation_delta)
 
     def set_powers(self) -> None:
         """
@@ -356,30 +855,26 @@ class Quadcopter:
 
         :return: None
         """
-        for x in self.motor_dict.values():
-            x['gpio'].ChangeDutyCycle(self.main_power + x['extra_power'])
+        self.motors.set_duty_cycles(self.main_power)
 
-    def set_led(self, led: dict, active: bool) -> None:
+    def set_led(self, led: int, active: bool) -> None:
         """
         This method set led state
 
-        :param led: dict | Led
+        :param led: int | Led index
         :param active: bool | Led status
         :return: None
         """
-        GPIO.setup(led['pin'], active)
-        led['active'] = active
+        self.leds.set(led, active)
 
-    def switch_led(self, led: dict) -> bool:
+    def switch_led(self, led: int) -> bool:
         """
         This method changes the state of the led.
         
-        :param led: dict | Led
+        :param led: int | Led index
         :return: bool | Led state
         """
-        led['active'] = not led['active']
-        GPIO.setup(led['pin'], led['active'])
-        return led['active']
+        return self.leds.switch(led)
 
     ###################
     ### CALCULTIONS ###
@@ -391,7 +886,7 @@ class Quadcopter:
         :param motor_name: str | Motor name
         :return: float | Calculated_power
         """
-        return self.main_power + self.motor_dict[motor_name]['extra_power']
+        return self.motors.get_power(self.motors.index(motor_name), self.main_power)
 
     def get_powers(self) -> dict:
         """
@@ -399,12 +894,7 @@ class Quadcopter:
 
         :return: dict | Dictionary of motors power
         """
-        powers = {}
-        for loop_index, x in enumerate(self.motor_dict.values()):
-            powers.update({
-                loop_index: self.main_power + x['extra_power']
-            })
-        return powers
+        return self.motors.get_powers(self.main_power)
 
     ###########
     ### DEL ###
@@ -431,11 +921,10 @@ class Quadcopter:
 
         :return: None
         """
-        for x in self.motor_dict.values():
-            x['gpio'].ChangeDutyCycle(5)
-        sleep(0.5)
-        for x in self.motor_dict.values():
-            x['gpio'].stop()
-        for x in self.led_dict.values():
-            GPIO.setup(x['pin'], 0)
-        GPIO.cleanup()
+        output = self.motors.output
+        for index in range(len(output)):
+            output.set_duty_cycle(index, 5)
+        self.hardware.sleep(0.5)
+        output.stop()
+        self.leds.set_all(False)
+        self.gpio.cleanup()
@@ -0,0 +1,142 @@
+"""This module replays a trace of the flight process through the current control loop (run it from the src directory)."""
+
+import argparse
+import math
+import sys
+from time import process_time
+
+from attitude import ComplementaryFilter, KalmanFilter
+from calibration import SensorCalibration
+from flight_trace import TraceWriter, TraceReader
+from hardware import FakeHardware
+from quadcopter import Quadcopter
+
+
+class Replay:
+    """
+    This class feeds a trace through the control loop of a quadcopter on fake hardware with a virtual clock, as fast as the CPU allows,
+    and compares the duty cycles it sets with the recorded ones. The trace has to start with fresh controllers and attitude estimator
+    (the start of a flight, or Simulation.takeoff) for the replay to be exact.
+    """
+
+    hardware: FakeHardware = None
+    """Fake hardware, its clock follows the trace"""
+
+    quadcopter: Quadcopter = None
+    """Quadcopter under test (its current estimator, controllers and settings)"""
+
+    def __init__(self, attitude_estimator=None) -> None:
+        """
+        This constructor creates the quadcopter under test.
+
+        :param attitude_estimator: AttitudeEstimator | Attitude estimator (None - Quadcopter default)
+        :return: None
+        """
+        self.hardware = FakeHardware()
+        self.quadcopter = Quadcopter(None, None, attitude_estimator, self.hardware)
+
+    def ticks(self, reader: TraceReader):
+        """
+        This method replays the trace.
+
+        :param reader: TraceReader | Trace
+        :return: generator | (time, recorded duty cycles, differences of the replayed duty cycles) of every control update
+        """
+        quadcopter = self.quadcopter
+        hardware = self.hardware
+        set_sample = hardware.bus.set_mpu6050_sample
+        motors = quadcopter.motors
+        if reader.motors != len(motors):
+            raise ValueError('The trace has ' + str(reader.motors) + ' motors, the quadcopter has ' + str(len(motors)) + '.')
+        for kind, timestamp, values in reader:
+            hardware.now = timestamp
+            if kind == TraceWriter.CONST_SAMPLE:
+                set_sample(values[0:3], values[3], values[4:7])
+                quadcopter.update_attitude()
+            elif kind == TraceWriter.CONST_OUTPUT:
+                quadcopter.main_method()
+                main_power = quadcopter.main_power
+                yield timestamp, values, [main_power + extra_power - recorded for extra_power, recorded in zip(motors.extra_powers, values)]
+            elif kind == TraceWriter.CONST_COMMAND:
+                try:
+                    quadcopter.apply_command(*values)
+                except Exception:
+                    # rejected like in Quadcopter.read_commands
+                    pass
+            elif kind == TraceWriter.CONST_CORRECTIONS:
+                # the temperature of the calibration is not traced
+                quadcopter.accelerometer.set_calibration(SensorCalibration(values[0:3], values[3:6], values[6:9], math.nan))
+            else:
+                quadcopter.attitude_clock.time_start_point = timestamp
+                quadcopter.control_clock.time_start_point = values[0]
+                quadcopter.set_main_power(values[1])
+                quadcopter.set_action(quadcopter.Action(values[2]))
+
+    def run(self, path: str, tolerance: float = 1e-9, diffs=None) -> dict:
+        """
+        This method replays the trace and sums up the differences.
+
+        :param path: str | Path to the trace
+        :param tolerance: float | Largest difference of a duty cycle that is not a divergence
+        :param diffs: file | Text file to write the differences of every control update to as CSV (None - not written)
+        :return: dict | ticks, divergent_ticks, first_divergence (time or None), max_difference, rms_difference, duration (trace time), cpu_time, speedup
+        """
+        reader = TraceReader(path)
+        if diffs is not None:
+            diffs.write(','.join(['time'] + list(self.quadcopter.motors.names)) + '\n')
+        ticks = 0
+        divergent_ticks = 0
+        first_divergence = None
+        max_difference = 0.0
+        squares = 0.0
+        first_time = None
+        last_time = None
+        start = process_time()
+        for timestamp, recorded, differences in self.ticks(reader):
+            if first_time is None:
+                first_time = timestamp
+            last_time = timestamp
+            ticks += 1
+            largest = max(abs(x) for x in differences)
+            squares += sum(x * x for x in differences)
+            if largest > max_difference:
+                max_difference = largest
+            if largest > tolerance:
+                divergent_ticks += 1
+                if first_divergence is None:
+                    first_divergence = timestamp
+            if diffs is not None:
+                diffs.write(repr(timestamp) + ',' + ','.join(repr(x) for x in differences) + '\n')
+        cpu_time = process_time() - start
+        duration = last_time - first_time if ticks else 0.0
+        return {
+            'ticks': ticks,
+            'divergent_ticks': divergent_ticks,
+            'first_divergence': first_divergence,
+            'max_difference': max_difference,
+            'rms_difference': math.sqrt(squares / (ticks * reader.motors)) if ticks else 0.0,
+            'duration': duration,
+            'cpu_time': cpu_time,
+            'speedup': duration / cpu_time if cpu_time > 0 else math.inf
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replays a trace through the current control loop and compares the motor outputs.')
+    parser.add_argument('trace', help='trace file (' + TraceWriter.CONST_EXTENSION + ')')
+    parser.add_argument('--estimator', choices=['complementary', 'kalman'], default='complementary', help='attitude estimator to replay with')
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='largest duty cycle difference that is not a divergence')
+    parser.add_argument('--diffs', help='CSV file for the differences of every control update')
+    arguments = parser.parse_args()
+
+    estimator = KalmanFilter() if arguments.estimator == 'kalman' else ComplementaryFilter()
+    replay = Replay(estimator)
+    diffs_file = open(arguments.diffs, 'w') if arguments.diffs else None
+    try:
+        summary = replay.run(arguments.trace, arguments.tolerance, diffs_file)
+    finally:
+        if diffs_file is not None:
+            diffs_file.close()
+    for name, value in summary.items():
+        print(name + ': ' + str(value))
+    sys.exit(1 if summary['divergent_ticks'] else 0)
@@ -0,0 +1,259 @@
+"""This module runs tasks at independent rates against absolute deadlines."""
+
+from time import monotonic, sleep
+from typing import Callable, TypeVar
+
+from timers import LoopRate
+
+
+SchedulerObject = TypeVar('SchedulerObject', bound='Scheduler')
+
+
+class Task:
+    """
+    This class holds a scheduled task, its next deadline and its timing statistics.
+    """
+
+    name: str = None
+    """Task name"""
+
+    callback: Callable = None
+    """Function called every period"""
+
+    rate: LoopRate = None
+    """Task frequency and period"""
+
+    origin: float = None
+    """Monotonic time (in seconds) of the first run"""
+
+    ticks: int = 0
+    """Number of periods from the first run to the next run"""
+
+    deadline: float = None
+    """Monotonic time (in seconds) of the next run (origin + ticks * period, so rounding errors do not accumulate)"""
+
+    runs: int = 0
+    """Number of runs"""
+
+    overruns: int = 0
+    """Number of runs that started a whole period late or took longer than a period"""
+
+    skipped: int = 0
+    """Number of periods skipped to catch up after overruns"""
+
+    jitter: float = 0
+    """Start delay of the last run (in seconds)"""
+
+    duration: float = 0
+    """Duration of the last run (in seconds)"""
+
+    jitter_sum: float = 0
+    """Sum of start delays (in seconds)"""
+
+    jitter_max: float = 0
+    """Maximum start delay (in seconds)"""
+
+    duration_max: float = 0
+    """Maximum run duration (in seconds)"""
+
+    def __init__(self, name: str, callback: Callable, frequency: float) -> None:
+        """
+        This constructor sets the task callback and frequency.
+
+        :param name: str | Task name
+        :param callback: Callable | Function called every period
+        :param frequency: float | Task frequency in Hz
+        :return: None
+        """
+        self.name = name
+        self.callback = callback
+        self.rate = LoopRate(frequency)
+        self.reset(0)
+
+    def reset(self, now: float) -> None:
+        """
+        This method clears the statistics and schedules the first run.
+
+        :param now: float | Monotonic time (in seconds) of the first run
+        :return: None
+        """
+        self.origin = now
+        self.ticks = 0
+        self.deadline = now
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.jitter = 0
+        self.duration = 0
+        self.jitter_sum = 0
+        self.jitter_max = 0
+        self.duration_max = 0
+
+    def run(self, now: float, time_source: Callable) -> float:
+        """
+        This method runs the task, updates its statistics and moves the deadline by whole periods.
+
+        :param now: float | Monotonic time (in seconds) at which the task starts
+        :param time_source: Callable | Monotonic time function
+        :return: float | Monotonic time (in seconds) after the run
+        """
+        period = self.rate.period
+        jitter = now - self.deadline
+        self.callback()
+        end = time_source()
+        duration = end - now
+
+        self.runs += 1
+        self.jitter = jitter
+        self.duration = duration
+        self.jitter_sum += jitter
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+        if duration > self.duration_max:
+            self.duration_max = duration
+
+        self.ticks += 1
+        if jitter >= period or duration > period:
+            self.overruns += 1
+        missed = int((end - self.origin) / period) + 1 - self.ticks
+        if missed > 0:
+            self.skipped += missed
+            self.ticks += missed
+        self.deadline = self.origin + self.ticks * period
+        return end
+
+    def get_statistics(self) -> dict:
+        """
+        This method returns the timing statistics.
+
+        :return: dict | Frequency, runs, overruns, skipped periods, mean and max jitter and max duration (seconds)
+        """
+        return {
+            'frequency': self.rate.frequency,
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'jitter_mean': self.jitter_sum / self.runs if self.runs else 0,
+            'jitter_max': self.jitter_max,
+            'duration_max': self.duration_max
+        }
+
+
+class Scheduler:
+    """
+    This class runs registered tasks at their own rates. Deadlines are absolute, so a late run does not shift the following ones.
+    """
+
+    tasks: list = None
+    """Registered tasks in priority order"""
+
+    running: bool = False
+    """Keeps information whether the scheduler loop is running"""
+
+    time_source: Callable = None
+    """Monotonic time function"""
+
+    sleep_function: Callable = None
+    """Function used to wait for the next deadline"""
+
+    def __init__(self, time_source: Callable = monotonic, sleep_function: Callable = sleep) -> None:
+        """
+        This constructor sets the time source.
+
+        :param time_source: Callable | Monotonic time function (seconds)
+        :param sleep_function: Callable | Function used to wait for the next deadline
+        :return: None
+        """
+        self.tasks = []
+        self.time_source = time_source
+        self.sleep_function = sleep_function
+
+    def add_task(self, name: str, callback: Callable, frequency: float) -> SchedulerObject:
+        """
+        Registers a task. Tasks registered earlier run first when they are due at the same time.
+
+        :param name: str | Task name
+        :param callback: Callable | Function called every period
+        :param frequency: float | Task frequency in Hz
+        :return: self
+        """
+        if self.get_task(name) is not None:
+            raise ValueError('Task "' + name + '" already exists.')
+        task = Task(name, callback, frequency)
+        task.reset(self.time_source())
+        self.tasks.append(task)
+        return self
+
+    def get_task(self, name: str) -> Task:
+        """
+        Returns a task by its name.
+
+        :param name: str | Task name
+        :return: Task | Task or None
+        """
+        for task in self.tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def reset(self) -> SchedulerObject:
+        """
+        Clears the statistics and makes all tasks due now.
+
+        :return: self
+        """
+        now = self.time_source()
+        for task in self.tasks:
+            task.reset(now)
+        return self
+
+    def run_pending(self) -> float:
+        """
+        Runs every task whose deadline has passed.
+
+        :return: float | The earliest next deadline (None - no tasks)
+        """
+        now = self.time_source()
+        next_deadline = None
+        for task in self.tasks:
+            if task.deadline <= now:
+                now = task.run(now, self.time_source)
+            if next_deadline is None or task.deadline < next_deadline:
+                next_deadline = task.deadline
+        return next_deadline
+
+    def run(self, duration: float = None) -> None:
+        """
+        Runs the tasks until stop() is called or the duration passes.
+
+        :param duration: float | Maximum run time in seconds (None - no limit)
+        :return: None
+        """
+        if not self.tasks:
+            raise ValueError('The scheduler has no tasks to run.')
+        self.running = True
+        end = None if duration is None else self.time_source() + duration
+        while self.running:
+            next_deadline = self.run_pending()
+            if end is not None and next_deadline >= end:
+                break
+            delay = next_deadline - self.time_source()
+            if delay > 0:
+                self.sleep_function(delay)
+        self.running = False
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler loop after the current task.
+
+        :return: None
+        """
+        self.running = False
+
+    def get_statistics(self) -> dict:
+        """
+        Returns the timing statistics of every task.
+
+        :return: dict | Task name -> statistics
+        """
+        return {task.name: task.get_statistics() for task in self.tasks}
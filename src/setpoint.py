@@ -0,0 +1,254 @@
+"""This module passes the latest command (setpoint) to the flight process through shared memory."""
+
+import struct
+from threading import Lock
+
+from shared_block import SharedBlock
+
+
+class SetpointChannel:
+    """
+    This class holds the latest power and action in shared memory (last writer wins).
+    A seqlock counter (odd while a write is in progress) lets the flight process read without locks or system calls.
+    Commands overwritten before the flight process read them are counted as coalesced. Every field keeps the number of the command
+    that set it, so the reader gets only the fields sent since its last read (a rejected power is not sent again with the next action).
+    """
+
+    CONST_LOCK_FORMAT: struct.Struct = struct.Struct('<Q')
+    """Layout of the seqlock counter"""
+
+    CONST_COMMAND_FORMAT: struct.Struct = struct.Struct('<QdqQQ')
+    """Command layout: command number, power, action, number of the command that set the power, number of the command that set the action"""
+
+    CONST_COMMAND_OFFSET: int = 8
+    """Offset of the command"""
+
+    CONST_STATE_FORMAT: struct.Struct = struct.Struct('<QQdqQQ')
+    """Seqlock counter followed by the command, read with a single unpack"""
+
+    CONST_COUNTERS_FORMAT: struct.Struct = struct.Struct('<QQ')
+    """Reader counters layout: coalesced commands, dropped commands"""
+
+    CONST_COUNTERS_OFFSET: int = 48
+    """Offset of the reader counters"""
+
+    CONST_SIZE: int = 64
+    """Size of the block"""
+
+    CONST_NO_ACTION: int = -1
+    """Action value before the first action is sent"""
+
+    CONST_NO_POWER: float = float('nan')
+    """Power value before the first power is sent"""
+
+    CONST_MIN_POWER: float = 0
+    """Lowest main power accepted by the flight process"""
+
+    CONST_MAX_POWER: float = 10
+    """Highest main power accepted by the flight process"""
+
+    block: SharedBlock = None
+    """Shared memory block"""
+
+    buffer: memoryview = None
+    """Memory of the block"""
+
+    write_lock: Lock = None
+    """Serializes the writers of this process"""
+
+    last_number: int = 0
+    """Number of the last command read"""
+
+    coalesced: int = 0
+    """Number of commands overwritten before they were read"""
+
+    dropped: int = 0
+    """Number of commands rejected by the reader"""
+
+    def __init__(self, name: str = None) -> None:
+        """
+        This constructor creates the channel in a new shared memory block.
+
+        :param name: str | Name of the shared memory block (None - random)
+        :return: None
+        """
+        self.block = SharedBlock(self.CONST_SIZE, name)
+        self.CONST_COMMAND_FORMAT.pack_into(self.block.get_buffer(), self.CONST_COMMAND_OFFSET, 0, self.CONST_NO_POWER, self.CONST_NO_ACTION, 0, 0)
+        self.map()
+
+    @staticmethod
+    def attach(name: str):
+        """
+        This method opens a channel created by another process.
+
+        :param name: str | Name of the shared memory block
+        :return: SetpointChannel | Channel
+        """
+        channel = SetpointChannel.__new__(SetpointChannel)
+        channel.block = SharedBlock.attach(name)
+        channel.map()
+        return channel
+
+    def map(self) -> None:
+        """
+        This method prepares the local state of the channel.
+
+        :return: None
+        """
+        self.buffer = self.block.get_buffer()
+        self.write_lock = Lock()
+        self.last_number = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __getstate__(self) -> dict:
+        """
+        This method pickles the channel as the name of its shared memory block.
+
+        :return: dict | State
+        """
+        return {'name': self.block.get_name()}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method attaches to the shared memory block after unpickling.
+
+        :param state: dict | State
+        :return: None
+        """
+        self.__dict__.update(SetpointChannel.attach(state['name']).__dict__)
+
+    def get_name(self) -> str:
+        """
+        This method returns the name of the shared memory block.
+
+        :return: str | Name
+        """
+        return self.block.get_name()
+
+    ##############
+    ### WRITER ###
+    ##############
+    @staticmethod
+    def parse_power(value) -> float:
+        """
+        This method checks a main power received from outside (e.g. a web request) before it is sent.
+
+        :param value: str | float | Main power
+        :return: float | Main power (None - not a number or out of the accepted range)
+        """
+        try:
+            power = float(value)
+        except (TypeError, ValueError):
+            return None
+        if not SetpointChannel.CONST_MIN_POWER <= power <= SetpointChannel.CONST_MAX_POWER:
+            return None
+        return power
+
+    def send(self, power: float = None, action: int = None) -> int:
+        """
+        This method replaces the latest command. A missing value keeps its previous state.
+
+        :param power: float | Main power (None - unchanged)
+        :param action: int | Quadcopter.Action value (None - unchanged)
+        :return: int | Command number
+        """
+        buffer = self.buffer
+        with self.write_lock:
+            lock = self.CONST_LOCK_FORMAT.unpack_from(buffer, 0)[0]
+            number, previous_power, previous_action, power_number, action_number = self.CONST_COMMAND_FORMAT.unpack_from(
+                buffer, self.CONST_COMMAND_OFFSET
+            )
+            self.CONST_LOCK_FORMAT.pack_into(buffer, 0, lock + 1)
+            self.CONST_COMMAND_FORMAT.pack_into(
+                buffer,
+                self.CONST_COMMAND_OFFSET,
+                number + 1,
+                previous_power if power is None else power,
+                previous_action if action is None else action,
+                power_number if power is None else number + 1,
+                action_number if action is None else number + 1
+            )
+            self.CONST_LOCK_FORMAT.pack_into(buffer, 0, lock + 2)
+        return number + 1
+
+    def send_power(self, power: float) -> int:
+        """
+        This method sends a new main power.
+
+        :param power: float | Main power
+        :return: int | Command number
+        """
+        return self.send(power=power)
+
+    def send_action(self, action: int) -> int:
+        """
+        This method sends a new action.
+
+        :param action: int | Quadcopter.Action value
+        :return: int | Command number
+        """
+        return self.send(action=action)
+
+    ##############
+    ### READER ###
+    ##############
+    def read(self) -> tuple:
+        """
+        This method reads a consistent copy of the latest command.
+
+        :return: tuple | Command number, power, action, number of the command that set the power, number of the command that set the action
+        """
+        buffer = self.buffer
+        unpack_state = self.CONST_STATE_FORMAT.unpack_from
+        unpack_lock = self.CONST_LOCK_FORMAT.unpack_from
+        while True:
+            lock, number, power, action, power_number, action_number = unpack_state(buffer, 0)
+            if not lock & 1 and unpack_lock(buffer, 0)[0] == lock:
+                return number, power, action, power_number, action_number
+
+    def poll(self) -> tuple:
+        """
+        This method returns the latest command if it has not been read yet (single reader only).
+        A field not sent since the last read comes back unchanged (CONST_NO_POWER, CONST_NO_ACTION).
+
+        :return: tuple | Power and action, or None
+        """
+        number, power, action, power_number, action_number = self.read()
+        last_number = self.last_number
+        if number == last_number:
+            return None
+        self.coalesced += number - last_number - 1
+        self.last_number = number
+        self.CONST_COUNTERS_FORMAT.pack_into(self.buffer, self.CONST_COUNTERS_OFFSET, self.coalesced, self.dropped)
+        return (
+            power if power_number > last_number else self.CONST_NO_POWER,
+            action if action_number > last_number else self.CONST_NO_ACTION
+        )
+
+    def drop(self) -> None:
+        """
+        This method counts the last polled command as rejected.
+
+        :return: None
+        """
+        self.dropped += 1
+        self.CONST_COUNTERS_FORMAT.pack_into(self.buffer, self.CONST_COUNTERS_OFFSET, self.coalesced, self.dropped)
+
+    def get_counters(self) -> dict:
+        """
+        This method returns the counters published by the reader.
+
+        :return: dict | Number of sent, coalesced and dropped commands
+        """
+        coalesced, dropped = self.CONST_COUNTERS_FORMAT.unpack_from(self.buffer, self.CONST_COUNTERS_OFFSET)
+        return {'sent': self.read()[0], 'coalesced': coalesced, 'dropped': dropped}
+
+    def close(self) -> None:
+        """
+        This method closes the shared memory (and removes it if this object created it).
+
+        :return: None
+        """
+        self.buffer = None
+        self.block.close()
@@ -0,0 +1,87 @@
+"""This module creates and opens named shared memory blocks used to exchange data between processes."""
+
+from multiprocessing import shared_memory, resource_tracker
+
+
+class SharedBlock:
+    """
+    This class owns or attaches to a named shared memory block. Only the creator removes the block.
+    The resource tracker is kept out of it, because it would remove the block as soon as any attached process exits.
+    """
+
+    shm: shared_memory.SharedMemory = None
+    """Shared memory block"""
+
+    owner: bool = False
+    """Keeps information whether this object created (and has to unlink) the shared memory"""
+
+    def __init__(self, size: int, name: str = None) -> None:
+        """
+        This constructor creates a new zero-filled block.
+
+        :param size: int | Size in bytes
+        :param name: str | Name of the block (None - random)
+        :return: None
+        """
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.owner = True
+
+    @staticmethod
+    def attach(name: str):
+        """
+        This method opens a block created by another object.
+
+        :param name: str | Name of the block
+        :return: SharedBlock | Block
+        """
+        block = SharedBlock.__new__(SharedBlock)
+        block.shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block.shm._name, 'shared_memory')
+        block.owner = False
+        return block
+
+    def __getstate__(self) -> dict:
+        """
+        This method pickles the block as its name (e.g. when it is passed to a new process).
+
+        :return: dict | State
+        """
+        return {'name': self.shm.name}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method attaches to the block after unpickling.
+
+        :param state: dict | State
+        :return: None
+        """
+        self.__dict__.update(SharedBlock.attach(state['name']).__dict__)
+
+    def get_name(self) -> str:
+        """
+        This method returns the name of the block.
+
+        :return: str | Name
+        """
+        return self.shm.name
+
+    def get_buffer(self) -> memoryview:
+        """
+        This method returns the memory of the block.
+
+        :return: memoryview | Memory
+        """
+        return self.shm.buf
+
+    def close(self) -> None:
+        """
+        This method closes the block (and removes it if this object created it).
+
+        :return: None
+        """
+        self.shm.close()
+        if self.owner:
+            # unlink() unregisters the block from the resource tracker
+            resource_tracker.register(self.shm._name, 'shared_memory')
+            self.shm.unlink()
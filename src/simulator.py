@@ -0,0 +1,741 @@
+"""This module simulates the flight of the quadcopter so the flight code can run (faster than real time) without the Raspberry Pi."""
+
+import math
+import numpy as np
+from time import process_time
+from typing import Callable, TypeVar
+
+from fake_hardware import FakeSMBus, FakeGPIO
+from file_reader import FileReader
+from hardware import FakeHardware
+from mixer import Mixer
+
+
+CONST_GRAVITY: float = 9.81
+"""Gravitational acceleration (m/s^2)"""
+
+
+RigidBodyObject = TypeVar('RigidBodyObject', bound='RigidBody')
+
+
+class RigidBody:
+    """
+    This class is a 6-DOF model of the quadcopter frame. The body frame is X forward, Y left, Z up (like the MPU-6050 on the drone),
+    the world frame is Z up. Motors are placed on the arms in the directions given by the mixing matrix
+    (roll coefficient - left, pitch coefficient - front) and follow their throttle with a first order lag.
+    The yaw column of the matrix gives the direction of the reaction torque (1 - clockwise seen from above).
+    """
+
+    names: tuple = None
+    """Motor names"""
+
+    mass: float = None
+    """Mass (kg)"""
+
+    inertia: np.ndarray = None
+    """Moments of inertia around the body axes (kg*m^2)"""
+
+    max_thrust: float = None
+    """Thrust of a single motor at full throttle (N)"""
+
+    motor_time_constant: float = None
+    """Time constant of the motors (seconds)"""
+
+    torque_coefficient: float = None
+    """Reaction torque of a motor per newton of thrust (m)"""
+
+    drag: float = None
+    """Linear drag coefficient (1/s)"""
+
+    angular_drag: float = None
+    """Angular drag coefficient (1/s)"""
+
+    positions: np.ndarray = None
+    """Motor positions in the body frame (m)"""
+
+    torque_matrix: np.ndarray = None
+    """Maps the motor thrusts to the body torques"""
+
+    position: np.ndarray = None
+    """Position in the world frame (m)"""
+
+    velocity: np.ndarray = None
+    """Velocity in the world frame (m/s)"""
+
+    quaternion: np.ndarray = None
+    """Orientation (w, x, y, z) rotating the body frame into the world frame"""
+
+    angular_velocity: np.ndarray = None
+    """Angular velocity in the body frame (rad/s)"""
+
+    acceleration: np.ndarray = None
+    """Acceleration in the world frame from the last step (m/s^2)"""
+
+    thrust: np.ndarray = None
+    """Current thrust of every motor (N)"""
+
+    external_torque: np.ndarray = None
+    """Disturbance torque in the body frame (N*m)"""
+
+    specific_force: np.ndarray = None
+    """Specific force in the body frame from the last step (g)"""
+
+    lag_step: float = None
+    """Time step for which the motor lag factor was calculated"""
+
+    lag: float = None
+    """Part of the difference between the target and the current thrust removed in one time step"""
+
+    def __init__(
+        self,
+        names: list,
+        matrix: np.ndarray,
+        mass: float = 1.0,
+        arm: float = 0.16,
+        inertia: list = (0.01, 0.01, 0.018),
+        max_thrust: float = None,
+        motor_time_constant: float = 0.03,
+        torque_coefficient: float = 0.016,
+        drag: float = 0.3,
+        angular_drag: float = 0.05
+    ) -> None:
+        """
+        This constructor sets the frame parameters and puts the body on the ground.
+
+        :param names: list | Motor names
+        :param matrix: np.ndarray | Mixing matrix (roll, pitch and yaw column of every motor)
+        :param mass: float | Mass (kg)
+        :param arm: float | Distance between the center and every motor (m)
+        :param inertia: list | Moments of inertia around the body axes (kg*m^2)
+        :param max_thrust: float | Thrust of a single motor at full throttle (None - twice the hover thrust)
+        :param motor_time_constant: float | Time constant of the motors (seconds)
+        :param torque_coefficient: float | Reaction torque of a motor per newton of thrust (m)
+        :param drag: float | Linear drag coefficient (1/s)
+        :param angular_drag: float | Angular drag coefficient (1/s)
+        :return: None
+        """
+        matrix = np.asarray(matrix, dtype=float)
+        if matrix.shape != (len(names), 3):
+            raise ValueError('Every motor needs a roll, pitch and yaw coefficient.')
+        if mass <= 0 or arm <= 0 or motor_time_constant <= 0:
+            raise ValueError('The mass, the arm and the motor time constant must be greater than 0.')
+        self.names = tuple(names)
+        self.mass = mass
+        self.inertia = np.array(inertia, dtype=float)
+        self.max_thrust = max_thrust if max_thrust is not None else 2 * mass * CONST_GRAVITY / len(names)
+        self.motor_time_constant = motor_time_constant
+        self.torque_coefficient = torque_coefficient
+        self.drag = drag
+        self.angular_drag = angular_drag
+
+        directions = np.zeros((len(names), 3))
+        directions[:, 0] = matrix[:, 1]
+        directions[:, 1] = matrix[:, 0]
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        self.positions = arm * directions
+        self.torque_matrix = np.vstack((
+            self.positions[:, 1],
+            -self.positions[:, 0],
+            -torque_coefficient * matrix[:, 2]
+        ))
+        self.reset()
+
+    @staticmethod
+    def from_file(path: str, airframe: str, **parameters):
+        """
+        This method creates the body of an airframe from the airframes file.
+
+        :param path: str | Path to the airframes file
+        :param airframe: str | Airframe name
+        :param parameters: dict | Other constructor parameters
+        :return: RigidBody | Body
+        """
+        mixer = Mixer.from_file(path, airframe)
+        return RigidBody(mixer.names, mixer.matrix, **parameters)
+
+    def reset(self, altitude: float = 0, attitude: list = (0, 0), throttle: float = None) -> RigidBodyObject:
+        """
+        This method puts the body at rest.
+
+        :param altitude: float | Altitude (m)
+        :param attitude: list | X and Y axis angles (degrees, like Accelerometer.read_attitude)
+        :param throttle: float | Throttle of every motor (None - 0 on the ground, hover in the air)
+        :return: self
+        """
+        if throttle is None:
+            throttle = self.get_hover_throttle() if altitude > 0 else 0
+        # the up direction seen from the body, rotated onto the world Z axis along the shortest arc (no yaw)
+        x, y = math.sin(math.radians(attitude[1])), math.sin(math.radians(attitude[0]))
+        if x * x + y * y > 1:
+            raise ValueError('Wrong attitude. The X and Y axis angles cannot be reached together.')
+        z = math.sqrt(1 - x * x - y * y)
+        quaternion = np.array([1 + z, y, -x, 0])
+        self.quaternion = quaternion / np.linalg.norm(quaternion)
+        self.position = np.array([0, 0, altitude], dtype=float)
+        self.velocity = np.zeros(3)
+        self.angular_velocity = np.zeros(3)
+        self.acceleration = np.zeros(3)
+        self.thrust = np.full(len(self.names), throttle * self.max_thrust)
+        self.external_torque = np.zeros(3)
+        self.specific_force = self.get_rotation()[2].copy()
+        return self
+
+    def get_rotation(self) -> np.ndarray:
+        """
+        This method returns the rotation matrix of the body (body frame -> world frame).
+
+        :return: np.ndarray | 3x3 matrix
+        """
+        w, x, y, z = self.quaternion
+        return np.array([
+            [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+            [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+            [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)]
+        ])
+
+    def get_hover_throttle(self) -> float:
+        """
+        This method returns the throttle at which the motors carry the body.
+
+        :return: float | Throttle (0 - 1)
+        """
+        return self.mass * CONST_GRAVITY / (len(self.names) * self.max_thrust)
+
+    def step(self, dt: float, throttles: np.ndarray) -> None:
+        """
+        This method moves the simulation forward (semi-implicit Euler). The ground stops the body.
+        The 3D math is written out on floats, because numpy calls on 3-element vectors cost more than the math itself.
+
+        :param dt: float | Time step (seconds)
+        :param throttles: np.ndarray | Throttle of every motor (0 - 1)
+        :return: None
+        """
+        if dt != self.lag_step:
+            self.lag_step = dt
+            self.lag = 1 - math.exp(-dt / self.motor_time_constant)
+        thrust = self.thrust
+        thrust += (throttles * self.max_thrust - thrust) * self.lag
+
+        w, x, y, z = self.quaternion.tolist()
+        force = float(thrust.sum()) / self.mass
+        drag = self.drag
+        vx, vy, vz = self.velocity.tolist()
+        ax = 2 * (x * z + w * y) * force - drag * vx
+        ay = 2 * (y * z - w * x) * force - drag * vy
+        az = (1 - 2 * (x * x + y * y)) * force - drag * vz - CONST_GRAVITY
+
+        tx, ty, tz = (self.torque_matrix.dot(thrust) + self.external_torque).tolist()
+        ix, iy, iz = self.inertia.tolist()
+        p, q, r = self.angular_velocity.tolist()
+        angular_drag = self.angular_drag
+        p += ((tx - (iz - iy) * q * r) / ix - angular_drag * p) * dt
+        q += ((ty - (ix - iz) * r * p) / iy - angular_drag * q) * dt
+        r += ((tz - (iy - ix) * p * q) / iz - angular_drag * r) * dt
+
+        px, py, pz = self.position.tolist()
+        if pz <= 0 and az <= 0:
+            self.position[2] = 0
+            self.velocity[:] = 0
+            self.angular_velocity[:] = 0
+            self.acceleration[:] = 0
+            ax = ay = az = 0
+        else:
+            vx += ax * dt
+            vy += ay * dt
+            vz += az * dt
+            self.velocity[:] = (vx, vy, vz)
+            self.position[:] = (px + vx * dt, py + vy * dt, pz + vz * dt)
+            self.angular_velocity[:] = (p, q, r)
+            self.acceleration[:] = (ax, ay, az)
+
+            p, q, r = p * dt / 2, q * dt / 2, r * dt / 2
+            w, x, y, z = (
+                w - x * p - y * q - z * r,
+                x + w * p + y * r - z * q,
+                y + w * q - x * r + z * p,
+                z + w * r + x * q - y * p
+            )
+            norm = math.sqrt(w * w + x * x + y * y + z * z)
+            w, x, y, z = w / norm, x / norm, y / norm, z / norm
+            self.quaternion[:] = (w, x, y, z)
+
+        az += CONST_GRAVITY
+        self.specific_force[:] = (
+            ((1 - 2 * (y * y + z * z)) * ax + 2 * (x * y + w * z) * ay + 2 * (x * z - w * y) * az) / CONST_GRAVITY,
+            (2 * (x * y - w * z) * ax + (1 - 2 * (x * x + z * z)) * ay + 2 * (y * z + w * x) * az) / CONST_GRAVITY,
+            (2 * (x * z + w * y) * ax + 2 * (y * z - w * x) * ay + (1 - 2 * (x * x + y * y)) * az) / CONST_GRAVITY
+        )
+
+    def get_specific_force(self) -> np.ndarray:
+        """
+        This method returns what an accelerometer fixed to the body measures.
+
+        :return: np.ndarray | X, Y and Z specific force in g
+        """
+        return self.specific_force
+
+    def get_gyro(self) -> np.ndarray:
+        """
+        This method returns what a gyro fixed to the body measures.
+
+        :return: np.ndarray | X, Y and Z angular velocity in deg/s
+        """
+        return np.degrees(self.angular_velocity)
+
+    def get_attitude(self) -> list:
+        """
+        This method returns the true attitude in the convention of Accelerometer.read_attitude.
+
+        :return: list | X axis angle, Y axis angle (degrees)
+        """
+        x, y, z = self.get_rotation()[2]
+        return [math.degrees(math.atan2(y, math.hypot(x, z))), math.degrees(math.atan2(x, math.hypot(y, z)))]
+
+    def get_yaw_rate(self) -> float:
+        """
+        This method returns the true yaw rate in the convention of Quadcopter.yaw_rate.
+
+        :return: float | Yaw rate (deg/s, positive - clockwise seen from above)
+        """
+        return -math.degrees(self.angular_velocity[2])
+
+
+SimulatedMPU6050Object = TypeVar('SimulatedMPU6050Object', bound='SimulatedMPU6050')
+
+
+class SimulatedMPU6050(FakeSMBus):
+    """
+    This class is a MPU-6050 on the I2C bus that measures a rigid body. The data registers are refreshed (with noise and bias)
+    on the first bus transaction after the body moved; with the FIFO enabled every sample period is also pushed to the FIFO.
+    """
+
+    accelerometer_noise: float = None
+    """Standard deviation of the accelerometer noise (g)"""
+
+    gyro_noise: float = None
+    """Standard deviation of the gyro noise (deg/s)"""
+
+    accelerometer_bias: np.ndarray = None
+    """Accelerometer bias (g)"""
+
+    gyro_bias: np.ndarray = None
+    """Gyro bias (deg/s)"""
+
+    temperature: float = None
+    """Temperature of the device (Celsius)"""
+
+    random: np.random.Generator = None
+    """Noise generator"""
+
+    accelerometer: np.ndarray = None
+    """Latest true accelerometer value (g)"""
+
+    gyro: np.ndarray = None
+    """Latest true gyro value (deg/s)"""
+
+    fresh: bool = True
+    """Keeps information whether the data registers hold the latest values"""
+
+    fifo_ticks: int = 0
+    """Number of samples since the last FIFO push"""
+
+    CONST_ACCELEROMETER_SCALE: float = 16384.0
+    """Raw accelerometer value of 1 g"""
+
+    CONST_GYRO_SCALE: float = 131.0
+    """Raw gyro value of 1 deg/s"""
+
+    CONST_SAMPLE_RATE_DIVIDER_REGISTER: hex = 0x19
+    """MPU-6050 sample rate divider register"""
+
+    def __init__(
+        self,
+        accelerometer_noise: float = 0.01,
+        gyro_noise: float = 0.1,
+        accelerometer_bias: list = (0, 0, 0),
+        gyro_bias: list = (0, 0, 0),
+        temperature: float = 25,
+        seed: int = None
+    ) -> None:
+        """
+        This constructor sets the sensor errors.
+
+        :param accelerometer_noise: float | Standard deviation of the accelerometer noise (g)
+        :param gyro_noise: float | Standard deviation of the gyro noise (deg/s)
+        :param accelerometer_bias: list | Accelerometer bias (g)
+        :param gyro_bias: list | Gyro bias (deg/s)
+        :param temperature: float | Temperature of the device (Celsius)
+        :param seed: int | Seed of the noise generator (None - random)
+        :return: None
+        """
+        super().__init__()
+        self.accelerometer_noise = accelerometer_noise
+        self.gyro_noise = gyro_noise
+        self.accelerometer_bias = np.array(accelerometer_bias, dtype=float)
+        self.gyro_bias = np.array(gyro_bias, dtype=float)
+        self.temperature = temperature
+        self.random = np.random.default_rng(seed)
+        self.fifo_ticks = 0
+        self.measure(np.array([0, 0, 1.0]), np.zeros(3))
+
+    def measure(self, accelerometer: np.ndarray, gyro: np.ndarray) -> None:
+        """
+        This method passes a new sample of the true values (at the 1 kHz sample rate).
+
+        :param accelerometer: np.ndarray | X, Y and Z specific force in g
+        :param gyro: np.ndarray | X, Y and Z angular velocity in deg/s
+        :return: None
+        """
+        self.accelerometer = accelerometer
+        self.gyro = gyro
+        self.fresh = False
+        if self.registers[self.CONST_USER_CONTROL_REGISTER] & 0x40:
+            self.fifo_ticks += 1
+            if self.fifo_ticks > self.registers[self.CONST_SAMPLE_RATE_DIVIDER_REGISTER]:
+                self.fifo_ticks = 0
+                accelerometer, gyro = self.get_raw()
+                self.push_mpu6050_fifo([accelerometer], [gyro])
+
+    def get_raw(self) -> tuple:
+        """
+        This method converts the true values into raw readings with noise and bias.
+
+        :return: tuple | Raw accelerometer values, raw gyro values
+        """
+        noise = self.random.standard_normal(6).tolist()
+        scale = self.CONST_ACCELEROMETER_SCALE
+        deviation = self.accelerometer_noise
+        values = [
+            (value + bias + deviation * noise[index]) * scale
+            for index, (value, bias) in enumerate(zip(self.accelerometer.tolist(), self.accelerometer_bias.tolist()))
+        ]
+        scale = self.CONST_GYRO_SCALE
+        deviation = self.gyro_noise
+        values += [
+            (value + bias + deviation * noise[index + 3]) * scale
+            for index, (value, bias) in enumerate(zip(self.gyro.tolist(), self.gyro_bias.tolist()))
+        ]
+        raw = [-32768 if value < -32768 else 32767 if value > 32767 else int(value) for value in values]
+        return raw[:3], raw[3:]
+
+    def wait(self) -> None:
+        """
+        This method refreshes the data registers before the transaction.
+
+        :return: None
+        """
+        super().wait()
+        if not self.fresh:
+            self.fresh = True
+            accelerometer, gyro = self.get_raw()
+            self.set_mpu6050_sample(accelerometer, round((self.temperature - 36.53) * 340), gyro)
+
+
+SimulatedHardwareObject = TypeVar('SimulatedHardwareObject', bound='SimulatedHardware')
+
+
+class SimulatedHardware(FakeHardware):
+    """
+    This class runs the rigid body in lockstep with the flight code. The virtual clock only moves while the flight code sleeps,
+    so the simulation runs as fast as the CPU allows. The PWM duty cycles (5% - 10%) are the motor throttles.
+    """
+
+    body: RigidBody = None
+    """Simulated frame"""
+
+    motor_pins: dict = None
+    """GPIO pin -> motor index of the body"""
+
+    step: float = None
+    """Physics time step (seconds)"""
+
+    simulated_time: float = 0
+    """Time up to which the physics has been simulated"""
+
+    throttles: np.ndarray = None
+    """Throttle of every motor"""
+
+    disturbance: Callable = None
+    """Function (time -> body torque in N*m or None) adding a disturbance"""
+
+    physics_time: float = 0
+    """CPU time (seconds) spent simulating the physics"""
+
+    def __init__(self, body: RigidBody, motor_pins: dict, sensor: SimulatedMPU6050 = None, step: float = 0.001, disturbance: Callable = None) -> None:
+        """
+        This constructor connects the body to the GPIO pins and the sensor.
+
+        :param body: RigidBody | Simulated frame
+        :param motor_pins: dict | Motor name -> GPIO pin
+        :param sensor: SimulatedMPU6050 | Sensor (None - default SimulatedMPU6050)
+        :param step: float | Physics time step (seconds)
+        :param disturbance: Callable | Function (time -> body torque in N*m or None) adding a disturbance
+        :return: None
+        """
+        if step <= 0:
+            raise ValueError('The step must be greater than 0.')
+        super().__init__(FakeGPIO(), sensor if sensor is not None else SimulatedMPU6050())
+        self.body = body
+        self.motor_pins = {motor_pins[name]: index for index, name in enumerate(body.names)}
+        self.step = step
+        self.simulated_time = 0
+        self.throttles = np.zeros(len(body.names))
+        self.disturbance = disturbance
+        self.physics_time = 0
+
+    @staticmethod
+    def from_files(airframes_path: str, airframe: str, motor_pins_path: str, sensor: SimulatedMPU6050 = None, **parameters):
+        """
+        This method creates the simulated hardware for an airframe.
+
+        :param airframes_path: str | Path to the airframes file
+        :param airframe: str | Airframe name
+        :param motor_pins_path: str | Path to the motor pins file
+        :param sensor: SimulatedMPU6050 | Sensor (None - default SimulatedMPU6050)
+        :param parameters: dict | RigidBody parameters
+        :return: SimulatedHardware | Hardware
+        """
+        return SimulatedHardware(RigidBody.from_file(airframes_path, airframe, **parameters), FileReader('motors', motor_pins_path).get_data('motors'), sensor)
+
+    def sleep(self, seconds: float) -> None:
+        """
+        This method moves the virtual time forward and simulates the physics up to it.
+
+        :param seconds: float | Time to wait in seconds
+        :return: None
+        """
+        if seconds <= 0:
+            return
+        self.now += seconds
+        start = process_time()
+        body = self.body
+        sensor = self.bus
+        while self.simulated_time + self.step <= self.now:
+            self.read_throttles()
+            if self.disturbance is not None:
+                torque = self.disturbance(self.simulated_time)
+                body.external_torque = np.zeros(3) if torque is None else np.asarray(torque, dtype=float)
+            body.step(self.step, self.throttles)
+            self.simulated_time += self.step
+            sensor.measure(body.get_specific_force(), body.get_gyro())
+        self.physics_time += process_time() - start
+
+    def read_throttles(self) -> None:
+        """
+        This method converts the duty cycles of the motor PWM channels into throttles.
+
+        :return: None
+        """
+        throttles = self.throttles
+        for pwm in self.gpio.pwms:
+            index = self.motor_pins.get(pwm.pin)
+            if index is not None:
+                throttle = (pwm.duty_cycle - 5) / 5 if pwm.running else 0
+                throttles[index] = 0 if throttle < 0 else 1 if throttle > 1 else throttle
+
+    def reset(self, altitude: float = 0, attitude: list = (0, 0), throttle: float = None) -> SimulatedHardwareObject:
+        """
+        This method puts the body at rest (the virtual clock keeps running).
+
+        :param altitude: float | Altitude (m)
+        :param attitude: list | X and Y axis angles (degrees)
+        :param throttle: float | Throttle of every motor (None - 0 on the ground, hover in the air)
+        :return: self
+        """
+        self.body.reset(altitude, attitude, throttle)
+        self.bus.measure(self.body.get_specific_force(), self.body.get_gyro())
+        return self
+
+
+class Simulation:
+    """
+    This class flies the quadcopter on the simulated hardware, records the trajectory and measures the CPU cost.
+    """
+
+    hardware: SimulatedHardware = None
+    """Simulated hardware"""
+
+    quadcopter = None
+    """Quadcopter flying on the simulated hardware"""
+
+    setpoints = None
+    """Command channel of the quadcopter"""
+
+    telemetry = None
+    """Telemetry ring of the quadcopter"""
+
+    records: list = None
+    """Recorded samples"""
+
+    CONST_RECORD_FREQUENCY: float = 100
+    """Frequency (Hz) of recording the trajectory"""
+
+    CONST_AIRFRAMES_PATH: str = '../data/airframes.json'
+    """Path to the airframes file"""
+
+    CONST_MOTOR_PINS_PATH: str = '../data/motor_pins.json'
+    """Path to the motor pins file"""
+
+    def __init__(self, hardware: SimulatedHardware = None, attitude_estimator=None) -> None:
+        """
+        This constructor creates the quadcopter on the simulated hardware (arming takes 13 seconds of virtual time).
+
+        :param hardware: SimulatedHardware | Simulated hardware (None - the airframe of the quadcopter with the default sensor)
+        :param attitude_estimator: AttitudeEstimator | Attitude estimator of the quadcopter (None - default)
+        :return: None
+        """
+        from quadcopter import Quadcopter
+        from setpoint import SetpointChannel
+        from telemetry import TelemetryRing
+
+        if hardware is None:
+            hardware = SimulatedHardware.from_files(self.CONST_AIRFRAMES_PATH, Quadcopter.CONST_AIRFRAME, self.CONST_MOTOR_PINS_PATH)
+        self.hardware = hardware
+        self.setpoints = SetpointChannel()
+        self.telemetry = TelemetryRing(motors=len(hardware.body.names))
+        self.quadcopter = Quadcopter(self.setpoints, self.telemetry, attitude_estimator, hardware)
+        self.records = []
+
+    def get_hover_power(self) -> float:
+        """
+        This method returns the main power at which the quadcopter hovers.
+
+        :return: float | Main power (duty cycle in percent)
+        """
+        return 5 + 5 * self.hardware.body.get_hover_throttle()
+
+    def takeoff(self, altitude: float = 1, attitude: list = (0, 0)) -> None:
+        """
+        This method puts the quadcopter in the air with the hover power and clears its controllers and its attitude estimate,
+        so the same quadcopter can fly many times.
+
+        :param altitude: float | Altitude (m)
+        :param attitude: list | X and Y axis angles (degrees)
+        :return: None
+        """
+        quadcopter = self.quadcopter
+        self.hardware.reset(altitude, attitude)
+        quadcopter.attitude_estimator.reset()
+        quadcopter.attitude = [0, 0]
+        quadcopter.yaw_rate = 0
+        for pid in (quadcopter.x_pid, quadcopter.y_pid, quadcopter.yaw_pid):
+            pid.reset()
+        quadcopter.attitude_clock.restart()
+        quadcopter.control_clock.restart()
+        quadcopter.set_action(quadcopter.Action.STAY)
+        quadcopter.set_main_power(self.get_hover_power())
+
+    def record(self) -> None:
+        """
+        This method records the true and the estimated state.
+
+        :return: None
+        """
+        body = self.hardware.body
+        quadcopter = self.quadcopter
+        self.records.append((
+            self.hardware.time(),
+            *body.get_attitude(),
+            *quadcopter.attitude,
+            body.get_yaw_rate(),
+            body.position[2],
+            quadcopter.x_pid.setpoint,
+            quadcopter.y_pid.setpoint,
+            quadcopter.yaw_pid.setpoint,
+            *quadcopter.motors.get_powers(quadcopter.main_power).values()
+        ))
+
+    def send_commands(self, commands: list, start: float) -> None:
+        """
+        This method sends the commands that are due through the command channel (like the web interface does).
+
+        :param commands: list | Pending (time since the start, Quadcopter.Action value) pairs sorted by time, sent ones are removed
+        :param start: float | Virtual time of the start
+        :return: None
+        """
+        elapsed = self.hardware.time() - start
+        while commands and commands[0][0] <= elapsed:
+            self.setpoints.send_action(commands.pop(0)[1])
+
+    def run(self, duration: float, commands: list = None) -> dict:
+        """
+        This method flies the quadcopter (with its own flight tasks) for the given virtual time.
+
+        :param duration: float | Virtual time (seconds)
+        :param commands: list | (time since the start, Quadcopter.Action value) pairs to send during the flight
+        :return: dict | Recorded arrays (time, angles, estimates, yaw_rate, altitude, setpoints, powers) and the timing of the run
+        """
+        scheduler = self.quadcopter.create_scheduler(self.setpoints)
+        if commands:
+            pending = sorted(commands)
+            start = self.hardware.time()
+            scheduler.add_task('script', lambda: self.send_commands(pending, start), self.CONST_RECORD_FREQUENCY)
+        scheduler.add_task('record', self.record, self.CONST_RECORD_FREQUENCY)
+        self.quadcopter.scheduler = scheduler
+        self.records = []
+
+        physics_time = self.hardware.physics_time
+        start = process_time()
+        scheduler.run(duration)
+        cpu_time = process_time() - start
+        physics_time = self.hardware.physics_time - physics_time
+
+        records = np.array(self.records, dtype=float).reshape(-1, 10 + len(self.hardware.body.names))
+        control = scheduler.get_task('control')
+        return {
+            'time': records[:, 0],
+            'angles': records[:, 1:3],
+            'estimates': records[:, 3:5],
+            'yaw_rate': records[:, 5],
+            'altitude': records[:, 6],
+            'setpoints': records[:, 7:10],
+            'powers': records[:, 10:],
+            'duration': duration,
+            'cpu_time': cpu_time,
+            'physics_time': physics_time,
+            'control_runs': control.runs,
+            'control_cpu_time': (cpu_time - physics_time) / max(control.runs, 1),
+            'speedup': duration / cpu_time if cpu_time > 0 else math.inf
+        }
+
+    @staticmethod
+    def get_settling_time(time: np.ndarray, values: np.ndarray, target: float, band: float) -> float:
+        """
+        This method returns the time after which the values stay within the band around the target.
+
+        :param time: np.ndarray | Sample times
+        :param values: np.ndarray | Samples
+        :param target: float | Target value
+        :param band: float | Allowed absolute error
+        :return: float | Settling time (measured from the first sample), inf if the values do not settle
+        """
+        outside = np.flatnonzero(np.abs(values - target) > band)
+        if len(outside) == 0:
+            return 0.0
+        if outside[-1] == len(values) - 1:
+            return math.inf
+        return float(time[outside[-1] + 1] - time[0])
+
+    @staticmethod
+    def get_overshoot(values: np.ndarray, start: float, target: float) -> float:
+        """
+        This method returns how far the values went past the target (in the direction of the step).
+
+        :param values: np.ndarray | Samples
+        :param start: float | Value before the step
+        :param target: float | Target value
+        :return: float | Overshoot (0 - none)
+        """
+        if target >= start:
+            return max(0.0, float(np.max(values)) - target)
+        return max(0.0, target - float(np.min(values)))
+
+    def close(self) -> None:
+        """
+        This method stops the quadcopter and closes its channels.
+
+        :return: None
+        """
+        self.quadcopter = None
+        self.setpoints.close()
+        self.telemetry.close()
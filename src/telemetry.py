@@ -0,0 +1,231 @@
+"""This module shares the telemetry of the flight process with other processes through a ring buffer in shared memory."""
+
+import struct
+import numpy as np
+
+from shared_block import SharedBlock
+
+
+class TelemetryRing:
+    """
+    This class is a fixed-layout ring of telemetry records in shared memory with a single writer.
+    Every record carries its own sequence number (seqlock): odd while the record is being written,
+    2 * (record index + 1) once it is complete. Readers never lock; they drop records that were torn or overwritten.
+    """
+
+    CONST_MAX_MOTORS: int = 8
+    """Number of motor power slots in a record"""
+
+    CONST_HEADER_FORMAT: struct.Struct = struct.Struct('<QQQ')
+    """Header layout: capacity, number of motors, number of written records"""
+
+    CONST_HEADER_SIZE: int = 64
+    """Bytes reserved for the header"""
+
+    CONST_SEQUENCE_FORMAT: struct.Struct = struct.Struct('<Q')
+    """Layout of the record sequence number"""
+
+    CONST_PAYLOAD_FORMAT: struct.Struct = struct.Struct('<d8f2f2f')
+    """Record payload layout: timestamp, motor powers, X and Y angles, control time, control jitter"""
+
+    CONST_RECORD_DTYPE: np.dtype = np.dtype([
+        ('sequence', '<u8'),
+        ('timestamp', '<f8'),
+        ('powers', '<f4', (8,)),
+        ('angles', '<f4', (2,)),
+        ('control_time', '<f4'),
+        ('control_jitter', '<f4')
+    ])
+    """Record layout seen by the readers (the same bytes as sequence + payload)"""
+
+    block: SharedBlock = None
+    """Shared memory block"""
+
+    capacity: int = None
+    """Number of records in the ring"""
+
+    motors: int = None
+    """Number of motors"""
+
+    records: np.ndarray = None
+    """Zero-copy view of all records"""
+
+    padding: tuple = None
+    """Zeros filling the unused motor power slots"""
+
+    def __init__(self, capacity: int = 1024, motors: int = 4, name: str = None) -> None:
+        """
+        This constructor creates the ring in a new shared memory block.
+
+        :param capacity: int | Number of records in the ring
+        :param motors: int | Number of motors
+        :param name: str | Name of the shared memory block (None - random)
+        :return: None
+        """
+        if capacity <= 0:
+            raise ValueError('The capacity must be greater than 0.')
+        if not 0 < motors <= self.CONST_MAX_MOTORS:
+            raise ValueError('Wrong number of motors. ' + str(motors) + ' should be between 1 and ' + str(self.CONST_MAX_MOTORS) + '.')
+        size = self.CONST_HEADER_SIZE + capacity * self.CONST_RECORD_DTYPE.itemsize
+        self.block = SharedBlock(size, name)
+        self.CONST_HEADER_FORMAT.pack_into(self.block.get_buffer(), 0, capacity, motors, 0)
+        self.map()
+
+    @staticmethod
+    def attach(name: str):
+        """
+        This method opens a ring created by another process.
+
+        :param name: str | Name of the shared memory block
+        :return: TelemetryRing | Ring
+        """
+        ring = TelemetryRing.__new__(TelemetryRing)
+        ring.block = SharedBlock.attach(name)
+        ring.map()
+        return ring
+
+    def map(self) -> None:
+        """
+        This method reads the header and maps the records.
+
+        :return: None
+        """
+        buffer = self.block.get_buffer()
+        self.capacity, self.motors, head = self.CONST_HEADER_FORMAT.unpack_from(buffer, 0)
+        self.records = np.ndarray((self.capacity,), dtype=self.CONST_RECORD_DTYPE, buffer=buffer, offset=self.CONST_HEADER_SIZE)
+        self.padding = (0.0,) * (self.CONST_MAX_MOTORS - self.motors)
+
+    def __getstate__(self) -> dict:
+        """
+        This method pickles the ring as the name of its shared memory block.
+
+        :return: dict | State
+        """
+        return {'name': self.block.get_name()}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method attaches to the shared memory block after unpickling.
+
+        :param state: dict | State
+        :return: None
+        """
+        self.__dict__.update(TelemetryRing.attach(state['name']).__dict__)
+
+    def get_name(self) -> str:
+        """
+        This method returns the name of the shared memory block.
+
+        :return: str | Name
+        """
+        return self.block.get_name()
+
+    def get_head(self) -> int:
+        """
+        This method returns the number of records written so far.
+
+        :return: int | Number of records
+        """
+        return self.CONST_HEADER_FORMAT.unpack_from(self.block.get_buffer(), 0)[2]
+
+    def write(self, timestamp: float, powers: list, angles: list, control_time: float = 0, control_jitter: float = 0) -> None:
+        """
+        This method appends a record (single writer only).
+
+        :param timestamp: float | Time of the record (seconds)
+        :param powers: list | Power of every motor
+        :param angles: list | X and Y axis angles
+        :param control_time: float | Duration of the last control tick (seconds)
+        :param control_jitter: float | Start delay of the last control tick (seconds)
+        :return: None
+        """
+        buffer = self.block.get_buffer()
+        head = self.CONST_HEADER_FORMAT.unpack_from(buffer, 0)[2]
+        offset = self.CONST_HEADER_SIZE + (head % self.capacity) * self.CONST_RECORD_DTYPE.itemsize
+        self.CONST_SEQUENCE_FORMAT.pack_into(buffer, offset, 2 * head + 1)
+        self.CONST_PAYLOAD_FORMAT.pack_into(
+            buffer, offset + 8, timestamp, *powers, *self.padding, angles[0], angles[1], control_time, control_jitter
+        )
+        self.CONST_SEQUENCE_FORMAT.pack_into(buffer, offset, 2 * head + 2)
+        self.CONST_HEADER_FORMAT.pack_into(buffer, 0, self.capacity, self.motors, head + 1)
+
+    def latest(self, count: int = 1) -> np.ndarray:
+        """
+        This method returns the latest records, oldest first. The result is a zero-copy view unless it wraps
+        around the end of the ring; a view keeps changing once the writer comes round again,
+        so take the head with get_head(), the view with get_records() and check it with is_valid() after reading it
+        (or use snapshot()) when that matters.
+
+        :param count: int | Maximum number of records
+        :return: np.ndarray | Records
+        """
+        return self.get_records(self.get_head(), count)
+
+    def get_records(self, head: int, count: int) -> np.ndarray:
+        """
+        This method returns the records written before the given head, oldest first (a view when they do not wrap).
+
+        :param head: int | Number of written records
+        :param count: int | Maximum number of records
+        :return: np.ndarray | Records
+        """
+        count = min(count, head, self.capacity - 1)
+        if count <= 0:
+            return self.records[:0]
+        start = (head - count) % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            return self.records[start:end]
+        return np.concatenate((self.records[start:], self.records[:end - self.capacity]))
+
+    def snapshot(self, count: int = 1, head: int = None) -> np.ndarray:
+        """
+        This method returns a consistent copy of the latest records, oldest first. Torn or overwritten records are dropped.
+
+        :param count: int | Maximum number of records
+        :param head: int | Number of written records to read up to (None - all written records)
+        :return: np.ndarray | Records
+        """
+        if head is None:
+            head = self.get_head()
+        records = np.array(self.get_records(head, count), copy=True)
+        return records[self.is_valid(records, head)]
+
+    def is_valid(self, records: np.ndarray, head: int) -> np.ndarray:
+        """
+        This method checks which records are complete and were not overwritten while they were read (seqlock read).
+        Call it after the records have been read: a record passes only if its sequence number is the expected one
+        and the writer has not reached its slot since, so a record copied while the writer lapped it is dropped
+        even when its copied sequence number is still the old one.
+
+        :param records: np.ndarray | Records returned by get_records(head, count) (or a copy of them)
+        :param head: int | Number of written records the records were taken with
+        :return: np.ndarray | Boolean mask
+        """
+        first = head - len(records)
+        valid = records['sequence'] == 2 * np.arange(first + 1, head + 1, dtype=np.uint64)
+        # the writer stores record get_head() into the slot of record get_head() - capacity
+        overwritten = self.get_head() - self.capacity + 1 - first
+        if overwritten > 0:
+            valid[:overwritten] = False
+        return valid
+
+    def get_powers(self) -> dict:
+        """
+        This method returns the power of every motor from the latest record.
+
+        :return: dict | Dictionary of motors power
+        """
+        records = self.snapshot(1)
+        if len(records) == 0:
+            return {index: 0.0 for index in range(self.motors)}
+        return {index: float(power) for index, power in enumerate(records[0]['powers'][:self.motors])}
+
+    def close(self) -> None:
+        """
+        This method closes the shared memory (and removes it if this object created it).
+
+        :return: None
+        """
+        self.records = None
+        self.block.close()
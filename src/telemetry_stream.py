@@ -0,0 +1,248 @@
+"""This module pushes the telemetry ring to web clients as compact binary frames."""
+
+import struct
+from time import monotonic
+
+import numpy as np
+
+from telemetry import TelemetryRing
+
+
+class TelemetrySubscriber:
+    """
+    This class keeps the subscription of a single client.
+    """
+
+    sid: str = None
+    """Client identifier"""
+
+    period: float = None
+    """Time (seconds) between frames"""
+
+    batch: int = None
+    """Maximum number of samples in a frame"""
+
+    next_time: float = 0
+    """Time of the next frame"""
+
+    head: int = 0
+    """Number of ring records the client has been sent or has skipped"""
+
+    sent_time: float = None
+    """Time the unacknowledged frame was sent (None - no frame in flight)"""
+
+    frames: int = 0
+    """Number of frames sent"""
+
+    dropped: int = 0
+    """Number of frames dropped because the previous one was not acknowledged yet"""
+
+    def __init__(self, sid: str, rate: float, batch: int, head: int) -> None:
+        """
+        This constructor sets the subscription.
+
+        :param sid: str | Client identifier
+        :param rate: float | Frames per second
+        :param batch: int | Maximum number of samples in a frame
+        :param head: int | Number of ring records written so far (older ones are not sent)
+        :return: None
+        """
+        self.sid = sid
+        self.period = 1 / rate
+        self.batch = batch
+        self.head = head
+        self.next_time = 0
+        self.sent_time = None
+        self.frames = 0
+        self.dropped = 0
+
+
+class TelemetryStream:
+    """
+    This class sends the new telemetry records to every subscribed client at its own rate, several samples per frame.
+    A client acknowledges each frame; while a frame is unacknowledged the client's next frames are dropped (and their samples skipped),
+    so a slow client never builds up a queue that delays the others. Clients that get the same records share one encoded frame.
+
+    Frame layout (little endian): version (u8), number of motors (u8), number of samples (u16), number of the first sample (u32),
+    then every sample: timestamp (f64), power of every motor (f32), X and Y angles (f32).
+    """
+
+    CONST_VERSION: int = 1
+    """Frame format version"""
+
+    CONST_HEADER_FORMAT: struct.Struct = struct.Struct('<BBHI')
+    """Frame header layout"""
+
+    CONST_MAX_RATE: float = 50
+    """Highest number of frames per second a client can subscribe to"""
+
+    CONST_MAX_BATCH: int = 64
+    """Highest number of samples in a frame"""
+
+    CONST_ACK_TIMEOUT: float = 1
+    """Time (seconds) after which an unacknowledged frame counts as lost"""
+
+    CONST_IDLE_PERIOD: float = 0.1
+    """Time (seconds) between checks when no client is subscribed"""
+
+    ring: TelemetryRing = None
+    """Telemetry ring of the flight process"""
+
+    send = None
+    """Function sending a frame: send(sid, data, callback), the callback is called when the client acknowledges the frame"""
+
+    time = None
+    """Function returning the current time in seconds"""
+
+    subscribers: dict = None
+    """Client identifier -> TelemetrySubscriber"""
+
+    sample_dtype: np.dtype = None
+    """Layout of a sample in a frame"""
+
+    running: bool = False
+    """Keeps information whether the stream loop is running"""
+
+    def __init__(self, ring: TelemetryRing, send, time=monotonic) -> None:
+        """
+        This constructor sets the ring and the function sending the frames.
+
+        :param ring: TelemetryRing | Telemetry ring of the flight process
+        :param send: Callable | Function sending a frame: send(sid, data, callback)
+        :param time: Callable | Function returning the current time in seconds
+        :return: None
+        """
+        self.ring = ring
+        self.send = send
+        self.time = time
+        self.subscribers = {}
+        self.sample_dtype = TelemetryStream.get_sample_dtype(ring.motors)
+        self.running = False
+
+    @staticmethod
+    def get_sample_dtype(motors: int) -> np.dtype:
+        """
+        This method returns the layout of a sample in a frame.
+
+        :param motors: int | Number of motors
+        :return: np.dtype | Sample type
+        """
+        return np.dtype([('timestamp', '<f8'), ('powers', '<f4', (motors,)), ('angles', '<f4', (2,))])
+
+    def subscribe(self, sid: str, rate: float = 50, batch: int = 8) -> TelemetrySubscriber:
+        """
+        This method starts (or changes) the subscription of a client.
+
+        :param sid: str | Client identifier
+        :param rate: float | Frames per second (limited to 0.1 - CONST_MAX_RATE)
+        :param batch: int | Maximum number of samples in a frame (limited to 1 - CONST_MAX_BATCH)
+        :return: TelemetrySubscriber | Subscription
+        """
+        rate = min(max(float(rate), 0.1), self.CONST_MAX_RATE)
+        batch = min(max(int(batch), 1), self.CONST_MAX_BATCH)
+        subscriber = TelemetrySubscriber(sid, rate, batch, self.ring.get_head())
+        self.subscribers[sid] = subscriber
+        return subscriber
+
+    def unsubscribe(self, sid: str) -> None:
+        """
+        This method ends the subscription of a client.
+
+        :param sid: str | Client identifier
+        :return: None
+        """
+        self.subscribers.pop(sid, None)
+
+    def acknowledge(self, sid: str) -> None:
+        """
+        This method lets the client get its next frame.
+
+        :param sid: str | Client identifier
+        :return: None
+        """
+        subscriber = self.subscribers.get(sid)
+        if subscriber is not None:
+            subscriber.sent_time = None
+
+    def encode(self, records: np.ndarray, first: int) -> bytes:
+        """
+        This method packs the records into a frame.
+
+        :param records: np.ndarray | Telemetry ring records
+        :param first: int | Number of the first record
+        :return: bytes | Frame
+        """
+        return TelemetryStream.pack(records, self.ring.motors, first, self.sample_dtype)
+
+    @staticmethod
+    def pack(records: np.ndarray, motors: int, first: int, sample_dtype: np.dtype = None) -> bytes:
+        """
+        This method packs telemetry ring records into a frame.
+
+        :param records: np.ndarray | Telemetry ring records
+        :param motors: int | Number of motors
+        :param first: int | Number of the first record
+        :param sample_dtype: np.dtype | Layout of a sample (None - get_sample_dtype(motors))
+        :return: bytes | Frame
+        """
+        samples = np.empty(len(records), dtype=sample_dtype if sample_dtype is not None else TelemetryStream.get_sample_dtype(motors))
+        samples['timestamp'] = records['timestamp']
+        samples['powers'] = records['powers'][:, :motors]
+        samples['angles'] = records['angles']
+        return TelemetryStream.CONST_HEADER_FORMAT.pack(TelemetryStream.CONST_VERSION, motors, len(samples), first & 0xffffffff) + samples.tobytes()
+
+    def tick(self) -> float:
+        """
+        This method sends a frame to every client that is due.
+
+        :return: float | Time (seconds) until the next client is due
+        """
+        now = self.time()
+        head = self.ring.get_head()
+        frames = {}
+        wait = self.CONST_IDLE_PERIOD
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.next_time <= now:
+                subscriber.next_time = max(subscriber.next_time + subscriber.period, now)
+                if subscriber.sent_time is not None and now - subscriber.sent_time < self.CONST_ACK_TIMEOUT:
+                    subscriber.dropped += 1
+                    subscriber.head = head
+                elif subscriber.head < head:
+                    count = min(head - subscriber.head, subscriber.batch)
+                    frame = frames.get((head, count))
+                    if frame is None:
+                        records = self.ring.snapshot(count, head)
+                        frame = frames[(head, count)] = self.encode(records, head - len(records))
+                    subscriber.head = head
+                    subscriber.sent_time = now
+                    subscriber.frames += 1
+                    self.send(subscriber.sid, frame, lambda *arguments, sid=subscriber.sid: self.acknowledge(sid))
+            wait = min(wait, subscriber.next_time - now)
+        return max(wait, 0)
+
+    def run(self, sleep) -> None:
+        """
+        This method sends the frames until stop() is called.
+
+        :param sleep: Callable | Function waiting the given number of seconds (e.g. SocketIO.sleep)
+        :return: None
+        """
+        self.running = True
+        while self.running:
+            sleep(self.tick())
+
+    def stop(self) -> None:
+        """
+        This method stops the stream loop.
+
+        :return: None
+        """
+        self.running = False
+
+    def get_counters(self) -> dict:
+        """
+        This method returns the frame counters of every client.
+
+        :return: dict | Client identifier -> {'frames': sent frames, 'dropped': dropped frames}
+        """
+        return {sid: {'frames': x.frames, 'dropped': x.dropped} for sid, x in self.subscribers.items()}
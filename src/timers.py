@@ -1,13 +1,15 @@
 """This module contains time functions."""
 
-from typing import TypeVar
+import math
+from typing import Callable, TypeVar
 from enum import Enum
-from time import sleep, time
-from typing import TypeVar
+from time import sleep, monotonic, monotonic_ns
 
 
 ClockObject = TypeVar('ClockObject', bound='Clock')
 
+PreciseLoopRateObject = TypeVar('PreciseLoopRateObject', bound='PreciseLoopRate')
+
 TimeConverterObject = TypeVar('TimeConverterObject', bound='TimeConverter')
 
 
@@ -80,19 +82,24 @@ class Clock:
     This class measures the elapsed time.
     """
 
-    time_start_point: time = None
+    time_start_point: float = None
     """Stores the time from which the class measures the elapsed time."""
 
     run: bool = True
     """Keeps information whether the clock is running."""
 
-    def __init__(self) -> None:
+    time_source: Callable = None
+    """Function returning the current time in seconds."""
+
+    def __init__(self, time_source: Callable = monotonic) -> None:
         """
         This constructor sets the time from which the class measures the elapsed time.
         
+        :param time_source: Callable | Function returning the current time in seconds (monotonic, NTP does not step it; e.g. a simulated clock)
         :return: None
         """
-        self.time_start_point = time()
+        self.time_source = time_source
+        self.time_start_point = self.time_source()
 
     def get_elapsed_time(self) -> TimeConverter:
         """
@@ -100,7 +107,7 @@ class Clock:
 
         :return: TimeConverter | Elapsed time
         """
-        return TimeConverter(time() - self.time_start_point)
+        return TimeConverter(self.time_source() - self.time_start_point)
 
     def restart(self) -> TimeConverter:
         """
@@ -108,8 +115,28 @@ class Clock:
 
         :return: TimeConverter | Elapsed time
         """
-        elapsed = TimeConverter(time() - self.time_start_point)
-        self.time_start_point = time()
+        now = self.time_source()
+        elapsed = TimeConverter(now - self.time_start_point)
+        self.time_start_point = now
+        return elapsed
+
+    def get_elapsed_seconds(self) -> float:
+        """
+        This method returns the elapsed time without creating a TimeConverter (for the hot path).
+
+        :return: float | Elapsed time in seconds
+        """
+        return self.time_source() - self.time_start_point
+
+    def restart_seconds(self) -> float:
+        """
+        This method returns the elapsed time and restarts the clock without creating a TimeConverter (for the hot path).
+
+        :return: float | Elapsed time in seconds
+        """
+        now = self.time_source()
+        elapsed = now - self.time_start_point
+        self.time_start_point = now
         return elapsed
 
 
@@ -151,10 +178,240 @@ class LoopRate:
 
     def slow_loop(self) -> None:
         """
-        This method puts the loop to sleep if it is too fast.
+        This method puts the loop to sleep if it is too fast. It reads the clock once: the next period starts where this one ends,
+        so the sleep error does not add up; a late loop starts the next period now instead of catching up with a burst.
+
+        :return: None
+        """
+        clock = self.clock
+        elapsed = clock.get_elapsed_seconds()
+        if elapsed < self.period:
+            sleep(self.period - elapsed)
+            clock.time_start_point += self.period
+        else:
+            clock.time_start_point += elapsed
+
+
+class PreciseClock:
+    """
+    This class measures the elapsed time in integer nanoseconds of the monotonic clock (no rounding, no allocation of objects).
+    """
+
+    time_start_point: int = None
+    """Stores the time (ns) from which the class measures the elapsed time."""
+
+    time_source: Callable = None
+    """Function returning the current time in nanoseconds."""
+
+    def __init__(self, time_source: Callable = monotonic_ns) -> None:
+        """
+        This constructor sets the time from which the class measures the elapsed time.
 
+        :param time_source: Callable | Function returning the current monotonic time in nanoseconds
         :return: None
         """
-        if self.clock.get_elapsed_time().as_seconds() < self.period:
-            sleep(self.period - self.clock.get_elapsed_time().as_seconds())
-        self.clock.restart()
+        self.time_source = time_source
+        self.time_start_point = time_source()
+
+    def get_elapsed_ns(self) -> int:
+        """
+        This method returns the elapsed time.
+
+        :return: int | Elapsed time in nanoseconds
+        """
+        return self.time_source() - self.time_start_point
+
+    def get_elapsed_seconds(self) -> float:
+        """
+        This method returns the elapsed time.
+
+        :return: float | Elapsed time in seconds
+        """
+        return (self.time_source() - self.time_start_point) * 1e-9
+
+    def restart_ns(self) -> int:
+        """
+        This method returns the elapsed time and restarts the clock.
+
+        :return: int | Elapsed time in nanoseconds
+        """
+        now = self.time_source()
+        elapsed = now - self.time_start_point
+        self.time_start_point = now
+        return elapsed
+
+    def restart_seconds(self) -> float:
+        """
+        This method returns the elapsed time and restarts the clock.
+
+        :return: float | Elapsed time in seconds
+        """
+        return self.restart_ns() * 1e-9
+
+
+class PreciseLoopRate:
+    """
+    This class paces a loop against absolute deadlines (origin + n * period in nanoseconds), so a late iteration does not shift
+    the following ones and the error does not accumulate. It waits with a hybrid sleep-then-spin: it sleeps until the spin budget
+    before the deadline (the system may wake it up late by up to a few hundred microseconds) and spins on the clock for the rest.
+    Every wait measures how late the loop was woken up.
+    """
+
+    CONST_SPIN: float = 0.0002
+    """Default spin budget (seconds)"""
+
+    frequency: float = None
+    """Loop frequency."""
+
+    period_ns: int = None
+    """Loop period (ns)."""
+
+    spin_ns: int = None
+    """Time (ns) before the deadline after which the wait spins instead of sleeping."""
+
+    origin: int = None
+    """Time (ns) from which the deadlines are counted."""
+
+    ticks: int = 0
+    """Number of the next deadline."""
+
+    time_source: Callable = None
+    """Function returning the current monotonic time in nanoseconds."""
+
+    sleep_function: Callable = None
+    """Function sleeping the given number of seconds."""
+
+    runs: int = 0
+    """Number of waits."""
+
+    overruns: int = 0
+    """Number of waits that ended a period or more after their deadline."""
+
+    skipped: int = 0
+    """Number of deadlines skipped because the loop fell behind."""
+
+    jitter_sum: int = 0
+    """Sum of the wake-up delays (ns)."""
+
+    jitter_squares: int = 0
+    """Sum of the squared wake-up delays (ns^2)."""
+
+    jitter_max: int = 0
+    """Largest wake-up delay (ns)."""
+
+    def __init__(self, frequency: float, spin: float = CONST_SPIN, time_source: Callable = monotonic_ns, sleep_function: Callable = sleep) -> None:
+        """
+        This constructor sets the loop frequency and starts counting the deadlines from now.
+
+        :param frequency: float | Loop frequency
+        :param spin: float | Spin budget (seconds, 0 - sleep only)
+        :param time_source: Callable | Function returning the current monotonic time in nanoseconds
+        :param sleep_function: Callable | Function sleeping the given number of seconds
+        :return: None
+        """
+        if spin < 0:
+            raise ValueError("The spin budget cannot be negative.")
+        self.time_source = time_source
+        self.sleep_function = sleep_function
+        self.spin_ns = int(spin * 1e9)
+        self.set_frequency(frequency)
+
+    def set_frequency(self, frequency: float) -> None:
+        """
+        This method sets the loop frequency and starts counting the deadlines from now.
+
+        :param frequency: float | Loop frequency
+        :return: None
+        """
+        if frequency <= 0:
+            raise ValueError("The frequency must be greater than 0.")
+        self.frequency = frequency
+        self.period_ns = max(1, round(1e9 / frequency))
+        self.reset()
+
+    def reset(self) -> PreciseLoopRateObject:
+        """
+        This method clears the statistics and starts counting the deadlines from now.
+
+        :return: self
+        """
+        self.origin = self.time_source()
+        self.ticks = 1
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.jitter_sum = 0
+        self.jitter_squares = 0
+        self.jitter_max = 0
+        return self
+
+    def wait_until(self, deadline: int) -> int:
+        """
+        This method waits until the deadline with the spin budget of the loop.
+
+        :param deadline: int | Monotonic time (ns)
+        :return: int | Monotonic time (ns) after the wait
+        """
+        return PreciseLoopRate.sleep_until(deadline, self.spin_ns, self.time_source, self.sleep_function)
+
+    @staticmethod
+    def sleep_until(deadline: int, spin_ns: int, time_source: Callable = monotonic_ns, sleep_function: Callable = sleep) -> int:
+        """
+        This method sleeps until the spin budget before the deadline and spins for the rest.
+
+        :param deadline: int | Monotonic time (ns)
+        :param spin_ns: int | Spin budget (ns)
+        :param time_source: Callable | Function returning the current monotonic time in nanoseconds
+        :param sleep_function: Callable | Function sleeping the given number of seconds
+        :return: int | Monotonic time (ns) after the wait
+        """
+        remaining = deadline - time_source()
+        if remaining > spin_ns:
+            sleep_function((remaining - spin_ns) * 1e-9)
+        now = time_source()
+        while now < deadline:
+            now = time_source()
+        return now
+
+    def wait(self) -> int:
+        """
+        This method waits for the next deadline and records how late it woke up. Deadlines that have already passed by a whole period are skipped.
+
+        :return: int | Wake-up delay (ns)
+        """
+        period = self.period_ns
+        deadline = self.origin + self.ticks * period
+        now = self.wait_until(deadline)
+        jitter = now - deadline
+
+        self.runs += 1
+        self.jitter_sum += jitter
+        self.jitter_squares += jitter * jitter
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+        self.ticks += 1
+        if jitter >= period:
+            self.overruns += 1
+            missed = (now - self.origin) // period + 1 - self.ticks
+            self.skipped += missed
+            self.ticks += missed
+        return jitter
+
+    def get_statistics(self) -> dict:
+        """
+        This method returns the measured timing statistics.
+
+        :return: dict | Frequency, runs, overruns, skipped deadlines, mean, standard deviation and max wake-up delay (seconds)
+        """
+        runs = self.runs
+        mean = self.jitter_sum / runs if runs else 0
+        variance = self.jitter_squares / runs - mean * mean if runs else 0
+        return {
+            'frequency': self.frequency,
+            'runs': runs,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'jitter_mean': mean * 1e-9,
+            'jitter_std': math.sqrt(max(variance, 0)) * 1e-9,
+            'jitter_max': self.jitter_max * 1e-9
+        }
@@ -0,0 +1,496 @@
+"""This module tunes the flight parameters by flying many simulated flights in parallel (run it from the src directory)."""
+
+import argparse
+import os
+import numpy as np
+from multiprocessing import Pool, util
+from time import perf_counter
+
+from config import TuningConfig
+from file_reader import FileReader
+from simulator import Simulation
+
+
+class DisturbanceProfile:
+    """
+    This class is a scripted flight: disturbance torques (constant segments and/or a recorded series) and commands sent during the flight.
+    """
+
+    name: str = None
+    """Profile name"""
+
+    duration: float = None
+    """Flight time (seconds)"""
+
+    torques: list = None
+    """Constant torque segments: (start, end, X, Y, Z torque in N*m)"""
+
+    start: float = 0
+    """Time (seconds) at which the recorded series starts"""
+
+    sample_period: float = None
+    """Time (seconds) between the samples of the recorded series"""
+
+    samples: np.ndarray = None
+    """Recorded (N, 3) torque series in N*m"""
+
+    actions: list = None
+    """Commands: (time, Quadcopter.Action name)"""
+
+    def __init__(self, name: str, duration: float, torques: list = (), actions: list = (), samples: list = (), sample_period: float = 0.02, start: float = 0) -> None:
+        """
+        This constructor sets the profile.
+
+        :param name: str | Profile name
+        :param duration: float | Flight time (seconds)
+        :param torques: list | Constant torque segments: (start, end, X, Y, Z torque in N*m)
+        :param actions: list | Commands: (time, Quadcopter.Action name)
+        :param samples: list | Recorded (N, 3) torque series in N*m
+        :param sample_period: float | Time (seconds) between the samples of the recorded series
+        :param start: float | Time (seconds) at which the recorded series starts
+        :return: None
+        """
+        if duration <= 0 or sample_period <= 0:
+            raise ValueError('The duration and the sample period must be greater than 0.')
+        self.name = name
+        self.duration = duration
+        self.torques = [tuple(x) for x in torques]
+        self.actions = sorted(tuple(x) for x in actions)
+        self.samples = np.array(samples, dtype=float).reshape(-1, 3)
+        self.sample_period = sample_period
+        self.start = start
+
+    @staticmethod
+    def load(path: str) -> list:
+        """
+        This method reads the profiles from a file.
+
+        :param path: str | Path to the profiles file
+        :return: list | Profiles
+        """
+        profiles = FileReader('profiles', path).get_data('profiles')
+        return [DisturbanceProfile(name, **profile) for name, profile in profiles.items()]
+
+    def get_torque(self, time: float) -> tuple:
+        """
+        This method returns the disturbance at the given time.
+
+        :param time: float | Time since the start of the flight (seconds)
+        :return: tuple | X, Y and Z torque in N*m or None
+        """
+        torque = None
+        for start, end, x, y, z in self.torques:
+            if start <= time < end:
+                torque = (x, y, z)
+        index = int((time - self.start) // self.sample_period)
+        if 0 <= index < len(self.samples):
+            sample = self.samples[index]
+            torque = tuple(sample) if torque is None else (torque[0] + sample[0], torque[1] + sample[1], torque[2] + sample[2])
+        return torque
+
+    def get_commands(self) -> list:
+        """
+        This method returns the commands in the form taken by Simulation.run.
+
+        :return: list | (time, Quadcopter.Action value) pairs
+        """
+        from quadcopter import Quadcopter
+        return [(time, Quadcopter.Action[action].value) for time, action in self.actions]
+
+    def get_events(self) -> list:
+        """
+        This method returns the times after which the quadcopter has to settle again (the start, commands and the end of every disturbance).
+
+        :return: list | Sorted times (seconds)
+        """
+        events = {0.0}
+        events.update(time for time, action in self.actions)
+        events.update(end for start, end, x, y, z in self.torques)
+        if len(self.samples):
+            events.add(self.start + len(self.samples) * self.sample_period)
+        return sorted(x for x in events if x < self.duration)
+
+
+class Tuner:
+    """
+    This class flies parameter sets against disturbance profiles across a process pool and searches for the best set.
+    Every worker arms one simulated quadcopter once and reuses it for all of its flights, so the workers share nothing
+    and the throughput grows with the number of cores.
+    """
+
+    CONST_PARAMETER_NAMES: tuple = (
+        'x_kp', 'x_ki', 'x_kd',
+        'y_kp', 'y_ki', 'y_kd',
+        'yaw_kp', 'yaw_ki', 'yaw_kd',
+        'max_delta', 'tilt_angle', 'yaw_rate'
+    )
+    """Tuned parameters (the values of config.TuningConfig)"""
+
+    CONST_BOUNDS: np.ndarray = np.array([
+        [0, 0.2], [0, 0.2], [0, 0.05],
+        [0, 0.2], [0, 0.2], [0, 0.05],
+        [0, 0.1], [0, 0.05], [0, 0.01],
+        [0.5, 3], [5, 30], [30, 180]
+    ])
+    """Lower and upper bound of every parameter"""
+
+    CONST_METRIC_NAMES: tuple = ('overshoot', 'settling_time', 'peak_error', 'rms_error', 'saturation', 'crashed', 'score')
+    """Scores of a flight"""
+
+    CONST_WEIGHTS: dict = {'overshoot': 1, 'settling_time': 1, 'peak_error': 0.05, 'rms_error': 0.2, 'saturation': 2, 'crashed': 100}
+    """Weights of the metrics in the score (lower is better)"""
+
+    CONST_BANDS: tuple = (2, 2, 10)
+    """Allowed error of the X angle, the Y angle (degrees) and the yaw rate (deg/s) of a settled quadcopter"""
+
+    CONST_PROFILES_PATH: str = '../data/disturbances.json'
+    """Path to the disturbance profiles"""
+
+    worker_simulation: Simulation = None
+    """Simulation of the current worker process"""
+
+    worker_profiles: list = None
+    """Profiles of the current worker process"""
+
+    profiles: list = None
+    """Disturbance profiles every parameter set flies"""
+
+    processes: int = None
+    """Number of worker processes"""
+
+    random: np.random.Generator = None
+    """Generator of parameter sets and sensor noise seeds"""
+
+    pool: Pool = None
+    """Worker processes"""
+
+    columns: dict = None
+    """Results of every flight, column name -> list of arrays"""
+
+    flights: int = 0
+    """Number of flights"""
+
+    def __init__(self, profiles: list = None, processes: int = None, seed: int = None) -> None:
+        """
+        This constructor sets the profiles and the pool size.
+
+        :param profiles: list | Disturbance profiles (None - every profile from the profiles file)
+        :param processes: int | Number of worker processes (None - number of cores)
+        :param seed: int | Seed of the search (None - random)
+        :return: None
+        """
+        self.profiles = profiles if profiles is not None else DisturbanceProfile.load(self.CONST_PROFILES_PATH)
+        if not self.profiles:
+            raise ValueError('At least one profile is needed.')
+        self.processes = processes
+        self.random = np.random.default_rng(seed)
+        self.columns = {}
+        self.flights = 0
+
+    def __enter__(self):
+        """
+        This method starts the worker processes.
+
+        :return: Tuner | self
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *exception) -> None:
+        """
+        This method stops the worker processes.
+
+        :return: None
+        """
+        self.close()
+
+    def start(self) -> None:
+        """
+        This method starts the worker processes (each of them arms its own simulated quadcopter).
+
+        :return: None
+        """
+        if self.pool is None:
+            self.pool = Pool(self.processes, initializer=Tuner.start_worker, initargs=(self.profiles,))
+
+    def close(self) -> None:
+        """
+        This method lets the workers finish and close their simulations.
+
+        :return: None
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    ##############
+    ### WORKER ###
+    ##############
+    @staticmethod
+    def start_worker(profiles: list) -> None:
+        """
+        This method prepares a worker process.
+
+        :param profiles: list | Disturbance profiles
+        :return: None
+        """
+        Tuner.worker_simulation = Simulation()
+        Tuner.worker_profiles = profiles
+        # closes the shared memory when the pool is closed
+        util.Finalize(Tuner.worker_simulation, Tuner.worker_simulation.close, exitpriority=10)
+
+    @staticmethod
+    def fly(task: tuple) -> tuple:
+        """
+        This method flies a parameter set against a profile in the worker process.
+
+        :param task: tuple | Flight index, parameters, profile index, sensor noise seed
+        :return: tuple | Flight index, metrics, CPU time
+        """
+        index, parameters, profile_index, seed = task
+        simulation = Tuner.worker_simulation
+        profile = Tuner.worker_profiles[profile_index]
+        hardware = simulation.hardware
+
+        Tuner.apply(simulation.quadcopter, parameters)
+        hardware.bus.random = np.random.default_rng(seed)
+        simulation.takeoff()
+        start = hardware.time()
+        hardware.disturbance = lambda time: profile.get_torque(time - start)
+        try:
+            result = simulation.run(profile.duration, profile.get_commands())
+        finally:
+            hardware.disturbance = None
+        return index, Tuner.score(result, profile, simulation.quadcopter.mixer), result['cpu_time']
+
+    @staticmethod
+    def apply(quadcopter, parameters: list) -> None:
+        """
+        This method sets the parameters on a quadcopter (and stops it from reloading its tuning file, which would replace them).
+
+        :param quadcopter: Quadcopter | Quadcopter
+        :param parameters: list | Values in the order of CONST_PARAMETER_NAMES
+        :return: None
+        """
+        x_kp, x_ki, x_kd, y_kp, y_ki, y_kd, yaw_kp, yaw_ki, yaw_kd, max_delta, tilt_angle, yaw_rate = [float(x) for x in parameters]
+        quadcopter.config = None
+        quadcopter.apply_tuning(TuningConfig((x_kp, x_ki, x_kd), (y_kp, y_ki, y_kd), (yaw_kp, yaw_ki, yaw_kd), max_delta, tilt_angle, yaw_rate))
+
+    @staticmethod
+    def get_parameters(quadcopter) -> np.ndarray:
+        """
+        This method reads the parameters of a quadcopter (or the default ones of the Quadcopter class).
+
+        :param quadcopter: Quadcopter | Quadcopter or the Quadcopter class
+        :return: np.ndarray | Values in the order of CONST_PARAMETER_NAMES
+        """
+        tuning = quadcopter.tuning if quadcopter.tuning is not None else quadcopter.get_default_tuning()
+        return np.array([
+            *tuning.x_pid_gains, *tuning.y_pid_gains, *tuning.yaw_pid_gains, tuning.max_delta, tuning.tilt_angle, tuning.yaw_rate
+        ], dtype=float)
+
+    @staticmethod
+    def score(result: dict, profile: DisturbanceProfile, mixer) -> tuple:
+        """
+        This method scores a flight. After every event of the profile the X angle, the Y angle and the yaw rate
+        have to settle within CONST_BANDS around their setpoints; a window that does not settle counts as its whole length.
+
+        :param result: dict | Result of Simulation.run
+        :param profile: DisturbanceProfile | Flown profile
+        :param mixer: Mixer | Mixer of the quadcopter (motor power limits)
+        :return: tuple | Values in the order of CONST_METRIC_NAMES
+        """
+        time = result['time'] - result['time'][0]
+        values = np.column_stack((result['angles'], result['yaw_rate']))
+        setpoints = result['setpoints']
+        errors = values - setpoints
+
+        # the commands reach the controllers a few ticks after they are sent
+        changes = np.flatnonzero(np.any(np.diff(setpoints, axis=0) != 0, axis=1)) + 1
+        events = sorted(set(np.searchsorted(time, profile.get_events()).tolist()) | set(changes.tolist()))
+        events.append(len(time))
+
+        overshoot = 0.0
+        settling_time = 0.0
+        for start, end in zip(events[:-1], events[1:]):
+            if end - start < 2:
+                continue
+            window = time[start:end]
+            for channel, band in enumerate(Tuner.CONST_BANDS):
+                target = setpoints[start, channel]
+                settled = Simulation.get_settling_time(window, values[start:end, channel], target, band)
+                settling_time = max(settling_time, min(settled, window[-1] - window[0]))
+                previous = setpoints[start - 1, channel] if start > 0 else target
+                if previous != target:
+                    step = abs(target - previous)
+                    overshoot = max(overshoot, Simulation.get_overshoot(values[start:end, channel], previous, target) / step)
+
+        angle_errors = errors[:, :2]
+        powers = result['powers']
+        saturated = np.any((powers <= mixer.min_power + 1e-9) | (powers >= mixer.max_power - 1e-9), axis=1)
+        metrics = {
+            'overshoot': overshoot,
+            'settling_time': settling_time,
+            'peak_error': float(np.max(np.abs(angle_errors))) if len(time) else 0.0,
+            'rms_error': float(np.sqrt(np.mean(angle_errors ** 2))) if len(time) else 0.0,
+            'saturation': float(np.mean(saturated)) if len(time) else 0.0,
+            'crashed': float(len(time) > 0 and np.min(result['altitude']) <= 0)
+        }
+        metrics['score'] = sum(weight * metrics[name] for name, weight in Tuner.CONST_WEIGHTS.items())
+        return tuple(metrics[name] for name in Tuner.CONST_METRIC_NAMES)
+
+    ##############
+    ### SEARCH ###
+    ##############
+    def evaluate(self, parameter_sets: np.ndarray) -> np.ndarray:
+        """
+        This method flies every parameter set against every profile and stores the results.
+
+        :param parameter_sets: np.ndarray | (N, number of parameters) array
+        :return: np.ndarray | Mean score of every parameter set
+        """
+        parameter_sets = np.atleast_2d(np.asarray(parameter_sets, dtype=float))
+        if parameter_sets.shape[1] != len(self.CONST_PARAMETER_NAMES):
+            raise ValueError('Every parameter set needs ' + str(len(self.CONST_PARAMETER_NAMES)) + ' values.')
+        self.start()
+
+        count = len(parameter_sets) * len(self.profiles)
+        seeds = self.random.integers(0, 2 ** 32, count, dtype=np.uint64)
+        tasks = [
+            (index, tuple(parameter_sets[index // len(self.profiles)]), index % len(self.profiles), int(seeds[index]))
+            for index in range(count)
+        ]
+        metrics = np.empty((count, len(self.CONST_METRIC_NAMES)))
+        cpu_time = np.empty(count)
+        chunk = max(1, count // (4 * (self.processes or os.cpu_count() or 1)))
+        for index, flight_metrics, flight_cpu_time in self.pool.imap_unordered(Tuner.fly, tasks, chunk):
+            metrics[index] = flight_metrics
+            cpu_time[index] = flight_cpu_time
+
+        profile_indexes = np.arange(count) % len(self.profiles)
+        self.add_columns(
+            run=np.arange(self.flights, self.flights + count, dtype=np.uint32),
+            profile=profile_indexes.astype(np.uint8),
+            seed=seeds.astype(np.uint32),
+            cpu_time=cpu_time.astype(np.float32),
+            **{name: np.repeat(parameter_sets[:, index], len(self.profiles)).astype(np.float32) for index, name in enumerate(self.CONST_PARAMETER_NAMES)},
+            **{name: metrics[:, index].astype(np.float32) for index, name in enumerate(self.CONST_METRIC_NAMES)}
+        )
+        self.flights += count
+        return metrics[:, -1].reshape(len(parameter_sets), len(self.profiles)).mean(axis=1)
+
+    def add_columns(self, **columns) -> None:
+        """
+        This method appends values to the result columns.
+
+        :param columns: dict | Column name -> values
+        :return: None
+        """
+        for name, values in columns.items():
+            self.columns.setdefault(name, []).append(values)
+
+    def sample(self, count: int) -> np.ndarray:
+        """
+        This method draws parameter sets uniformly within the bounds.
+
+        :param count: int | Number of parameter sets
+        :return: np.ndarray | (count, number of parameters) array
+        """
+        return self.random.uniform(self.CONST_BOUNDS[:, 0], self.CONST_BOUNDS[:, 1], (count, len(self.CONST_BOUNDS)))
+
+    def refine(self, centers: np.ndarray, count: int, radius: float) -> np.ndarray:
+        """
+        This method draws parameter sets around the given ones (normal distribution, clipped to the bounds).
+
+        :param centers: np.ndarray | (M, number of parameters) array
+        :param count: int | Number of parameter sets
+        :param radius: float | Standard deviation as a part of the bounds width
+        :return: np.ndarray | (count, number of parameters) array
+        """
+        width = self.CONST_BOUNDS[:, 1] - self.CONST_BOUNDS[:, 0]
+        parameter_sets = centers[self.random.integers(0, len(centers), count)] + self.random.normal(0, radius, (count, len(width))) * width
+        return np.clip(parameter_sets, self.CONST_BOUNDS[:, 0], self.CONST_BOUNDS[:, 1])
+
+    def optimize(self, samples: int = 200, rounds: int = 3, top: int = 10, initial: np.ndarray = None) -> tuple:
+        """
+        This method searches for the parameters with the lowest score: a random search, then rounds of sampling
+        around the best sets with a shrinking radius.
+
+        :param samples: int | Number of parameter sets in every round
+        :param rounds: int | Number of refining rounds
+        :param top: int | Number of the best sets sampled around
+        :param initial: np.ndarray | Parameter sets flown in the first round as well (e.g. the current parameters)
+        :return: tuple | Best parameters, best score
+        """
+        parameter_sets = self.sample(samples)
+        if initial is not None:
+            parameter_sets = np.vstack((np.atleast_2d(initial), parameter_sets))
+        scores = self.evaluate(parameter_sets)
+        radius = 0.1
+        for x in range(rounds):
+            best = parameter_sets[np.argsort(scores)[:top]]
+            candidates = self.refine(best, samples, radius)
+            candidate_scores = self.evaluate(candidates)
+            parameter_sets = np.vstack((best, candidates))
+            scores = np.concatenate((np.sort(scores)[:top], candidate_scores))
+            radius /= 2
+        index = int(np.argmin(scores))
+        return parameter_sets[index], float(scores[index])
+
+    def get_results(self) -> dict:
+        """
+        This method returns the results of every flight.
+
+        :return: dict | Column name -> array
+        """
+        return {name: np.concatenate(values) for name, values in self.columns.items()}
+
+    def save(self, path: str) -> None:
+        """
+        This method writes the results as a compressed columnar file (one array per column).
+
+        :param path: str | Path to the .npz file
+        :return: None
+        """
+        np.savez_compressed(path, profile_names=np.array([x.name for x in self.profiles]), **self.get_results())
+
+    @staticmethod
+    def load(path: str) -> dict:
+        """
+        This method reads results written by save().
+
+        :param path: str | Path to the .npz file
+        :return: dict | Column name -> array
+        """
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tunes the flight parameters in the simulator.')
+    parser.add_argument('--samples', type=int, default=200, help='parameter sets in every round')
+    parser.add_argument('--rounds', type=int, default=3, help='refining rounds')
+    parser.add_argument('--top', type=int, default=10, help='best sets sampled around')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: number of cores)')
+    parser.add_argument('--profiles', nargs='*', default=None, help='profile names (default: all)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='tuning.npz')
+    arguments = parser.parse_args()
+
+    from quadcopter import Quadcopter
+
+    profiles = DisturbanceProfile.load(Tuner.CONST_PROFILES_PATH)
+    if arguments.profiles:
+        profiles = [x for x in profiles if x.name in arguments.profiles]
+    with Tuner(profiles, arguments.processes, arguments.seed) as tuner:
+        begin = perf_counter()
+        parameters, score = tuner.optimize(arguments.samples, arguments.rounds, arguments.top, Tuner.get_parameters(Quadcopter))
+        elapsed = perf_counter() - begin
+    tuner.save(arguments.output)
+
+    print('Flights: ' + str(tuner.flights) + ' in ' + str(round(elapsed, 1)) + ' s (' + str(round(tuner.flights / elapsed, 1)) + ' flights/s)')
+    print('Best score: ' + str(round(score, 4)))
+    for name, value in zip(Tuner.CONST_PARAMETER_NAMES, parameters):
+        print(name + ' = ' + str(round(float(value), 4)))
+    print('Results: ' + arguments.output)
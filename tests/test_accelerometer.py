@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+import numpy as np
+
+import import_from_root
+from src.accelerometer import Accelerometer
+from src.fake_hardware import FakeSMBus
+
+
+class TestAccelerometer(TestCase):
+    def test_burst_read(self):
+        bus = FakeSMBus()
+        bus.set_mpu6050_sample([8192, -8192, 16384], -340, [131, -262, 0])
+        acc = Accelerometer(bus=bus)
+        bus.transactions = 0
+        self.assertEqual(acc.read_raw(), (8192, -8192, 16384, -340, 131, -262, 0))
+        self.assertEqual(bus.transactions, 1)
+        self.assertEqual(acc.get_gyro(), [1.0, -2.0, 0.0])
+        self.assertAlmostEqual(acc.get_temperature(), 35.53)
+        accelerometer, temperature, gyro = acc.read_sample()
+        self.assertEqual(accelerometer, [0.5, -0.5, 1.0])
+        self.assertAlmostEqual(temperature, 35.53)
+        self.assertEqual(gyro, [1.0, -2.0, 0.0])
+
+    def test_run(self):
+        bus = FakeSMBus()
+        bus.set_mpu6050_sample([0, 11585, 11585])
+        burst = Accelerometer(bus=bus)
+        single = Accelerometer(burst=False, bus=bus)
+        bus.transactions = 0
+        angles = burst.run()
+        self.assertEqual(bus.transactions, 1)
+        self.assertEqual(single.run(), angles)
+        self.assertEqual(bus.transactions, 7)
+        self.assertAlmostEqual(angles[0], 45, 1)
+        self.assertAlmostEqual(angles[1], 0)
+
+    def test_stream(self):
+        bus = FakeSMBus()
+        acc = Accelerometer(bus=bus)
+        acc.start_stream(sample_rate_divider=3, dlpf=1)
+        self.assertEqual(Accelerometer.get_sample_rate(3, 1), 250)
+        self.assertTrue(acc.streaming)
+        bus.push_mpu6050_fifo([[0, 11585, 11585], [8192, 0, 14189], [0, 0, 16384]], [[131, 0, 0], [0, -131, 0], [0, 0, 262]])
+        accelerometer, gyro = acc.read_stream(max_samples=2)
+        self.assertEqual(accelerometer.shape, (2, 3))
+        self.assertEqual(gyro.tolist(), [[1.0, 0.0, 0.0], [0.0, -1.0, 0.0]])
+        angles = acc.run_stream()
+        self.assertEqual(angles.shape, (1, 2))
+        self.assertEqual(angles.tolist(), [[0.0, 0.0]])
+        self.assertEqual(acc.read_stream()[0].shape, (0, 3))
+        self.assertRaises(ValueError, acc.start_stream, 256)
+        self.assertRaises(ValueError, acc.start_stream, 0, 7)
+
+    def test_get_rotations(self):
+        samples = [[0.5, -0.2, 0.8], [0, 0.7, 0.7], [-0.3, 0.1, 0.9]]
+        angles = Accelerometer.get_rotations(np.array(samples))
+        for sample, angle in zip(samples, angles):
+            self.assertAlmostEqual(angle[0], Accelerometer.get_x_rotation(*sample))
+            self.assertAlmostEqual(angle[1], Accelerometer.get_y_rotation(*sample))
+
+    def test_read_attitude(self):
+        bus = FakeSMBus()
+        bus.set_mpu6050_sample([0, 11585, 11585], 0, [131, 262, -131])
+        acc = Accelerometer(bus=bus)
+        bus.transactions = 0
+        angles, rates = acc.read_attitude()
+        self.assertEqual(bus.transactions, 1)
+        self.assertEqual(angles, acc.run())
+        self.assertEqual(rates, [1.0, -2.0, -1.0])
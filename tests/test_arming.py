@@ -0,0 +1,92 @@
+from unittest import TestCase
+import os
+import tempfile
+
+import import_from_root
+from src.arming import ArmingState, ArmingSequence, ArmingStatus, EscCalibrationCache
+from src.banks import MotorBank, LedBank
+from src.fake_hardware import FakeGPIO
+from src.hardware import FakeHardware
+from src.motor_output import FakeMotorOutput
+from src.quadcopter import Quadcopter
+from src.setpoint import SetpointChannel
+
+
+class TestArming(TestCase):
+    def create_sequence(self, cache=None, status=None):
+        gpio = FakeGPIO()
+        names = ['frontLeft', 'frontRight', 'backLeft', 'backRight']
+        motors = MotorBank(names, [1, 2, 3, 4], FakeMotorOutput(4))
+        leds = LedBank(['frontLeft', 'backRight'], [20, 21], gpio)
+        return ArmingSequence(motors, leds, cache, {'output': 'fake'}, status), gpio
+
+    def test_sequence(self):
+        status = ArmingStatus()
+        try:
+            sequence, gpio = self.create_sequence(status=status)
+            output = sequence.motors.output
+            self.assertEqual(sequence.start(10), ArmingState.CALIBRATING)
+            self.assertEqual(list(output.duty_cycles), [4] * 4)
+            self.assertAlmostEqual(sequence.get_remaining_time(10), 13.9)
+            self.assertEqual(sequence.update(14.9), ArmingState.CALIBRATING)
+
+            self.assertEqual(sequence.update(15), ArmingState.ARMING)
+            self.assertEqual(list(output.duty_cycles), [5.7, 4, 4, 4])
+            self.assertEqual(gpio.pins[20], 1)
+            self.assertEqual(status.read()['state'], 'ARMING')
+
+            sequence.update(17.1)
+            self.assertEqual(list(output.duty_cycles), [5, 5.7, 4, 4])
+            self.assertEqual(gpio.pins[20], 0)
+
+            # a late update ends one spin and starts the next one for its full time
+            self.assertEqual(sequence.update(23.8), ArmingState.ARMING)
+            self.assertEqual(list(output.duty_cycles), [5, 5, 5.7, 4])
+            self.assertAlmostEqual(sequence.get_remaining_time(23.8), 4.9)
+            for x in range(4):
+                self.assertEqual(sequence.update(sequence.deadline), ArmingState.ARMING)
+            self.assertEqual(sequence.update(sequence.deadline), ArmingState.READY)
+            self.assertEqual(list(output.duty_cycles), [5] * 4)
+            self.assertEqual(gpio.pins, {20: 1, 21: 1})
+            self.assertEqual(status.read(), {'state': 'READY', 'step': len(sequence.steps), 'steps': len(sequence.steps), 'remaining': 0,
+                                             'sensor': 'UNCALIBRATED', 'sensor_failures': 0})
+            self.assertRaises(Exception, sequence.start, 30)
+        finally:
+            status.close()
+
+    def test_cached_calibration(self):
+        path = os.path.join(tempfile.mkdtemp(), 'esc_calibration.json')
+        cache = EscCalibrationCache(path, 60)
+        self.assertFalse(cache.is_valid({'output': 'fake'}))
+
+        sequence, gpio = self.create_sequence(cache)
+        sequence.start(0)
+        sequence.update(5)
+        self.assertTrue(cache.is_valid({'output': 'fake'}))
+        self.assertFalse(cache.is_valid({'output': 'other'}))
+        self.assertFalse(cache.is_valid({'output': 'fake'}, os.stat(path).st_mtime + 120))
+
+        sequence, gpio = self.create_sequence(cache)
+        self.assertEqual(sequence.start(0), ArmingState.ARMING)
+        self.assertAlmostEqual(sequence.get_remaining_time(0), 9.9)
+        os.remove(path)
+
+    def test_quadcopter(self):
+        class TestQuadcopter(Quadcopter):
+            CONST_CALIBRATION_FILE = None
+
+        setpoints = SetpointChannel()
+        try:
+            hardware = FakeHardware()
+            quadcopter = TestQuadcopter(setpoints, None, hardware=hardware, arm=False)
+            self.assertEqual(hardware.time(), 0)
+            self.assertEqual(quadcopter.arming.state.name, 'DISARMED')
+
+            setpoints.send_power(8)
+            quadcopter.wait_for_arming(setpoints)
+            self.assertEqual(quadcopter.arming.state.name, 'READY')
+            self.assertAlmostEqual(hardware.time(), 13.9, delta=0.05)
+            self.assertGreater(quadcopter.attitude_clock.time_start_point, 13)
+            self.assertEqual((quadcopter.main_power, setpoints.poll(), setpoints.get_counters()['dropped']), (5, None, 1))
+        finally:
+            setpoints.close()
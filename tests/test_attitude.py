@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+import import_from_root
+from src.attitude import ComplementaryFilter, KalmanFilter
+
+
+class TestAttitude(TestCase):
+    def test_complementary_filter(self):
+        f = ComplementaryFilter(0.9)
+        self.assertEqual(f.update([10, -10], [0, 0], 0.01), [10, -10])
+        self.assertAlmostEqual(f.update([0, 0], [100, 0], 0.01)[0], 0.9 * (10 + 1))
+        f.reset([0, 0])
+        for i in range(500):
+            angle = f.update([20, -5], [0, 0], 0.004)
+        self.assertAlmostEqual(angle[0], 20, 3)
+        self.assertAlmostEqual(angle[1], -5, 3)
+        self.assertRaises(ValueError, ComplementaryFilter, 1.5)
+
+    def test_kalman_filter(self):
+        f = KalmanFilter()
+        f.update([0, 0], [0, 0], 0.004)
+        for i in range(2000):
+            angle = f.update([0, 0], [2, -1], 0.004)
+        self.assertAlmostEqual(angle[0], 0, 0)
+        self.assertAlmostEqual(f.bias[0], 2, 1)
+        self.assertAlmostEqual(f.bias[1], -1, 1)
+        f.reset()
+        self.assertEqual(f.update([15, 3], [0, 0], 0.004), [15, 3])
+        self.assertRaises(ValueError, KalmanFilter, 0)
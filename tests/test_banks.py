@@ -0,0 +1,32 @@
+from unittest import TestCase
+
+import import_from_root
+from src.banks import MotorBank, LedBank
+from src.fake_hardware import FakeGPIO
+from src.motor_output import GPIOMotorOutput, FakeMotorOutput
+
+
+class TestBanks(TestCase):
+    def test_motor_bank(self):
+        gpio = FakeGPIO()
+        pins = [6, 26, 19, 13]
+        m = MotorBank(['frontLeft', 'frontRight', 'backLeft', 'backRight'], pins, GPIOMotorOutput(gpio, pins))
+        m.extra_powers[1] = 0.5
+        m.extra_powers[3] = -0.25
+        self.assertEqual(m.index('backLeft'), 2)
+        self.assertEqual(m.get_power(1, 7), 7.5)
+        self.assertEqual(m.get_powers(7), {0: 7, 1: 7.5, 2: 7, 3: 6.75})
+        m.set_duty_cycles(6)
+        self.assertEqual([x.duty_cycle for x in gpio.pwms], [6, 6.5, 6, 5.75])
+        self.assertRaises(AttributeError, setattr, m, 'motor_dict', {})
+        self.assertRaises(ValueError, MotorBank, ['a'], [1, 2], FakeMotorOutput(1))
+
+    def test_led_bank(self):
+        gpio = FakeGPIO()
+        leds = LedBank(['frontLeft', 'backRight'], [20, 21], gpio)
+        leds.set(leds.index('backRight'), True)
+        self.assertEqual(gpio.pins, {21: 1})
+        self.assertFalse(leds.switch(1))
+        leds.switch_all()
+        self.assertEqual(gpio.pins, {20: 1, 21: 1})
+        self.assertEqual(leds.index('missing'), -1)
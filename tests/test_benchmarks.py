@@ -0,0 +1,25 @@
+from unittest import TestCase
+
+import import_from_root
+from benchmarks.__main__ import compare
+from benchmarks.measure import latencies, percentile
+
+
+class TestBenchmarks(TestCase):
+    def test_compare(self):
+        baseline = {'a': {'ns': 100, 'p99': 200, 'bytes': 0}, 'b': {'ns': 100, 'p99': 200, 'bytes': 100}}
+        results = {
+            'a': {'ns': 120, 'p99': 390, 'bytes': 16},
+            'b': {'ns': 130, 'p99': 410, 'bytes': 200},
+            'c': {'ns': 1000, 'p99': 1000, 'bytes': 1000}
+        }
+        regressions = compare(results, baseline, 0.25, 1.0)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(x.startswith('b: ') for x in regressions))
+
+    def test_latencies(self):
+        samples = latencies(lambda: None, 100)
+        self.assertEqual(len(samples), 100)
+        self.assertEqual(samples, sorted(samples))
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 3)
+        self.assertEqual(percentile([1, 2, 3, 4], 1), 4)
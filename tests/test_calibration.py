@@ -0,0 +1,130 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import import_from_root
+from src.accelerometer import Accelerometer
+from src.arming import ArmingStatus
+from src.calibration import SensorCalibration, SensorCalibrator, SensorCalibrationCache
+from src.fake_hardware import FakeSMBus
+from src.hardware import FakeHardware
+from src.quadcopter import Quadcopter
+from src.simulator import SimulatedMPU6050
+
+
+class TestCalibration(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'sensor_calibration.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def create_pose(accelerometer, gyro=(0, 0, 0), samples=10):
+        return np.tile([*accelerometer, 0, *gyro], (samples, 1))
+
+    def test_compute(self):
+        calibration = SensorCalibration.compute([self.create_pose([100, -50, 16484], [13, -26, 5])])
+        self.assertEqual(calibration.accelerometer_bias, (100, -50, 100))
+        self.assertEqual(calibration.accelerometer_scale, (16384, 16384, 16384))
+        self.assertEqual(calibration.gyro_bias, (13, -26, 5))
+        self.assertAlmostEqual(calibration.temperature, 36.53)
+
+        # six positions: bias 100, -50, 30 and scale 16000, 16500, 16300 LSB per g
+        bias = np.array([100, -50, 30])
+        scale = np.array([16000, 16500, 16300])
+        poses = [self.create_pose(bias + sign * scale * axis) for axis in np.eye(3) for sign in (1, -1)]
+        calibration = SensorCalibration.compute(poses)
+        self.assertEqual(calibration.accelerometer_bias, (100, -50, 30))
+        self.assertEqual(calibration.accelerometer_scale, (16000, 16500, 16300))
+        self.assertEqual(SensorCalibration.from_data(calibration.to_data()), calibration)
+
+    def test_calibrator(self):
+        bus = SimulatedMPU6050(accelerometer_bias=[0.02, -0.01, 0.03], gyro_bias=[0.5, -1, 0.2], seed=1)
+        accelerometer = Accelerometer(bus=bus)
+        calibration = SensorCalibrator(accelerometer, lambda seconds: bus.measure(np.array([0, 0, 1.0]), np.zeros(3))).calibrate()
+        np.testing.assert_allclose(np.array(calibration.accelerometer_bias) / 16384, [0.02, -0.01, 0.03], atol=0.002)
+        np.testing.assert_allclose(np.array(calibration.gyro_bias) / 131, [0.5, -1, 0.2], atol=0.02)
+        self.assertAlmostEqual(calibration.temperature, 25, 2)
+
+        bus = FakeSMBus().set_mpu6050_sample([328, -164, 16876], 0, [65, -131, 26])
+        accelerometer = Accelerometer(bus=bus)
+        calibration = SensorCalibrator(accelerometer, lambda seconds: None).calibrate(100)
+        accelerometer.set_calibration(calibration)
+        self.assertEqual(accelerometer.read_sample()[0], [0, 0, 1])
+        self.assertEqual(accelerometer.read_sample()[2], [0, 0, 0])
+        self.assertEqual(accelerometer.get_accelerometer(), [0, 0, 1])
+        self.assertEqual(accelerometer.get_gyro(), [0, 0, 0])
+        accelerometer.start_stream()
+        bus.push_mpu6050_fifo([[328, -164, 16876]], [[196, -131, 26]])
+        accelerometer_stream, gyro_stream = accelerometer.read_stream()
+        self.assertEqual(accelerometer_stream.tolist(), [[0, 0, 1]])
+        self.assertEqual(gyro_stream.tolist(), [[1, 0, 0]])
+        accelerometer.set_calibration(None)
+        self.assertEqual(accelerometer.get_gyro(), [65 / 131, -1, 26 / 131])
+
+        bus = SimulatedMPU6050(gyro_noise=5, seed=1)
+        calibrator = SensorCalibrator(Accelerometer(bus=bus), lambda seconds: bus.measure(np.array([0, 0, 1.0]), np.zeros(3)))
+        self.assertRaises(ValueError, calibrator.calibrate, 200)
+        self.assertRaises(ValueError, calibrator.calibrate, 1)
+
+    def test_cache(self):
+        cache = SensorCalibrationCache(self.path, 60)
+        calibration = SensorCalibration((1.0, 2.0, 3.0), (16384.0, 16384.0, 16384.0), (4.0, 5.0, 6.0), 30.0)
+        self.assertIsNone(cache.load(0x68, 30, 100))
+        cache.save(0x68, calibration, 100)
+        cache.save(0x69, SensorCalibration.get_default(), 100)
+        self.assertEqual(sorted(cache.read().keys()), ['0x68', '0x69'])
+        self.assertEqual(cache.load(0x68, 33, 150), calibration)
+        self.assertIsNone(cache.load(0x68, 36, 150))
+        self.assertIsNone(cache.load(0x68, 30, 161))
+        self.assertIsNone(cache.load(0x6a, 30, 150))
+
+        with open(self.path, 'w') as file:
+            file.write('{')
+        self.assertIsNone(cache.load(0x68, 30, 150))
+
+    def test_quadcopter(self):
+        hardware = FakeHardware()
+        hardware.bus.set_mpu6050_sample([164, 0, 16384], 0, [131, 0, 0])
+        quadcopter = Quadcopter(None, None, hardware=hardware, arm=False)
+        self.assertIsNone(quadcopter.sensor_cache)
+        quadcopter.calibrate_sensor()
+        self.assertIsNone(quadcopter.accelerometer.calibration)
+
+        quadcopter.sensor_cache = SensorCalibrationCache(self.path, 60)
+        quadcopter.calibrate_sensor()
+        self.assertEqual(quadcopter.accelerometer.calibration.gyro_bias, (131, 0, 0))
+        self.assertAlmostEqual(hardware.time(), 2)
+
+        quadcopter = Quadcopter(None, None, hardware=hardware, arm=False)
+        quadcopter.sensor_cache = SensorCalibrationCache(self.path, 1e12)
+        quadcopter.calibrate_sensor()
+        self.assertEqual(quadcopter.accelerometer.calibration.accelerometer_bias, (164, 0, 0))
+        self.assertAlmostEqual(hardware.time(), 2)
+        angles, rates = quadcopter.accelerometer.read_attitude()
+        self.assertEqual((angles, rates), ([0, 0], [0, 0, 0]))
+
+    def test_quadcopter_failure(self):
+        bus = SimulatedMPU6050(gyro_noise=5, seed=1)
+        hardware = FakeHardware(bus=bus)
+        hardware.sleep = lambda seconds: bus.measure(np.array([0, 0, 1.0]), np.zeros(3))
+        status = ArmingStatus()
+        try:
+            quadcopter = Quadcopter(None, None, hardware=hardware, arm=False, arming_status=status)
+            quadcopter.sensor_cache = SensorCalibrationCache(self.path, 60)
+            quadcopter.calibrate_sensor()
+            self.assertEqual(quadcopter.accelerometer.calibration, SensorCalibration.get_default())
+            self.assertEqual((status.read()['sensor'], status.read()['sensor_failures']), ('FAILED', Quadcopter.CONST_SENSOR_CALIBRATION_ATTEMPTS))
+            self.assertFalse(os.path.exists(self.path))
+
+            quadcopter = Quadcopter(None, None, hardware=FakeHardware(), arm=False, arming_status=status)
+            quadcopter.sensor_cache = SensorCalibrationCache(self.path, 60)
+            quadcopter.calibrate_sensor()
+            self.assertEqual((status.read()['sensor'], status.read()['sensor_failures']), ('CALIBRATED', 0))
+        finally:
+            status.close()
@@ -0,0 +1,72 @@
+from unittest import TestCase
+import json
+import os
+import tempfile
+
+import import_from_root
+from src.config import TuningConfig, ConfigService
+from src.hardware import FakeHardware
+from src.quadcopter import Quadcopter
+
+
+class TestConfig(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'tuning.json')
+        self.writes = 0
+        with open('../data/tuning.json') as file:
+            self.data = json.load(file)
+        self.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write(self, data, text: str = None):
+        with open(self.path, 'w') as file:
+            file.write(text if text is not None else json.dumps(data))
+        # a new modification time even on file systems with a coarse clock
+        self.writes += 1
+        stamp = os.stat(self.path).st_mtime_ns + 1000000000 * self.writes
+        os.utime(self.path, ns=(stamp, stamp))
+
+    def test_tuning_config(self):
+        tuning = TuningConfig.from_data(self.data)
+        self.assertEqual(tuning.x_pid_gains, (0.06, 0.04, 0.012))
+        self.assertEqual(tuning.to_data(), self.data)
+        self.assertRaises(AttributeError, setattr, tuning, 'tilt_angle', 10)
+        for name, value in (('max_delta', 0), ('tilt_angle', 90), ('yaw_rate', 'fast'), ('x_pid_gains', [1, 2]), ('y_pid_gains', [0, -1, 0])):
+            self.assertRaises(ValueError, TuningConfig.from_data, dict(self.data, **{name: value}))
+        self.assertRaises(ValueError, TuningConfig.from_data, dict(self.data, extra=1))
+        self.assertRaises(ValueError, TuningConfig.from_data, [])
+
+    def test_service(self):
+        service = ConfigService(self.path)
+        self.assertEqual(service.version, 1)
+        self.assertIsNone(service.check())
+
+        self.write(None, '{"x_pid_gains": [')
+        self.assertIsNone(service.check())
+        self.assertEqual((service.errors, service.current.tilt_angle), (1, 20))
+        self.assertIsNotNone(service.error)
+
+        self.write(dict(self.data, tilt_angle=15))
+        self.assertEqual(service.check().tilt_angle, 15)
+        self.assertEqual((service.version, service.error), (2, None))
+        self.assertIsNone(service.check())
+        self.assertEqual(service.get_status()['tuning']['tilt_angle'], 15)
+
+    def test_reload_while_flying(self):
+        class TestQuadcopter(Quadcopter):
+            CONST_TUNING_FILE = self.path
+
+        quadcopter = TestQuadcopter(None, None, hardware=FakeHardware())
+        quadcopter.set_action(Quadcopter.Action.FORWARD)
+        self.assertEqual(quadcopter.x_pid.setpoint, 20)
+
+        self.write(dict(self.data, tilt_angle=10, x_pid_gains=[0.1, 0, 0], max_delta=1))
+        quadcopter.reload_tuning()
+        self.assertEqual(quadcopter.x_pid.setpoint, 10)
+        self.assertEqual((quadcopter.x_pid.kp, quadcopter.x_pid.output_limit), (0.1, 1))
+        self.assertIs(quadcopter.tuning, quadcopter.config.current)
+
+    def test_default_tuning(self):
+        self.assertEqual(Quadcopter.get_default_tuning(), TuningConfig.from_data(self.data))
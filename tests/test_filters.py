@@ -0,0 +1,72 @@
+from unittest import TestCase
+import math
+
+import numpy as np
+
+import import_from_root
+from src.filters import MovingAverage, MovingMedian, ExponentialMovingAverage, BiquadLowPass
+
+
+class TestFilters(TestCase):
+    def setUp(self):
+        self.samples = np.random.default_rng(1).normal(0, 10, (500, 2))
+
+    def assert_batch(self, create):
+        single = create()
+        expected = np.array([single.add(x) for x in self.samples.tolist()])
+        batch = create()
+        outputs = np.concatenate([batch.add_many(self.samples[start:start + size]) for start, size in ((0, 1), (1, 6), (7, 0), (7, 493))])
+        np.testing.assert_allclose(outputs, expected, atol=1e-9)
+        np.testing.assert_allclose(batch.get_value(), single.get_value(), atol=1e-9)
+        self.assertEqual(batch.count, single.count)
+
+    def test_moving_average(self):
+        average = MovingAverage(3)
+        self.assertEqual(average.get_value(), [0, 0])
+        self.assertEqual(average.add([3, 6]), [3, 6])
+        self.assertEqual(average.add([6, 0]), [4.5, 3])
+        average.add([0, 3])
+        self.assertEqual(average.add([9, 3]), [5, 2])
+        self.assertEqual(average.get_window(), [[6, 0], [0, 3], [9, 3]])
+        self.assertEqual(average.fill([1, 2]).get_value(), [1, 2])
+        self.assertRaises(ValueError, MovingAverage, 0)
+
+        average = MovingAverage(50, 1)
+        for x in range(100000):
+            average.add([0.1 * (x % 7) + 1e6])
+        self.assertAlmostEqual(average.get_value()[0], np.mean([0.1 * (x % 7) + 1e6 for x in range(100000 - 50, 100000)]), 6)
+
+        self.assert_batch(lambda: MovingAverage(20))
+
+    def test_moving_median(self):
+        median = MovingMedian(3)
+        self.assertEqual(median.add([1, 5]), [1, 5])
+        self.assertEqual(median.add([3, -5]), [2, 0])
+        self.assertEqual(median.add([1000, 4]), [3, 4])
+        self.assertEqual(median.add([2, 4]), [3, 4])
+        self.assertEqual(median.add([2, 4]), [2, 4])
+        self.assert_batch(lambda: MovingMedian(5))
+        self.assert_batch(lambda: MovingMedian(4))
+
+    def test_exponential_moving_average(self):
+        average = ExponentialMovingAverage(0.5)
+        self.assertEqual(average.add([4, 8]), [4, 8])
+        self.assertEqual(average.add([0, 0]), [2, 4])
+        self.assertAlmostEqual(ExponentialMovingAverage.get_alpha(1000 / (2 * math.pi), 1000), 0.5)
+        self.assertRaises(ValueError, ExponentialMovingAverage, 0)
+        self.assert_batch(lambda: ExponentialMovingAverage(0.1))
+
+    def test_biquad_low_pass(self):
+        low_pass = BiquadLowPass(20, 1000, channels=1)
+        self.assertAlmostEqual(low_pass.add([3])[0], 3)
+        self.assertAlmostEqual(low_pass.add([3])[0], 3)
+
+        # a 5 Hz signal passes, a 200 Hz vibration is damped
+        for frequency, low, high in ((5, 0.95, 1.05), (200, 0, 0.02)):
+            low_pass = BiquadLowPass(20, 1000, channels=1)
+            signal = np.sin(2 * math.pi * frequency * np.arange(2000) / 1000)[:, None]
+            output = low_pass.add_many(signal)[1000:, 0]
+            amplitude = (output.max() - output.min()) / 2
+            self.assertTrue(low < amplitude < high, amplitude)
+        self.assertRaises(ValueError, BiquadLowPass, 500, 1000)
+        self.assert_batch(lambda: BiquadLowPass(30, 1000))
@@ -0,0 +1,84 @@
+from unittest import TestCase
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+import import_from_root
+from src.flight_recorder import FlightRecorder, FlightLog
+from src.hardware import FakeHardware
+from src.quadcopter import Quadcopter
+from src.setpoint import SetpointChannel
+from src.telemetry import TelemetryRing
+
+
+class TestFlightRecorder(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_layout(self):
+        for motors in (4, 6, 8):
+            self.assertEqual(FlightRecorder.get_dtype(motors).itemsize, struct.calcsize(FlightRecorder.get_format(motors)))
+
+    def test_rotation(self):
+        recorder = FlightRecorder(self.directory, motors=4, records_per_file=10, max_files=3)
+        for x in range(35):
+            recorder.write(x * 0.004, (x, -x, 16384, 0, 1, 2, 3), [x / 2, -1], (0.1, 0.2, 0.3), 7, [7, 7.5, 6.5, 7], [1e-5, 2e-5, 3e-5, 4e-5, 5e-5])
+        self.assertEqual(recorder.count, 35)
+        recorder.close()
+        paths = recorder.get_paths()
+
+        self.assertEqual(len(paths), 3)
+        logs = FlightLog.open_directory(self.directory)
+        self.assertEqual([len(x) for x in logs], [10, 10, 5])
+        self.assertIsInstance(logs[0], np.memmap)
+        records = np.concatenate(logs)
+        np.testing.assert_allclose(records['timestamp'], np.arange(10, 35) * 0.004)
+        self.assertEqual(records['accelerometer'][0].tolist(), [10, -10, 16384])
+        self.assertEqual(records['gyro'][-1].tolist(), [1, 2, 3])
+        self.assertEqual(records['angles'][-1].tolist(), [17, -1])
+        np.testing.assert_allclose(records['deltas'][0], [0.1, 0.2, 0.3], rtol=1e-6)
+        self.assertEqual(records['duties'][0].tolist(), [7, 7.5, 6.5, 7])
+        np.testing.assert_allclose(records['stage_times'][0], [1e-5, 2e-5, 3e-5, 4e-5, 5e-5], rtol=1e-6)
+        self.assertEqual(FlightLog.read_header(paths[0])['motors'], 4)
+        self.assertRaises(ValueError, FlightRecorder, self.directory, 4, 10, 1)
+
+    def test_earlier_runs(self):
+        for name in ('flight-20200101-000000-00000', 'flight-20200101-000000-00001', 'flight-20200102-000000-00000', 'other-20200101-000000-00000'):
+            open(os.path.join(self.directory, name + FlightRecorder.CONST_EXTENSION), 'wb').close()
+        recorder = FlightRecorder(self.directory, motors=4, records_per_file=10, max_files=2)
+        recorder.write(0, (0, 0, 16384, 0, 0, 0, 0), [0, 0], (0, 0, 0), 7, [7, 7, 7, 7], [0, 0, 0, 0, 0])
+        recorder.close()
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(names[0], 'flight-20200102-000000-00000' + FlightRecorder.CONST_EXTENSION)
+        self.assertEqual(len(names), 3)
+        self.assertIn('other-20200101-000000-00000' + FlightRecorder.CONST_EXTENSION, names)
+
+    def test_quadcopter(self):
+        setpoints = SetpointChannel()
+        telemetry = TelemetryRing()
+        hardware = FakeHardware()
+        hardware.bus.set_mpu6050_sample([0, 1000, 16000], 0, [131, 0, 0])
+        quadcopter = Quadcopter(setpoints, telemetry, hardware=hardware)
+        quadcopter.set_main_power(7)
+        quadcopter.CONST_RECORDER_DIRECTORY = self.directory
+        quadcopter.start_recorder()
+        for x in range(3):
+            hardware.sleep(0.004)
+            quadcopter.update_attitude()
+            quadcopter.main_method()
+        quadcopter.stop_recorder()
+        setpoints.close()
+        telemetry.close()
+
+        records = FlightLog.open_directory(self.directory)[0]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records['accelerometer'][0].tolist(), [0, 1000, 16000])
+        self.assertEqual(records['main_power'][0], 7)
+        self.assertAlmostEqual(float(records['timestamp'][-1]), hardware.time(), 6)
+        self.assertTrue(np.all(records['stage_times'] >= 0))
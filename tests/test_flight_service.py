@@ -0,0 +1,79 @@
+from unittest import TestCase
+from time import sleep
+import pickle
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import import_from_root
+from src.flight_service import IPCHub, FlightSupervisor, get_resident_memory
+from src.hardware import FakeHardware
+
+
+class TestFlightService(TestCase):
+    def test_hub(self):
+        hub = IPCHub()
+        try:
+            names = hub.get_names()
+            self.assertEqual(sorted(names), ['arming', 'metrics', 'setpoints', 'telemetry'])
+            setpoints = pickle.loads(pickle.dumps(hub.setpoints))
+            setpoints.send_power(7)
+            self.assertEqual(hub.setpoints.poll()[0], 7)
+            setpoints.close()
+        finally:
+            hub.close()
+
+    def test_from_airframe(self):
+        hub = IPCHub.from_airframe('hexa_x')
+        try:
+            self.assertEqual(hub.telemetry.motors, 6)
+        finally:
+            hub.close()
+
+    def test_light_import(self):
+        source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+        code = 'import sys, flight_service; print(sorted({"numpy", "quadcopter", "flight_recorder"} & set(sys.modules)))'
+        output = subprocess.run([sys.executable, '-c', code], cwd=source, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+        # sizing the hub does not import the flight stack either
+        code = 'import sys, flight_service; flight_service.IPCHub.from_airframe().close(); print(sorted({"quadcopter", "accelerometer", "pid"} & set(sys.modules)))'
+        output = subprocess.run([sys.executable, '-c', code], cwd=source, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+    def test_resident_memory(self):
+        self.assertGreater(get_resident_memory(), 1000000)
+
+    def test_supervisor(self):
+        # the supervisor imports the flat module, the forked flight process records into a temporary directory
+        import quadcopter
+        directory = tempfile.mkdtemp()
+        recorder_directory = quadcopter.Quadcopter.CONST_RECORDER_DIRECTORY
+        quadcopter.Quadcopter.CONST_RECORDER_DIRECTORY = directory
+        hub = IPCHub()
+        supervisor = FlightSupervisor(hub, hardware=FakeHardware())
+        try:
+            status = supervisor.get_status()
+            self.assertFalse(status['flight']['started'])
+            self.assertEqual(status['arming']['state'], 'DISARMED')
+
+            self.assertTrue(supervisor.start())
+            self.assertTrue(supervisor.start())
+            self.assertTrue(supervisor.is_running())
+            # the fake hardware has a virtual clock, so the arming takes no real time
+            for x in range(100):
+                if hub.arming_status.read()['state'] == 'READY':
+                    break
+                sleep(0.05)
+            status = supervisor.get_status()
+            self.assertEqual(status['arming']['state'], 'READY')
+            self.assertTrue(status['flight']['running'])
+            self.assertGreater(status['flight']['resident_bytes'], 0)
+        finally:
+            supervisor.stop()
+            hub.close()
+            quadcopter.Quadcopter.CONST_RECORDER_DIRECTORY = recorder_directory
+            shutil.rmtree(directory)
+        self.assertFalse(supervisor.is_running())
@@ -0,0 +1,75 @@
+from unittest import TestCase
+import asyncio
+import json
+
+import numpy as np
+
+import import_from_root
+from src.ground_station import GroundStation, GroundStationClient
+from src.telemetry import TelemetryRing
+from src.telemetry_stream import TelemetryStream
+
+
+class TestGroundStation(TestCase):
+    def setUp(self):
+        self.ring = TelemetryRing(capacity=64)
+
+    def tearDown(self):
+        self.ring.close()
+
+    async def exchange(self):
+        station = GroundStation(self.ring, poll_frequency=200)
+        await station.start('127.0.0.1', 0)
+        port = station.get_port()
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /ws HTTP/1.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n')
+        response = await reader.readuntil(b'\r\n\r\n')
+        self.assertIn(b'Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=', response)
+        await asyncio.sleep(0.02)
+
+        for x in range(3):
+            self.ring.write(x, [5 + x, 6, 7, 8], [x, -x])
+        first, length = await asyncio.wait_for(reader.readexactly(2), 1)
+        payload = await reader.readexactly(length)
+        writer.write(b'\x89\x82\x00\x00\x00\x00hi')
+        pong = await asyncio.wait_for(reader.readexactly(4), 1)
+        writer.write(b'\x88\x80\x00\x00\x00\x00')
+        writer.close()
+
+        http_reader, http_writer = await asyncio.open_connection('127.0.0.1', port)
+        bodies = []
+        for path in (b'/telemetry', b'/status', b'/missing'):
+            http_writer.write(b'GET ' + path + b' HTTP/1.1\r\n\r\n')
+            head = await http_reader.readuntil(b'\r\n\r\n')
+            body = await http_reader.readexactly(int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0]))
+            bodies.append((head.split(b'\r\n')[0], json.loads(body)))
+        http_writer.close()
+        station.stop()
+        return first, payload, pong, bodies
+
+    def test_station(self):
+        first, payload, pong, bodies = asyncio.run(self.exchange())
+        self.assertEqual(first, 0x82)
+        version, motors, count, number = TelemetryStream.CONST_HEADER_FORMAT.unpack_from(payload)
+        self.assertEqual((motors, count, number), (4, 3, 0))
+        samples = np.frombuffer(payload, TelemetryStream.get_sample_dtype(4), offset=TelemetryStream.CONST_HEADER_FORMAT.size)
+        self.assertEqual(samples['powers'][:, 0].tolist(), [5, 6, 7])
+        self.assertEqual(pong, b'\x8a\x02hi')
+
+        self.assertEqual(bodies[0][0], b'HTTP/1.1 200 OK')
+        self.assertEqual(bodies[0][1]['powers'], [7, 6, 7, 8])
+        self.assertEqual(bodies[1][1]['updates'], 1)
+        self.assertEqual(bodies[2][0], b'HTTP/1.1 404 Not Found')
+
+    def test_slow_client(self):
+        async def push():
+            client = GroundStationClient(2)
+            for x in range(5):
+                client.push(bytes([x]))
+            return client
+
+        client = asyncio.run(push())
+        self.assertEqual(list(client.frames), [b'\x03', b'\x04'])
+        self.assertEqual(client.dropped, 3)
+        self.assertTrue(client.ready.is_set())
@@ -0,0 +1,145 @@
+from unittest import TestCase
+from time import sleep, perf_counter
+
+import import_from_root
+from src.accelerometer import Accelerometer
+from src.fake_hardware import FakeSMBus
+from src.hardware import FakeHardware
+from src.imu_reader import ImuReader
+from src.metrics import FlightMetrics
+from src.quadcopter import Quadcopter
+from src.setpoint import SetpointChannel
+
+
+class FailingSMBus(FakeSMBus):
+    failures: int = 0
+
+    def read_i2c_block_data(self, address, register, length=32):
+        if self.failures:
+            self.failures -= 1
+            raise OSError(121, 'Remote I/O error')
+        return super().read_i2c_block_data(address, register, length)
+
+
+class StalledSMBus(FakeSMBus):
+    def read_i2c_block_data(self, address, register, length=32):
+        # like smbus, a C call holding the GIL for the whole transfer (about 10 ms)
+        sum(range(300000))
+        return super().read_i2c_block_data(address, register, length)
+
+
+class TestImuReader(TestCase):
+    def test_ring(self):
+        bus = FailingSMBus()
+        hardware = FakeHardware(bus=bus)
+        reader = ImuReader(Accelerometer(bus=bus), hardware.time, capacity=4)
+        self.addCleanup(reader.close)
+        self.assertIsNone(reader.latest())
+        self.assertEqual(reader.read_new().shape, (0, 8))
+        self.assertEqual(reader.stale, 1)
+
+        for x in range(3):
+            bus.set_mpu6050_sample([x, 0, 16384], 0, [131 * x, 0, 0])
+            hardware.now = x * 0.001
+            self.assertTrue(reader.read_once())
+        hardware.now = 0.0025
+        self.assertEqual(reader.latest(), (0.002, (2, 0, 16384, 0, 262, 0, 0)))
+        self.assertAlmostEqual(reader.age, 0.0005)
+        samples = reader.read_new()
+        self.assertEqual(samples[:, 0].tolist(), [0, 0.001, 0.002])
+        self.assertEqual(samples[:, 1].tolist(), [0, 1, 2])
+
+        # the ring keeps capacity - 1 unread samples, the rest is lost
+        for x in range(10):
+            hardware.now = 0.003 + x * 0.001
+            reader.read_once()
+        samples = reader.read_new()
+        self.assertEqual(len(samples), 3)
+        self.assertAlmostEqual(samples[0, 0], 0.010)
+        self.assertEqual(reader.lost, 7)
+        self.assertEqual(len(reader.read_new()), 0)
+
+        bus.failures = 2
+        self.assertFalse(reader.read_once())
+        self.assertFalse(reader.read_once())
+        self.assertTrue(reader.read_once())
+        counters = reader.get_counters()
+        self.assertEqual((counters['samples'], counters['bus_errors'], counters['lost'], counters['running']), (14, 2, 7, False))
+        self.assertRaises(ValueError, ImuReader, reader.accelerometer, capacity=1)
+        self.assertRaises(ValueError, ImuReader, reader.accelerometer, period=0)
+
+    def test_process(self):
+        bus = FailingSMBus()
+        bus.failures = 3
+        reader = ImuReader(Accelerometer(bus=bus), period=0.0005)
+        reader.start()
+        reader.start()
+        try:
+            for x in range(200):
+                if reader.get_head() > 20:
+                    break
+                sleep(0.005)
+            self.assertTrue(reader.get_counters()['running'])
+            samples = reader.read_new()
+            self.assertGreater(len(samples), 0)
+            self.assertTrue((samples[1:, 0] > samples[:-1, 0]).all())
+        finally:
+            reader.stop()
+        self.assertEqual(reader.get_bus_errors(), 3)
+        self.assertFalse(reader.get_counters()['running'])
+        reader.close()
+
+    def test_control_latency(self):
+        # the control loop wakes up on time while the reading process is stuck in transfers that hold its GIL
+        reader = ImuReader(Accelerometer(bus=StalledSMBus()))
+        reader.start()
+        try:
+            delays = []
+            for x in range(200):
+                start = perf_counter()
+                sleep(0.002)
+                delays.append(perf_counter() - start - 0.002)
+            self.assertGreater(reader.get_head(), 0)
+        finally:
+            reader.close()
+        delays.sort()
+        self.assertLess(delays[int(len(delays) * 0.99)], 1 / Quadcopter.CONST_CONTROL_FREQUENCY)
+
+    def test_quadcopter(self):
+        hardware = FakeHardware()
+        inline = Quadcopter(None, None, hardware=FakeHardware())
+        quadcopter = Quadcopter(None, None, hardware=hardware)
+        quadcopter.imu_reader = ImuReader(quadcopter.accelerometer, hardware.time)
+        quadcopter.attitude_clock.time_start_point = inline.attitude_clock.time_start_point = 0
+        quadcopter.take_samples()
+        self.assertEqual(quadcopter.attitude, [0, 0])
+
+        for x in range(1, 6):
+            sample = ([800 * x, -400, 16000], 0, [131, -65 * x, 30])
+            hardware.bus.set_mpu6050_sample(*sample)
+            inline.hardware.bus.set_mpu6050_sample(*sample)
+            hardware.now = inline.hardware.now = x * 0.001
+            quadcopter.imu_reader.read_once()
+            inline.update_attitude()
+        quadcopter.take_samples()
+        self.assertEqual(quadcopter.attitude, inline.attitude)
+        self.assertEqual((quadcopter.yaw_rate, quadcopter.accelerometer.raw), (inline.yaw_rate, inline.accelerometer.raw))
+        self.assertEqual(quadcopter.attitude_clock.time_start_point, 0.005)
+
+        setpoints = SetpointChannel()
+        metrics = FlightMetrics()
+        try:
+            quadcopter.metrics = metrics
+            scheduler = quadcopter.create_scheduler(setpoints)
+            self.assertEqual(scheduler.get_task('imu').callback, quadcopter.take_samples)
+            quadcopter.scheduler = scheduler
+            reader = quadcopter.imu_reader
+            ImuReader.CONST_HEADER_FORMAT.pack_into(reader.block.get_buffer(), 0, reader.get_head(), 4)
+            quadcopter.update_metrics(scheduler, setpoints)
+            self.assertEqual(metrics.gauges[FlightMetrics.get_gauge_index('imu_bus_errors_total')], 4)
+            quadcopter.stop_imu_reader()
+            self.assertIsNone(quadcopter.imu_reader)
+            self.assertEqual(quadcopter.create_scheduler(setpoints).get_task('imu').callback, quadcopter.update_attitude)
+        finally:
+            metrics.close()
+            setpoints.close()
@@ -24,3 +24,22 @@ class TestLoopRate(TestCase):
             et = cl.restart()
             break
         self.assertAlmostEqual(et.as_seconds(), 0.50, 1)
+
+    def test_no_drift(self):
+        # the clock returns the start, then the time at every slow_loop call
+        times = [0.0, 0.004, 0.013, 0.045]
+        reads = []
+
+        def time_source():
+            reads.append(times[len(reads)])
+            return reads[-1]
+
+        lp = LoopRate(100)
+        lp.clock = Clock(time_source)
+        lp.slow_loop()
+        self.assertAlmostEqual(lp.clock.time_start_point, 0.01)
+        lp.slow_loop()
+        self.assertAlmostEqual(lp.clock.time_start_point, 0.02)
+        lp.slow_loop()
+        self.assertAlmostEqual(lp.clock.time_start_point, 0.045)
+        self.assertEqual(len(reads), 4)
@@ -18,3 +18,10 @@ class TestMeasurementsFixer(TestCase):
         m.add_measurement([1.23, 4.56]).add_measurement([2.34, 5.67]).add_measurement([3.45, 6.78])
         self.assertEqual(m.get_fixed_measurement(), [2.0, 6.0])
         self.assertRaises(ValueError, m.set_round, -2)
+
+    def test_no_rounding(self):
+        m = MeasurementsFixer()
+        m.add_measurement([1.23, 4.56]).add_measurement([2.34, 5.67]).add_measurement([3.45, 6.79])
+        self.assertIsNone(m.round_position)
+        self.assertAlmostEqual(m.get_fixed_measurement()[0], 2.34)
+        self.assertAlmostEqual(m.get_fixed_measurement()[1], 5.673333, 6)
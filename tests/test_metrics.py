@@ -0,0 +1,73 @@
+from unittest import TestCase
+from multiprocessing import Process
+
+import import_from_root
+from src.hardware import FakeHardware
+from src.metrics import FlightMetrics
+from src.quadcopter import Quadcopter
+from src.setpoint import SetpointChannel
+from src.telemetry import TelemetryRing
+
+
+def observe(metrics):
+    for x in range(10):
+        metrics.observe(2, 0.000003)
+    metrics.set_gauge(1, 250)
+
+
+class TestFlightMetrics(TestCase):
+    def test_histogram(self):
+        metrics = FlightMetrics(('read', 'write'))
+        try:
+            for seconds in (0.0000005, 0.000001, 0.00003, 1):
+                metrics.observe(1, seconds)
+            counts, count, total = metrics.get_histogram(1)
+            self.assertEqual(len(counts), len(FlightMetrics.CONST_BUCKETS) + 1)
+            self.assertEqual((counts[0], counts[5], counts[-1]), (2, 1, 1))
+            self.assertEqual(count, 4)
+            self.assertAlmostEqual(total, 1.0000315)
+            self.assertEqual(metrics.get_histogram(0)[1], 0)
+
+            text = metrics.render({'sent': 5, 'coalesced': 1, 'dropped': 0})
+            self.assertIn('quadcopter_stage_seconds_bucket{stage="write",le="1e-06"} 2\n', text)
+            self.assertIn('quadcopter_stage_seconds_bucket{stage="write",le="+Inf"} 4\n', text)
+            self.assertIn('quadcopter_stage_seconds_count{stage="write"} 4\n', text)
+            self.assertIn('# TYPE quadcopter_control_overruns_total counter\n', text)
+            self.assertIn('quadcopter_command_queue_depth 5\n', text)
+            self.assertRaises(ValueError, FlightMetrics.get_gauge_index, 'missing')
+        finally:
+            metrics.close()
+
+    def test_processes(self):
+        metrics = FlightMetrics()
+        try:
+            process = Process(target=observe, args=(metrics,))
+            process.start()
+            process.join()
+            self.assertEqual(metrics.get_histogram(2)[1], 10)
+            self.assertEqual(metrics.gauges[1], 250)
+            self.assertRaises(ValueError, FlightMetrics.attach, metrics.get_name(), ('read',))
+        finally:
+            metrics.close()
+
+    def test_quadcopter(self):
+        setpoints = SetpointChannel()
+        telemetry = TelemetryRing()
+        metrics = FlightMetrics()
+        try:
+            hardware = FakeHardware()
+            quadcopter = Quadcopter(setpoints, telemetry, hardware=hardware, metrics=metrics)
+            scheduler = quadcopter.create_scheduler(setpoints)
+            setpoints.send_power(6)
+            scheduler.run(1)
+            quadcopter = None
+
+            self.assertEqual(metrics.get_histogram(0)[1], 1000)
+            self.assertEqual(metrics.get_histogram(4)[1], 250)
+            self.assertAlmostEqual(metrics.gauges[FlightMetrics.get_gauge_index('control_rate_hz')], 250, delta=5)
+            self.assertEqual(metrics.gauges[FlightMetrics.get_gauge_index('last_command_number')], 1)
+            self.assertIn('quadcopter_command_queue_depth 0\n', metrics.render(setpoints.get_counters()))
+        finally:
+            setpoints.close()
+            telemetry.close()
+            metrics.close()
@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+import import_from_root
+from src.mixer import Mixer
+
+
+class TestMixer(TestCase):
+    def test_quad_x(self):
+        m = Mixer.from_file('../data/airframes.json', 'quad_x')
+        self.assertEqual(m.names, ['frontLeft', 'frontRight', 'backLeft', 'backRight'])
+        x, y, yaw = 0.4, -0.2, 0.1
+        expected = [x / 2 - yaw + y / 2, -x / 2 + yaw + y / 2, x / 2 + yaw - y / 2, -x / 2 - yaw - y / 2]
+        for extra_power, value in zip(m.mix(7, x, y, yaw), expected):
+            self.assertAlmostEqual(extra_power, value)
+
+    def test_desaturation(self):
+        m = Mixer.from_file('../data/airframes.json', 'quad_x')
+        self.assertAlmostEqual(9.5 + m.mix(9.5, 2, 0, 0).max(), 10)
+        self.assertAlmostEqual(5 + m.mix(5, 0, 2, 0).min(), 5)
+        self.assertAlmostEqual(7 + m.mix(7, 0, 2, 0).min(), 6)
+
+    def test_airframes(self):
+        for airframe, motors in [['quad_x', 4], ['quad_plus', 4], ['hexa_x', 6], ['octo_x', 8]]:
+            m = Mixer.from_file('../data/airframes.json', airframe)
+            self.assertEqual(m.get_motor_count(), motors)
+            for axis in range(3):
+                self.assertAlmostEqual(m.matrix[:, axis].sum(), 0, 3)
+        self.assertRaises(ValueError, Mixer.from_file, '../data/airframes.json', 'tricopter')
+        self.assertRaises(ValueError, Mixer, ['a', 'b'], [[1, 0, 0]])
@@ -0,0 +1,54 @@
+from array import array
+from unittest import TestCase
+
+import import_from_root
+from src.motor_output import MotorOutput, GPIOMotorOutput, PCA9685MotorOutput, FakeMotorOutput
+from src.fake_hardware import FakeGPIO, FakeSMBus
+
+
+class TestMotorOutput(TestCase):
+    def test_unchanged_channels_are_skipped(self):
+        output = FakeMotorOutput(4)
+        output.set_duty_cycles(6, array('d', [0, 0.5, 0, -0.25]))
+        self.assertEqual(output.history, [(0, 6), (1, 6.5), (2, 6), (3, 5.75)])
+        output.set_duty_cycles(6, array('d', [0, 0.5, 0.25, -0.25]))
+        self.assertEqual(output.history[4:], [(2, 6.25)])
+        output.set_duty_cycles(6, array('d', [0, 0.5, 0.25, -0.25]))
+        self.assertEqual((output.writes, output.skipped, output.flushes), (5, 7, 2))
+        output.set_duty_cycle(2, 6.25)
+        self.assertEqual((output.writes, output.skipped, output.flushes), (5, 8, 2))
+
+    def test_pulse_width(self):
+        self.assertAlmostEqual(MotorOutput(1).get_pulse_width(5), 0.001)
+        self.assertAlmostEqual(MotorOutput(1, 400).get_pulse_width(10), 0.002)
+        self.assertAlmostEqual(MotorOutput(1, 2000, True).get_pulse_width(10), 0.00025)
+        self.assertRaises(ValueError, MotorOutput, 1, 500)
+
+    def test_gpio(self):
+        gpio = FakeGPIO()
+        output = GPIOMotorOutput(gpio, [20, 12], 400)
+        output.start(5)
+        self.assertEqual([(x.frequency, x.duty_cycle, x.running) for x in gpio.pwms], [(400, 40, True), (400, 40, True)])
+        output.set_duty_cycles(7.5, array('d', [0, 0]))
+        self.assertEqual([x.duty_cycle for x in gpio.pwms], [60, 60])
+        output.set_duty_cycles(7.5, array('d', [0, 0]))
+        self.assertEqual([x.changes for x in gpio.pwms], [1, 1])
+        output.stop()
+        self.assertFalse(gpio.pwms[0].running)
+
+    def test_pca9685(self):
+        bus = FakeSMBus()
+        output = PCA9685MotorOutput(bus, [1, 0, 3, 2], 400)
+        self.assertEqual(bus.registers[PCA9685MotorOutput.CONST_PRESCALE_REGISTER], 14)
+        self.assertEqual(bus.registers[PCA9685MotorOutput.CONST_MODE1_REGISTER], 0xa0)
+        transactions = bus.transactions
+        output.set_duty_cycles(5, array('d', [0, 5, 0, 5]))
+        self.assertEqual(bus.transactions, transactions + 1)
+        steps = [bus.registers[0x08 + 4 * x] | bus.registers[0x09 + 4 * x] << 8 for x in range(4)]
+        self.assertEqual(steps, [round(0.002 * 4096 * output.frequency), round(0.001 * 4096 * output.frequency)] * 2)
+        output.set_duty_cycles(5, array('d', [0, 5, 0, 5]))
+        self.assertEqual(bus.transactions, transactions + 1)
+        output.stop()
+        self.assertEqual(bus.registers[PCA9685MotorOutput.CONST_ALL_LED_OFF_H_REGISTER], 0x10)
+        self.assertRaises(ValueError, PCA9685MotorOutput, bus, [0, 2])
+        self.assertRaises(ValueError, PCA9685MotorOutput, bus, [0], 2000)
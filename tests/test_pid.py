@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+import import_from_root
+from src.pid import PID
+
+
+class TestPID(TestCase):
+    def test_update(self):
+        pid = PID(0.5, 0, 0, 2)
+        self.assertAlmostEqual(pid.update(-1, 0.01), 0.5)
+        self.assertAlmostEqual(pid.update(10, 0.01), -2)
+        pid.set_setpoint(20)
+        self.assertAlmostEqual(pid.update(19, 0.01), 0.5)
+        self.assertRaises(ValueError, PID, -1, 0, 0, 2)
+        self.assertRaises(ValueError, PID, 1, 0, 0, 0)
+
+    def test_anti_windup(self):
+        pid = PID(0.1, 1, 0, 2, setpoint=100)
+        for i in range(1000):
+            self.assertEqual(pid.update(0, 0.01), 2)
+        self.assertLessEqual(pid.integral, 2)
+        pid.set_setpoint(0)
+        self.assertLess(pid.update(1, 0.01), 2)
+
+    def test_derivative_on_measurement(self):
+        pid = PID(0, 0, 1, 10)
+        pid.update(0, 0.01)
+        pid.set_setpoint(5)
+        self.assertEqual(pid.update(0, 0.01), 0)
+        self.assertAlmostEqual(pid.update(0.01, 0.01), -1)
+
+    def test_settling(self):
+        pid = PID(2, 1, 0.1, 10, setpoint=10)
+        angle = 0
+        rate = 0
+        for i in range(2500):
+            rate += pid.update(angle, 0.004) * 50 * 0.004 - rate * 0.02
+            angle += rate * 0.004
+        self.assertAlmostEqual(angle, 10, 1)
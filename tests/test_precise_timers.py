@@ -0,0 +1,63 @@
+from unittest import TestCase
+from time import sleep
+
+import import_from_root
+from src.timers import Clock, PreciseClock, PreciseLoopRate
+
+
+class VirtualTime:
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def time_ns(self):
+        self.now += 1000
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += int(seconds * 1e9) + 50000
+
+
+class TestPreciseTimers(TestCase):
+    def test_precise_clock(self):
+        clock = PreciseClock()
+        sleep(0.05)
+        elapsed = clock.restart_ns()
+        self.assertIsInstance(elapsed, int)
+        self.assertAlmostEqual(elapsed * 1e-9, 0.05, 1)
+        self.assertLess(clock.get_elapsed_seconds(), 0.05)
+        self.assertAlmostEqual(Clock().restart_seconds(), 0, 2)
+
+    def test_hybrid_wait(self):
+        time = VirtualTime()
+        rate = PreciseLoopRate(1000, 0.0002, time.time_ns, time.sleep)
+        for x in range(10):
+            jitter = rate.wait()
+            self.assertLess(jitter, 2000)
+        self.assertEqual(len(time.sleeps), 10)
+        self.assertTrue(all(x < 0.0008 for x in time.sleeps))
+        statistics = rate.get_statistics()
+        self.assertEqual((statistics['runs'], statistics['overruns'], statistics['skipped']), (10, 0, 0))
+        # absolute deadlines: 10 periods after the origin, whatever the sleeps overshot
+        self.assertGreaterEqual(time.now - rate.origin, 10 ** 7)
+        self.assertLess(time.now - rate.origin, 10 ** 7 + 2000)
+
+    def test_overrun(self):
+        time = VirtualTime()
+        rate = PreciseLoopRate(1000, 0, time.time_ns, time.sleep)
+        time.now += 3500000
+        rate.wait()
+        statistics = rate.get_statistics()
+        self.assertEqual((statistics['overruns'], statistics['skipped']), (1, 2))
+        self.assertEqual(rate.ticks * rate.period_ns, 4000000)
+        self.assertRaises(ValueError, PreciseLoopRate, 0)
+        self.assertRaises(ValueError, PreciseLoopRate, 10, -1)
+
+    def test_real_time(self):
+        rate = PreciseLoopRate(500)
+        for x in range(50):
+            rate.wait()
+        statistics = rate.get_statistics()
+        self.assertLess(statistics['jitter_mean'], 0.001)
+        self.assertGreater(statistics['jitter_max'], 0)
@@ -0,0 +1,79 @@
+from unittest import TestCase
+import io
+import os
+import shutil
+import tempfile
+
+import import_from_root
+from src.attitude import KalmanFilter
+from src.calibration import SensorCalibration
+from src.flight_trace import TraceWriter, TraceReader
+from src.quadcopter import Quadcopter
+from src.replay import Replay
+from src.simulator import Simulation
+
+
+class TestReplay(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'flight' + TraceWriter.CONST_EXTENSION)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_trace(self):
+        trace = TraceWriter(self.path, motors=2)
+        trace.write_state(1, 2, 5, 0)
+        trace.write_sample(1.001, (1, -2, 16384, 0, 131, 0, -131))
+        trace.write_command(1.002, float('nan'), 1)
+        trace.write_output(1.004, [7.5, 6.5])
+        trace.close()
+
+        for chunk_size in (None, 5):
+            records = list(TraceReader(self.path, chunk_size))
+            self.assertEqual([x[0] for x in records], [b'I', b'S', b'C', b'M'])
+            self.assertEqual(records[0][1:], (1, (2, 5, 0)))
+            self.assertEqual(records[1][2], (1, -2, 16384, 0, 131, 0, -131))
+            self.assertEqual(records[2][2][1], 1)
+            self.assertEqual(records[3], (b'M', 1.004, (7.5, 6.5)))
+
+        with open(self.path, 'ab') as file:
+            file.write(b'S\x00')
+        self.assertRaises(ValueError, list, TraceReader(self.path))
+
+    def test_replay(self):
+        simulation = Simulation()
+        simulation.takeoff(1, (3, -2))
+        simulation.quadcopter.start_trace(self.path)
+        simulation.run(0.5, [(0.2, Quadcopter.Action.FORWARD.value)])
+        simulation.quadcopter.stop_trace()
+        simulation.close()
+
+        diffs = io.StringIO()
+        summary = Replay().run(self.path, diffs=diffs)
+        self.assertEqual(summary['ticks'], 125)
+        self.assertEqual(summary['divergent_ticks'], 0)
+        self.assertEqual(summary['max_difference'], 0)
+        self.assertEqual(len(diffs.getvalue().splitlines()), 126)
+
+        summary = Replay(KalmanFilter()).run(self.path)
+        self.assertGreater(summary['divergent_ticks'], 0)
+        self.assertIsNotNone(summary['first_divergence'])
+
+    def test_replay_calibrated(self):
+        simulation = Simulation()
+        simulation.quadcopter.accelerometer.set_calibration(SensorCalibration((160.0, -80.0, 50.0), (16000.0, 16500.0, 16300.0), (60.0, -30.0, 10.0), 25.0))
+        simulation.takeoff(1, (3, -2))
+        simulation.quadcopter.start_trace(self.path)
+        simulation.run(0.2, [(0.1, Quadcopter.Action.LEFT.value)])
+        simulation.quadcopter.stop_trace()
+        simulation.close()
+
+        self.assertEqual(list(TraceReader(self.path))[0][0], TraceWriter.CONST_CORRECTIONS)
+        summary = Replay().run(self.path)
+        self.assertEqual(summary['divergent_ticks'], 0)
+        self.assertEqual(summary['max_difference'], 0)
+
+        summary = Replay(KalmanFilter()).run(self.path)
+        self.assertGreater(summary['divergent_ticks'], 0)
+        self.assertIsNotNone(summary['first_divergence'])
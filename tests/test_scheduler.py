@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import import_from_root
+from src.scheduler import Scheduler
+
+
+class VirtualTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestScheduler(TestCase):
+    def test_rates(self):
+        vt = VirtualTime()
+        calls = {'fast': 0, 'slow': 0}
+        s = Scheduler(vt.time, vt.sleep)
+        self.assertIsNone(s.run_pending())
+        self.assertRaises(ValueError, s.run, 1.0)
+        s.add_task('fast', lambda: calls.update(fast=calls['fast'] + 1), 100)
+        s.add_task('slow', lambda: calls.update(slow=calls['slow'] + 1), 10)
+        s.run(1.0)
+        self.assertEqual(calls, {'fast': 100, 'slow': 10})
+        statistics = s.get_statistics()
+        self.assertEqual(statistics['fast']['overruns'], 0)
+        self.assertAlmostEqual(statistics['fast']['jitter_max'], 0)
+        self.assertRaises(ValueError, s.add_task, 'fast', print, 1)
+        self.assertRaises(ValueError, s.add_task, 'zero', print, 0)
+
+    def test_overrun(self):
+        vt = VirtualTime()
+        s = Scheduler(vt.time, vt.sleep)
+        s.add_task('control', lambda: vt.sleep(0.001), 250)
+        s.add_task('slow', lambda: vt.sleep(0.011), 100)
+        s.run(0.1)
+        control = s.get_statistics()['control']
+        slow = s.get_statistics()['slow']
+        self.assertEqual(slow['overruns'], slow['runs'])
+        self.assertGreater(control['overruns'], 0)
+        self.assertGreater(control['skipped'], 0)
+        self.assertGreater(control['jitter_max'], 0.004)
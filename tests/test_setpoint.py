@@ -0,0 +1,82 @@
+from unittest import TestCase
+from multiprocessing import Process
+from time import perf_counter_ns
+
+import import_from_root
+from src.hardware import FakeHardware
+from src.quadcopter import Quadcopter
+from src.setpoint import SetpointChannel
+
+
+def send_powers(channel, count):
+    for x in range(count):
+        channel.send_power(5 + x / count)
+    channel.send_action(2)
+
+
+class TestSetpointChannel(TestCase):
+    def test_poll(self):
+        channel = SetpointChannel()
+        try:
+            self.assertIsNone(channel.poll())
+            self.assertEqual(channel.send_power(6.5), 1)
+            power, action = channel.poll()
+            self.assertEqual((power, action), (6.5, SetpointChannel.CONST_NO_ACTION))
+            self.assertIsNone(channel.poll())
+            channel.send_power(7)
+            channel.send_power(8)
+            channel.send_action(1)
+            self.assertEqual(channel.poll(), (8, 1))
+            channel.drop()
+            self.assertEqual(channel.get_counters(), {'sent': 4, 'coalesced': 2, 'dropped': 1})
+
+            # only the fields sent since the last read come back
+            channel.send_power(50)
+            self.assertEqual(channel.poll(), (50, SetpointChannel.CONST_NO_ACTION))
+            channel.send_action(3)
+            power, action = channel.poll()
+            self.assertEqual((power != power, action), (True, 3))
+        finally:
+            channel.close()
+
+    def test_processes(self):
+        channel = SetpointChannel()
+        try:
+            process = Process(target=send_powers, args=(channel, 100))
+            process.start()
+            process.join()
+            reader = SetpointChannel.attach(channel.get_name())
+            self.assertEqual(reader.poll(), (5.99, 2))
+            self.assertEqual(reader.coalesced, 100)
+            start = perf_counter_ns()
+            for x in range(10000):
+                reader.read()
+            self.assertLess((perf_counter_ns() - start) / 10000, 5000)
+            reader.close()
+        finally:
+            channel.close()
+
+    def test_parse_power(self):
+        self.assertEqual(SetpointChannel.parse_power('7.5'), 7.5)
+        self.assertEqual(SetpointChannel.parse_power(10), 10)
+        for value in ('50', '-1', 'nan', 'inf', 'x', None):
+            self.assertIsNone(SetpointChannel.parse_power(value))
+
+    def test_rejected_power(self):
+        channel = SetpointChannel()
+        try:
+            quadcopter = Quadcopter(channel, None, hardware=FakeHardware(), arm=False)
+            channel.send_power(50)
+            quadcopter.read_commands(channel)
+            channel.send_action(Quadcopter.Action.FORWARD.value)
+            quadcopter.read_commands(channel)
+            self.assertEqual((quadcopter.action.name, quadcopter.main_power), ('FORWARD', None))
+
+            # a coalesced command keeps its valid action
+            channel.send_action(Quadcopter.Action.LEFT.value)
+            channel.send_power(50)
+            quadcopter.read_commands(channel)
+            self.assertEqual(quadcopter.action.name, 'LEFT')
+            self.assertEqual(channel.get_counters()['dropped'], 2)
+        finally:
+            channel.close()
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import numpy as np
+
+import import_from_root
+from src.accelerometer import Accelerometer
+from src.simulator import RigidBody, SimulatedMPU6050, SimulatedHardware, Simulation
+
+
+class TestSimulator(TestCase):
+    def test_rigid_body(self):
+        body = RigidBody.from_file('../data/airframes.json', 'quad_x').reset(1)
+        hover = body.get_hover_throttle()
+        self.assertAlmostEqual(hover, 0.5)
+        for x in range(100):
+            body.step(0.001, np.full(4, hover))
+        self.assertAlmostEqual(body.position[2], 1)
+        np.testing.assert_allclose(body.get_specific_force(), [0, 0, 1], atol=1e-9)
+
+        # frontLeft, frontRight, backLeft, backRight
+        for throttles, axis, sign in (([1, 0, 1, 0], 0, 1), ([1, 1, 0, 0], 1, -1), ([0, 1, 1, 0], 2, -1)):
+            body.reset(1)
+            for x in range(50):
+                body.step(0.001, hover + 0.05 * (np.array(throttles) - 0.5))
+            rates = [*body.get_attitude(), body.get_yaw_rate()]
+            self.assertGreater(sign * body.angular_velocity[axis], 0)
+            self.assertGreater(rates[axis], 0)
+
+        body.reset(0)
+        body.step(0.001, np.zeros(4))
+        self.assertEqual(body.position[2], 0)
+        np.testing.assert_allclose(body.reset(0, [10, -5]).get_attitude(), [10, -5], atol=1e-9)
+
+    def test_simulated_mpu6050(self):
+        sensor = SimulatedMPU6050(accelerometer_noise=0, gyro_noise=0, gyro_bias=[1, 0, 0], temperature=30)
+        sensor.measure(np.array([0.5, 0, 0.5]), np.array([0, 10, -20.0]))
+        accelerometer = Accelerometer(bus=sensor)
+        values, temperature, gyro = accelerometer.read_sample()
+        np.testing.assert_allclose(values, [0.5, 0, 0.5], atol=1e-3)
+        np.testing.assert_allclose(gyro, [1, 10, -20], atol=1e-2)
+        self.assertAlmostEqual(temperature, 30, 2)
+
+        accelerometer.start_stream(sample_rate_divider=1)
+        for x in range(10):
+            sensor.measure(np.array([0, 0, 1.0]), np.zeros(3))
+        values, gyro = accelerometer.read_stream()
+        self.assertEqual(len(values), 5)
+        np.testing.assert_allclose(values, np.tile([0, 0, 1], (5, 1)), atol=1e-3)
+
+    def test_simulated_hardware(self):
+        body = RigidBody.from_file('../data/airframes.json', 'quad_x')
+        hardware = SimulatedHardware(body, {'frontLeft': 1, 'frontRight': 2, 'backLeft': 3, 'backRight': 4})
+        pwm = hardware.gpio.PWM(2, 50)
+        pwm.start(7.5)
+        hardware.gpio.PWM(9, 50).start(10)
+        hardware.sleep(0.0105)
+        self.assertEqual(hardware.time(), 0.0105)
+        self.assertAlmostEqual(hardware.simulated_time, 0.01)
+        self.assertEqual(hardware.throttles.tolist(), [0, 0.5, 0, 0])
+        self.assertGreater(body.thrust[1], 0)
+        self.assertRaises(ValueError, SimulatedHardware, body, {}, None, 0)
+
+    def test_simulation(self):
+        simulation = Simulation()
+        simulation.takeoff(1)
+        start = simulation.hardware.time()
+        simulation.hardware.disturbance = lambda time: (0.02, 0, 0) if start + 0.5 <= time < start + 0.6 else None
+        result = simulation.run(2)
+        simulation.close()
+
+        self.assertEqual(len(result['time']), 200)
+        self.assertEqual(result['control_runs'], 500)
+        self.assertEqual(result['powers'].shape, (200, 4))
+        self.assertGreater(np.max(result['angles'][:, 0]), 0.5)
+        self.assertLess(np.max(np.abs(result['angles'])), 10)
+        self.assertGreater(result['speedup'], 1)
+
+    def test_step_metrics(self):
+        time = np.arange(6) * 0.1
+        values = np.array([0, 12, 8.5, 10.5, 10, 10])
+        self.assertAlmostEqual(Simulation.get_settling_time(time, values, 10, 1), 0.3)
+        self.assertEqual(Simulation.get_settling_time(time, values, 20, 1), np.inf)
+        self.assertEqual(Simulation.get_overshoot(values, 0, 10), 2)
+        self.assertEqual(Simulation.get_overshoot(-values, 0, -10), 2)
@@ -0,0 +1,67 @@
+from unittest import TestCase
+from multiprocessing import Process
+
+import numpy as np
+
+import import_from_root
+from src.telemetry import TelemetryRing
+
+
+def write_records(ring, count):
+    for x in range(count):
+        ring.write(x, [5 + x, 6, 7, 8], [x, -x], 0.001, 0.0001)
+
+
+class TestTelemetryRing(TestCase):
+    def test_write(self):
+        ring = TelemetryRing(capacity=8)
+        try:
+            self.assertEqual(len(ring.latest(5)), 0)
+            self.assertEqual(ring.get_powers(), {0: 0, 1: 0, 2: 0, 3: 0})
+            write_records(ring, 3)
+            records = ring.latest(5)
+            self.assertEqual(records['timestamp'].tolist(), [0, 1, 2])
+            self.assertTrue(records.base is not None)
+            self.assertEqual(ring.get_powers(), {0: 7, 1: 6, 2: 7, 3: 8})
+            self.assertEqual(records[2]['angles'].tolist(), [2, -2])
+            self.assertEqual(records[2]['powers'].tolist(), [7, 6, 7, 8, 0, 0, 0, 0])
+            write_records(ring, 20)
+            records = ring.snapshot(100)
+            self.assertEqual(records['timestamp'].tolist(), list(range(13, 20)))
+            head = ring.get_head()
+            records = ring.get_records(head, 7)
+            self.assertTrue(ring.is_valid(records, head).all())
+            write_records(ring, 3)
+            self.assertEqual(ring.is_valid(records, head).tolist(), [False] * 3 + [True] * 4)
+        finally:
+            ring.close()
+
+    def test_lapped_copy(self):
+        # the writer laps the oldest records while the reader copies them: their copied sequence numbers still match
+        class LappedRing(TelemetryRing):
+            def get_records(self, head, count):
+                records = np.array(TelemetryRing.get_records(self, head, count), copy=True)
+                write_records(self, 2)
+                return records
+
+        ring = LappedRing(capacity=8)
+        try:
+            write_records(ring, 10)
+            records = ring.snapshot(7)
+            self.assertEqual(records['timestamp'].tolist(), [5, 6, 7, 8, 9])
+        finally:
+            ring.close()
+
+    def test_processes(self):
+        ring = TelemetryRing(capacity=64)
+        try:
+            process = Process(target=write_records, args=(ring, 10))
+            process.start()
+            process.join()
+            reader = TelemetryRing.attach(ring.get_name())
+            self.assertEqual(reader.get_head(), 10)
+            self.assertEqual(reader.snapshot(1)['powers'][0][0], 14)
+            reader.close()
+        finally:
+            ring.close()
+        self.assertRaises(ValueError, TelemetryRing, 8, 9)
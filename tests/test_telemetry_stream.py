@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+import numpy as np
+
+import import_from_root
+from src.telemetry import TelemetryRing
+from src.telemetry_stream import TelemetryStream
+
+
+class TestTelemetryStream(TestCase):
+    def setUp(self):
+        self.ring = TelemetryRing(capacity=64)
+        self.now = 0
+        self.sent = []
+        self.stream = TelemetryStream(self.ring, lambda sid, data, callback: self.sent.append((sid, data, callback)), lambda: self.now)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def write(self, count):
+        for x in range(count):
+            head = self.ring.get_head()
+            self.ring.write(head * 0.01, [5 + head, 6, 7, 8], [head, -head])
+
+    def test_frame(self):
+        self.stream.subscribe('a', rate=50, batch=4)
+        self.write(6)
+        self.assertEqual(self.stream.tick(), 0.02)
+        self.assertEqual(len(self.sent), 1)
+        sid, data, callback = self.sent[0]
+        version, motors, count, first = TelemetryStream.CONST_HEADER_FORMAT.unpack_from(data)
+        self.assertEqual((sid, version, motors, count, first), ('a', 1, 4, 4, 2))
+        samples = np.frombuffer(data, TelemetryStream.get_sample_dtype(4), offset=TelemetryStream.CONST_HEADER_FORMAT.size)
+        self.assertEqual(samples['powers'][:, 0].tolist(), [7, 8, 9, 10])
+        self.assertEqual(samples['angles'][-1].tolist(), [5, -5])
+        np.testing.assert_allclose(samples['timestamp'], [0.02, 0.03, 0.04, 0.05])
+
+    def test_rates(self):
+        fast = self.stream.subscribe('fast', rate=50)
+        slow = self.stream.subscribe('slow', rate=10)
+        self.assertEqual(self.stream.subscribe('limited', rate=1000).period, 1 / 50)
+        self.stream.unsubscribe('limited')
+        for x in range(10):
+            self.write(2)
+            self.stream.tick()
+            for sid, data, callback in self.sent:
+                callback()
+            self.sent.clear()
+            self.now += 0.02
+        self.assertEqual(fast.frames, 10)
+        self.assertEqual(slow.frames, 2)
+        self.assertEqual(fast.dropped + slow.dropped, 0)
+
+    def test_slow_client(self):
+        self.stream.subscribe('fast')
+        self.stream.subscribe('slow')
+        for x in range(5):
+            self.write(1)
+            self.stream.tick()
+            for sid, data, callback in self.sent:
+                if sid == 'fast':
+                    callback()
+            self.sent.clear()
+            self.now += 0.02
+        counters = self.stream.get_counters()
+        self.assertEqual(counters['fast'], {'frames': 5, 'dropped': 0})
+        self.assertEqual(counters['slow'], {'frames': 1, 'dropped': 4})
+
+        self.now += TelemetryStream.CONST_ACK_TIMEOUT
+        self.write(1)
+        self.stream.tick()
+        self.assertEqual(self.stream.get_counters()['slow']['frames'], 2)
@@ -0,0 +1,65 @@
+from unittest import TestCase
+import os
+import tempfile
+
+import numpy as np
+
+import import_from_root
+from src.mixer import Mixer
+from src.quadcopter import Quadcopter
+from src.tuning import DisturbanceProfile, Tuner
+
+
+class TestTuning(TestCase):
+    def test_profile(self):
+        profile = DisturbanceProfile('test', 2, [[0.5, 0.6, 0.1, 0, 0]], [[1, 'FORWARD']], [[0, 0.01, 0], [0, 0.02, 0]], 0.1, 0.55)
+        self.assertIsNone(profile.get_torque(0.2))
+        self.assertEqual(profile.get_torque(0.52), (0.1, 0, 0))
+        self.assertEqual(profile.get_torque(0.57), (0.1, 0.01, 0))
+        self.assertEqual(profile.get_torque(0.7), (0, 0.02, 0))
+        self.assertEqual(profile.get_commands(), [(1, Quadcopter.Action.FORWARD.value)])
+        self.assertEqual(profile.get_events(), [0, 0.6, 0.75, 1])
+        names = [x.name for x in DisturbanceProfile.load('../data/disturbances.json')]
+        self.assertIn('hover_gust', names)
+        self.assertIn('turbulence', names)
+
+    def test_score(self):
+        time = np.arange(100) * 0.01
+        angles = np.zeros((100, 2))
+        angles[50:, 0] = 20
+        angles[55:60, 0] = 25
+        setpoints = np.zeros((100, 3))
+        setpoints[50:, 0] = 20
+        powers = np.full((100, 4), 7.5)
+        powers[:10, 0] = 10
+        result = {
+            'time': time, 'angles': angles, 'yaw_rate': np.zeros(100), 'setpoints': setpoints,
+            'powers': powers, 'altitude': np.ones(100)
+        }
+        profile = DisturbanceProfile('test', 1, actions=[[0.5, 'FORWARD']])
+        metrics = dict(zip(Tuner.CONST_METRIC_NAMES, Tuner.score(result, profile, Mixer(['a'], [[0, 0, 0]]))))
+        self.assertAlmostEqual(metrics['overshoot'], 0.25)
+        self.assertAlmostEqual(metrics['settling_time'], 0.1)
+        self.assertAlmostEqual(metrics['peak_error'], 5)
+        self.assertAlmostEqual(metrics['saturation'], 0.1)
+        self.assertEqual(metrics['crashed'], 0)
+        self.assertGreater(metrics['score'], 0)
+
+    def test_evaluate(self):
+        tuner = Tuner([DisturbanceProfile('short', 0.5, [[0.1, 0.2, 0.02, 0, 0]])], processes=1, seed=1)
+        parameters = Tuner.get_parameters(Quadcopter)
+        self.assertEqual(len(parameters), len(Tuner.CONST_PARAMETER_NAMES))
+        with tuner:
+            scores = tuner.evaluate(np.vstack((parameters, tuner.sample(1))))
+        self.assertEqual(scores.shape, (2,))
+        self.assertEqual(tuner.flights, 2)
+        self.assertRaises(ValueError, tuner.evaluate, np.zeros((1, 3)))
+
+        path = os.path.join(tempfile.mkdtemp(), 'results.npz')
+        tuner.save(path)
+        results = Tuner.load(path)
+        self.assertEqual(results['profile_names'].tolist(), ['short'])
+        self.assertEqual(results['x_kp'].dtype, np.float32)
+        self.assertAlmostEqual(float(results['x_kp'][0]), parameters[0], 6)
+        np.testing.assert_allclose(results['score'], scores, rtol=1e-6)
+        os.remove(path)